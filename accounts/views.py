@@ -6,6 +6,7 @@ from django.contrib.auth.views import (
     PasswordResetView, PasswordResetConfirmView
 )
 from django.urls import reverse_lazy
+from analysis.kpis import DASHBOARD_CARDS, kpi_cards
 from .forms import CustomUserCreationForm
 
 class CustomLoginView(LoginView):
@@ -46,5 +47,5 @@ def home_view(request):
 # New protected view for the dashboard
 @login_required
 def dashboard_view(request):
-    # This renders the authenticated dashboard page (dashboard.html)
-    return render(request, 'accounts/dashboard.html')
\ No newline at end of file
+    # Module links plus the KPI cards, read from the precomputed snapshots (analysis.kpis)
+    return render(request, 'accounts/dashboard.html', {'kpi_cards': kpi_cards(DASHBOARD_CARDS)})
\ No newline at end of file
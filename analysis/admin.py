@@ -1,3 +1,16 @@
 from django.contrib import admin
+from .models import KPISnapshot
 
-# Register your models here.
+
+@admin.register(KPISnapshot)
+class KPISnapshotAdmin(admin.ModelAdmin):
+    # Written by analysis.kpis, never edited by hand
+    list_display = ('metric', 'period', 'entity_code', 'value', 'previous_value', 'change_percent', 'is_latest')
+    list_filter = ('metric', 'is_latest')
+    search_fields = ('entity_code',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class AnalysisConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'analysis'
-    verbose_name = 'Performance Management & Analysis'
\ No newline at end of file
+    verbose_name = 'Performance Management & Analysis'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,236 @@
+"""
+Budget vs actual drill-down for one budget year, served one tree level at a time:
+
+    department -> GL accounts along the chart's parent_account hierarchy -> cost center
+
+Amounts on a header account itself sit in a "(direct postings)" node beside its sub-accounts.
+
+Budget is the approved BudgetTransaction lines (department x GL account). Actuals are the
+GLMonthlyBalance rollup of the fiscal year, assigned to a department through its CostCenter codes;
+actuals on cost centers with no department sit under an Unassigned node. Cost center is the
+finest grain of the ledger but not of the budget, so cost center nodes carry actuals only.
+
+Actuals cover the expense accounts (Income Statement, debit balance) and any other account
+budgeted that year (CAPEX asset accounts), each signed by its normal balance.
+
+Every level is one or two GROUP BY queries on the rollup, stored in the report fragment cache per
+node; a department's per-account totals are cached once and reused by every account node under
+it, so opening an account is a cache read and a walk of the (small) chart of accounts.
+"""
+import datetime
+from decimal import Decimal
+from django.db.models import Max, Q, Sum
+from budget_input.models import BudgetTransaction
+from data_management.fragment_cache import BUDGET, LEDGER, cached_fragment
+from data_management.models import GLMonthlyBalance
+from data_management.statements import add_months
+from setup.fiscal import get_fiscal_config
+from setup.models import CostCenter, Department, GLAccount
+
+SOURCES = (LEDGER, BUDGET)
+# Department node of actuals whose cost center is not mapped to a department
+UNASSIGNED = 0
+
+
+def budget_years():
+    """Budget years with approved lines, latest first."""
+    return list(
+        BudgetTransaction.objects.filter(status='APPROVED')
+        .values_list('budget_year', flat=True).distinct().order_by('-budget_year')
+    )
+
+
+def latest_budget_year():
+    return BudgetTransaction.objects.filter(status='APPROVED').aggregate(year=Max('budget_year'))['year']
+
+
+def year_months(year):
+    """(first month, first month after) of fiscal year `year` in the monthly rollup."""
+    first = datetime.date(year, get_fiscal_config()['START_MONTH'], 1)
+    return first, add_months(first, 12)
+
+
+def _approved(year):
+    return BudgetTransaction.objects.filter(status='APPROVED', budget_year=year)
+
+
+def _actuals(year):
+    """GLMonthlyBalance rows of fiscal year `year` on the accounts the drill-down compares."""
+    first, end = year_months(year)
+    budgeted = _approved(year).values('gl_account__gl_account_code')
+    return GLMonthlyBalance.objects.filter(period__gte=first, period__lt=end).filter(
+        Q(gl_account_code__financial_statement='Income Statement', gl_account_code__normal_balance='Debit')
+        | Q(gl_account_code__in=budgeted)
+    )
+
+
+def _in_department(rows, department):
+    mapped = CostCenter.objects.filter(department__isnull=False).values('code')
+    if department == UNASSIGNED:
+        return rows.exclude(cost_center_code__in=mapped)
+    return rows.filter(cost_center_code__in=CostCenter.objects.filter(department=department).values('code'))
+
+
+def _movement(normal_balance, debit, credit):
+    debit, credit = debit or Decimal(0), credit or Decimal(0)
+    return credit - debit if normal_balance == 'Credit' else debit - credit
+
+
+def _node(label, budget, actual, params=None, **extra):
+    """One tree node: figures as floats for the browser; `params` fetch its children (None for a leaf)."""
+    node = {
+        'label': label,
+        'budget': None if budget is None else round(float(budget), 2),
+        'actual': round(float(actual), 2),
+        'variance': None,
+        'variance_pct': None,
+        'children': params,
+    }
+    if budget is not None:
+        node['variance'] = round(float(budget - actual), 2)  # positive: under budget
+        if budget:
+            node['variance_pct'] = round(float((budget - actual) / budget * 100), 1)
+    node.update(extra)
+    return node
+
+
+def department_nodes(year):
+    """Root level: one node per department with a budget or actuals in `year`, Unassigned last."""
+    budget = dict(_approved(year).values_list('department').annotate(total=Sum('annual_amount')).order_by())
+    departments = dict(CostCenter.objects.filter(department__isnull=False).values_list('code', 'department'))
+    actual = {}
+    for cost_center, normal_balance, debit, credit in (
+        _actuals(year).values_list('cost_center_code', 'gl_account_code__normal_balance')
+        .annotate(debit_total=Sum('debit'), credit_total=Sum('credit')).order_by()
+    ):
+        department = departments.get(cost_center, UNASSIGNED)
+        actual[department] = actual.get(department, Decimal(0)) + _movement(normal_balance, debit, credit)
+
+    names = dict(Department.objects.filter(pk__in=set(budget) | set(actual)).values_list('pk', 'name'))
+    nodes = [
+        _node(name, budget.get(pk, Decimal(0)), actual.get(pk, Decimal(0)), {'department': pk}, level='department')
+        for pk, name in sorted(names.items(), key=lambda item: item[1])
+    ]
+    if actual.get(UNASSIGNED):
+        nodes.append(_node(
+            'Unassigned cost centers', None, actual[UNASSIGNED], {'department': UNASSIGNED}, level='department',
+        ))
+    return nodes
+
+
+def chart_of_accounts():
+    """{account code: (name, parent code)} of the whole chart."""
+    return {
+        code: (name, parent)
+        for code, name, parent in GLAccount.objects.values_list(
+            'gl_account_code', 'gl_account_name', 'parent_account__gl_account_code',
+        )
+    }
+
+
+def department_account_totals(year, department):
+    """
+    {account code: [budget, actual]} of one department in `year`, for the accounts it posts to
+    and, rolled up, every header account above them.
+    """
+    totals = {}
+    budget = () if department == UNASSIGNED else (
+        _approved(year).filter(department=department)
+        .values_list('gl_account__gl_account_code').annotate(total=Sum('annual_amount')).order_by()
+    )
+    for code, amount in budget:
+        totals.setdefault(code, [Decimal(0), Decimal(0)])[0] += amount or 0
+    for code, normal_balance, debit, credit in (
+        _in_department(_actuals(year), department)
+        .values_list('gl_account_code', 'gl_account_code__normal_balance')
+        .annotate(debit_total=Sum('debit'), credit_total=Sum('credit')).order_by()
+    ):
+        totals.setdefault(code, [Decimal(0), Decimal(0)])[1] += _movement(normal_balance, debit, credit)
+
+    chart = chart_of_accounts()
+    rolled = {}
+    for code, (budget, actual) in totals.items():
+        seen = set()
+        while code is not None and code not in seen:  # a mis-keyed parent loop stops at the repeat
+            seen.add(code)
+            entry = rolled.setdefault(code, [Decimal(0), Decimal(0)])
+            entry[0] += budget
+            entry[1] += actual
+            code = chart.get(code, (None, None))[1]
+    return rolled
+
+
+def cached_department_account_totals(year, department):
+    return cached_fragment(
+        'variance_tree_department', SOURCES, lambda: department_account_totals(year, department),
+        extra=(year, department),
+    )
+
+
+def account_nodes(year, department, account=None, chart=None):
+    """
+    The accounts directly under `account` (the top of the chart when None) within a department,
+    plus a "(direct postings)" node for budget or actuals on `account` itself, so the children
+    always add up to their parent.
+    """
+    totals = cached_department_account_totals(year, department)
+    chart = chart or chart_of_accounts()
+    children = {code for code in totals if chart.get(code, (None, None))[1] == account}
+
+    def label(code):
+        return f'{code} - {chart[code][0]}' if code in chart else code
+
+    nodes = []
+    for code in sorted(children):
+        budget, actual = totals[code]
+        has_children = any(chart.get(other, (None, None))[1] == code for other in totals)
+        nodes.append(_node(
+            label(code), None if department == UNASSIGNED else budget, actual,
+            {'department': department, 'account': code}, level='account', code=code, header=has_children,
+        ))
+    if account in totals:
+        budget, actual = totals[account]
+        budget -= sum(totals[code][0] for code in children)
+        actual -= sum(totals[code][1] for code in children)
+        if budget or actual:
+            nodes.append(_node(
+                f'{label(account)} (direct postings)', None if department == UNASSIGNED else budget, actual,
+                {'department': department, 'account': account, 'direct': 1}, level='account', code=account,
+                header=False,
+            ))
+    return nodes
+
+
+def cost_center_nodes(year, department, account):
+    """Actuals of a department's cost centers on one account (the budget has no cost center)."""
+    names = dict(CostCenter.objects.values_list('code', 'name'))
+    nodes = []
+    for cost_center, normal_balance, debit, credit in (
+        _in_department(_actuals(year).filter(gl_account_code=account), department)
+        .values_list('cost_center_code', 'gl_account_code__normal_balance')
+        .annotate(debit_total=Sum('debit'), credit_total=Sum('credit'))
+        .order_by('cost_center_code')
+    ):
+        label = cost_center or 'No cost center'
+        if names.get(cost_center):
+            label = f'{cost_center} - {names[cost_center]}'
+        nodes.append(_node(label, None, _movement(normal_balance, debit, credit), level='cost_center'))
+    return nodes
+
+
+def tree_level(year, department=None, account=None, direct=False):
+    """
+    The child nodes of one tree node: departments for the root, then the department's accounts,
+    then header accounts' children, then cost centers under a posting account. `direct` opens a
+    header account's own postings (its "(direct postings)" node) at the cost center level.
+    Cached per node.
+    """
+    def build():
+        if department is None:
+            return department_nodes(year)
+        chart = chart_of_accounts()
+        if not direct and (account is None or any(parent == account for name, parent in chart.values())):
+            return account_nodes(year, department, account, chart)
+        return cost_center_nodes(year, department, account)
+
+    return cached_fragment('variance_tree', SOURCES, build, extra=(year, department, account, bool(direct)))
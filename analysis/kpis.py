@@ -0,0 +1,268 @@
+"""
+KPI snapshots (KPISnapshot) for the landing dashboard and the analysis performance cards.
+
+Ledger metrics (revenue, expenses, net profit and its fiscal year to date, profit margin, expense
+ratio, total assets, trailing-twelve-month return on assets) are computed per month from the GL
+rollups: one GROUP BY over GLMonthlyBalance for the Income Statement accounts and one over
+GLBalanceSnapshot for the asset accounts. They are stored per entity and for all entities (entity
+'' - lines without an entity code only count there). Closing AUM comes from the fund histories,
+budgeted net profit from the approved forecast versions.
+
+Each refresh rewrites the metric's rows from a start period onwards together with their change
+against the previous stored period and the is_latest flag, so a card is one indexed read:
+    refresh_ledger_kpis(from_month)  after every rollup refresh (data_management.rollups.ledger_refreshed)
+    refresh_budget_kpis()            after a forecast version is approved (analysis.signals)
+    refresh_aum_kpis()               nightly, with the rest, by `manage.py refresh_kpi_snapshots`
+"""
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Max, Min, Q, Sum
+from django.db.models.functions import TruncMonth
+from budget_input.models import ApprovedBudgetVersion
+from data_management.balance_sheet import section_of
+from data_management.models import GLMonthlyBalance, GLBalanceSnapshot
+from data_management.rollups import month_start
+from data_management.statements import add_months, compact_amount, fiscal_year_first_month
+from setup.fiscal import get_fiscal_config
+from setup.models import GLAccount, RSAFundHistorical, ManagedFundHistorical
+from .models import KPISnapshot, KPI_METRIC_CHOICES
+
+ALL_ENTITIES = ''
+
+LEDGER_METRICS = (
+    'revenue', 'expenses', 'net_profit', 'net_profit_ytd', 'profit_margin', 'expense_ratio',
+    'total_assets', 'return_on_assets',
+)
+RATIO_METRICS = {'profit_margin', 'expense_ratio', 'return_on_assets'}
+METRIC_LABELS = dict(KPI_METRIC_CHOICES)
+
+# Cards of the landing dashboard: (metric, icon, colour)
+DASHBOARD_CARDS = [
+    ('closing_aum', 'fas fa-chart-pie', 'success'),
+    ('revenue', 'fas fa-hand-holding-usd', 'warning'),
+    ('net_profit_ytd', 'fas fa-coins', 'primary'),
+    ('profit_margin', 'fas fa-percentage', 'info'),
+    ('total_assets', 'fas fa-university', 'secondary'),
+    ('return_on_assets', 'fas fa-arrow-up', 'danger'),
+]
+
+
+# --- Storing ---
+
+def _store(metrics, values, from_period=None):
+    """
+    Replaces the rows of `metrics` from `from_period` (all rows when None) with `values`
+    ({(metric, entity): {period: Decimal}}), linking each row to the previous stored period and
+    moving is_latest. Returns the number of rows written.
+    """
+    existing = KPISnapshot.objects.filter(metric__in=metrics)
+    if from_period is not None:
+        existing = existing.filter(period__gte=from_period)
+
+    previous = {}
+    if from_period is not None:
+        # The last value before from_period carries into the first rewritten row
+        before = KPISnapshot.objects.filter(metric__in=metrics, period__lt=from_period)
+        last = before.values('metric', 'entity_code').annotate(last=Max('period')).order_by()
+        keys = Q()
+        for row in last:
+            keys |= Q(metric=row['metric'], entity_code=row['entity_code'], period=row['last'])
+        if keys:
+            previous = {(m, e): v for m, e, v in before.filter(keys).values_list('metric', 'entity_code', 'value')}
+
+    rows = []
+    for (metric, entity), series in values.items():
+        prior = previous.get((metric, entity))
+        for period in sorted(series):
+            value = Decimal(series[period]).quantize(Decimal('0.000001'))
+            change = None
+            if prior:
+                change = float((value - prior) / abs(prior) * 100)
+            rows.append(KPISnapshot(
+                metric=metric, entity_code=entity, period=period, value=value,
+                previous_value=prior, change_percent=change,
+            ))
+            prior = value
+
+    with transaction.atomic():
+        existing.delete()
+        KPISnapshot.objects.bulk_create(rows, batch_size=2000)
+        KPISnapshot.objects.filter(metric__in=metrics, is_latest=True).update(is_latest=False)
+        latest = Q()
+        for row in KPISnapshot.objects.filter(metric__in=metrics).values('metric', 'entity_code').annotate(last=Max('period')).order_by():
+            latest |= Q(metric=row['metric'], entity_code=row['entity_code'], period=row['last'])
+        if latest:
+            KPISnapshot.objects.filter(metric__in=metrics).filter(latest).update(is_latest=True)
+    return len(rows)
+
+
+# --- Ledger metrics ---
+
+def _asset_accounts():
+    fields = {
+        'code': 'gl_account_code', 'statement': 'financial_statement', 'category': 'category',
+        'sub_category': 'sub_category', 'normal_balance': 'normal_balance',
+    }
+    accounts = GLAccount.objects.filter(financial_statement='Balance Sheet').values_list(*fields.values())
+    return [row[0] for row in accounts if section_of(dict(zip(fields, row))) == 'ASSETS']
+
+
+def ledger_kpi_values(first_month, last_month):
+    """{(metric, entity): {month: value}} of LEDGER_METRICS for the months [first_month, last_month]."""
+    start_month = get_fiscal_config()['START_MONTH']
+    # Twelve months back for the TTM profit (which also covers the fiscal year to date)
+    lookback = add_months(first_month, -11)
+
+    revenue = defaultdict(Decimal)
+    expenses = defaultdict(Decimal)
+    movements = (
+        GLMonthlyBalance.objects.filter(
+            gl_account_code__financial_statement='Income Statement', period__gte=lookback, period__lte=last_month,
+        )
+        .values_list('entity_code', 'period', 'gl_account_code__normal_balance')
+        .annotate(debit_total=Sum('debit'), credit_total=Sum('credit'))
+        .order_by()
+    )
+    entities = {ALL_ENTITIES}
+    for entity, period, normal_balance, debit, credit in movements:
+        net = (debit or 0) - (credit or 0)
+        for key in {ALL_ENTITIES, entity}:
+            if normal_balance == 'Credit':
+                revenue[key, period] -= net
+            else:
+                expenses[key, period] += net
+        entities.add(entity)
+
+    assets = defaultdict(Decimal)
+    for entity, period, balance in (
+        GLBalanceSnapshot.objects.filter(
+            gl_account_code__in=_asset_accounts(), period__gte=first_month, period__lte=last_month,
+        )
+        .values_list('entity_code', 'period')
+        .annotate(total=Sum('closing_balance'))
+        .order_by()
+    ):
+        for key in {ALL_ENTITIES, entity}:
+            assets[key, period] += balance or 0
+        entities.add(entity)
+
+    values = defaultdict(dict)
+    for entity in entities:
+        profits = {}
+        month = lookback
+        while month <= last_month:
+            profits[month] = revenue.get((entity, month), Decimal('0')) - expenses.get((entity, month), Decimal('0'))
+            month = add_months(month, 1)
+        month = first_month
+        while month <= last_month:
+            month_revenue = revenue.get((entity, month))
+            month_expenses = expenses.get((entity, month))
+            month_assets = assets.get((entity, month))
+            if entity == ALL_ENTITIES or month_revenue is not None or month_expenses is not None or month_assets is not None:
+                month_revenue = month_revenue or Decimal('0')
+                month_expenses = month_expenses or Decimal('0')
+                fy_first = fiscal_year_first_month(month, start_month)
+                values['revenue', entity][month] = month_revenue
+                values['expenses', entity][month] = month_expenses
+                values['net_profit', entity][month] = profits[month]
+                values['net_profit_ytd', entity][month] = sum(
+                    profit for m, profit in profits.items() if fy_first <= m <= month
+                )
+                if month_revenue:
+                    values['profit_margin', entity][month] = profits[month] / month_revenue
+                    values['expense_ratio', entity][month] = month_expenses / month_revenue
+                if month_assets is not None:
+                    values['total_assets', entity][month] = month_assets
+                    if month_assets:
+                        ttm = sum(profit for m, profit in profits.items() if add_months(month, -11) <= m <= month)
+                        values['return_on_assets', entity][month] = ttm / month_assets
+            month = add_months(month, 1)
+    return values
+
+
+def refresh_ledger_kpis(from_month=None):
+    """Rewrites the ledger KPIs from `from_month` (every rollup month when None). Returns rows written."""
+    bounds = GLMonthlyBalance.objects.aggregate(first=Min('period'), last=Max('period'))
+    if bounds['first'] is None:
+        KPISnapshot.objects.filter(metric__in=LEDGER_METRICS).delete()
+        return 0
+    from_month = max(month_start(from_month), bounds['first']) if from_month else None
+    return _store(LEDGER_METRICS, ledger_kpi_values(from_month or bounds['first'], bounds['last']), from_month)
+
+
+# --- Fund and budget metrics ---
+
+def refresh_aum_kpis():
+    """Rewrites closing AUM (all RSA and managed funds, per month of the period end). Returns rows written."""
+    totals = defaultdict(Decimal)
+    for history_model in (RSAFundHistorical, ManagedFundHistorical):
+        for month, total in (
+            history_model.objects.annotate(month=TruncMonth('period_end_date'))
+            .values_list('month')
+            .annotate(total=Sum('aum_closing_balance'))
+            .order_by()
+        ):
+            totals[month] += total or 0
+    return _store(('closing_aum',), {('closing_aum', ALL_ENTITIES): dict(totals)} if totals else {})
+
+
+def refresh_budget_kpis():
+    """
+    Rewrites budgeted net profit from the approved forecast versions, stored at the last month
+    of their fiscal year (the latest approval wins when a year has several). Returns rows written.
+    """
+    start_month = get_fiscal_config()['START_MONTH']
+    budgets = {}
+    for year, net_profit in (
+        ApprovedBudgetVersion.objects.filter(status='APPROVED')
+        .order_by('approval_date', 'submission_date')
+        .values_list('forecast_year', 'final_net_profit')
+    ):
+        budgets[add_months(datetime.date(year, start_month, 1), 11)] = net_profit
+    return _store(('budget_net_profit',), {('budget_net_profit', ALL_ENTITIES): budgets} if budgets else {})
+
+
+# --- Cards ---
+
+def format_kpi(metric, value):
+    if value is None:
+        return 'n/a'
+    if metric in RATIO_METRICS:
+        return f"{value:.2%}"
+    return compact_amount(value)
+
+
+def kpi_cards(cards, entity=ALL_ENTITIES):
+    """
+    Performance cards for `cards` ([(metric, icon, colour), ...]) from the latest snapshots of
+    `entity`, in one query on the partial is_latest index.
+    """
+    latest = {
+        snapshot.metric: snapshot
+        for snapshot in KPISnapshot.objects.filter(
+            entity_code=entity, is_latest=True, metric__in=[metric for metric, _, _ in cards],
+        )
+    }
+    result = []
+    for metric, icon, color in cards:
+        snapshot = latest.get(metric)
+        change, trend = 'n/a', 'up'
+        if snapshot is not None and snapshot.previous_value is not None:
+            if metric in RATIO_METRICS:
+                points = (snapshot.value - snapshot.previous_value) * 100
+                change, trend = f"{points:+.2f} pts", 'up' if points >= 0 else 'down'
+            elif snapshot.change_percent is not None:
+                change, trend = f"{snapshot.change_percent:+.1f}%", 'up' if snapshot.change_percent >= 0 else 'down'
+        result.append({
+            'metric': metric,
+            'title': METRIC_LABELS[metric],
+            'value': format_kpi(metric, snapshot.value if snapshot else None),
+            'period': snapshot.period if snapshot else None,
+            'change': change,
+            'trend': trend,
+            'icon': icon,
+            'color': color,
+        })
+    return result
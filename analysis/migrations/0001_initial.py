@@ -0,0 +1,79 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="KPISnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "metric",
+                    models.CharField(
+                        choices=[
+                            ("revenue", "Total Revenue"),
+                            ("expenses", "Total Expenses"),
+                            ("net_profit", "Net Profit"),
+                            ("net_profit_ytd", "Net Profit (Fiscal YTD)"),
+                            ("profit_margin", "Profit Margin"),
+                            ("expense_ratio", "Expense Ratio"),
+                            ("total_assets", "Total Assets"),
+                            ("return_on_assets", "Return on Assets (TTM)"),
+                            ("closing_aum", "Closing AUM"),
+                            ("budget_net_profit", "Budgeted Net Profit"),
+                        ],
+                        max_length=30,
+                    ),
+                ),
+                ("period", models.DateField(verbose_name="Month")),
+                (
+                    "entity_code",
+                    models.CharField(blank=True, default="", max_length=50),
+                ),
+                ("value", models.DecimalField(decimal_places=6, max_digits=24)),
+                (
+                    "previous_value",
+                    models.DecimalField(
+                        blank=True, decimal_places=6, max_digits=24, null=True
+                    ),
+                ),
+                ("change_percent", models.FloatField(blank=True, null=True)),
+                ("is_latest", models.BooleanField(default=False)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "KPI Snapshot",
+                "verbose_name_plural": "KPI Snapshots",
+                "ordering": ["metric", "entity_code", "period"],
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("is_latest", True)),
+                        fields=["entity_code", "metric"],
+                        name="kpisnapshot_latest_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="kpisnapshot",
+            constraint=models.UniqueConstraint(
+                fields=("metric", "entity_code", "period"),
+                name="kpisnapshot_metric_entity_period_uniq",
+            ),
+        ),
+    ]
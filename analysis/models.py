@@ -1,3 +1,54 @@
 from django.db import models
+from django.db.models import Q
 
-# Create your models here.
+KPI_METRIC_CHOICES = [
+    ('revenue', 'Total Revenue'),
+    ('expenses', 'Total Expenses'),
+    ('net_profit', 'Net Profit'),
+    ('net_profit_ytd', 'Net Profit (Fiscal YTD)'),
+    ('profit_margin', 'Profit Margin'),
+    ('expense_ratio', 'Expense Ratio'),
+    ('total_assets', 'Total Assets'),
+    ('return_on_assets', 'Return on Assets (TTM)'),
+    ('closing_aum', 'Closing AUM'),
+    ('budget_net_profit', 'Budgeted Net Profit'),
+]
+
+
+class KPISnapshot(models.Model):
+    """
+    One precomputed KPI value: metric x month x entity, with the change against the metric's
+    previous period. Maintained by analysis.kpis after GL imports and forecast approvals so the
+    dashboards read their cards instead of recomputing them. entity_code '' is all entities.
+    """
+    metric = models.CharField(max_length=30, choices=KPI_METRIC_CHOICES)
+    period = models.DateField(verbose_name="Month")  # first day of the month
+    entity_code = models.CharField(max_length=50, blank=True, default='')
+    value = models.DecimalField(max_digits=24, decimal_places=6)
+    # The metric's value in its previous stored period (months for the ledger, fiscal years for budgets)
+    previous_value = models.DecimalField(max_digits=24, decimal_places=6, null=True, blank=True)
+    # (value - previous) / |previous| * 100; None when there is no previous value or it is zero
+    change_percent = models.FloatField(null=True, blank=True)
+    # The newest period of this metric and entity: what the dashboard cards show
+    is_latest = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "KPI Snapshot"
+        verbose_name_plural = "KPI Snapshots"
+        ordering = ['metric', 'entity_code', 'period']
+        constraints = [
+            models.UniqueConstraint(fields=['metric', 'entity_code', 'period'], name='kpisnapshot_metric_entity_period_uniq'),
+        ]
+        indexes = [
+            # Partial: the dashboards read only the latest row of each metric
+            models.Index(fields=['entity_code', 'metric'], condition=Q(is_latest=True), name='kpisnapshot_latest_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_metric_display()} {self.period:%Y-%m} {self.entity_code or 'All entities'}"
+
+    @property
+    def change(self):
+        """value - previous_value (percentage points for ratio metrics)."""
+        return None if self.previous_value is None else self.value - self.previous_value
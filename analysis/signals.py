@@ -0,0 +1,21 @@
+"""
+Keeps the KPI snapshots (analysis.kpis) current: ledger KPIs follow every GL rollup refresh
+(imports, rollbacks, revaluations), budget KPIs follow forecast approvals.
+"""
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from data_management.rollups import ledger_refreshed
+from .kpis import refresh_budget_kpis, refresh_ledger_kpis
+
+
+@receiver(ledger_refreshed)
+def refresh_kpis_after_ledger_change(sender, from_month=None, **kwargs):
+    refresh_ledger_kpis(from_month)
+
+
+@receiver(post_save, sender='budget_input.ApprovedBudgetVersion')
+def refresh_kpis_after_approval(sender, instance, raw=False, **kwargs):
+    # Any save may approve or withdraw a version; the budget KPIs are a handful of rows
+    if not raw:
+        transaction.on_commit(refresh_budget_kpis)
@@ -1,3 +1,50 @@
-from django.test import TestCase
+import datetime
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from budget_input.models import BudgetTransaction
+from data_management.models import GLMonthlyBalance
+from setup.models import CostCenter, Department, GLAccount, Location, State
+from .drilldown import tree_level
 
-# Create your tests here.
+
+@override_settings(FRAGMENT_CACHE={'ENABLED': False})
+class VarianceDrilldownTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user('planner')
+        self.department = Department.objects.create(name='Operations')
+        CostCenter.objects.create(code='CC1', name='Branch', department=self.department)
+        location = Location.objects.create(name='Head Office', state=State.objects.create(name='Lagos'))
+        accounts = {}
+        for code, parent in (('6000', None), ('6100', '6000'), ('6200', '6000')):
+            accounts[code] = GLAccount.objects.create(
+                gl_account_code=code, gl_account_name=f'Expense {code}', category='Opex',
+                financial_statement='Income Statement', account_type='Expense', normal_balance='Debit',
+                is_postable=parent is not None, parent_account=accounts.get(parent),
+            )
+        # Budget and actuals on the header account itself as well as on its sub-accounts
+        for code, budget, actual in (('6000', 300, 250), ('6100', 1000, 900), ('6200', 500, 700)):
+            BudgetTransaction.objects.create(
+                budget_year=2025, transaction_type='OPEX', department=self.department, gl_account=accounts[code],
+                location=location, description=f'Budget {code}', annual_amount=Decimal(budget),
+                submitted_by=user, status='APPROVED',
+            )
+            GLMonthlyBalance.objects.create(
+                period=datetime.date(2025, 3, 1), gl_account_code=accounts[code], cost_center_code='CC1',
+                debit=Decimal(actual), line_count=1,
+            )
+
+    def test_children_add_up_to_the_header_account(self):
+        [header] = tree_level(2025, self.department.pk)
+        self.assertEqual((header['budget'], header['actual']), (1800.0, 1850.0))
+
+        children = tree_level(2025, self.department.pk, '6000')
+        self.assertEqual(sum(node['budget'] for node in children), header['budget'])
+        self.assertEqual(sum(node['actual'] for node in children), header['actual'])
+        direct = children[-1]
+        self.assertTrue(direct['label'].endswith('(direct postings)'))
+        self.assertEqual((direct['budget'], direct['actual']), (300.0, 250.0))
+
+        self.assertEqual(direct['children'], {'department': self.department.pk, 'account': '6000', 'direct': 1})
+        [cost_center] = tree_level(2025, self.department.pk, '6000', direct=True)
+        self.assertEqual(cost_center['actual'], 250.0)
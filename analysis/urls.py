@@ -10,5 +10,7 @@ urlpatterns = [
     path('trends/', views.trend_dashboard_view, name='trend_dashboard'),
     path('report/income_statement/', views.analysis_report_view, {'report_type': 'income_statement'}, name='analysis_income_statement'),
     path('report/balance_sheet/', views.analysis_report_view, {'report_type': 'balance_sheet'}, name='analysis_balance_sheet'),
+    path('drilldown/', views.variance_drilldown_view, name='variance_drilldown'),
+    path('drilldown/nodes/', views.variance_drilldown_nodes_view, name='variance_drilldown_nodes'),
     path('report/cash_flow/', views.analysis_report_view, {'report_type': 'cash_flow'}, name='analysis_cash_flow'),
 ]
\ No newline at end of file
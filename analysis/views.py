@@ -2,14 +2,26 @@
 
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
 from decimal import Decimal
 # FIX: Import REPORTING_PERIOD_CHOICES along with IncomeStatementFilterForm
 from data_management.forms import IncomeStatementFilterForm, REPORTING_PERIOD_CHOICES 
+from .kpis import ALL_ENTITIES, kpi_cards
+from .drilldown import UNASSIGNED, budget_years, latest_budget_year, tree_level
 import datetime
 import random # Used for mocking variance figures
 import json # NEW: To serialize data for JavaScript
 
 
+# Performance cards: (metric, icon, colour)
+ANALYSIS_CARDS = [
+    ('closing_aum', 'fas fa-chart-pie', 'success'),
+    ('profit_margin', 'fas fa-percentage', 'primary'),
+    ('return_on_assets', 'fas fa-arrow-up', 'info'),
+    ('revenue', 'fas fa-hand-holding-usd', 'warning'),
+]
+
+
 def generate_mock_analysis_data():
     """Mocks the data based on the Analysis.xlsx - Sheet1.csv structure."""
     data = []
@@ -65,21 +77,27 @@ def analysis_dashboard_view(request):
     filter_form = IncomeStatementFilterForm(request.GET)
     
     # Mock data generation based on the CSV structure
-    financial_data = generate_mock_analysis_data()
+    raw_data = generate_mock_analysis_data()
     
     # Extract unique period labels from the first item
-    period_labels = list(financial_data[0]['periods'].keys()) if financial_data else []
-    
-    # Mock KPI cards (using the latest data)
-    latest_data = {item['description']: list(item['periods'].values())[-1] for item in financial_data if item['periods']}
-    
-    performance_cards = [
-        {'title': 'Closing AUM', 'value': f'₦{latest_data.get("Closing AUM (₦)", 0):,.0f}', 'change': '+1.5%', 'trend': 'up', 'icon': 'fas fa-chart-pie', 'color': 'success'},
-        {'title': 'Profit Margin', 'value': f'{latest_data.get("Profit Margin", 0.0):.2%}', 'change': '+0.2%', 'trend': 'up', 'icon': 'fas fa-percentage', 'color': 'primary'},
-        {'title': 'Return on Assets (ROA)', 'value': f'{latest_data.get("Return on Assets (ROA)", 0.0):.2%}', 'change': '+0.1%', 'trend': 'up', 'icon': 'fas fa-arrow-up', 'color': 'info'},
-        {'title': 'Total Revenue', 'value': f'₦{latest_data.get("Total Revenue (₦)", 0):,.0f}', 'change': '+2.0%', 'trend': 'up', 'icon': 'fas fa-hand-holding-usd', 'color': 'warning'},
+    period_labels = list(raw_data[0]['periods'].keys()) if raw_data else []
+
+    # Rows as value lists aligned to period_labels for {% period_row %}
+    financial_data = [
+        {
+            'description': item['description'],
+            'type': 'metric',
+            'is_percent': item['is_percent'],
+            'is_major': 'Total Revenue' in item['description'] or 'Closing AUM' in item['description'],
+            'values': [item['periods'].get(label) for label in period_labels],
+        }
+        for item in raw_data
     ]
     
+    # Latest KPI snapshots (analysis.kpis), for the selected entity when one is filtered
+    entity = (filter_form.cleaned_data.get('entity') or ALL_ENTITIES) if filter_form.is_valid() else ALL_ENTITIES
+    performance_cards = kpi_cards(ANALYSIS_CARDS, entity)
+    
     context = {
         'filter_form': filter_form,
         'performance_cards': performance_cards,
@@ -244,4 +262,48 @@ def trend_dashboard_view(request):
         'chart_data_json': chart_data_json,
         'report_type': 'Comprehensive Trend Dashboard',
     }
-    return render(request, 'analysis/trend_dashboard.html', context)
\ No newline at end of file
+    return render(request, 'analysis/trend_dashboard.html', context)
+
+
+@login_required
+def variance_drilldown_view(request):
+    """
+    Budget vs actual tree (department -> GL account hierarchy -> cost center) for a budget year;
+    the page loads each level from variance_drilldown_nodes_view as a node is opened.
+    """
+    years = budget_years()
+    try:
+        year = int(request.GET.get('year') or latest_budget_year() or datetime.date.today().year)
+    except ValueError:
+        year = latest_budget_year() or datetime.date.today().year
+    context = {
+        'report_type': 'Budget vs Actual Drill-Down',
+        'year': year,
+        'years': years,
+        'unassigned': UNASSIGNED,
+    }
+    return render(request, 'analysis/variance_drilldown.html', context)
+
+
+@login_required
+def variance_drilldown_nodes_view(request):
+    """
+    One level of the budget vs actual tree as JSON: the departments without `department`, the
+    department's top accounts without `account`, then an account's sub-accounts or cost centers
+    (a header account's own cost centers with direct=1).
+    """
+    try:
+        year = int(request.GET['year'])
+        department = int(request.GET['department']) if request.GET.get('department') not in (None, '') else None
+    except (KeyError, ValueError):
+        return JsonResponse({'error': 'year (and department, when given) must be integers.'}, status=400)
+    account = request.GET.get('account') or None
+    if account is not None and department is None:
+        return JsonResponse({'error': 'account needs a department.'}, status=400)
+    direct = account is not None and request.GET.get('direct') == '1'
+    return JsonResponse({
+        'year': year,
+        'department': department,
+        'account': account,
+        'nodes': tree_level(year, department, account, direct),
+    })
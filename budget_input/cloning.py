@@ -0,0 +1,70 @@
+"""
+Cloning of budget versions inside the database, for building an alternative budget from an
+existing one instead of re-entering it.
+
+clone_budget_version() copies an ApprovedBudgetVersion: its base BudgetAssumption (one row, so the
+drivers can be edited without touching the original), the version row itself, and all of its
+ForecastGLTransaction lines. The line copy is a single INSERT ... SELECT built from the ORM query,
+so a 100k-line version is copied by the database in one pass and no line is ever loaded into
+Python.
+
+The year's OPEX / CAPEX lines (BudgetTransaction) are not copied: they belong to the budget year,
+not to a version, so a copy would simply add to the year's totals.
+"""
+from django.db import connections, transaction
+from django.db.models import Value
+from .models import ApprovedBudgetVersion, BudgetAssumption, ForecastGLTransaction
+
+
+def insert_select(queryset, overrides):
+    """
+    Copies every row of `queryset` into its own table with one INSERT ... SELECT, the columns of
+    `overrides` ({field name: value}) set to the given values instead of copied; the primary key is
+    left to the database. Returns the number of rows inserted.
+    """
+    meta = queryset.model._meta
+    copied = [field for field in meta.concrete_fields if not field.primary_key and field.name not in overrides]
+    aliases = {
+        f'clone_{name}': Value(value, output_field=meta.get_field(name)) for name, value in overrides.items()
+    }
+    # The SELECT lists the model fields first, then the annotations, each in the given order
+    select = queryset.order_by().annotate(**aliases).values_list(*(field.attname for field in copied), *aliases)
+    sql, params = select.query.sql_with_params()
+
+    connection = connections[queryset.db]
+    quote = connection.ops.quote_name
+    columns = [field.column for field in copied] + [meta.get_field(name).column for name in overrides]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {quote(meta.db_table)} ({', '.join(quote(column) for column in columns)}) {sql}",
+            params,
+        )
+        return cursor.rowcount
+
+
+def clone_budget_version(version, version_name, user):
+    """
+    Copies `version` as a new PENDING version `version_name` submitted by `user`, with a copy of its
+    base assumption under the same name and all of its forecast lines. Returns (new version,
+    forecast lines copied).
+    """
+    with transaction.atomic(using=ApprovedBudgetVersion.objects.db):
+        assumption = BudgetAssumption.objects.get(pk=version.base_assumption_id)
+        assumption.pk = None
+        assumption.version_name = version_name
+        assumption.created_by = user
+        assumption.save()
+
+        clone = ApprovedBudgetVersion.objects.create(
+            version_name=version_name,
+            forecast_year=version.forecast_year,
+            base_assumption=assumption,
+            final_net_profit=version.final_net_profit,
+            final_closing_cash=version.final_closing_cash,
+            submitted_by=user,
+            status='PENDING',
+        )
+        forecast_lines = insert_select(
+            ForecastGLTransaction.objects.filter(approved_version=version), {'approved_version': clone.pk},
+        )
+    return clone, forecast_lines
@@ -0,0 +1,119 @@
+"""
+Forecast / scenario downloads (XLSX / CSV) built on the server from budget_input.forecast, so the
+file always matches the engine rather than whatever the browser last rendered.
+
+Both formats stream: the CSV is written row by row into a StreamingHttpResponse, and the workbook
+is built with openpyxl in write-only mode (rows go straight to the sheet's XML on disk) and sent
+with a FileResponse, so a five-year horizon with per-department detail never sits in memory as a
+workbook or a response body.
+"""
+import csv
+import tempfile
+from decimal import Decimal
+from django.http import FileResponse, StreamingHttpResponse
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from data_management.exports import XLSX_CONTENT_TYPE, Echo
+from .forecast import STATEMENT_LINES, STATEMENT_TITLES
+
+CENT = Decimal('0.01')
+# Balance sheet lines are point-in-time: a year shows its closing value, not a sum of months
+CLOSING_LINES = {key for key, label in STATEMENT_LINES['BS']} | {'closing_cash'}
+OPENING_LINES = {'opening_cash'}
+
+
+def _year_total(key, values):
+    if key in CLOSING_LINES:
+        return values[-1]
+    if key in OPENING_LINES:
+        return values[0]
+    return sum(values, Decimal(0))
+
+
+def statement_lines(forecast, statement):
+    """
+    Yields (label, [monthly values..., yearly totals...], is_total) for one statement of a forecast;
+    department detail ('departments' in the IS rows) becomes one line per department.
+    """
+    months = forecast[statement]
+    department_names = sorted({name for month in months for name in month.get('departments', {})})
+
+    def line(key, values):
+        totals = [_year_total(key, values[i:i + 12]) for i in range(0, len(values), 12)]
+        return [value.quantize(CENT) for value in values + totals]
+
+    for key, label in STATEMENT_LINES[statement]:
+        if key == 'departments':
+            for name in department_names:
+                values = [month.get('departments', {}).get(name, Decimal(0)) for month in months]
+                yield f'  {label} - {name}', line(key, values), False
+        else:
+            yield label, line(key, [month[key] for month in months]), label.isupper()
+
+
+def header_row(forecast):
+    metadata = forecast['metadata']
+    first_year = metadata['year']
+    return ['Line'] + list(metadata['months']) + [f'FY{first_year + i}' for i in range(metadata.get('years', 1))]
+
+
+def export_filename(forecast):
+    """File name without extension."""
+    metadata = forecast['metadata']
+    name = f"Forecast_{metadata['year']}"
+    if metadata.get('years', 1) > 1:
+        name += f"-{metadata['year'] + metadata['years'] - 1}"
+    scenario = metadata.get('scenario')
+    if scenario and (scenario['revenue_override'] or scenario['opex_reduction'] or scenario['tax_rate'] != 30):
+        name += '_Scenario_R{}_O{}_T{}'.format(*(
+            f'{Decimal(scenario[key]).normalize():f}' for key in ('revenue_override', 'opex_reduction', 'tax_rate')
+        ))
+    return name
+
+
+def csv_response(forecast):
+    """StreamingHttpResponse of all three statements, one 'Statement' column ahead of each line."""
+    writer = csv.writer(Echo())
+    headers = header_row(forecast)
+
+    def rows():
+        yield writer.writerow(['Statement'] + headers)
+        for statement in ('IS', 'BS', 'CF'):
+            for label, values, is_total in statement_lines(forecast, statement):
+                yield writer.writerow([STATEMENT_TITLES[statement], label.strip()] + values)
+
+    response = StreamingHttpResponse(rows(), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename={export_filename(forecast)}.csv'
+    return response
+
+
+def xlsx_response(forecast):
+    """FileResponse of a write-only workbook with one sheet per statement."""
+    wb = Workbook(write_only=True)
+    headers = header_row(forecast)
+    bold = Font(bold=True)
+
+    def styled(ws, value, font=None, number_format=None):
+        cell = WriteOnlyCell(ws, value=value)
+        if font:
+            cell.font = font
+        if number_format:
+            cell.number_format = number_format
+        return cell
+
+    for statement in ('IS', 'BS', 'CF'):
+        ws = wb.create_sheet(STATEMENT_TITLES[statement])
+        ws.freeze_panes = 'B2'
+        ws.column_dimensions['A'].width = 36
+        ws.append([styled(ws, header, bold) for header in headers])
+        for label, values, is_total in statement_lines(forecast, statement):
+            font = bold if is_total else None
+            ws.append([styled(ws, label, font)] + [styled(ws, value, font, '#,##0.00') for value in values])
+
+    output = tempfile.TemporaryFile()
+    wb.save(output)
+    output.seek(0)
+    return FileResponse(
+        output, as_attachment=True, filename=f'{export_filename(forecast)}.xlsx', content_type=XLSX_CONTENT_TYPE,
+    )
@@ -0,0 +1,255 @@
+"""
+Budget forecast engine: the monthly base case (IS / BS / CF) the forecast dashboard starts from,
+and the scenario recalculation the dashboard runs in the browser (revenue growth, OPEX reduction,
+tax rate), so a scenario can be rebuilt and exported on the server.
+
+build_base_case() runs from the approved OPEX / CAPEX of each budget year in the horizon; a later
+year without approved lines carries the previous year's amounts forward. With by_department,
+each month's admin expenses are also split by department (IS rows get a 'departments' dict).
+"""
+import datetime
+from decimal import Decimal
+from django.db.models import Sum
+from .models import BudgetTransaction
+
+MAX_HORIZON_YEARS = 5
+MONTH_NAMES = [datetime.date(2000, m, 1).strftime('%b') for m in range(1, 13)]
+
+# Statement lines in display order: (key, label); 'departments' expands to one line per department
+STATEMENT_LINES = {
+    'IS': [
+        ('revenue_mgmt_fee', 'Mgmt Fee Revenue'),
+        ('revenue_admin_fee', 'Admin Fee Revenue'),
+        ('total_revenue', 'TOTAL REVENUE'),
+        ('investment_return', 'Investment Income'),
+        ('staff_costs', 'Staff Costs'),
+        ('admin_expenses', 'Admin/OPEX Expenses'),
+        ('departments', 'Admin/OPEX'),
+        ('total_opex', 'TOTAL OPEX'),
+        ('pbt', 'PROFIT BEFORE TAX'),
+        ('tax', 'Tax Expense'),
+        ('net_profit', 'NET PROFIT'),
+    ],
+    'BS': [
+        ('cash_balance', 'Cash & Bank'),
+        ('fixed_assets', 'Fixed Assets (CAPEX)'),
+        ('total_assets', 'TOTAL ASSETS'),
+        ('liabilities', 'Current Liabilities'),
+        ('aum_liability', 'AUM Liability (Equity)'),
+        ('retained_earnings', 'Retained Earnings'),
+        ('total_liabilities_equity', 'TOTAL LIA & EQUITY'),
+    ],
+    'CF': [
+        ('opening_cash', 'Opening Cash Balance'),
+        ('net_cash_ops', 'Net Cash from Ops'),
+        ('net_cash_investing', 'Net Cash from Investing'),
+        ('net_cash_financing', 'Net Cash from Financing'),
+        ('net_change_cash', 'Net Change in Cash'),
+        ('closing_cash', 'CLOSING CASH BALANCE'),
+    ],
+}
+STATEMENT_TITLES = {'IS': 'Income Statement', 'BS': 'Balance Sheet', 'CF': 'Cash Flow'}
+
+
+def month_labels(first_year, years=1):
+    return [f'{m}-{str(year)[2:]}' for year in range(first_year, first_year + years) for m in MONTH_NAMES]
+
+
+def approved_amounts(first_year, years=1):
+    """
+    ({(budget_year, transaction_type): annual total}, {budget_year: {department: OPEX total}}) of
+    the approved lines in the horizon, from one GROUP BY.
+    """
+    totals = {}
+    departments = {}
+    for year, transaction_type, department, total in (
+        BudgetTransaction.objects.filter(
+            status='APPROVED', budget_year__gte=first_year, budget_year__lt=first_year + years,
+        )
+        .values_list('budget_year', 'transaction_type', 'department__name')
+        .annotate(total=Sum('annual_amount'))
+        .order_by('budget_year', 'department__name')
+    ):
+        totals[year, transaction_type] = totals.get((year, transaction_type), Decimal(0)) + (total or 0)
+        if transaction_type == 'OPEX':
+            departments.setdefault(year, {})[department] = total or Decimal(0)
+    return totals, departments
+
+
+def build_base_case(forecast_year, assumptions, years=1, by_department=False):
+    """
+    Base Case monthly forecast from `forecast_year` for `years` years under `assumptions`
+    (a BudgetAssumption): {'metadata': {'year', 'years', 'months', 'version'}, 'IS', 'BS', 'CF'},
+    one dict per month in each statement.
+    """
+    totals, department_opex = approved_amounts(forecast_year, years)
+    labels = month_labels(forecast_year, years)
+    forecast_data = {
+        'metadata': {
+            'year': forecast_year,
+            'years': years,
+            'months': labels,
+            'version': assumptions.version_name,
+        },
+        'IS': [],
+        'BS': [],
+        'CF': [],
+    }
+
+    # Assumptions & Constants
+    initial_aum = Decimal(5_000_000_000)
+
+    # Initialize monthly balances for iterative calculation
+    aum_monthly = initial_aum
+    retained_earnings = Decimal(0)
+    cash_balance = Decimal(1_000_000_000)
+    fixed_assets = Decimal(0)
+
+    approved_opex = approved_capex = Decimal(0)
+    departments = {}
+    for index, label in enumerate(labels):
+        if index % 12 == 0:
+            # A year without approved lines keeps the previous year's budget
+            year = forecast_year + index // 12
+            if (year, 'OPEX') in totals or index == 0:
+                approved_opex = totals.get((year, 'OPEX'), Decimal(0))
+                departments = department_opex.get(year, {})
+            if (year, 'CAPEX') in totals or index == 0:
+                approved_capex = totals.get((year, 'CAPEX'), Decimal(0))
+            monthly_opex_base = approved_opex / 12 if approved_opex else Decimal(0)
+            monthly_capex_base = approved_capex / 12 if approved_capex else Decimal(0)
+
+        # I. Income Statement Calculation (Monthly)
+        monthly_aum_growth = aum_monthly * assumptions.new_fund_aum_growth / 12
+        monthly_investment_return = aum_monthly * assumptions.investment_return_rate / 12
+
+        revenue_mgmt_fee = aum_monthly * assumptions.mgmt_fee_rate / 12
+        revenue_admin_fee = aum_monthly * assumptions.admin_fee_rate / 12
+        total_revenue = revenue_mgmt_fee + revenue_admin_fee
+
+        staff_costs = total_revenue * assumptions.staff_cost_percent
+        admin_growth = Decimal(1) + assumptions.admin_expense_growth / 12
+        admin_expenses = monthly_opex_base * admin_growth
+        total_opex = staff_costs + admin_expenses
+
+        pbt = total_revenue + monthly_investment_return - total_opex
+        net_profit = pbt * Decimal(0.7) # Mock 30% tax
+        tax_amount = pbt * Decimal(0.3)
+
+        # II. Balance Sheet Calculation (Cumulative/Ending Balance)
+        aum_monthly += monthly_aum_growth
+        aum_end_balance = aum_monthly
+        retained_earnings += net_profit
+        fixed_assets += monthly_capex_base # Accumulate CAPEX as assets
+
+        # III. Cash Flow Calculation
+        net_cash_ops = total_revenue - total_opex
+        net_cash_investing = monthly_capex_base * Decimal(-1)
+        net_change_cash = net_cash_ops + net_cash_investing
+        opening_cash_prev = cash_balance
+        cash_balance += net_change_cash
+
+        income = {
+            'period': label,
+            'revenue_mgmt_fee': revenue_mgmt_fee,
+            'revenue_admin_fee': revenue_admin_fee,
+            'total_revenue': total_revenue,
+            'staff_costs': staff_costs,
+            'admin_expenses': admin_expenses,
+            'total_opex': total_opex,
+            'investment_return': monthly_investment_return,
+            'pbt': pbt,
+            'tax': tax_amount,
+            'net_profit': net_profit,
+        }
+        if by_department:
+            income['departments'] = {name: amount / 12 * admin_growth for name, amount in departments.items()}
+        forecast_data['IS'].append(income)
+
+        forecast_data['BS'].append({
+            'period': label,
+            'cash_balance': cash_balance,
+            'fixed_assets': fixed_assets,
+            'total_assets': cash_balance + fixed_assets + aum_end_balance,
+            'liabilities': Decimal(1_000_000_000), # Fixed initial liabilities
+            'retained_earnings': retained_earnings,
+            'aum_liability': aum_end_balance,
+            'total_liabilities_equity': Decimal(1_000_000_000) + retained_earnings + aum_end_balance,
+        })
+
+        forecast_data['CF'].append({
+            'period': label,
+            'net_cash_ops': net_cash_ops,
+            'net_cash_investing': net_cash_investing,
+            'net_cash_financing': Decimal(0),
+            'net_change_cash': net_change_cash,
+            'opening_cash': opening_cash_prev,
+            'closing_cash': cash_balance,
+        })
+    return forecast_data
+
+
+def apply_scenario(base, revenue_override=0, opex_reduction=0, tax_rate=30):
+    """
+    The base case under a scenario, as the dashboard's Apply Scenario recalculates it: revenue
+    scaled by +revenue_override %, OPEX by -opex_reduction %, tax at tax_rate %; cash, retained
+    earnings and fixed assets are rolled forward again. Returns a new forecast dict.
+    """
+    tax = Decimal(tax_rate) / 100
+    revenue_multiplier = 1 + Decimal(revenue_override) / 100
+    opex_multiplier = 1 - Decimal(opex_reduction) / 100
+
+    scenario = {
+        'metadata': dict(base['metadata'], scenario={
+            'revenue_override': revenue_override, 'opex_reduction': opex_reduction, 'tax_rate': tax_rate,
+        }),
+        'IS': [],
+        'BS': [],
+        'CF': [],
+    }
+    retained_earnings = Decimal(0)
+    cash_balance = base['CF'][0]['opening_cash'] if base['CF'] else Decimal(1_000_000_000)
+    accumulated_capex = Decimal(0)
+
+    for income, balance, cash in zip(base['IS'], base['BS'], base['CF']):
+        revenue_mgmt_fee = income['revenue_mgmt_fee'] * revenue_multiplier
+        revenue_admin_fee = income['revenue_admin_fee'] * revenue_multiplier
+        total_revenue = income['total_revenue'] * revenue_multiplier
+        staff_costs = income['staff_costs'] * opex_multiplier
+        admin_expenses = income['admin_expenses'] * opex_multiplier
+        total_opex = staff_costs + admin_expenses
+
+        pbt = total_revenue + income['investment_return'] - total_opex
+        tax_amount = pbt * tax
+        net_profit = pbt - tax_amount
+        retained_earnings += net_profit
+
+        net_cash_ops = total_revenue - total_opex
+        net_change_cash = net_cash_ops + cash['net_cash_investing']
+        opening_cash = cash_balance
+        cash_balance += net_change_cash
+        accumulated_capex += abs(cash['net_cash_investing'])
+        total_assets = cash_balance + accumulated_capex + balance['aum_liability']
+
+        scenario_income = dict(
+            income,
+            revenue_mgmt_fee=revenue_mgmt_fee, revenue_admin_fee=revenue_admin_fee, total_revenue=total_revenue,
+            staff_costs=staff_costs, admin_expenses=admin_expenses, total_opex=total_opex,
+            pbt=pbt, tax=tax_amount, net_profit=net_profit,
+        )
+        if 'departments' in income:
+            scenario_income['departments'] = {
+                name: amount * opex_multiplier for name, amount in income['departments'].items()
+            }
+        scenario['IS'].append(scenario_income)
+        scenario['BS'].append(dict(
+            balance,
+            cash_balance=cash_balance, retained_earnings=retained_earnings, fixed_assets=accumulated_capex,
+            total_assets=total_assets, total_liabilities_equity=total_assets,
+        ))
+        scenario['CF'].append(dict(
+            cash,
+            net_cash_ops=net_cash_ops, net_change_cash=net_change_cash,
+            opening_cash=opening_cash, closing_cash=cash_balance,
+        ))
+    return scenario
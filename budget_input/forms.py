@@ -3,7 +3,7 @@ from django import forms
 from crispy_forms.helper import FormHelper
 from crispy_forms.layout import Layout, Submit, Fieldset, Row, Column, HTML
 # UPDATED: Import new models and Setup models
-from .models import BudgetAssumption, BudgetTransaction, PINDataSubmission
+from .models import ApprovedBudgetVersion, BudgetAssumption, BudgetTransaction, PINDataSubmission
 from setup.models import DateDetail, GLAccount, Department, Location, State, Region, RSAFund 
 
 # --- (BudgetAssumptionForm from previous step is retained here) ---
@@ -248,4 +248,40 @@ class PINDataForm(forms.ModelForm):
                 ),
             ),
             Submit('submit', 'Save Entry', css_class='btn-success mt-4 w-100')
-        )
\ No newline at end of file
+        )
+
+
+# --- Budget Version Cloning ---
+
+class CloneBudgetVersionForm(forms.Form):
+    source = forms.ModelChoiceField(
+        queryset=ApprovedBudgetVersion.objects.order_by('-forecast_year', 'version_name'),
+        label="Budget Version to Copy",
+        empty_label="--- Select Version ---",
+    )
+    version_name = forms.CharField(
+        max_length=100, label="New Version Name",
+        widget=forms.TextInput(attrs={'placeholder': 'e.g., FY2026 Downside Case'}),
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.helper = FormHelper()
+        self.helper.form_method = 'post'
+        self.helper.layout = Layout(
+            Row(
+                Column('source', css_class='form-group col-md-6 mb-0'),
+                Column('version_name', css_class='form-group col-md-6 mb-0'),
+            ),
+            Submit('submit', 'Clone Version', css_class='btn-primary mt-3'),
+        )
+
+    def clean_version_name(self):
+        # The copy's base assumption takes the same name, so it must be free in both tables
+        version_name = self.cleaned_data['version_name'].strip()
+        if (
+            ApprovedBudgetVersion.objects.filter(version_name=version_name).exists()
+            or BudgetAssumption.objects.filter(version_name=version_name).exists()
+        ):
+            raise forms.ValidationError("A budget version or assumption with this name already exists.")
+        return version_name
@@ -1,3 +1,177 @@
+import datetime
+import io
+from decimal import Decimal
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.urls import reverse
+from openpyxl import load_workbook
+from setup.models import DateDetail, Department, GLAccount, Location, State
+from .cloning import clone_budget_version
+from .exports import csv_response, statement_lines
+from .forecast import apply_scenario, build_base_case
+from .models import ApprovedBudgetVersion, BudgetAssumption, BudgetTransaction, ForecastGLTransaction
 
-# Create your tests here.
+
+class CloneBudgetVersionTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('planner')
+        DateDetail.objects.create(date=datetime.date(2025, 1, 1))
+        assumption = BudgetAssumption.objects.create(
+            period_start_date_id=datetime.date(2025, 1, 1), version_name='FY2025 Base', created_by=self.user,
+        )
+        self.version = ApprovedBudgetVersion.objects.create(
+            version_name='FY2025 Base', forecast_year=2025, base_assumption=assumption,
+            final_net_profit=Decimal(100), final_closing_cash=Decimal(200), submitted_by=self.user, status='APPROVED',
+        )
+        self.account = GLAccount.objects.create(
+            gl_account_code='6000', gl_account_name='Opex', category='Opex',
+            financial_statement='Income Statement', account_type='Expense', normal_balance='Debit',
+        )
+        ForecastGLTransaction.objects.bulk_create([
+            ForecastGLTransaction(
+                approved_version=self.version, budget_month=datetime.date(2025, month, 1),
+                gl_account=self.account, amount=Decimal(month * 10),
+            )
+            for month in range(1, 13)
+        ])
+
+    def forecast(self, version):
+        return list(
+            ForecastGLTransaction.objects.filter(approved_version=version)
+            .order_by('budget_month').values_list('budget_month', 'gl_account', 'amount')
+        )
+
+    def test_copies_version_assumption_and_forecast_lines(self):
+        clone, copied = clone_budget_version(self.version, 'FY2025 Downside', self.user)
+        self.assertEqual(copied, 12)
+        self.assertEqual(self.forecast(clone), self.forecast(self.version))
+        self.assertEqual((clone.status, clone.final_net_profit), ('PENDING', Decimal(100)))
+        self.assertNotEqual(clone.base_assumption_id, self.version.base_assumption_id)
+        self.assertEqual(clone.base_assumption.version_name, 'FY2025 Downside')
+        self.assertEqual(len(self.forecast(self.version)), 12)
+
+    def test_budget_lines_are_not_copied(self):
+        BudgetTransaction.objects.create(
+            budget_year=2025, transaction_type='OPEX', gl_account=self.account, description='Rent',
+            department=Department.objects.create(name='Admin'), annual_amount=Decimal(12000),
+            location=Location.objects.create(name='Head Office', state=State.objects.create(name='Lagos')),
+            submitted_by=self.user, status='APPROVED',
+        )
+        clone_budget_version(self.version, 'FY2025 Downside', self.user)
+        self.assertEqual(BudgetTransaction.objects.count(), 1)
+
+
+def dashboard_recalculation(base, revenue_override, opex_reduction, tax_rate):
+    """recalculateForecast() of forecast_dashboard.html, step for step."""
+    tax = Decimal(tax_rate) / 100
+    revenue_multiplier = 1 + Decimal(revenue_override) / 100
+    opex_multiplier = 1 - Decimal(opex_reduction) / 100
+    retained_earnings = accumulated_capex = Decimal(0)
+    cash_balance = base['CF'][0]['opening_cash']
+    months = []
+    for income, balance, cash in zip(base['IS'], base['BS'], base['CF']):
+        total_revenue = income['total_revenue'] * revenue_multiplier
+        total_opex = (income['staff_costs'] + income['admin_expenses']) * opex_multiplier
+        pbt = total_revenue + income['investment_return'] - total_opex
+        net_profit = pbt - pbt * tax
+        retained_earnings += net_profit
+        cash_balance += total_revenue - total_opex + cash['net_cash_investing']
+        accumulated_capex += abs(cash['net_cash_investing'])
+        months.append({
+            'net_profit': net_profit, 'retained_earnings': retained_earnings, 'closing_cash': cash_balance,
+            'total_assets': cash_balance + accumulated_capex + balance['aum_liability'],
+        })
+    return months
+
+
+class ForecastTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('planner', password='secret')
+        DateDetail.objects.create(date=datetime.date(2024, 12, 31))
+        self.assumption = BudgetAssumption.objects.create(
+            period_start_date_id=datetime.date(2024, 12, 31), version_name='FY2025 Base', created_by=self.user,
+        )
+        self.assumption.refresh_from_db()  # the rates as Decimals
+        self.account = GLAccount.objects.create(
+            gl_account_code='6000', gl_account_name='Opex', category='Opex',
+            financial_statement='Income Statement', account_type='Expense', normal_balance='Debit',
+        )
+        self.location = Location.objects.create(name='Head Office', state=State.objects.create(name='Lagos'))
+        self.add_line(2025, 'Admin', 'OPEX', 120000)
+        self.add_line(2025, 'Finance', 'OPEX', 240000)
+        self.add_line(2025, 'Admin', 'CAPEX', 60000)
+
+    def add_line(self, year, department, transaction_type, amount):
+        BudgetTransaction.objects.create(
+            budget_year=year, transaction_type=transaction_type, gl_account=self.account,
+            department=Department.objects.get_or_create(name=department)[0], location=self.location,
+            description='Line', annual_amount=Decimal(amount), unit_cost=Decimal(amount), submitted_by=self.user,
+            status='APPROVED',
+        )
+
+    def base_case(self, **options):
+        return build_base_case(2025, self.assumption, **options)
+
+    def test_scenario_matches_dashboard_recalculation(self):
+        base = self.base_case()
+        scenario = apply_scenario(base, 10, 20, 25)
+        for month, expected in enumerate(dashboard_recalculation(base, 10, 20, 25)):
+            self.assertEqual(scenario['IS'][month]['net_profit'], expected['net_profit'])
+            self.assertEqual(scenario['BS'][month]['retained_earnings'], expected['retained_earnings'])
+            self.assertEqual(scenario['CF'][month]['closing_cash'], expected['closing_cash'])
+            self.assertEqual(scenario['BS'][month]['total_assets'], expected['total_assets'])
+            self.assertEqual(scenario['BS'][month]['total_liabilities_equity'], expected['total_assets'])
+
+    def test_yearly_totals(self):
+        forecast = self.base_case(years=2)
+        lines = {}
+        for statement in ('IS', 'BS', 'CF'):
+            lines.update({label: values for label, values, _ in statement_lines(forecast, statement)})
+        for statement, key, label, total in (
+            ('BS', 'cash_balance', 'Cash & Bank', lambda months: months[-1]),  # closing
+            ('CF', 'closing_cash', 'CLOSING CASH BALANCE', lambda months: months[-1]),
+            ('CF', 'opening_cash', 'Opening Cash Balance', lambda months: months[0]),
+            ('IS', 'total_revenue', 'TOTAL REVENUE', lambda months: sum(months, Decimal(0))),
+        ):
+            self.assertEqual(len(lines[label]), 26, msg=label)
+            for year in range(2):
+                months = [month[key] for month in forecast[statement][12 * year:12 * year + 12]]
+                self.assertEqual(lines[label][24 + year], total(months).quantize(Decimal('0.01')), msg=label)
+
+    def test_year_without_approved_lines_carries_forward(self):
+        forecast = self.base_case(years=3)
+        self.assertEqual(forecast['IS'][12]['admin_expenses'], forecast['IS'][0]['admin_expenses'])
+        self.assertEqual(forecast['CF'][12]['net_cash_investing'], Decimal(-5000))
+
+        self.add_line(2027, 'Admin', 'OPEX', 720000)
+        forecast = self.base_case(years=3)
+        self.assertEqual(forecast['IS'][12]['admin_expenses'], forecast['IS'][0]['admin_expenses'])
+        self.assertEqual(forecast['IS'][24]['admin_expenses'], forecast['IS'][0]['admin_expenses'] * 2)
+        # CAPEX was only approved for 2025 and carries on
+        self.assertEqual(forecast['CF'][35]['net_cash_investing'], Decimal(-5000))
+
+    def test_department_lines_in_csv_and_xlsx(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('budget_input:export_forecast'), {'format': 'csv', 'departments': '1'})
+        rows = b''.join(response.streaming_content).decode().splitlines()
+        department_rows = [row for row in rows if 'Admin/OPEX - ' in row]
+        self.assertEqual([row.split(',')[1] for row in department_rows], ['Admin/OPEX - Admin', 'Admin/OPEX - Finance'])
+        # The year's OPEX with the monthly admin expense growth (5% a year / 12)
+        self.assertTrue(department_rows[0].endswith(',120500.00'))
+
+        response = self.client.get(reverse('budget_input:export_forecast'), {'format': 'xlsx', 'departments': '1'})
+        sheet = load_workbook(io.BytesIO(b''.join(response.streaming_content)))['Income Statement']
+        labels = [row[0] for row in sheet.iter_rows(values_only=True)]
+        self.assertIn('  Admin/OPEX - Finance', labels)
+
+    def test_export_without_scenario_is_the_base_case(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('budget_input:export_forecast'), {
+            'format': 'csv', 'revenue_override': '0', 'opex_override': '0', 'tax_rate': '30',
+        })
+        expected = csv_response(self.base_case())
+        self.assertEqual(b''.join(response.streaming_content), b''.join(expected.streaming_content))
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename=Forecast_2025.csv')
+
+        response = self.client.get(reverse('budget_input:export_forecast'), {'format': 'csv', 'tax_rate': '25'})
+        self.assertIn('_Scenario_R0_O0_T25', response['Content-Disposition'])
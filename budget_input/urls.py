@@ -23,6 +23,9 @@ urlpatterns = [
     #path('forecast/cash_flow/', views.generate_forecast_view, {'report_type': 'cash_flow'}, name='forecast_cash_flow'),
     # --- UPDATED: Single Forecast Dashboard URL ---
     path('forecast/', views.forecast_dashboard_view, name='forecast_dashboard'),
+    path('forecast/export/', views.export_forecast_view, name='export_forecast'),
     # --- NEW: Forecast Approval Endpoint ---
-    path('forecast/submit/', views.submit_forecast_for_approval_view, name='submit_forecast_approval')
+    path('forecast/submit/', views.submit_forecast_for_approval_view, name='submit_forecast_approval'),
+    # Budget version cloning
+    path('versions/', views.budget_versions_view, name='budget_versions'),
 ]
\ No newline at end of file
@@ -1,15 +1,19 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Sum, Q
+from django.db.models import Count, Sum, Q
 from decimal import Decimal
 import datetime # Import for monthly names
 # UPDATED: Import DateDetail model
-from .forms import BudgetAssumptionForm, OPEXBudgetForm, CAPEXBudgetForm, PINDataForm
-from .models import BudgetAssumption, BudgetTransaction, PINDataSubmission
+from .forms import BudgetAssumptionForm, OPEXBudgetForm, CAPEXBudgetForm, PINDataForm, CloneBudgetVersionForm
+from .models import ApprovedBudgetVersion, BudgetAssumption, BudgetTransaction, ForecastGLTransaction, PINDataSubmission
 from setup.models import GLAccount, Department, Location, DateDetail # <-- ADDED DateDetail
 import json 
 from django.db import transaction
+from data_management.fragment_cache import BUDGET, cached_fragment
+from .forecast import MAX_HORIZON_YEARS, apply_scenario, build_base_case, month_labels
+from .exports import csv_response, xlsx_response
+from .cloning import clone_budget_version
 
 @login_required
 def submission_index_view(request):
@@ -188,12 +192,11 @@ def forecast_dashboard_view(request):
     
     # Default to blank data if setup is missing (as requested by user)
     forecast_year = datetime.datetime.now().year + 1
-    MONTH_NAMES = [datetime.date(2000, m, 1).strftime('%b') for m in range(1, 13)]
     
     forecast_data = {
         'metadata': {
             'year': forecast_year,
-            'months': [f'{m}-{str(forecast_year)[2:]}' for m in MONTH_NAMES],
+            'months': month_labels(forecast_year),
             'version': 'Base Case (No Assumptions)'
         },
         'IS': [],
@@ -216,107 +219,12 @@ def forecast_dashboard_view(request):
         
         forecast_year = latest_date_detail.year + 1
         
-        # --- 2. Fetch Base Inputs (Approved Data and Assumptions) ---
-        approved_opex = BudgetTransaction.objects.filter(
-            budget_year=forecast_year,
-            transaction_type='OPEX',
-            status='APPROVED'
-        ).aggregate(total=Sum('annual_amount'))['total'] or Decimal(0)
-        
-        approved_capex = BudgetTransaction.objects.filter(
-            budget_year=forecast_year,
-            transaction_type='CAPEX',
-            status='APPROVED'
-        ).aggregate(total=Sum('annual_amount'))['total'] or Decimal(0)
-        
-        # --- 3. Monthly Forecast Logic (Simplified Base Case) ---
-        MONTH_NAMES_LABELS = [f'{m}-{str(forecast_year)[2:]}' for m in MONTH_NAMES]
-        
-        # Assumptions & Constants
-        initial_aum = Decimal(5_000_000_000) 
-        
-        monthly_opex_base = approved_opex / 12 if approved_opex else Decimal(0)
-        monthly_capex_base = approved_capex / 12 if approved_capex else Decimal(0)
-        
-        # --- Build Financial Statements Data (Base Case for JS) ---
-        forecast_data['metadata'] = {
-            'year': forecast_year,
-            'months': MONTH_NAMES_LABELS,
-            'version': active_assumptions.version_name
-        }
-        
-        # Initialize monthly balances for iterative calculation
-        aum_monthly = initial_aum
-        retained_earnings = Decimal(0)
-        cash_balance = Decimal(1_000_000_000)
-    
-        # --- Line Item Definitions (Mocked) ---
-        for month in range(12):
-            # I. Income Statement Calculation (Monthly)
-            monthly_aum_growth = aum_monthly * active_assumptions.new_fund_aum_growth / 12
-            monthly_investment_return = aum_monthly * active_assumptions.investment_return_rate / 12
-            
-            revenue_mgmt_fee = aum_monthly * active_assumptions.mgmt_fee_rate / 12
-            revenue_admin_fee = aum_monthly * active_assumptions.admin_fee_rate / 12
-            total_revenue = revenue_mgmt_fee + revenue_admin_fee
-            
-            staff_costs = total_revenue * active_assumptions.staff_cost_percent
-            admin_expenses = monthly_opex_base * (Decimal(1) + active_assumptions.admin_expense_growth / 12)
-            total_opex = staff_costs + admin_expenses
-            
-            pbt = total_revenue + monthly_investment_return - total_opex
-            net_profit = pbt * Decimal(0.7) # Mock 30% tax
-            tax_amount = pbt * Decimal(0.3)
-            
-            # II. Balance Sheet Calculation (Cumulative/Ending Balance)
-            aum_monthly += monthly_aum_growth
-            aum_end_balance = aum_monthly
-            retained_earnings += net_profit
-            
-            # III. Cash Flow Calculation
-            net_cash_ops = total_revenue - total_opex 
-            net_cash_investing = monthly_capex_base * Decimal(-1)
-            net_change_cash = net_cash_ops + net_cash_investing
-            opening_cash_prev = cash_balance
-            cash_balance += net_change_cash
-            
-            # --- Store IS Data ---
-            forecast_data['IS'].append({
-                'period': MONTH_NAMES_LABELS[month],
-                'revenue_mgmt_fee': revenue_mgmt_fee,
-                'revenue_admin_fee': revenue_admin_fee,
-                'total_revenue': total_revenue,
-                'staff_costs': staff_costs,
-                'admin_expenses': admin_expenses,
-                'total_opex': total_opex,
-                'investment_return': monthly_investment_return,
-                'pbt': pbt,
-                'tax': tax_amount,
-                'net_profit': net_profit,
-            })
-            
-            # --- Store BS Data (Simplified) ---
-            forecast_data['BS'].append({
-                'period': MONTH_NAMES_LABELS[month],
-                'cash_balance': cash_balance,
-                'fixed_assets': monthly_capex_base * (month + 1), # Accumulate CAPEX as assets
-                'total_assets': cash_balance + monthly_capex_base * (month + 1) + aum_end_balance,
-                'liabilities': Decimal(1_000_000_000), # Fixed initial liabilities
-                'retained_earnings': retained_earnings,
-                'aum_liability': aum_end_balance, 
-                'total_liabilities_equity': Decimal(1_000_000_000) + retained_earnings + aum_end_balance, 
-            });
-            
-            # --- Store CF Data (Simplified) ---
-            forecast_data['CF'].append({
-                'period': MONTH_NAMES_LABELS[month],
-                'net_cash_ops': net_cash_ops,
-                'net_cash_investing': net_cash_investing,
-                'net_cash_financing': Decimal(0),
-                'net_change_cash': net_change_cash,
-                'opening_cash': opening_cash_prev,
-                'closing_cash': cash_balance,
-            });
+        # Served from the fragment cache until the budget inputs change
+        forecast_data = cached_fragment(
+            'forecast_dashboard', (BUDGET,),
+            lambda: build_base_case(forecast_year, active_assumptions),
+            extra=(forecast_year, active_assumptions.pk),
+        )
 
 
     context = {
@@ -328,6 +236,45 @@ def forecast_dashboard_view(request):
     }
     return render(request, 'budget_input/forecast_dashboard.html', context)
 
+@login_required
+def export_forecast_view(request):
+    """
+    Downloads the forecast as XLSX (?format=xlsx, default) or CSV (?format=csv): all three
+    statements, every month and a total per fiscal year, computed on the server from the forecast
+    engine. ?years= extends the horizon (1 to MAX_HORIZON_YEARS), ?departments=1 adds the OPEX
+    lines per department, and revenue_override / opex_override / tax_rate export the scenario
+    set on the dashboard instead of the base case.
+    """
+    latest_date_detail = DateDetail.objects.order_by('-date').first()
+    active_assumptions = BudgetAssumption.objects.order_by('-created_at').first()
+    if not latest_date_detail or not active_assumptions:
+        messages.error(request, "Export failed: setup is incomplete (Date Table or Budget Assumptions missing).")
+        return redirect('budget_input:forecast_dashboard')
+
+    export_format = request.GET.get('format') or 'xlsx'
+    try:
+        years = int(request.GET.get('years') or 1)
+        revenue_override = Decimal(request.GET.get('revenue_override') or 0)
+        opex_reduction = Decimal(request.GET.get('opex_override') or 0)
+        tax_rate = Decimal(request.GET.get('tax_rate') or 30)
+    except (ValueError, ArithmeticError):
+        messages.error(request, "Export failed: the scenario inputs must be numbers.")
+        return redirect('budget_input:forecast_dashboard')
+    if export_format not in ('xlsx', 'csv') or not 1 <= years <= MAX_HORIZON_YEARS:
+        messages.error(request, f"Export failed: choose XLSX or CSV and a horizon of 1 to {MAX_HORIZON_YEARS} years.")
+        return redirect('budget_input:forecast_dashboard')
+
+    forecast = build_base_case(
+        latest_date_detail.year + 1, active_assumptions,
+        years=years, by_department=request.GET.get('departments') == '1',
+    )
+    # Neutral inputs are the base case as the dashboard shows it, not a scenario recalculation
+    if revenue_override or opex_reduction or tax_rate != 30:
+        forecast = apply_scenario(forecast, revenue_override, opex_reduction, tax_rate)
+    if export_format == 'csv':
+        return csv_response(forecast)
+    return xlsx_response(forecast)
+
 # --- NEW: Forecast Approval Submission View ---
 @login_required
 @transaction.atomic
@@ -395,4 +342,30 @@ def submit_forecast_for_approval_view(request):
         
         return redirect('budget_input:forecast_dashboard')
     
-    return redirect('budget_input:forecast_dashboard')
\ No newline at end of file
+    return redirect('budget_input:forecast_dashboard')
+
+
+@login_required
+def budget_versions_view(request):
+    """
+    Lists the budget versions and copies one into a new alternative version (clone_budget_version:
+    INSERT ... SELECT inside the database, so large versions copy in one statement per table).
+    """
+    if request.method == 'POST':
+        form = CloneBudgetVersionForm(request.POST)
+        if form.is_valid():
+            clone, forecast_lines = clone_budget_version(
+                form.cleaned_data['source'], form.cleaned_data['version_name'], request.user,
+            )
+            messages.success(request, f"Version '{clone.version_name}' created with {forecast_lines:,} forecast line(s).")
+            return redirect('budget_input:budget_versions')
+        messages.error(request, "Error cloning the version. Please check the inputs.")
+    else:
+        form = CloneBudgetVersionForm(initial={'source': request.GET.get('source')})
+
+    versions = (
+        ApprovedBudgetVersion.objects.select_related('base_assumption', 'submitted_by')
+        .annotate(line_count=Count('forecastgltransaction'))
+        .order_by('-forecast_year', '-submission_date')
+    )
+    return render(request, 'budget_input/budget_versions.html', {'form': form, 'versions': versions})
@@ -1,3 +1,50 @@
 from django.contrib import admin
+from .models import GLMonthlyBalance, GLBalanceSnapshot, BackgroundJob, DataVersion
 
-# Register your models here.
+
+@admin.register(GLMonthlyBalance)
+class GLMonthlyBalanceAdmin(admin.ModelAdmin):
+    # Derived data: rebuilt by refresh_gl_rollups, never edited by hand
+    list_display = ('period', 'gl_account_code', 'entity_code', 'cost_center_code', 'debit', 'credit', 'line_count')
+    list_filter = ('period',)
+    search_fields = ('gl_account_code__gl_account_code', 'entity_code', 'cost_center_code')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(GLBalanceSnapshot)
+class GLBalanceSnapshotAdmin(admin.ModelAdmin):
+    # Derived data: rolled forward by refresh_gl_rollups, never edited by hand
+    list_display = ('period', 'gl_account_code', 'entity_code', 'cost_center_code', 'closing_balance')
+    list_filter = ('period',)
+    search_fields = ('gl_account_code__gl_account_code', 'entity_code', 'cost_center_code')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'job_type', 'label', 'status', 'progress_current', 'progress_total', 'created_by', 'created_at', 'finished_at', 'worker')
+    list_filter = ('status', 'job_type')
+    search_fields = ('label', 'job_type', 'error')
+    readonly_fields = ('started_at', 'finished_at', 'heartbeat_at', 'worker', 'attempts')
+
+
+@admin.register(DataVersion)
+class DataVersionAdmin(admin.ModelAdmin):
+    # Bumped by data_management.signals, never edited by hand
+    list_display = ('source', 'version', 'updated_at')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
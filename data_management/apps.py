@@ -3,4 +3,7 @@ from django.apps import AppConfig
 class DataManagementConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'data_management'
-    verbose_name = 'Data Management & Import'
\ No newline at end of file
+    verbose_name = 'Data Management & Import'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,215 @@
+"""
+Balance sheet built from month-end balance snapshots.
+
+Each column date D reads the GLBalanceSnapshot of the last month ending on or before D (one query for
+all columns) and, for mid-month dates, adds the month-to-date movements from the net ledger. Filters that are not snapshot dimensions fall back to a single conditional-sum pass over the
+ledger. Income Statement balances roll into equity as cumulative profit.
+"""
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+from django.db.models import Case, DecimalField, F, Max, Sum, Value, When
+from setup.models import GLTransaction
+from .models import GLBalanceSnapshot
+from .rollups import month_start, next_month_start, previous_month_start
+from .statements import FILTER_FIELDS, ROLLUP_FILTERS, note_account, reporting_periods
+
+ACCOUNT_FIELDS = {
+    'account': 'gl_account_code',
+    'name': 'gl_account_code__gl_account_name',
+    'statement': 'gl_account_code__financial_statement',
+    'category': 'gl_account_code__category',
+    'sub_category': 'gl_account_code__sub_category',
+    'normal_balance': 'gl_account_code__normal_balance',
+}
+
+SECTIONS = [
+    ('ASSETS', 'ASSETS', 'TOTAL ASSETS'),
+    ('LIABILITIES', 'LIABILITIES', 'TOTAL LIABILITIES'),
+    ('EQUITY', 'EQUITY', 'TOTAL EQUITY'),
+]
+
+
+def month_end(month):
+    return next_month_start(month) - datetime.timedelta(days=1)
+
+
+def balance_sheet_dates(reporting_period='annual', start_date=None, end_date=None):
+    """Chronological 'as at' dates: period ends of the reporting buckets (the prior year for annual)."""
+    if reporting_period == 'annual':
+        if end_date:
+            try:
+                prior = end_date.replace(year=end_date.year - 1)
+            except ValueError:  # 29 February
+                prior = end_date - datetime.timedelta(days=365)
+            return [prior, end_date]
+        return [month_end(last) for _, _, last in reporting_periods('annual')]
+    dates = [month_end(last) for _, _, last in reporting_periods(reporting_period, start_date, end_date)]
+    if end_date:
+        dates[-1] = end_date
+    return dates
+
+
+def section_of(row):
+    """ASSETS / LIABILITIES / EQUITY for Balance Sheet accounts, EARNINGS for Income Statement accounts."""
+    if row['statement'] == 'Income Statement':
+        return 'EARNINGS'
+    if row['statement'] != 'Balance Sheet':
+        return None
+    text = f"{row['category'] or ''} {row['sub_category'] or ''}".lower()
+    for keyword, section in (('asset', 'ASSETS'), ('liabilit', 'LIABILITIES'), ('equity', 'EQUITY')):
+        if keyword in text:
+            return section
+    return 'ASSETS' if row['normal_balance'] == 'Debit' else 'LIABILITIES'
+
+
+def is_current(row):
+    text = f"{row['category'] or ''} {row['sub_category'] or ''}".lower().replace('-', ' ')
+    return 'current' in text and 'non current' not in text
+
+
+def _balances_from_snapshots(dates, filters):
+    """Yields (column, row) with row['balance'] = debit - credit as at each date."""
+    latest = GLBalanceSnapshot.objects.aggregate(last=Max('period'))['last']
+    if latest is None:
+        latest = previous_month_start(month_start(min(dates)))
+    dimension_filters = {FILTER_FIELDS[key]: value for key, value in filters.items()}
+
+    snapshot_months = {}
+    deltas = []
+    for column, as_at in enumerate(dates):
+        # Last month fully covered by a snapshot
+        month = month_start(as_at) if as_at == month_end(month_start(as_at)) else previous_month_start(month_start(as_at))
+        month = min(month, latest)
+        snapshot_months.setdefault(month, []).append(column)
+        if as_at > month_end(month):
+            deltas.append((column, next_month_start(month), as_at))
+
+    snapshots = (
+        GLBalanceSnapshot.objects.filter(period__in=list(snapshot_months), **dimension_filters)
+        .values('period', *ACCOUNT_FIELDS.values())
+        .annotate(balance=Sum('closing_balance'))
+        .order_by()
+    )
+    for row in snapshots.iterator():
+        for column in snapshot_months[row['period']]:
+            yield column, row
+
+    # Mid-month dates (usually just the latest column): add the month-to-date movements
+    for column, first, last in deltas:
+        movements = (
+            GLTransaction.objects.net()
+            .filter(transaction_date__gte=first, transaction_date__lte=last, **dimension_filters)
+            .values(*ACCOUNT_FIELDS.values())
+            .annotate(balance=Sum(F('base_debit') - F('base_credit')))
+            .order_by()
+        )
+        for row in movements.iterator():
+            yield column, row
+
+
+def _balances_from_ledger(dates, filters):
+    """Single pass over the net ledger with one conditional sum per column (non-rollup filters)."""
+    columns = {
+        f"as_at_{column}": Sum(
+            Case(
+                When(transaction_date__lte=as_at, then=F('base_debit') - F('base_credit')),
+                default=Value(Decimal('0')),
+                output_field=DecimalField(max_digits=22, decimal_places=2),
+            )
+        )
+        for column, as_at in enumerate(dates)
+    }
+    rows = (
+        GLTransaction.objects.net()
+        .filter(transaction_date__lte=max(dates), **{FILTER_FIELDS[key]: value for key, value in filters.items()})
+        .values(*ACCOUNT_FIELDS.values())
+        .annotate(**columns)
+        .order_by()
+    )
+    for row in rows.iterator():
+        for column in range(len(dates)):
+            yield column, {**row, 'balance': row[f"as_at_{column}"]}
+
+
+def build_balance_sheet(reporting_period='annual', start_date=None, end_date=None, filters=None):
+    """
+    Returns {'period_labels', 'rows', 'drill_dates', 'totals'} in the statement template layout
+    (account lines also carry their 'account' code). totals holds
+    per-column lists for 'assets', 'liabilities', 'equity', 'current_assets', 'current_liabilities'.
+    """
+    filters = filters or {}
+    dates = balance_sheet_dates(reporting_period, start_date, end_date)
+    labels = [as_at.strftime('%b %d, %Y') for as_at in dates]
+    size = len(dates)
+
+    def zeros():
+        return [Decimal('0')] * size
+
+    source = _balances_from_snapshots if set(filters) <= ROLLUP_FILTERS else _balances_from_ledger
+    # {section: {group: {account name: [amount per column]}}}
+    accounts = {key: defaultdict(lambda: defaultdict(zeros)) for key, _, _ in SECTIONS}
+    earnings = zeros()
+    current_assets, current_liabilities = zeros(), zeros()
+    codes = {}  # account name: code, for the drill-through links
+
+    for column, row in source(dates, filters):
+        row = {key: row[field] for key, field in ACCOUNT_FIELDS.items()} | {'balance': row['balance'] or Decimal('0')}
+        section = section_of(row)
+        if section is None:
+            continue
+        if section == 'EARNINGS':
+            earnings[column] -= row['balance']
+            continue
+        amount = row['balance'] if section == 'ASSETS' else -row['balance']
+        group = row['sub_category'] or row['category'] or ''
+        accounts[section][group][row['name']][column] += amount
+        note_account(codes, row['name'], row['account'])
+        if is_current(row):
+            if section == 'ASSETS':
+                current_assets[column] += amount
+            elif section == 'LIABILITIES':
+                current_liabilities[column] += amount
+
+    def line(description, row_type, values, account=None):
+        item = {'description': description, 'type': row_type, 'values': list(values)}
+        if account:
+            item['account'] = account
+        return item
+
+    rows = []
+    totals = {}
+    for key, header, total_label in SECTIONS:
+        rows.append(line(header, 'section_header', zeros()))
+        section_total = zeros()
+        for group, names in sorted(accounts[key].items()):
+            if group:
+                rows.append(line(group, 'header', zeros()))
+            for name, values in sorted(names.items()):
+                rows.append(line(name, 'account', values, codes.get(name)))
+                section_total = [a + b for a, b in zip(section_total, values)]
+        if key == 'EQUITY':
+            rows.append(line('Retained earnings (cumulative profit)', 'account', earnings))
+            section_total = [a + b for a, b in zip(section_total, earnings)]
+        totals[key] = section_total
+        rows.append(line(total_label, 'major_total' if key == 'ASSETS' else 'subtotal', section_total))
+
+    liabilities_and_equity = [a + b for a, b in zip(totals['LIABILITIES'], totals['EQUITY'])]
+    rows.append(line('TOTAL LIABILITIES & EQUITY', 'major_total', liabilities_and_equity))
+    difference = [a - b for a, b in zip(totals['ASSETS'], liabilities_and_equity)]
+    if any(difference):
+        rows.append(line('Out of balance (check account classification)', 'account', difference))
+
+    return {
+        'period_labels': labels,
+        'rows': rows,
+        # Ledger lines behind an account line (data_management.drill_through): everything up to the last date
+        'drill_dates': (None, dates[-1]),
+        'totals': {
+            'assets': totals['ASSETS'],
+            'liabilities': totals['LIABILITIES'],
+            'equity': totals['EQUITY'],
+            'current_assets': current_assets,
+            'current_liabilities': current_liabilities,
+        },
+    }
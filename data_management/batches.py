@@ -0,0 +1,97 @@
+"""
+Import batches: every GLTransaction / FundTransaction written by an upload points at that upload's
+UploadHistory row (import_batch), so a bad upload can be taken back out as a unit.
+
+rollback_batch() deletes a batch's lines in chunked DELETEs on the import_batch index, or empties
+whole partitions when the GL table is partitioned and a partition holds nothing but the batch.
+The monthly rollup is corrected by the batch's own totals (rollups.adjust_monthly_balances)
+rather than re-aggregated from the ledger. Lines that were already in the ledger and only
+updated by the upload keep their original batch and are not touched.
+"""
+from django.db import transaction
+from django.db.models import Max, Min
+from setup.models import GLTransaction, FundTransaction
+from setup.netting import reversal_counterparts, release_reversal_netting
+from setup.partitioning import is_partitioned, list_partitions, partition_periods, truncate_partition
+from .models import UploadHistory
+from .rollups import monthly_totals, adjust_monthly_balances
+
+DELETE_CHUNK_SIZE = 5000
+
+STATUS_IMPORTING = 'Importing'
+STATUS_ROLLED_BACK = 'Rolled back'
+
+
+def can_roll_back(batch):
+    return batch.status.startswith('Success')
+
+
+def _delete_in_chunks(lines, progress=None, done=0):
+    """Deletes `lines` DELETE_CHUNK_SIZE primary keys at a time. Returns the running count."""
+    while True:
+        ids = list(lines.order_by().values_list('pk', flat=True)[:DELETE_CHUNK_SIZE])
+        if not ids:
+            return done
+        lines.filter(pk__in=ids).delete()
+        done += len(ids)
+        if progress:
+            progress(done)
+
+
+def _truncate_batch_partitions(lines, batch, first_date, last_date):
+    """Empties the partitions in [first_date, last_date] that only hold lines of `batch`. Returns lines removed."""
+    existing = {name for name, _ in list_partitions()}
+    removed = 0
+    for name, start, end in partition_periods(first_date, last_date):
+        if name not in existing:
+            continue
+        in_partition = GLTransaction.objects.filter(transaction_date__gte=start, transaction_date__lt=end)
+        if in_partition.exclude(import_batch=batch).exists():
+            continue
+        removed += lines.filter(transaction_date__gte=start, transaction_date__lt=end).count()
+        truncate_partition(name)
+    return removed
+
+
+def rollback_batch(batch, progress=None):
+    """
+    Removes every line imported by the UploadHistory `batch` in one transaction and marks the
+    batch rolled back. Reversal pairs with one side in the batch are released first, so their
+    other side counts again. `progress(count, message=None)` is called as lines are deleted.
+    Returns (GL lines removed, fund lines removed).
+    """
+    with transaction.atomic():
+        batch = UploadHistory.objects.select_for_update().get(pk=batch.pk)
+        if not can_roll_back(batch):
+            raise ValueError(f"Upload #{batch.pk} cannot be rolled back (status: {batch.status}).")
+
+        gl_lines = GLTransaction.objects.filter(import_batch=batch)
+        bounds = gl_lines.aggregate(first=Min('transaction_date'), last=Max('transaction_date'))
+        gl_count = 0
+        if bounds['first'] is not None:
+            # Both evaluated before netting is released: released lines change what counts as net
+            removed = list(monthly_totals(gl_lines))
+            restored_ids = list(reversal_counterparts(gl_lines).exclude(import_batch=batch).values_list('pk', flat=True))
+            release_reversal_netting(gl_lines)
+            restored = list(monthly_totals(GLTransaction.objects.filter(pk__in=restored_ids)))
+
+            if progress:
+                progress(0, 'Deleting GL lines')
+            if is_partitioned():
+                gl_count = _truncate_batch_partitions(gl_lines, batch, bounds['first'], bounds['last'])
+            # The date range lets a partitioned table prune to the batch's partitions
+            gl_count = _delete_in_chunks(
+                gl_lines.filter(transaction_date__gte=bounds['first'], transaction_date__lte=bounds['last']),
+                progress, gl_count,
+            )
+            if progress:
+                progress(gl_count, 'Adjusting monthly balances')
+            adjust_monthly_balances(removed=removed, added=restored)
+
+        if progress:
+            progress(gl_count, 'Deleting fund transactions')
+        fund_count = _delete_in_chunks(FundTransaction.objects.filter(import_batch=batch))
+
+        batch.status = f'{STATUS_ROLLED_BACK}: {gl_count + fund_count} lines removed'[:50]
+        batch.save(update_fields=['status'])
+    return gl_count, fund_count
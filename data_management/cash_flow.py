@@ -0,0 +1,126 @@
+"""
+Indirect-method cash flow statement built from monthly GL movements.
+
+Net income comes from Income Statement accounts. Balance Sheet accounts are classified by
+GLAccount.cash_flow_category: NON_CASH movements are added back, OPERATING (and unclassified)
+movements are working-capital changes, INVESTING / FINANCING movements form their sections, and
+CASH accounts give the opening and closing cash. Every period is computed from one pass over
+monthly_account_movements().
+"""
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+from django.db.models import Q
+from .rollups import next_month_start
+from .statements import reporting_periods, month_index, monthly_account_movements, note_account
+
+SECTIONS = [
+    ('OPERATING', 'CASH FLOW FROM OPERATING ACTIVITIES', 'NET CASH FROM OPERATING ACTIVITIES'),
+    ('INVESTING', 'CASH FLOW FROM INVESTING ACTIVITIES', 'NET CASH FROM INVESTING ACTIVITIES'),
+    ('FINANCING', 'CASH FLOW FROM FINANCING ACTIVITIES', 'NET CASH FROM FINANCING ACTIVITIES'),
+]
+
+
+def build_cash_flow(reporting_period='annual', start_date=None, end_date=None, filters=None):
+    """
+    Returns {'period_labels', 'rows', 'drill_dates', 'totals'}. rows use the statement template layout
+    ({'description', 'type', 'values': [amount per period label]}, plus 'account' on account lines); totals holds per-period lists for
+    'operating', 'investing', 'financing', 'net_change', 'opening_cash', 'closing_cash'.
+    """
+    periods = reporting_periods(reporting_period, start_date, end_date)
+    labels = [label for label, _, _ in periods]
+    months = month_index(periods)
+    size = len(periods)
+
+    def zeros():
+        return [Decimal('0')] * size
+
+    net_income = zeros()
+    cash_change = zeros()
+    opening_cash = Decimal('0')
+    # {section: {account name: [amount per period]}}
+    lines = {key: defaultdict(zeros) for key in ('NON_CASH', 'OPERATING', 'INVESTING', 'FINANCING')}
+    codes = {}  # account name: code, for the drill-through links
+
+    movements = monthly_account_movements(
+        periods[0][1], periods[-1][2], filters,
+        carry_forward=Q(gl_account_code__cash_flow_category='CASH'),
+    )
+    for row in movements:
+        movement = row['debit'] - row['credit']
+        position = months.get(row['month'])
+        if position is None:
+            # Cash before the first period: opening balance
+            opening_cash += movement
+            continue
+        if row['statement'] == 'Income Statement':
+            net_income[position] -= movement
+        elif row['statement'] == 'Balance Sheet':
+            category = row['category'] or 'OPERATING'
+            if category == 'CASH':
+                cash_change[position] += movement
+            else:
+                # An increase in a non-cash asset uses cash; an increase in a liability/equity provides it
+                lines[category][row['name']][position] -= movement
+                note_account(codes, row['name'], row['account'])
+
+    def row(description, row_type, values, account=None):
+        item = {'description': description, 'type': row_type, 'values': list(values)}
+        if account:
+            item['account'] = account
+        return item
+
+    def total(*series):
+        return [sum(values, Decimal('0')) for values in zip(*series)] if series else zeros()
+
+    rows = []
+    section_totals = {}
+    for key, header, subtotal in SECTIONS:
+        rows.append(row(header, 'section_header', zeros()))
+        parts = []
+        if key == 'OPERATING':
+            rows.append(row('Net income', 'account', net_income))
+            parts.append(net_income)
+            if lines['NON_CASH']:
+                rows.append(row('Adjustments for non-cash items', 'header', zeros()))
+                for name, values in sorted(lines['NON_CASH'].items()):
+                    rows.append(row(name, 'account', values, codes.get(name)))
+                    parts.append(values)
+            if lines['OPERATING']:
+                rows.append(row('Changes in working capital', 'header', zeros()))
+        for name, values in sorted(lines[key].items()):
+            rows.append(row(name, 'account', values, codes.get(name)))
+            parts.append(values)
+        section_totals[key] = total(*parts)
+        rows.append(row(subtotal, 'subtotal', section_totals[key]))
+
+    net_change = total(*section_totals.values())
+    opening, closing = [], []
+    balance = opening_cash
+    for change in cash_change:
+        opening.append(balance)
+        balance += change
+        closing.append(balance)
+
+    rows.append(row('NET INCREASE/(DECREASE) IN CASH AND CASH EQUIVALENTS', 'major_total', net_change))
+    rows.append(row('Cash and cash equivalents at beginning of period', 'account', opening))
+    difference = [actual - derived for actual, derived in zip(cash_change, net_change)]
+    if any(difference):
+        # Ledger out of balance, or accounts outside Income Statement / Balance Sheet
+        rows.append(row('Unreconciled difference (check account classification)', 'account', difference))
+    rows.append(row('CASH AND CASH EQUIVALENTS AT END OF PERIOD', 'major_total', closing))
+
+    return {
+        'period_labels': labels,
+        'rows': rows,
+        # Ledger lines behind an account line (data_management.drill_through): the movements of the whole range
+        'drill_dates': (periods[0][1], next_month_start(periods[-1][2]) - datetime.timedelta(days=1)),
+        'totals': {
+            'operating': section_totals['OPERATING'],
+            'investing': section_totals['INVESTING'],
+            'financing': section_totals['FINANCING'],
+            'net_change': net_change,
+            'opening_cash': opening,
+            'closing_cash': closing,
+        },
+    }
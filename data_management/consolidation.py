@@ -0,0 +1,344 @@
+"""
+Multi-entity consolidation with intercompany elimination.
+
+For a close period (a month) and a history window ending on it, each entity's monthly figures are
+read from the derived GL tables: Income Statement movements from GLMonthlyBalance and closing
+balances from GLBalanceSnapshot, two grouped queries per entity. Entities are computed in worker
+processes (CONSOLIDATION['WORKERS'], 'spawn', as the import pool) and merged in the caller, where
+every active setup.IntercompanyAccountPair is eliminated month by month: the amount the debit and
+credit side hold in common is removed from both, and anything left over is reported as an
+intercompany difference.
+
+The result holds every month of the window, so the worksheet of any of those months is built
+without touching the database again. It is cached per close period and window through the report
+fragment cache (keyed on the ledger version, which account and pair changes bump as well).
+"""
+import multiprocessing
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from django.conf import settings
+from django.db.models import F, Sum
+from setup.models import GLAccount, IntercompanyAccountPair
+from . import worker
+from .balance_sheet import SECTIONS, section_of
+from .fragment_cache import LEDGER, cached_fragment
+from .models import GLMonthlyBalance, GLBalanceSnapshot
+from .statements import add_months, fiscal_year_first_month
+
+DEFAULT_CONSOLIDATION = {
+    'WORKERS': 4,  # entity processes; 0 or 1 computes every entity in the calling process
+    'PARALLEL_MIN_ENTITIES': 4,  # fewer entities are computed in-process (pool start-up costs more)
+    'MAX_MONTHS': 60,
+}
+
+ELIMINATIONS = 'Eliminations'
+CONSOLIDATED = 'Consolidated'
+NO_ENTITY = '(No entity)'
+
+
+def get_consolidation_config():
+    config = dict(DEFAULT_CONSOLIDATION)
+    config.update(getattr(settings, 'CONSOLIDATION', {}))
+    return config
+
+
+def window_months(close_month, months):
+    """First day of each month of the `months`-month window ending on close_month, oldest first."""
+    return [add_months(close_month, offset) for offset in range(1 - months, 1)]
+
+
+def month_span(first_month, last_month):
+    return (last_month.year - first_month.year) * 12 + last_month.month - first_month.month + 1
+
+
+def consolidation_entities(first_month, last_month):
+    """Entity codes with rollup movements or balances in the window ('' for lines without one)."""
+    entities = set(
+        GLMonthlyBalance.objects.filter(period__gte=first_month, period__lte=last_month)
+        .values_list('entity_code', flat=True).distinct()
+    )
+    entities.update(
+        GLBalanceSnapshot.objects.filter(period__gte=first_month, period__lte=last_month)
+        .values_list('entity_code', flat=True).distinct()
+    )
+    return sorted(entities)
+
+
+def entity_balances(entity, first_month, last_month):
+    """
+    One entity's window as {'movements': {account: [debit - credit per month]}} for Income
+    Statement accounts and {'closing': {account: [closing balance per month]}} for all accounts.
+    """
+    months = window_months(last_month, month_span(first_month, last_month))
+    index = {month: position for position, month in enumerate(months)}
+    size = len(months)
+    result = {'movements': {}, 'closing': {}}
+
+    movements = (
+        GLMonthlyBalance.objects.filter(
+            entity_code=entity, period__gte=first_month, period__lte=last_month,
+            gl_account_code__financial_statement='Income Statement',
+        )
+        .values_list('period', 'gl_account_code')
+        .annotate(total=Sum(F('debit') - F('credit')))
+        .order_by()
+    )
+    closing = (
+        GLBalanceSnapshot.objects.filter(entity_code=entity, period__gte=first_month, period__lte=last_month)
+        .values_list('period', 'gl_account_code')
+        .annotate(total=Sum('closing_balance'))
+        .order_by()
+    )
+    for key, rows in (('movements', movements), ('closing', closing)):
+        accounts = result[key]
+        for period, account, total in rows.iterator():
+            if account not in accounts:
+                accounts[account] = [Decimal('0')] * size
+            accounts[account][index[period]] += total or Decimal('0')
+    return result
+
+
+def _compute_entities(entities, first_month, last_month, workers):
+    if workers <= 1:
+        return [entity_balances(entity, first_month, last_month) for entity in entities], 0
+    # 'spawn': every worker opens its own database connection (data_management.worker)
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=worker.init_worker) as pool:
+        results = list(pool.map(
+            worker.consolidate_entity, entities, [first_month] * len(entities), [last_month] * len(entities),
+        ))
+    return results, workers
+
+
+def _add(target, source):
+    for account, values in source.items():
+        if account not in target:
+            target[account] = list(values)
+        else:
+            target[account] = [a + b for a, b in zip(target[account], values)]
+
+
+def eliminate(totals, pairs, size):
+    """
+    Eliminations of `pairs` against the merged {'movements', 'closing'} totals, as
+    ({'movements': {account: [adjustment per month]}, 'closing': {...}}, [difference, ...]).
+    Income Statement pairs are matched on the month's movements, Balance Sheet pairs on closing
+    balances; a difference is a month where the two sides do not match.
+    """
+    adjustments = {'movements': {}, 'closing': {}}
+    differences = []
+    for pair in pairs:
+        key = 'movements' if pair['statement'] == 'Income Statement' else 'closing'
+        debit_side = totals[key].get(pair['debit_account'], [Decimal('0')] * size)
+        credit_side = totals[key].get(pair['credit_account'], [Decimal('0')] * size)
+        debit_adjustments = [Decimal('0')] * size
+        credit_adjustments = [Decimal('0')] * size
+        for position in range(size):
+            debit_amount = debit_side[position]
+            credit_amount = -credit_side[position]
+            matched = min(max(debit_amount, Decimal('0')), max(credit_amount, Decimal('0')))
+            debit_adjustments[position] = -matched
+            credit_adjustments[position] = matched
+            if debit_amount != credit_amount:
+                differences.append({
+                    'pair': pair['name'],
+                    'position': position,
+                    'debit_side': debit_amount,
+                    'credit_side': credit_amount,
+                    'difference': debit_amount - credit_amount,
+                })
+        _add(adjustments[key], {pair['debit_account']: debit_adjustments, pair['credit_account']: credit_adjustments})
+    return adjustments, differences
+
+
+def consolidate(close_month, months=12, workers=None):
+    """
+    Consolidates every entity over the `months` months ending on close_month:
+    {'months', 'entities', 'accounts', 'entity_data', 'eliminations', 'consolidated',
+    'differences', 'workers', 'seconds'}. entity_data / eliminations / consolidated hold
+    {'movements', 'closing'} per account and month (debit - credit).
+    """
+    started = time.perf_counter()
+    config = get_consolidation_config()
+    month_list = window_months(close_month, months)
+    first_month, last_month = month_list[0], month_list[-1]
+    entities = consolidation_entities(first_month, last_month)
+    if workers is None:
+        workers = 0 if len(entities) < config['PARALLEL_MIN_ENTITIES'] else config['WORKERS']
+    workers = min(workers, len(entities), os.cpu_count() or 1)
+
+    results, used_workers = _compute_entities(entities, first_month, last_month, workers)
+    entity_data = dict(zip(entities, results))
+
+    totals = {'movements': {}, 'closing': {}}
+    for data in results:
+        for key in totals:
+            _add(totals[key], data[key])
+
+    pairs = [
+        {'name': pair.name, 'debit_account': pair.debit_account_id, 'credit_account': pair.credit_account_id,
+         'statement': pair.debit_account.financial_statement}
+        for pair in IntercompanyAccountPair.objects.filter(is_active=True).select_related('debit_account')
+    ]
+    eliminations, differences = eliminate(totals, pairs, len(month_list))
+    consolidated = {key: {account: list(values) for account, values in totals[key].items()} for key in totals}
+    for key in consolidated:
+        _add(consolidated[key], eliminations[key])
+
+    codes = set(consolidated['movements']) | set(consolidated['closing'])
+    accounts = {
+        code: {'account': code, 'name': name, 'statement': statement, 'category': category,
+               'sub_category': sub_category, 'normal_balance': normal_balance}
+        for code, name, statement, category, sub_category, normal_balance in GLAccount.objects.filter(
+            gl_account_code__in=codes,
+        ).values_list(
+            'gl_account_code', 'gl_account_name', 'financial_statement', 'category', 'sub_category', 'normal_balance',
+        )
+    }
+    return {
+        'months': month_list,
+        'entities': entities,
+        'accounts': accounts,
+        'entity_data': entity_data,
+        'eliminations': eliminations,
+        'consolidated': consolidated,
+        'differences': differences,
+        'workers': used_workers,
+        'seconds': time.perf_counter() - started,
+    }
+
+
+def cached_consolidation(close_month, months=12):
+    """consolidate() for a close period and window, from the fragment cache until the ledger changes."""
+    return cached_fragment(
+        'consolidation', (LEDGER,), lambda: consolidate(close_month, months), extra=(close_month, months),
+    )
+
+
+def _columns(result, key, positions):
+    """{account: [per entity..., eliminations, consolidated]} summed over the month `positions`."""
+    sources = [result['entity_data'][entity][key] for entity in result['entities']]
+    sources += [result['eliminations'][key], result['consolidated'][key]]
+    size = len(sources)
+    columns = defaultdict(lambda: [Decimal('0')] * size)
+    for column, accounts in enumerate(sources):
+        for account, values in accounts.items():
+            columns[account][column] += sum((values[position] for position in positions), Decimal('0'))
+    return columns
+
+
+def _eliminated(adjustments, positions):
+    # Each matched amount shows up once as a positive adjustment (on the credit side)
+    return sum((max(values[position], Decimal('0')) for values in adjustments.values() for position in positions), Decimal('0'))
+
+
+def _line(description, row_type, values):
+    return {'description': description, 'type': row_type, 'values': list(values)}
+
+
+def consolidation_worksheet(result, month=None, fiscal_start_month=None):
+    """
+    Worksheet of one month of a consolidate() result (the close period when None), with one
+    column per entity, then Eliminations and Consolidated, in the statement template layout:
+    {'column_labels', 'income_statement', 'balance_sheet', 'totals', 'differences'}. The income
+    statement covers the fiscal year to date (within the window); the balance sheet is as at
+    the month end.
+    """
+    months = result['months']
+    month = month or months[-1]
+    position = months.index(month)
+    fy_first = fiscal_year_first_month(month, fiscal_start_month)
+    ytd = [index for index, m in enumerate(months[:position + 1]) if m >= fy_first]
+    labels = [entity or NO_ENTITY for entity in result['entities']] + [ELIMINATIONS, CONSOLIDATED]
+    size = len(labels)
+    accounts = result['accounts']
+
+    def zeros():
+        return [Decimal('0')] * size
+
+    def add(a, b):
+        return [x + y for x, y in zip(a, b)]
+
+    # Income statement (fiscal year to date): credit-normal accounts are revenue
+    revenue, expenses = {}, {}
+    for account, values in _columns(result, 'movements', ytd).items():
+        info = accounts.get(account)
+        if info is None or not any(values):
+            continue
+        if info['normal_balance'] == 'Credit':
+            revenue[info['name']] = [-value for value in values]
+        else:
+            expenses[info['name']] = values
+    income_rows = []
+    section_totals = []
+    for header, lines, total_label in (('REVENUE', revenue, 'TOTAL REVENUE'), ('EXPENSES', expenses, 'TOTAL EXPENSES')):
+        income_rows.append(_line(header, 'section_header', zeros()))
+        total = zeros()
+        for name, values in sorted(lines.items()):
+            income_rows.append(_line(name, 'account', values))
+            total = add(total, values)
+        income_rows.append(_line(total_label, 'subtotal', total))
+        section_totals.append(total)
+    net_profit = [a - b for a, b in zip(*section_totals)]
+    income_rows.append(_line('NET PROFIT', 'major_total', net_profit))
+
+    # Balance sheet as at the month end; Income Statement balances roll into equity
+    sections = {key: defaultdict(dict) for key, _, _ in SECTIONS}
+    earnings = zeros()
+    for account, values in _columns(result, 'closing', [position]).items():
+        info = accounts.get(account)
+        if info is None:
+            continue
+        section = section_of(info)
+        if section is None or not any(values):
+            continue
+        if section == 'EARNINGS':
+            earnings = [a - b for a, b in zip(earnings, values)]
+            continue
+        amounts = values if section == 'ASSETS' else [-value for value in values]
+        group = info['sub_category'] or info['category'] or ''
+        existing = sections[section][group].get(info['name'])
+        sections[section][group][info['name']] = add(existing, amounts) if existing else amounts
+    balance_rows = []
+    totals = {}
+    for key, header, total_label in SECTIONS:
+        balance_rows.append(_line(header, 'section_header', zeros()))
+        total = zeros()
+        for group, names in sorted(sections[key].items()):
+            if group:
+                balance_rows.append(_line(group, 'header', zeros()))
+            for name, values in sorted(names.items()):
+                balance_rows.append(_line(name, 'account', values))
+                total = add(total, values)
+        if key == 'EQUITY':
+            balance_rows.append(_line('Retained earnings (cumulative profit)', 'account', earnings))
+            total = add(total, earnings)
+        totals[key] = total
+        balance_rows.append(_line(total_label, 'major_total' if key == 'ASSETS' else 'subtotal', total))
+    liabilities_and_equity = add(totals['LIABILITIES'], totals['EQUITY'])
+    balance_rows.append(_line('TOTAL LIABILITIES & EQUITY', 'major_total', liabilities_and_equity))
+    difference = [a - b for a, b in zip(totals['ASSETS'], liabilities_and_equity)]
+    if any(difference):
+        balance_rows.append(_line('Out of balance (check account classification)', 'account', difference))
+
+    return {
+        'column_labels': labels,
+        'income_statement': income_rows,
+        'balance_sheet': balance_rows,
+        'totals': {
+            'revenue': section_totals[0],
+            'net_profit': net_profit,
+            'assets': totals['ASSETS'],
+            # Amounts removed: balances as at the month end, transactions over the year to date
+            'eliminated_balances': _eliminated(result['eliminations']['closing'], [position]),
+            'eliminated_transactions': _eliminated(result['eliminations']['movements'], ytd),
+        },
+        'differences': [
+            dict(difference, month=months[difference['position']])
+            for difference in result['differences'] if difference['position'] == position
+        ],
+        'ytd_first_month': months[ytd[0]] if ytd else month,
+    }
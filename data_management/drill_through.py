@@ -0,0 +1,148 @@
+"""
+GL drill-through: the net ledger lines behind a statement line, for an account and its sub-accounts
+(parent_account), a date range and the statement dimension filters.
+
+Pages use keyset pagination on (transaction_date, id): a page is "the next PAGE_SIZE lines after
+the last one shown", a range scan on the (gl_account_code, transaction_date, id) net-ledger index,
+so page 5,000 costs what page 1 does; OFFSET would read and discard every earlier line. The cursor
+is the boundary line's date and id. Only the displayed columns are loaded.
+
+The CSV download walks the whole selection in the same keyset batches, as values_list() tuples
+written straight into a streaming response.
+"""
+import csv
+import datetime
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from setup.models import GLAccount, GLTransaction
+from .exports import Echo
+from .statements import FILTER_FIELDS
+
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+CSV_BATCH_SIZE = 5000
+
+# (field, header) of the displayed / exported columns
+COLUMNS = [
+    ('id', 'Line ID'),
+    ('transaction_date', 'Date'),
+    ('gl_account_code', 'GL Account'),
+    ('description', 'Description'),
+    ('journal_type', 'Journal Type'),
+    ('document_no', 'Document No'),
+    ('reference_no', 'Reference No'),
+    ('entity_code', 'Entity'),
+    ('cost_center_code', 'Cost Center'),
+    ('project_code', 'Project'),
+    ('currency_code', 'Currency'),
+    ('debit', 'Debit'),
+    ('credit', 'Credit'),
+    ('base_debit', 'Base Debit'),
+    ('base_credit', 'Base Credit'),
+]
+FIELDS = [field for field, _ in COLUMNS]
+AMOUNT_FIELDS = {'debit', 'credit', 'base_debit', 'base_credit'}
+
+
+def account_subtree(code):
+    """`code` and every account below it in the parent_account hierarchy, from one query on the chart."""
+    children = {}
+    for account, parent in GLAccount.objects.values_list('gl_account_code', 'parent_account__gl_account_code'):
+        children.setdefault(parent, []).append(account)
+    codes, pending = set(), [code]
+    while pending:
+        account = pending.pop()
+        if account not in codes:
+            codes.add(account)
+            pending.extend(children.get(account, ()))
+    return codes
+
+
+def drill_through_lines(account=None, date_from=None, date_to=None, filters=None):
+    """The net ledger lines of the selection, displayed columns only (unordered)."""
+    lines = GLTransaction.objects.net()
+    if account:
+        codes = account_subtree(account)
+        lines = lines.filter(gl_account_code=account) if len(codes) == 1 else lines.filter(gl_account_code__in=codes)
+    if date_from:
+        lines = lines.filter(transaction_date__gte=date_from)
+    if date_to:
+        lines = lines.filter(transaction_date__lte=date_to)
+    lines = lines.filter(**{FILTER_FIELDS[key]: value for key, value in (filters or {}).items()})
+    return lines.only(*FIELDS)
+
+
+def line_values(line):
+    """The FIELDS values of a loaded line, the account as its code."""
+    return [line.gl_account_code_id if field == 'gl_account_code' else getattr(line, field) for field in FIELDS]
+
+
+def encode_cursor(line):
+    return f'{line.transaction_date:%Y-%m-%d}.{line.pk}'
+
+
+def decode_cursor(cursor):
+    """(date, id) of a cursor from encode_cursor(); ValueError when malformed."""
+    date_text, _, pk = (cursor or '').partition('.')
+    return datetime.datetime.strptime(date_text, '%Y-%m-%d').date(), int(pk)
+
+
+def keyset_page(lines, after=None, before=None, size=PAGE_SIZE):
+    """
+    One page of `lines` in (transaction_date, id) order: the `size` lines after the `after` cursor,
+    or before the `before` cursor (the first page when neither). Returns
+    {'lines', 'next', 'previous'}: the cursors of the neighbouring pages, None at either end.
+    """
+    size = max(1, min(size, MAX_PAGE_SIZE))
+    if before:
+        date, pk = decode_cursor(before)
+        page = list(
+            lines.filter(Q(transaction_date__lt=date) | Q(transaction_date=date, pk__lt=pk))
+            .order_by('-transaction_date', '-pk')[:size + 1]
+        )
+        has_more = len(page) > size
+        page = page[:size][::-1]
+        return {
+            'lines': page,
+            'previous': encode_cursor(page[0]) if has_more else None,
+            'next': encode_cursor(page[-1]) if page else None,
+        }
+
+    if after:
+        date, pk = decode_cursor(after)
+        lines = lines.filter(Q(transaction_date__gt=date) | Q(transaction_date=date, pk__gt=pk))
+    page = list(lines.order_by('transaction_date', 'pk')[:size + 1])
+    has_more = len(page) > size
+    page = page[:size]
+    return {
+        'lines': page,
+        'previous': encode_cursor(page[0]) if after and page else None,
+        'next': encode_cursor(page[-1]) if has_more else None,
+    }
+
+
+def iter_line_values(lines, batch_size=CSV_BATCH_SIZE):
+    """Every line of `lines` as a FIELDS tuple in (transaction_date, id) order, in keyset batches."""
+    rows = lines.order_by('transaction_date', 'pk').values_list(*FIELDS)
+    date_index, pk_index = FIELDS.index('transaction_date'), FIELDS.index('id')
+    batch = list(rows[:batch_size])
+    while batch:
+        yield from batch
+        if len(batch) < batch_size:
+            return
+        date, pk = batch[-1][date_index], batch[-1][pk_index]
+        batch = list(rows.filter(Q(transaction_date__gt=date) | Q(transaction_date=date, pk__gt=pk))[:batch_size])
+
+
+def csv_response(lines, filename):
+    """StreamingHttpResponse of the whole selection, one CSV row per ledger line."""
+    writer = csv.writer(Echo())
+
+    def rows():
+        yield writer.writerow([header for _, header in COLUMNS])
+        for values in iter_line_values(lines):
+            yield writer.writerow(values)
+
+    response = StreamingHttpResponse(rows(), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename={filename}.csv'
+    return response
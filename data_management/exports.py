@@ -0,0 +1,78 @@
+"""
+Statement downloads (XLSX / CSV) shared by the statement pages, their export views and the
+export_statement background job, so a queued export produces the same file as a direct one.
+"""
+import csv
+import io
+from openpyxl import Workbook
+from .balance_sheet import build_balance_sheet
+from .cash_flow import build_cash_flow
+from .forms import IncomeStatementFilterForm
+from .statements import active_filters
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# key: (statement engine, sheet title)
+STATEMENTS = {
+    'balance_sheet': (build_balance_sheet, 'Balance Sheet'),
+    'cash_flow': (build_cash_flow, 'Cash Flow Statement'),
+}
+
+
+class Echo:
+    """File-like object whose write() returns the row, for csv.writer into a streaming response."""
+
+    def write(self, value):
+        return value
+
+
+def statement_from_query(query, engine):
+    """Filter form + statement engine output for a page's GET parameters."""
+    filter_form = IncomeStatementFilterForm(query)
+    reporting_period = 'annual'
+    start_date = end_date = None
+    filters = {}
+    if filter_form.is_valid():
+        reporting_period = filter_form.cleaned_data.get('reporting_period') or 'annual'
+        start_date = filter_form.cleaned_data.get('start_date')
+        end_date = filter_form.cleaned_data.get('end_date')
+        filters = active_filters(filter_form.cleaned_data)
+    statement = engine(reporting_period, start_date, end_date, filters)
+    return filter_form, reporting_period, statement
+
+
+def export_filename(key, reporting_period, statement):
+    """File name without extension."""
+    if key == 'balance_sheet':
+        return f"Balance_Sheet_{statement['period_labels'][-1].replace(' ', '_').replace(',', '')}"
+    return f'Cash_Flow_Statement_{reporting_period.capitalize()}'
+
+
+def render_statement(statement, title, export_format):
+    """Returns (content bytes, content type, extension) for a statement engine's rows."""
+    period_labels = statement['period_labels']
+    headers = ['Description'] + period_labels
+
+    def lines():
+        yield headers
+        for item in statement['rows']:
+            if item['type'] in ('section_header', 'header'):
+                yield [item['description']]
+            else:
+                yield [item['description']] + list(item['values'])
+
+    if export_format == 'csv':
+        output = io.StringIO()
+        csv.writer(output).writerows(lines())
+        return output.getvalue().encode('utf-8'), 'text/csv', 'csv'
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = title
+    for line in lines():
+        ws.append(line)
+
+    # Prepare in-memory file
+    output = io.BytesIO()
+    wb.save(output)
+    return output.getvalue(), XLSX_CONTENT_TYPE, 'xlsx'
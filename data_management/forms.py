@@ -1,7 +1,7 @@
 from django import forms
 from crispy_forms.helper import FormHelper
 from crispy_forms.layout import Layout, Row, Column, Submit
-from setup.models import GLTransaction # Import GLTransaction model
+from setup.models import GLAccount, GLTransaction # Import GLTransaction model
 
 REPORTING_PERIOD_CHOICES = [
     ('annual', 'Annual (Yearly)'),
@@ -97,6 +97,49 @@ class IncomeStatementFilterForm(forms.Form):
         label='Currency',
     )
 
+class DrillThroughForm(IncomeStatementFilterForm):
+    """GL drill-through selection: an account (with its sub-accounts), dates and the statement filters."""
+    reporting_period = None
+
+    account = forms.ModelChoiceField(
+        queryset=GLAccount.objects.all(),
+        to_field_name='gl_account_code',
+        required=False,
+        empty_label='All Accounts',
+        label='GL Account (incl. sub-accounts)',
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.helper.layout = Layout(
+            Row(
+                Column('account', css_class='form-group col-md-4 mb-0'),
+                Column('start_date', css_class='form-group col-md-2 mb-0'),
+                Column('end_date', css_class='form-group col-md-2 mb-0'),
+                Column('entity', css_class='form-group col-md-2 mb-0'),
+                Column('cost_center', css_class='form-group col-md-2 mb-0'),
+                css_class='form-row'
+            ),
+            Row(
+                Column('journal_type', css_class='form-group col-md-3 mb-0'),
+                Column('project', css_class='form-group col-md-3 mb-0'),
+                Column('currency', css_class='form-group col-md-3 mb-0'),
+                Column(
+                    Submit('filter', 'Show Lines', css_class='btn-primary mt-4 w-100'),
+                    css_class='form-group col-md-3 mb-0'
+                ),
+                css_class='form-row mt-3'
+            )
+        )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start_date, end_date = cleaned_data.get('start_date'), cleaned_data.get('end_date')
+        if start_date and end_date and start_date > end_date:
+            raise forms.ValidationError("The start date must be on or before the end date.")
+        return cleaned_data
+
+
 UPLOAD_TYPE_CHOICES = [
     ('', '--- Select Data Type ---'),
     ('gl_transactions', 'GL Transactions Data'),
@@ -106,16 +149,35 @@ UPLOAD_TYPE_CHOICES = [
     ('managed_fund', 'Managed Fund Historical'),
 ]
 
+class MultipleFileInput(forms.FileInput):
+    allow_multiple_selected = True
+
+
+class MultipleFileField(forms.FileField):
+    """FileField accepting several files; cleaned_data is always a list."""
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('widget', MultipleFileInput())
+        super().__init__(*args, **kwargs)
+
+    def clean(self, data, initial=None):
+        single_file_clean = super().clean
+        if isinstance(data, (list, tuple)):
+            return [single_file_clean(d, initial) for d in data]
+        return [single_file_clean(data, initial)]
+
+
 class HistoricalDataUploadForm(forms.Form):
     upload_type = forms.ChoiceField(
         choices=UPLOAD_TYPE_CHOICES,
         label='Data to Import',
         required=True
     )
-    excel_file = forms.FileField(
-        label='Select Excel/CSV File',
+    # Several files (e.g. one workbook per entity or month) are imported together as one upload
+    excel_file = MultipleFileField(
+        label='Select Excel/CSV File(s)',
         required=True,
-        widget=forms.FileInput(attrs={'accept': '.xls,.xlsx,.csv'})
+        widget=MultipleFileInput(attrs={'accept': '.xls,.xlsx,.csv'})
     )
 
     def __init__(self, *args, **kwargs):
@@ -126,4 +188,46 @@ class HistoricalDataUploadForm(forms.Form):
             'upload_type',
             'excel_file',
             Submit('submit', 'Process & Upload Data', css_class='btn-success w-100 mt-4')
-        )
\ No newline at end of file
+        )
+
+CONSOLIDATION_MONTHS_CHOICES = [
+    (12, 'Last 12 months'),
+    (24, 'Last 24 months'),
+    (36, 'Last 36 months'),
+    (60, 'Last 60 months'),
+]
+
+
+class ConsolidationForm(forms.Form):
+    # The close period; the worksheet shows the fiscal year to date and the balances at its end
+    period = forms.DateField(
+        required=False,
+        label='Close Period',
+        input_formats=['%Y-%m'],
+        widget=forms.DateInput(attrs={'type': 'month', 'class': 'form-control'}, format='%Y-%m'),
+    )
+    months = forms.TypedChoiceField(
+        required=False,
+        coerce=int,
+        choices=CONSOLIDATION_MONTHS_CHOICES,
+        label='History',
+        initial=12,
+        empty_value=12,
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.helper = FormHelper()
+        self.helper.form_method = 'get'
+        self.helper.form_class = 'bg-white p-4 rounded shadow-sm mb-4'
+        self.helper.layout = Layout(
+            Row(
+                Column('period', css_class='form-group col-md-4 mb-0'),
+                Column('months', css_class='form-group col-md-4 mb-0'),
+                Column(
+                    Submit('consolidate', 'Consolidate', css_class='btn-primary mt-4 w-100'),
+                    css_class='form-group col-md-4 mb-0'
+                ),
+                css_class='form-row'
+            )
+        )
@@ -0,0 +1,119 @@
+"""
+Versioned fragment cache for the heavy report pages (balance sheet, cash flow, budget forecast).
+
+A page hands cached_fragment() a builder that runs its queries and renders its table; the result
+(the rendered HTML plus the few values the rest of the page needs) is stored in the cache under a
+key made of the fragment name, the current DataVersion of each data source the page reads, the
+page's GET parameters and any extra inputs (fiscal year start, active assumption). A repeat view of
+an unchanged report is one small DataVersion read and a cache get: no statement queries and no
+per-cell template rendering.
+
+Nothing is ever deleted: a change to the data bumps its source's version (data_management.signals)
+in the same transaction, so every later view builds a new key and stale entries expire after
+TIMEOUT. The versions live in the database, so the cache stays correct across the web and worker
+processes whatever the cache backend; a shared backend (database, Redis) also shares the entries.
+
+Hits, misses and build times are counted per fragment in this process (fragment_cache_stats()),
+for the staff stats endpoint.
+"""
+import hashlib
+import json
+import threading
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+from django.utils import timezone
+from .models import DataVersion
+
+DEFAULT_FRAGMENT_CACHE = {
+    'ENABLED': True,
+    'CACHE': 'default',  # alias in CACHES
+    'TIMEOUT': 6 * 60 * 60,
+}
+
+LEDGER = 'ledger'
+BUDGET = 'budget'
+
+_lock = threading.Lock()
+# fragment name: {'hits', 'misses', 'build_seconds'} of this process
+_stats = {}
+
+
+def get_fragment_cache_config():
+    config = dict(DEFAULT_FRAGMENT_CACHE)
+    config.update(getattr(settings, 'FRAGMENT_CACHE', {}))
+    return config
+
+
+def bump_data_version(*sources):
+    """Moves `sources` to a new version; cached fragments reading them are rebuilt on next view."""
+    now = timezone.now()
+    for source in sources:
+        if not DataVersion.objects.filter(source=source).update(version=F('version') + 1, updated_at=now):
+            DataVersion.objects.get_or_create(source=source, defaults={'version': 1, 'updated_at': now})
+
+
+def data_versions(sources):
+    """{source: version} of `sources` (0 for a source never bumped)."""
+    versions = dict(DataVersion.objects.filter(source__in=sources).values_list('source', 'version'))
+    return {source: versions.get(source, 0) for source in sources}
+
+
+def fragment_key(name, sources, params=None, extra=()):
+    """Cache key of fragment `name` for the current versions of `sources`, GET `params` and `extra`."""
+    if params is None:
+        query = []
+    elif hasattr(params, 'lists'):
+        query = sorted((key, values) for key, values in params.lists())
+    else:
+        query = sorted(params.items())
+    digest = hashlib.sha256(
+        json.dumps([data_versions(sources), query, list(extra)], sort_keys=True, default=str).encode()
+    ).hexdigest()
+    return f'fragment:{name}:{digest}'
+
+
+def cached_fragment(name, sources, build, params=None, extra=()):
+    """
+    The payload of fragment `name`: from the cache when its sources, `params` and `extra` are
+    unchanged since it was built, otherwise build() (queries + rendering), stored for TIMEOUT.
+    A build() returning None (e.g. missing inputs) is not cached.
+    """
+    config = get_fragment_cache_config()
+    if not config['ENABLED']:
+        return build()
+    cache = caches[config['CACHE']]
+    key = fragment_key(name, sources, params, extra)
+    payload = cache.get(key)
+    if payload is not None:
+        _count(name, 'hits')
+        return payload
+
+    started = time.perf_counter()
+    payload = build()
+    _count(name, 'misses', time.perf_counter() - started)
+    if payload is not None:
+        cache.set(key, payload, config['TIMEOUT'])
+    return payload
+
+
+def _count(name, outcome, seconds=0.0):
+    with _lock:
+        stats = _stats.setdefault(name, {'hits': 0, 'misses': 0, 'build_seconds': 0.0})
+        stats[outcome] += 1
+        stats['build_seconds'] += seconds
+
+
+def fragment_cache_stats():
+    """This process's fragments: hits, misses, hit rate and mean build time of a miss."""
+    with _lock:
+        result = {}
+        for name, stats in _stats.items():
+            views = stats['hits'] + stats['misses']
+            result[name] = dict(
+                stats,
+                hit_rate=stats['hits'] / views if views else None,
+                mean_build_seconds=stats['build_seconds'] / stats['misses'] if stats['misses'] else None,
+            )
+        return result
@@ -0,0 +1,417 @@
+"""
+Streaming importers for the historical data uploads (see download_excel_template for the layouts).
+
+Rows are read one at a time (csv module / openpyxl read-only mode), parsed by pure functions that
+never touch the database, and written in chunks with bulk_create. Lookups the parser cannot do on
+its own (GL accounts, Date Table rows) are preloaded once per import by the writer.
+"""
+import csv
+import datetime
+import hashlib
+import io
+import re
+from decimal import Decimal, InvalidOperation
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Min
+from setup.models import GLTransaction, GLAccount, DateDetail, FundTransaction, RSAFund, ManagedFund
+from setup.netting import apply_reversal_netting
+from setup.fx import RateBook, base_currency, to_base
+from setup.partitioning import ensure_partitions
+from .rollups import refresh_monthly_balances
+
+DEFAULT_DATA_IMPORT = {
+    'CHUNK_SIZE': 5000,
+    'CREATE_MISSING_FUNDS': False,
+    'PARSE_WORKERS': 2,
+    'QUEUE_CHUNKS': 8,
+    'PARALLEL_MIN_BYTES': 2 * 1024 * 1024,
+}
+
+
+def get_import_config():
+    config = dict(DEFAULT_DATA_IMPORT)
+    config.update(getattr(settings, 'DATA_IMPORT', {}))
+    return config
+
+
+TRUE_VALUES = {'true', 't', 'yes', 'y', '1'}
+FALSE_VALUES = {'false', 'f', 'no', 'n', '0', ''}
+
+
+def normalise_header(header):
+    """'transaction_date (YYYY-MM-DD)' -> 'transaction_date'"""
+    return re.sub(r'\s*\(.*\)\s*$', '', str(header or '')).strip().lower()
+
+
+def iter_upload_rows(uploaded_file, sheet=None):
+    """
+    Yields (line_no, row_dict) for every non-empty data row of a .csv or .xlsx upload
+    (of the named worksheet, else the active one). Header cells are normalised, so the template
+    hints in brackets are optional.
+    """
+    name = uploaded_file.name.lower()
+    if name.endswith('.csv'):
+        uploaded_file.seek(0)
+        reader = csv.reader(io.TextIOWrapper(uploaded_file, encoding='utf-8-sig', newline=''))
+        rows = iter(reader)
+    elif name.endswith('.xlsx'):
+        from openpyxl import load_workbook
+        wb = load_workbook(uploaded_file, read_only=True, data_only=True)
+        rows = (wb[sheet] if sheet else wb.active).iter_rows(values_only=True)
+    else:
+        raise ValueError('Unsupported file type. Upload a .xlsx or .csv file.')
+
+    try:
+        headers = [normalise_header(h) for h in next(rows, [])]
+        for line_no, values in enumerate(rows, start=2):
+            if not any(v not in (None, '') for v in values):
+                continue
+            yield line_no, dict(zip(headers, values))
+    finally:
+        if name.endswith('.xlsx'):
+            # read-only workbooks keep the archive open until closed
+            wb.close()
+
+
+def data_sheets(uploaded_file, required_column='transaction_date'):
+    """
+    Names of the worksheets of an .xlsx upload whose header row has `required_column`
+    (instruction or summary sheets are skipped); [None] (the active sheet) when there are none,
+    so a malformed workbook still fails with the usual row errors. [None] for a .csv.
+    """
+    if not uploaded_file.name.lower().endswith('.xlsx'):
+        return [None]
+    from openpyxl import load_workbook
+    wb = load_workbook(uploaded_file, read_only=True, data_only=True)
+    try:
+        sheets = [
+            ws.title for ws in wb.worksheets
+            if required_column in (normalise_header(h) for h in next(ws.iter_rows(max_row=1, values_only=True), ()))
+        ]
+    finally:
+        wb.close()
+    return sheets or [None]
+
+
+def parse_date(value, field, line_no):
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    try:
+        return datetime.date.fromisoformat(str(value).strip()[:10])
+    except ValueError:
+        raise ValueError(f"Row {line_no}: invalid {field} '{value}' (expected YYYY-MM-DD).")
+
+
+def parse_decimal(value, field, line_no, default=Decimal('0')):
+    if value in (None, ''):
+        return default
+    try:
+        return Decimal(str(value).replace(',', '').strip())
+    except InvalidOperation:
+        raise ValueError(f"Row {line_no}: invalid {field} '{value}'.")
+
+
+def parse_bool(value, field, line_no):
+    if isinstance(value, bool):
+        return value
+    text = str(value if value is not None else '').strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ValueError(f"Row {line_no}: invalid {field} '{value}' (expected TRUE/FALSE).")
+
+
+def clean_text(value):
+    if value is None:
+        return None
+    text = str(value).strip()
+    return text or None
+
+
+def parse_gl_row(row, line_no):
+    """Turns one template row into GLTransaction field values. Pure: no database access."""
+    if not row.get('gl_account_code'):
+        raise ValueError(f"Row {line_no}: gl_account_code is required.")
+
+    reversal_ref_id = row.get('reversal_ref_id')
+    if reversal_ref_id not in (None, ''):
+        try:
+            reversal_ref_id = int(str(reversal_ref_id).strip().split('.')[0])
+        except ValueError:
+            raise ValueError(f"Row {line_no}: invalid reversal_ref_id '{reversal_ref_id}'.")
+    else:
+        reversal_ref_id = None
+
+    return {
+        'transaction_date': parse_date(row.get('transaction_date'), 'transaction_date', line_no),
+        'gl_account_code_id': str(row['gl_account_code']).strip(),
+        'description': clean_text(row.get('description')),
+        'journal_type': clean_text(row.get('journal_type')),
+        'document_no': clean_text(row.get('document_no')),
+        'reference_no': clean_text(row.get('reference_no')),
+        'entity_code': clean_text(row.get('entity_code')),
+        'cost_center_code': clean_text(row.get('cost_center_code')),
+        'project_code': clean_text(row.get('project_code')),
+        'currency_code': clean_text(row.get('currency_code')) or base_currency(),
+        # None: the writer looks the rate up in the FX rate table
+        'exchange_rate': parse_decimal(row.get('exchange_rate'), 'exchange_rate', line_no, None),
+        'debit': parse_decimal(row.get('debit'), 'debit', line_no),
+        'credit': parse_decimal(row.get('credit'), 'credit', line_no),
+        'reversal_flag': parse_bool(row.get('reversal_flag'), 'reversal_flag', line_no),
+        'reversal_ref_id': reversal_ref_id,
+        '_line_no': line_no,
+    }
+
+
+# Fields identifying an imported GL line. Description, exchange rate and base amounts are not part
+# of the key: re-importing a line with a corrected rate or narrative updates the existing line.
+LINE_KEY_FIELDS = (
+    'transaction_date', 'gl_account_code_id', 'document_no', 'reference_no', 'journal_type',
+    'entity_code', 'cost_center_code', 'project_code', 'currency_code', 'debit', 'credit', 'reversal_flag',
+)
+# Updated in place when a re-imported line matches an existing one
+UPSERT_FIELDS = [
+    'description', 'exchange_rate', 'rate_from_table', 'base_debit', 'base_credit', 'reversal_ref_id', 'date_detail',
+]
+
+
+def line_hash(values, occurrence=0):
+    """
+    SHA-256 natural key of a GL line from its LINE_KEY_FIELDS. `occurrence` numbers identical
+    lines within one upload (the 2nd is 1, ...), so genuine repeats are kept apart while a re-import
+    of the same file maps every line onto its earlier copy.
+    """
+    parts = []
+    for field in LINE_KEY_FIELDS:
+        value = values.get(field)
+        if isinstance(value, Decimal):
+            value = f"{value:.2f}"  # 100 and 100.00 are the same amount
+        parts.append('' if value is None else str(value))
+    if occurrence:
+        parts.append(f"#{occurrence}")
+    return hashlib.sha256('\x1f'.join(parts).encode()).hexdigest()
+
+
+class GLTransactionWriter:
+    """
+    Buffers parsed GL rows and writes them with bulk_create, DATA_IMPORT['CHUNK_SIZE'] at a time.
+    Lines without an exchange_rate are translated at the FX rate table's latest rate on or before
+    their transaction_date; base_debit/base_credit are written with the line. On close(), reversal
+    lines are netted against their originals and the monthly rollup is refreshed for the months touched.
+    Lines are upserted on (transaction_date, line_hash): lines already in the ledger are updated,
+    not duplicated (`updated` counts them); new lines are stamped with the UploadHistory `batch`.
+    `progress(count, message=None)` is called after every chunk (see data_management.jobs).
+    """
+
+    def __init__(self, user=None, source_module='Upload', chunk_size=None, progress=None, batch=None):
+        self.user = user
+        self.batch = batch
+        self.progress = progress
+        self.source_module = source_module
+        self.chunk_size = chunk_size or get_import_config()['CHUNK_SIZE']
+        self.account_codes = set(GLAccount.objects.values_list('gl_account_code', flat=True))
+        self.dates = set(DateDetail.objects.values_list('date', flat=True))
+        self.rate_book = RateBook.load()
+        self.buffer = []
+        self.reversal_ids = []
+        self.occurrences = {}  # line hash -> identical lines seen so far in this upload
+        self.first_date = self.last_date = None
+        self.count = 0
+        self.updated = 0
+
+    def add(self, values):
+        line_no = values.pop('_line_no', None)
+        if values['gl_account_code_id'] not in self.account_codes:
+            raise ValueError(f"Row {line_no}: GL account '{values['gl_account_code_id']}' does not exist.")
+        values['rate_from_table'] = values['exchange_rate'] is None
+        if values['exchange_rate'] is None:
+            values['exchange_rate'] = self.rate_book.rate_for(values['currency_code'], values['transaction_date'])
+            if values['exchange_rate'] is None:
+                raise ValueError(
+                    f"Row {line_no}: no {values['currency_code']} exchange rate on or before "
+                    f"{values['transaction_date']}. Load FX rates or fill in exchange_rate."
+                )
+        values['base_debit'] = to_base(values['debit'], values['exchange_rate'])
+        values['base_credit'] = to_base(values['credit'], values['exchange_rate'])
+        if values['transaction_date'] in self.dates:
+            values['date_detail_id'] = values['transaction_date']
+        key = line_hash(values)
+        occurrence = self.occurrences.get(key, 0)
+        self.occurrences[key] = occurrence + 1
+        values['line_hash'] = line_hash(values, occurrence) if occurrence else key
+        self.buffer.append(GLTransaction(
+            user_posted_by=self.user, source_module=self.source_module, import_batch=self.batch, **values
+        ))
+        if len(self.buffer) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        first = min(obj.transaction_date for obj in self.buffer)
+        last = max(obj.transaction_date for obj in self.buffer)
+        ensure_partitions(first, last)
+        self.first_date = first if self.first_date is None else min(self.first_date, first)
+        self.last_date = last if self.last_date is None else max(self.last_date, last)
+        in_range = GLTransaction.objects.filter(transaction_date__gte=first, transaction_date__lte=last)
+        hashes = [obj.line_hash for obj in self.buffer]
+        self.updated += in_range.filter(line_hash__in=hashes).count()
+        GLTransaction.objects.bulk_create(
+            self.buffer,
+            update_conflicts=True,
+            unique_fields=['transaction_date', 'line_hash'],
+            update_fields=UPSERT_FIELDS,
+        )
+        # Upserts do not return primary keys: look the chunk's reversal lines up by their key
+        reversal_hashes = [obj.line_hash for obj in self.buffer if obj.reversal_flag]
+        if reversal_hashes:
+            self.reversal_ids.extend(in_range.filter(line_hash__in=reversal_hashes).values_list('pk', flat=True))
+        self.count += len(self.buffer)
+        self.buffer = []
+        if self.progress:
+            self.progress(self.count)
+
+    def close(self):
+        self.flush()
+        if not self.count:
+            return 0
+        if self.progress:
+            self.progress(self.count, 'Netting reversals and refreshing monthly balances')
+        if self.reversal_ids:
+            reversals = GLTransaction.objects.filter(pk__in=self.reversal_ids)
+            apply_reversal_netting(reversals)
+            # Netting also changes the originals, which may sit in earlier months
+            originals = GLTransaction.objects.filter(pk__in=reversals.values('reversal_ref_id')).aggregate(
+                first=Min('transaction_date'), last=Max('transaction_date')
+            )
+            if originals['first']:
+                self.first_date = min(self.first_date, originals['first'])
+                self.last_date = max(self.last_date, originals['last'])
+        refresh_monthly_balances(self.first_date, self.last_date)
+        return self.count
+
+
+def import_gl_transactions(uploaded_file, user=None, progress=None, batch=None):
+    """Imports a GL transactions upload in one transaction. Returns the number of lines written."""
+    with transaction.atomic():
+        writer = GLTransactionWriter(user=user, progress=progress, batch=batch)
+        for line_no, row in iter_upload_rows(uploaded_file):
+            writer.add(parse_gl_row(row, line_no))
+        return writer.close()
+
+
+# --- Fund transactions (RSA / Managed Fund historical templates) ---
+
+FUND_SOURCES = {
+    # source_type: (fund model, FundTransaction FK id field, template name column)
+    'RSA': (RSAFund, 'rsa_fund_id', 'rsa_fund_name'),
+    'MANAGED': (ManagedFund, 'managed_fund_id', 'managed_fund_name'),
+}
+
+
+def parse_fund_row(row, line_no, source_type):
+    """Turns one RSA/Managed Fund template row into FundTransaction field values. Pure: no database access."""
+    name_column = FUND_SOURCES[source_type][2]
+    fund_name = clean_text(row.get(name_column))
+    if not fund_name:
+        raise ValueError(f"Row {line_no}: {name_column} is required.")
+
+    values = {
+        'transaction_date': parse_date(row.get('transaction_date'), 'transaction_date', line_no),
+        'entity_code': clean_text(row.get('entity_code')),
+        'contributions': parse_decimal(row.get('contributions'), 'contributions', line_no),
+        'withdrawals': parse_decimal(row.get('withdrawals'), 'withdrawals', line_no),
+        'source_type': source_type,
+        '_fund_name': fund_name,
+        '_line_no': line_no,
+    }
+    if source_type == 'RSA':
+        values['balance'] = parse_decimal(row.get('balance'), 'balance', line_no)
+    else:
+        values['investment_value'] = parse_decimal(row.get('investment_value'), 'investment_value', line_no)
+    return values
+
+
+class FundTransactionWriter:
+    """
+    Buffers parsed fund rows and writes them with bulk_create, DATA_IMPORT['CHUNK_SIZE'] at a time.
+    Fund names are resolved against a name -> id map loaded once; with create_missing_funds,
+    the unknown names of a chunk are created together just before that chunk is written.
+    Lines are stamped with the UploadHistory `batch`.
+    """
+
+    def __init__(self, source_type, create_missing_funds=None, chunk_size=None, progress=None, batch=None):
+        config = get_import_config()
+        self.batch = batch
+        self.progress = progress
+        self.source_type = source_type
+        self.fund_model, self.fund_field, _ = FUND_SOURCES[source_type]
+        self.create_missing_funds = (
+            config['CREATE_MISSING_FUNDS'] if create_missing_funds is None else create_missing_funds
+        )
+        self.chunk_size = chunk_size or config['CHUNK_SIZE']
+        self.fund_ids = {
+            name.lower(): pk for pk, name in self.fund_model.objects.values_list('pk', 'name')
+        }
+        self.buffer = []
+        self.count = 0
+        self.created_funds = 0
+
+    def add(self, values):
+        line_no = values.pop('_line_no', None)
+        if values['_fund_name'].lower() not in self.fund_ids and not self.create_missing_funds:
+            raise ValueError(f"Row {line_no}: {self.fund_model._meta.verbose_name} '{values['_fund_name']}' does not exist.")
+        self.buffer.append(values)
+        if len(self.buffer) >= self.chunk_size:
+            self.flush()
+
+    def _create_missing(self):
+        missing = {}
+        for values in self.buffer:
+            missing.setdefault(values['_fund_name'].lower(), values['_fund_name'])
+        for key in list(missing):
+            if key in self.fund_ids:
+                del missing[key]
+        if not missing:
+            return
+        self.fund_model.objects.bulk_create(
+            [self.fund_model(name=name) for name in missing.values()], ignore_conflicts=True
+        )
+        for pk, name in self.fund_model.objects.filter(name__in=missing.values()).values_list('pk', 'name'):
+            self.fund_ids[name.lower()] = pk
+        self.created_funds += len(missing)
+
+    def flush(self):
+        if not self.buffer:
+            return
+        if self.create_missing_funds:
+            self._create_missing()
+        objs = []
+        for values in self.buffer:
+            values[self.fund_field] = self.fund_ids[values.pop('_fund_name').lower()]
+            objs.append(FundTransaction(import_batch=self.batch, **values))
+        FundTransaction.objects.bulk_create(objs)
+        self.count += len(objs)
+        self.buffer = []
+        if self.progress:
+            self.progress(self.count)
+
+    def close(self):
+        self.flush()
+        return self.count
+
+
+def import_fund_transactions(uploaded_file, source_type, create_missing_funds=None, progress=None, batch=None):
+    """
+    Imports an RSA ('RSA') or Managed Fund ('MANAGED') historical upload in one transaction.
+    Returns (lines written, funds created).
+    """
+    with transaction.atomic():
+        writer = FundTransactionWriter(source_type, create_missing_funds=create_missing_funds, progress=progress, batch=batch)
+        for line_no, row in iter_upload_rows(uploaded_file):
+            writer.add(parse_fund_row(row, line_no, source_type))
+        return writer.close(), writer.created_funds
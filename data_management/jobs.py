@@ -0,0 +1,288 @@
+"""
+DB-backed background jobs for work too long for a request: uploads, statement exports and
+recomputations. There is no broker: jobs are BackgroundJob rows, claimed by `manage.py run_workers`
+with SELECT ... FOR UPDATE SKIP LOCKED plus a conditional UPDATE, so several worker processes
+(or boxes) never run the same job.
+
+Handlers are plain functions registered with @job_handler('name') in an app's tasks.py and called
+as handler(job, **job.params). They report progress with report_progress(job, ...), which raises
+JobCancelled once a cancel has been requested, so a cancelled import rolls back its transaction.
+With BACKGROUND_JOBS['RUN_INLINE'] enqueue() runs the job straight away in the calling process.
+"""
+import datetime
+import hashlib
+import logging
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+from .models import (
+    BackgroundJob, JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKGROUND_JOBS = {
+    'RUN_INLINE': False,
+    'WORKERS': 2,
+    'POLL_INTERVAL': 2,
+    'STALE_AFTER': 900,
+    'MAX_ATTEMPTS': 2,
+}
+
+UPLOAD_DIR = 'job_uploads'
+EXPORT_DIR = 'job_exports'
+
+
+def get_jobs_config():
+    config = dict(DEFAULT_BACKGROUND_JOBS)
+    config.update(getattr(settings, 'BACKGROUND_JOBS', {}))
+    return config
+
+
+class JobCancelled(Exception):
+    """Raised inside a handler when its job has been cancelled."""
+
+
+# --- Handler registry ---
+
+_handlers = {}
+_discovered = False
+
+
+def job_handler(job_type):
+    """Registers `func(job, **params)` as the handler for `job_type`."""
+    def register(func):
+        _handlers[job_type] = func
+        return func
+    return register
+
+
+def get_handler(job_type):
+    global _discovered
+    if not _discovered:
+        autodiscover_modules('tasks')
+        _discovered = True
+    try:
+        return _handlers[job_type]
+    except KeyError:
+        raise ValueError(f"No background job handler registered for '{job_type}'.")
+
+
+# --- Enqueueing ---
+
+def enqueue(job_type, params=None, user=None, label=''):
+    """Creates a queued job (params must be JSON-serialisable) and returns it."""
+    get_handler(job_type)  # fail in the request, not in the worker, on an unknown type
+    job = BackgroundJob.objects.create(
+        job_type=job_type,
+        params=params or {},
+        label=label[:255],
+        created_by=user if user is not None and user.is_authenticated else None,
+    )
+    if get_jobs_config()['RUN_INLINE']:
+        claimed = BackgroundJob.objects.filter(pk=job.pk, status=JOB_QUEUED).update(
+            status=JOB_RUNNING, started_at=timezone.now(), heartbeat_at=timezone.now(),
+            worker='inline', attempts=F('attempts') + 1,
+        )
+        if claimed:
+            run_job(job.pk)
+        job.refresh_from_db()
+    return job
+
+
+class _HashingFile(File):
+    """Feeds every chunk the storage backend reads into a SHA-256 digest."""
+
+    def __init__(self, file, name):
+        super().__init__(file, name)
+        self.sha256 = hashlib.sha256()
+        self.hashed_bytes = 0
+
+    def chunks(self, chunk_size=None):
+        for chunk in super().chunks(chunk_size):
+            self.sha256.update(chunk)
+            self.hashed_bytes += len(chunk)
+            yield chunk
+
+
+def store_upload(uploaded_file):
+    """
+    Saves an uploaded file where a worker process can read it, hashing it on the way.
+    Returns (storage path, SHA-256 hex digest of the content).
+    """
+    hashing = _HashingFile(uploaded_file.file, uploaded_file.name)
+    path = default_storage.save(f"{UPLOAD_DIR}/{timezone.now():%Y%m%d}/{uploaded_file.name}", hashing)
+    if hashing.hashed_bytes != uploaded_file.size:
+        # The storage backend did not read through chunks(): hash the stored copy instead
+        hashing.sha256 = hashlib.sha256()
+        with default_storage.open(path, 'rb') as stored:
+            for chunk in iter(lambda: stored.read(File.DEFAULT_CHUNK_SIZE), b''):
+                hashing.sha256.update(chunk)
+    return path, hashing.sha256.hexdigest()
+
+
+def upload_checksum(digests):
+    """Checksum of an upload from its files' digests (the digest itself for a single file)."""
+    if len(digests) == 1:
+        return digests[0]
+    return hashlib.sha256(':'.join(digests).encode()).hexdigest()
+
+
+def export_path(job, filename):
+    return f"{EXPORT_DIR}/{job.pk}/{filename}"
+
+
+# --- Claiming and running (run_workers) ---
+
+def claim_next_job(worker=''):
+    """Marks the oldest queued job as running for `worker` and returns its id, or None."""
+    with transaction.atomic():
+        job_id = (
+            BackgroundJob.objects.select_for_update(skip_locked=True)
+            .filter(status=JOB_QUEUED)
+            .order_by('created_at', 'pk')
+            .values_list('pk', flat=True)
+            .first()
+        )
+        if job_id is None:
+            return None
+        now = timezone.now()
+        # Backends without row locks (SQLite) rely on this conditional UPDATE alone
+        claimed = BackgroundJob.objects.filter(pk=job_id, status=JOB_QUEUED).update(
+            status=JOB_RUNNING, started_at=now, heartbeat_at=now, worker=worker[:100],
+            attempts=F('attempts') + 1,
+        )
+    return job_id if claimed else None
+
+
+def run_job(job_id):
+    """Runs a claimed job's handler and records the outcome. Returns the final status."""
+    job = BackgroundJob.objects.get(pk=job_id)
+    try:
+        if job.cancel_requested:
+            raise JobCancelled()
+        result = get_handler(job.job_type)(job, **job.params)
+    except JobCancelled:
+        status, result, error = JOB_CANCELLED, None, 'Cancelled by user.'
+    except Exception as e:
+        logger.exception("Background job %s (%s) failed", job.pk, job.job_type)
+        status, result, error = JOB_FAILED, None, str(e) or e.__class__.__name__
+    else:
+        status, error = JOB_SUCCEEDED, ''
+    BackgroundJob.objects.filter(pk=job.pk).update(
+        status=status, result=result, error=error, finished_at=timezone.now(), heartbeat_at=timezone.now(),
+    )
+    return status
+
+
+def record_failure(job_id, error):
+    """Fails a job whose worker process died without reporting back."""
+    BackgroundJob.objects.filter(pk=job_id, status=JOB_RUNNING).update(
+        status=JOB_FAILED, error=error, finished_at=timezone.now(),
+    )
+
+
+def heartbeat(job_ids):
+    if job_ids:
+        BackgroundJob.objects.filter(pk__in=list(job_ids), status=JOB_RUNNING).update(heartbeat_at=timezone.now())
+
+
+def requeue_stale_jobs():
+    """
+    Recovers running jobs whose worker stopped sending heartbeats (killed box, OOM). A job that has
+    been tried fewer than MAX_ATTEMPTS times goes back on the queue: an import that died half-way
+    has already been rolled back and upserts on its line keys, so running it again is safe. Jobs
+    out of attempts are failed, and jobs with a cancel request are cancelled. Returns
+    (re-queued, failed).
+    """
+    config = get_jobs_config()
+    cutoff = timezone.now() - datetime.timedelta(seconds=config['STALE_AFTER'])
+    stale = BackgroundJob.objects.filter(status=JOB_RUNNING, heartbeat_at__lt=cutoff)
+    stale.filter(cancel_requested=True).update(
+        status=JOB_CANCELLED, error='Cancelled by user.', finished_at=timezone.now(),
+    )
+    requeued = stale.filter(attempts__lt=config['MAX_ATTEMPTS']).update(
+        status=JOB_QUEUED, worker='', started_at=None, heartbeat_at=None,
+        progress_current=0, progress_total=None, progress_message='Re-queued: the previous worker stopped responding.',
+    )
+    failed = stale.update(
+        status=JOB_FAILED, error='The worker running this job stopped responding.', finished_at=timezone.now(),
+    )
+    return requeued, failed
+
+
+def cancel_job(job):
+    """Cancels a queued job at once; a running job stops at its next progress report."""
+    if BackgroundJob.objects.filter(pk=job.pk, status=JOB_QUEUED).update(
+        status=JOB_CANCELLED, cancel_requested=True, error='Cancelled by user.', finished_at=timezone.now(),
+    ):
+        return True
+    return bool(BackgroundJob.objects.filter(pk=job.pk, status=JOB_RUNNING).update(cancel_requested=True))
+
+
+# --- Progress (called from handlers) ---
+
+_progress_connection = None
+
+
+def _side_connection():
+    """
+    A second connection in autocommit mode. Handlers usually report progress from inside the
+    transaction of the work itself; writing through the same connection would keep the progress
+    invisible to the status endpoint until that transaction commits.
+    """
+    global _progress_connection
+    if _progress_connection is None:
+        _progress_connection = connections.create_connection(DEFAULT_DB_ALIAS)
+    return _progress_connection
+
+
+def report_progress(job, current, total=None, message=None):
+    """
+    Stores progress (and a heartbeat) for `job`; raises JobCancelled if the job has been cancelled.
+    `total` and `message` are left unchanged when None.
+    """
+    if job is None:
+        return
+    job.progress_current = current
+    if total is not None:
+        job.progress_total = total
+    if message is not None:
+        job.progress_message = message[:255]
+
+    if connection.in_atomic_block and connection.vendor != 'sqlite':
+        table = connection.ops.quote_name(BackgroundJob._meta.db_table)
+        with _side_connection().cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} SET progress_current = %s, progress_total = %s, progress_message = %s, "
+                f"heartbeat_at = %s WHERE id = %s",
+                [job.progress_current, job.progress_total, job.progress_message, timezone.now(), job.pk],
+            )
+            cursor.execute(f"SELECT cancel_requested FROM {table} WHERE id = %s", [job.pk])
+            row = cursor.fetchone()
+        cancelled = bool(row and row[0])
+    else:
+        # SQLite allows one writer at a time, so progress goes through the connection in use
+        BackgroundJob.objects.filter(pk=job.pk).update(
+            progress_current=job.progress_current,
+            progress_total=job.progress_total,
+            progress_message=job.progress_message,
+            heartbeat_at=timezone.now(),
+        )
+        cancelled = BackgroundJob.objects.filter(pk=job.pk, cancel_requested=True).exists()
+    if cancelled:
+        raise JobCancelled()
+
+
+def progress_callback(job, message='', total=None):
+    """progress(count) callable for the importers' writers, bound to `job`."""
+    if job is None:
+        return None
+
+    def progress(count, step_message=None):
+        report_progress(job, count, total, step_message if step_message is not None else message)
+    return progress
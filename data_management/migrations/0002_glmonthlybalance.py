@@ -0,0 +1,69 @@
+# Generated by Django 4.2.30 on 2026-10-19 15:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("setup", "0012_glaccount_cash_flow_category"),
+        ("data_management", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GLMonthlyBalance",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("period", models.DateField(verbose_name="Month")),
+                (
+                    "entity_code",
+                    models.CharField(blank=True, default="", max_length=50),
+                ),
+                (
+                    "cost_center_code",
+                    models.CharField(blank=True, default="", max_length=50),
+                ),
+                (
+                    "debit",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=20),
+                ),
+                (
+                    "credit",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=20),
+                ),
+                ("line_count", models.IntegerField(default=0)),
+                (
+                    "gl_account_code",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="monthly_balances",
+                        to="setup.glaccount",
+                        to_field="gl_account_code",
+                        verbose_name="GL Account Code",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "GL Monthly Balance",
+                "verbose_name_plural": "GL Monthly Balances",
+                "ordering": ["period", "gl_account_code"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="glmonthlybalance",
+            constraint=models.UniqueConstraint(
+                fields=("period", "gl_account_code", "entity_code", "cost_center_code"),
+                name="glmonthly_period_acct_dims_uniq",
+            ),
+        ),
+    ]
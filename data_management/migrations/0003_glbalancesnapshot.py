@@ -0,0 +1,64 @@
+# Generated by Django 4.2.30 on 2026-10-19 15:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("setup", "0012_glaccount_cash_flow_category"),
+        ("data_management", "0002_glmonthlybalance"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GLBalanceSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("period", models.DateField(verbose_name="Month")),
+                (
+                    "entity_code",
+                    models.CharField(blank=True, default="", max_length=50),
+                ),
+                (
+                    "cost_center_code",
+                    models.CharField(blank=True, default="", max_length=50),
+                ),
+                (
+                    "closing_balance",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=22),
+                ),
+                (
+                    "gl_account_code",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="balance_snapshots",
+                        to="setup.glaccount",
+                        to_field="gl_account_code",
+                        verbose_name="GL Account Code",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "GL Balance Snapshot",
+                "verbose_name_plural": "GL Balance Snapshots",
+                "ordering": ["period", "gl_account_code"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="glbalancesnapshot",
+            constraint=models.UniqueConstraint(
+                fields=("period", "gl_account_code", "entity_code", "cost_center_code"),
+                name="glsnapshot_period_acct_dims_uniq",
+            ),
+        ),
+    ]
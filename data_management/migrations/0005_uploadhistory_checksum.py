@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("data_management", "0004_backgroundjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="uploadhistory",
+            name="checksum",
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name="uploadhistory",
+            name="upload_type",
+            field=models.CharField(blank=True, max_length=50),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("data_management", "0006_data_version"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="glmonthlybalance",
+            index=models.Index(
+                fields=["cost_center_code", "period"], name="glmonthly_cc_period_idx"
+            ),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 class UploadHistory(models.Model):
     file_name = models.CharField(max_length=255)
@@ -11,6 +12,9 @@ class UploadHistory(models.Model):
     )
     record_count = models.IntegerField(default=0)
     status = models.CharField(max_length=50, default='Completed')
+    upload_type = models.CharField(max_length=50, blank=True)
+    # SHA-256 of the uploaded content (data_management.jobs.upload_checksum); identical uploads are skipped
+    checksum = models.CharField(max_length=64, blank=True, db_index=True)
     
     class Meta:
         verbose_name = "Upload History"
@@ -18,4 +22,185 @@ class UploadHistory(models.Model):
         ordering = ['-upload_date']
 
     def __str__(self):
-        return f"{self.file_name} by {self.uploaded_by}"
\ No newline at end of file
+        return f"{self.file_name} by {self.uploaded_by}"
+
+class GLMonthlyBalance(models.Model):
+    """
+    Monthly rollup of the net GL ledger (GLTransaction.objects.net()) in base currency, one row per
+    month x account x entity x cost center. Rebuilt for the affected months by
+    data_management.rollups.refresh_monthly_balances() after imports and revaluations.
+    """
+    period = models.DateField(verbose_name="Month")  # first day of the month
+    gl_account_code = models.ForeignKey(
+        'setup.GLAccount',
+        to_field='gl_account_code',
+        on_delete=models.CASCADE,
+        related_name='monthly_balances',
+        verbose_name="GL Account Code"
+    )
+    # '' instead of NULL so the unique constraint covers lines without an entity / cost center
+    entity_code = models.CharField(max_length=50, blank=True, default='')
+    cost_center_code = models.CharField(max_length=50, blank=True, default='')
+    debit = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    credit = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    line_count = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "GL Monthly Balance"
+        verbose_name_plural = "GL Monthly Balances"
+        ordering = ['period', 'gl_account_code']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['period', 'gl_account_code', 'entity_code', 'cost_center_code'],
+                name='glmonthly_period_acct_dims_uniq',
+            ),
+        ]
+        indexes = [
+            # Cost-center / department scoped reads (analysis.drilldown)
+            models.Index(fields=['cost_center_code', 'period'], name='glmonthly_cc_period_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.period:%Y-%m} {self.gl_account_code_id}"
+
+
+class GLBalanceSnapshot(models.Model):
+    """
+    Closing balance (cumulative base debit - credit since inception) at the end of each month, per
+    account x entity x cost center. Rebuilt forward from the first changed month by
+    data_management.rollups.refresh_balance_snapshots(), so a balance at any date is one snapshot
+    month plus, for mid-month dates, that month's movements.
+    """
+    period = models.DateField(verbose_name="Month")  # balance as at the last day of this month
+    gl_account_code = models.ForeignKey(
+        'setup.GLAccount',
+        to_field='gl_account_code',
+        on_delete=models.CASCADE,
+        related_name='balance_snapshots',
+        verbose_name="GL Account Code"
+    )
+    entity_code = models.CharField(max_length=50, blank=True, default='')
+    cost_center_code = models.CharField(max_length=50, blank=True, default='')
+    closing_balance = models.DecimalField(max_digits=22, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = "GL Balance Snapshot"
+        verbose_name_plural = "GL Balance Snapshots"
+        ordering = ['period', 'gl_account_code']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['period', 'gl_account_code', 'entity_code', 'cost_center_code'],
+                name='glsnapshot_period_acct_dims_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.period:%Y-%m} {self.gl_account_code_id}: {self.closing_balance}"
+
+
+JOB_QUEUED = 'QUEUED'
+JOB_RUNNING = 'RUNNING'
+JOB_SUCCEEDED = 'SUCCEEDED'
+JOB_FAILED = 'FAILED'
+JOB_CANCELLED = 'CANCELLED'
+JOB_STATUS_CHOICES = [
+    (JOB_QUEUED, 'Queued'),
+    (JOB_RUNNING, 'Running'),
+    (JOB_SUCCEEDED, 'Succeeded'),
+    (JOB_FAILED, 'Failed'),
+    (JOB_CANCELLED, 'Cancelled'),
+]
+JOB_FINISHED_STATUSES = (JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED)
+
+
+class BackgroundJob(models.Model):
+    """
+    One unit of work (an upload, a statement export, a recomputation) run outside the request by
+    `manage.py run_workers`. See data_management.jobs for enqueueing, claiming and progress.
+    """
+    job_type = models.CharField(max_length=100)  # name of a handler registered in an app's tasks.py
+    label = models.CharField(max_length=255, blank=True)  # e.g. the uploaded file name
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=JOB_STATUS_CHOICES, default=JOB_QUEUED)
+    progress_current = models.IntegerField(default=0)
+    progress_total = models.IntegerField(null=True, blank=True)  # None when the size is not known up front
+    progress_message = models.CharField(max_length=255, blank=True)
+    cancel_requested = models.BooleanField(default=False)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='background_jobs'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    worker = models.CharField(max_length=100, blank=True)  # host:pid of the run_workers process
+    attempts = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Background Job"
+        verbose_name_plural = "Background Jobs"
+        ordering = ['-created_at']
+        indexes = [
+            # Claiming scans the oldest queued jobs; stale-job recovery scans running ones
+            models.Index(fields=['status', 'created_at'], name='bgjob_status_created_idx'),
+            models.Index(fields=['created_by', '-created_at'], name='bgjob_user_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.pk} {self.job_type} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in JOB_FINISHED_STATUSES
+
+    @property
+    def progress_percent(self):
+        if not self.progress_total:
+            return 100 if self.status == JOB_SUCCEEDED else None
+        return min(100, round(self.progress_current * 100 / self.progress_total))
+
+    def as_dict(self):
+        """JSON payload for the status-polling endpoint."""
+        return {
+            'id': self.pk,
+            'job_type': self.job_type,
+            'label': self.label,
+            'status': self.status,
+            'status_display': self.get_status_display(),
+            'progress_current': self.progress_current,
+            'progress_total': self.progress_total,
+            'progress_percent': self.progress_percent,
+            'progress_message': self.progress_message,
+            'cancel_requested': self.cancel_requested,
+            'is_finished': self.is_finished,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class DataVersion(models.Model):
+    """
+    Generation counter of one report data source ('ledger', 'budget'), bumped in the same
+    transaction as every change to its data (data_management.signals). The versions of a page's
+    sources are part of its fragment cache key (data_management.fragment_cache).
+    """
+    source = models.CharField(max_length=50, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Data Version"
+        verbose_name_plural = "Data Versions"
+        ordering = ['source']
+
+    def __str__(self):
+        return f"{self.source} v{self.version}"
@@ -0,0 +1,180 @@
+"""
+Multi-file / multi-sheet imports with parsing and writing overlapped.
+
+Every data sheet of every file is one "part". Parts are parsed (openpyxl cell decoding, date and
+amount parsing: CPU-bound, no database access) in a process pool and pushed as lists of parsed rows
+onto a bounded queue. The calling process is the single writer: it drains the queue into the usual
+GLTransactionWriter / FundTransactionWriter inside one transaction, so the whole upload still
+commits or rolls back as a unit. The queue bound (DATA_IMPORT['QUEUE_CHUNKS']) keeps fast parsers
+from piling parsed rows up in memory while the database catches up.
+
+Small uploads are parsed in-process: starting the pool costs more than it saves.
+"""
+import multiprocessing
+import os
+import queue as queue_module
+from concurrent.futures import ProcessPoolExecutor
+from django.db import transaction
+from . import worker
+from .importers import (
+    get_import_config, iter_upload_rows, data_sheets, parse_gl_row, parse_fund_row,
+    GLTransactionWriter, FundTransactionWriter,
+)
+
+
+def upload_parts(files):
+    """[(path, display name)] -> [(path, sheet name or None, label)], one per data sheet."""
+    parts = []
+    for path, name in files:
+        with open(path, 'rb') as fh:
+            sheets = data_sheets(fh)
+        for sheet in sheets:
+            label = f"{name} [{sheet}]" if sheet and len(sheets) > 1 else name
+            parts.append((path, sheet, label))
+    return parts
+
+
+def parse_rows(row, line_no, source_type=None):
+    """parse_gl_row for GL uploads (source_type None), parse_fund_row for 'RSA' / 'MANAGED'."""
+    if source_type is None:
+        return parse_gl_row(row, line_no)
+    return parse_fund_row(row, line_no, source_type)
+
+
+def _iter_part_chunks(path, sheet, source_type, chunk_size):
+    chunk = []
+    with open(path, 'rb') as fh:
+        for line_no, row in iter_upload_rows(fh, sheet):
+            chunk.append(parse_rows(row, line_no, source_type))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def parse_part(path, sheet, label, source_type, chunk_size, queue, stop):
+    """
+    Pool task: parses one part onto `queue` as ('rows', label, [values, ...]) messages, then
+    ('error', label, message) on a bad row, and always a final ('done', label, row count).
+    """
+    count = 0
+    try:
+        for chunk in _iter_part_chunks(path, sheet, source_type, chunk_size):
+            if stop.is_set():
+                break
+            queue.put(('rows', label, chunk))
+            count += len(chunk)
+    except Exception as e:
+        queue.put(('error', label, str(e) or e.__class__.__name__))
+    queue.put(('done', label, count))
+    return count
+
+
+def iter_parsed_chunks(parts, source_type=None, workers=None):
+    """
+    Yields (label, [parsed values, ...]) for all parts, parsed by up to `workers` processes
+    (DATA_IMPORT['PARSE_WORKERS'] by default; 0 parses in-process). A parse error is raised as
+    ValueError('<label>: <message>') once every worker has stopped.
+    """
+    config = get_import_config()
+    chunk_size = config['CHUNK_SIZE']
+    if workers is None:
+        workers = config['PARSE_WORKERS']
+        if sum(os.path.getsize(path) for path in {part[0] for part in parts}) < config['PARALLEL_MIN_BYTES']:
+            workers = 0
+    workers = min(workers, len(parts))
+
+    if workers <= 0:
+        for path, sheet, label in parts:
+            try:
+                for chunk in _iter_part_chunks(path, sheet, source_type, chunk_size):
+                    yield label, chunk
+            except ValueError as e:
+                raise ValueError(f"{label}: {e}")
+        return
+
+    # 'spawn': the parsers never share this process's database connection (they do not need one)
+    context = multiprocessing.get_context('spawn')
+    with context.Manager() as manager:
+        queue = manager.Queue(maxsize=config['QUEUE_CHUNKS'])
+        stop = manager.Event()
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=worker.init_worker)
+        pending = len(parts)
+        error = None
+
+        def next_message():
+            while True:
+                try:
+                    return queue.get(timeout=1)
+                except queue_module.Empty:
+                    # A task that raised outside parse_part (e.g. a dead process) never sends 'done'
+                    for future in futures:
+                        if future.done() and future.exception() is not None:
+                            raise future.exception()
+
+        try:
+            futures = [
+                pool.submit(parse_part, path, sheet, label, source_type, chunk_size, queue, stop)
+                for path, sheet, label in parts
+            ]
+            while pending:
+                kind, label, payload = next_message()
+                if kind == 'done':
+                    pending -= 1
+                elif kind == 'error':
+                    if error is None:
+                        error = f"{label}: {payload}"
+                    stop.set()
+                elif error is None:
+                    yield label, payload
+            if error:
+                raise ValueError(error)
+        finally:
+            if pending:
+                # The writer failed (or the consumer stopped early): let the parsers finish their
+                # current chunk, draining the queue so none of them blocks on a full queue
+                stop.set()
+                try:
+                    while pending:
+                        if next_message()[0] == 'done':
+                            pending -= 1
+                except Exception:
+                    pass  # already failing; the pool is shut down below
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _write(writer, chunks):
+    try:
+        for label, chunk in chunks:
+            for values in chunk:
+                try:
+                    writer.add(values)
+                except ValueError as e:
+                    raise ValueError(f"{label}: {e}")
+    finally:
+        # Stops the parsers at once if the writer failed
+        chunks.close()
+    return writer.close()
+
+
+def import_gl_files(files, user=None, progress=None, workers=None, batch=None):
+    """
+    Imports one or more GL uploads ([(path, display name)], every data sheet of each workbook)
+    in one transaction, as import batch `batch` (an UploadHistory, optional).
+    Returns (lines written, of which already in the ledger and updated).
+    """
+    parts = upload_parts(files)
+    with transaction.atomic():
+        writer = GLTransactionWriter(user=user, progress=progress, batch=batch)
+        return _write(writer, iter_parsed_chunks(parts, workers=workers)), writer.updated
+
+
+def import_fund_files(files, source_type, create_missing_funds=None, progress=None, workers=None, batch=None):
+    """Fund counterpart of import_gl_files. Returns (lines written, funds created)."""
+    parts = upload_parts(files)
+    with transaction.atomic():
+        writer = FundTransactionWriter(
+            source_type, create_missing_funds=create_missing_funds, progress=progress, batch=batch
+        )
+        return _write(writer, iter_parsed_chunks(parts, source_type, workers=workers)), writer.created_funds
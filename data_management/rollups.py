@@ -0,0 +1,228 @@
+"""
+Maintenance of the derived GL tables the financial statements read from:
+GLMonthlyBalance (movements per month) and GLBalanceSnapshot (closing balances per month end).
+
+Both are derived data: refresh_monthly_balances() deletes the months in range, re-aggregates them
+from the net ledger in one GROUP BY and then rolls the snapshots forward from the first changed
+month, so it is safe to re-run at any time. When the change is known exactly (an upload being
+rolled back), adjust_monthly_balances() applies its totals to the rollup rows instead. Either way
+ledger_refreshed is sent once the snapshots are current.
+"""
+import datetime
+from django.db import transaction
+from django.dispatch import Signal
+from django.db.models import Count, F, Max, Min, Sum, Value, Window
+from django.db.models.functions import Coalesce, TruncMonth
+from setup.models import GLTransaction
+from .models import GLMonthlyBalance, GLBalanceSnapshot
+
+BATCH_SIZE = 5000
+
+# Sent after the balance snapshots were rolled forward, with from_month: the first month whose
+# rollups changed (None when the whole ledger was cleared). analysis.kpis refreshes its KPIs on it.
+ledger_refreshed = Signal()
+
+
+def month_start(d):
+    return datetime.date(d.year, d.month, 1)
+
+
+def next_month_start(d):
+    return datetime.date(d.year + d.month // 12, d.month % 12 + 1, 1)
+
+
+def previous_month_start(d):
+    return datetime.date(d.year - (d.month == 1), (d.month - 2) % 12 + 1, 1)
+
+
+def monthly_totals(lines):
+    """The net movements of the GLTransaction queryset `lines` per rollup key, in one GROUP BY."""
+    return (
+        lines.net()
+        .annotate(
+            month=TruncMonth('transaction_date'),
+            entity=Coalesce('entity_code', Value('')),
+            cost_center=Coalesce('cost_center_code', Value('')),
+        )
+        .values('month', 'gl_account_code', 'entity', 'cost_center')
+        .annotate(debit_total=Sum('base_debit'), credit_total=Sum('base_credit'), lines=Count('id'))
+        .order_by()
+    )
+
+
+def refresh_monthly_balances(first_date=None, last_date=None):
+    """
+    Rebuilds GLMonthlyBalance for every month touching [first_date, last_date]
+    (the whole ledger when a bound is None), then the balance snapshots from the first of those
+    months onwards. Returns the number of rollup rows written.
+    """
+    if first_date is None or last_date is None:
+        bounds = GLTransaction.objects.aggregate(first=Min('transaction_date'), last=Max('transaction_date'))
+        first_date = first_date or bounds['first']
+        last_date = last_date or bounds['last']
+        if first_date is None:
+            GLMonthlyBalance.objects.all().delete()
+            GLBalanceSnapshot.objects.all().delete()
+            ledger_refreshed.send(sender=GLBalanceSnapshot, from_month=None)
+            return 0
+
+    first_month, last_month = month_start(first_date), month_start(last_date)
+    totals = monthly_totals(
+        GLTransaction.objects.filter(transaction_date__gte=first_month, transaction_date__lt=next_month_start(last_month))
+    )
+
+    written = 0
+    with transaction.atomic():
+        GLMonthlyBalance.objects.filter(period__gte=first_month, period__lte=last_month).delete()
+        batch = []
+        for row in totals.iterator(chunk_size=BATCH_SIZE):
+            batch.append(GLMonthlyBalance(
+                period=row['month'],
+                gl_account_code_id=row['gl_account_code'],
+                entity_code=row['entity'],
+                cost_center_code=row['cost_center'],
+                debit=row['debit_total'] or 0,
+                credit=row['credit_total'] or 0,
+                line_count=row['lines'],
+            ))
+            if len(batch) >= BATCH_SIZE:
+                written += len(GLMonthlyBalance.objects.bulk_create(batch))
+                batch = []
+        written += len(GLMonthlyBalance.objects.bulk_create(batch))
+        refresh_balance_snapshots(first_month)
+    return written
+
+
+def adjust_monthly_balances(removed=(), added=()):
+    """
+    Applies a known change of the ledger to GLMonthlyBalance without re-aggregating the months:
+    `removed` and `added` are monthly_totals() rows of the lines leaving and entering the net
+    ledger, evaluated while they were (or are) in it. Rollup rows left without lines are deleted.
+    The snapshots are then rolled forward from the first month changed. Returns rollup rows changed.
+    """
+    deltas = {}
+    for rows, sign in ((removed, -1), (added, 1)):
+        for row in rows:
+            key = (row['month'], row['gl_account_code'], row['entity'], row['cost_center'])
+            delta = deltas.setdefault(key, [0, 0, 0])
+            delta[0] += sign * (row['debit_total'] or 0)
+            delta[1] += sign * (row['credit_total'] or 0)
+            delta[2] += sign * row['lines']
+    if not deltas:
+        return 0
+
+    months = {key[0] for key in deltas}
+    accounts = {key[1] for key in deltas}
+    with transaction.atomic():
+        existing = {
+            (balance.period, balance.gl_account_code_id, balance.entity_code, balance.cost_center_code): balance
+            for balance in GLMonthlyBalance.objects.select_for_update().filter(
+                period__in=months, gl_account_code__in=accounts,
+            )
+        }
+        changed, created, emptied = [], [], []
+        for key, (debit, credit, lines) in deltas.items():
+            balance = existing.get(key)
+            if balance is None:
+                if lines > 0:
+                    created.append(GLMonthlyBalance(
+                        period=key[0], gl_account_code_id=key[1], entity_code=key[2], cost_center_code=key[3],
+                        debit=debit, credit=credit, line_count=lines,
+                    ))
+                continue
+            balance.debit += debit
+            balance.credit += credit
+            balance.line_count += lines
+            if balance.line_count > 0:
+                changed.append(balance)
+            else:
+                emptied.append(balance.pk)
+        GLMonthlyBalance.objects.bulk_update(changed, ['debit', 'credit', 'line_count'], batch_size=BATCH_SIZE)
+        GLMonthlyBalance.objects.bulk_create(created, batch_size=BATCH_SIZE)
+        GLMonthlyBalance.objects.filter(pk__in=emptied).delete()
+        refresh_balance_snapshots(min(months))
+    return len(deltas)
+
+
+def refresh_balance_snapshots(from_month=None):
+    """
+    Rolls GLBalanceSnapshot forward from `from_month` (the first rollup month when None) to the
+    latest rollup month: closing = previous month's snapshot + a window running sum of the
+    monthly movements, carried forward through months without activity. Earlier snapshots are
+    left untouched, so importing a new month only writes that month. Returns rows written.
+    """
+    bounds = GLMonthlyBalance.objects.aggregate(first=Min('period'), last=Max('period'))
+    if bounds['first'] is None:
+        GLBalanceSnapshot.objects.all().delete()
+        ledger_refreshed.send(sender=GLBalanceSnapshot, from_month=None)
+        return 0
+    from_month = max(month_start(from_month), bounds['first']) if from_month else bounds['first']
+    last_month = bounds['last']
+
+    # Snapshots end at the last month that had activity; start right after them if that is earlier
+    previous = GLBalanceSnapshot.objects.filter(period__lt=from_month).aggregate(last=Max('period'))['last']
+    if previous is not None:
+        from_month = min(from_month, next_month_start(previous))
+
+    dims = ('gl_account_code', 'entity_code', 'cost_center_code')
+    # Opening balances: the latest snapshot before from_month
+    opening = {
+        tuple(row[:3]): row[3]
+        for row in GLBalanceSnapshot.objects.filter(period=previous).values_list(*dims, 'closing_balance')
+    } if previous is not None else {}
+
+    running = (
+        GLMonthlyBalance.objects.filter(period__gte=from_month)
+        .annotate(running=Window(
+            Sum(F('debit') - F('credit')),
+            partition_by=[F(dim) for dim in dims],
+            order_by=F('period').asc(),
+        ))
+        .values_list(*dims, 'period', 'running')
+        .order_by(*dims, 'period')
+    )
+
+    written = 0
+    batch = []
+
+    def emit(key, start, end, balance):
+        # Carry `balance` forward for months [start, end]; zero balances are not stored
+        nonlocal written, batch
+        if not balance:
+            return
+        month = start
+        while month <= end:
+            batch.append(GLBalanceSnapshot(
+                gl_account_code_id=key[0], entity_code=key[1], cost_center_code=key[2],
+                period=month, closing_balance=balance,
+            ))
+            month = next_month_start(month)
+        if len(batch) >= BATCH_SIZE:
+            written += len(GLBalanceSnapshot.objects.bulk_create(batch))
+            batch = []
+
+    with transaction.atomic():
+        GLBalanceSnapshot.objects.filter(period__gte=from_month).delete()
+        key = None
+        for account, entity, cost_center, period, total in running.iterator(chunk_size=BATCH_SIZE):
+            if (account, entity, cost_center) != key:
+                if key is not None:
+                    emit(key, month, last_month, balance)
+                key = (account, entity, cost_center)
+                base = opening.pop(key, 0)
+                month, balance = from_month, base
+            if period > month:
+                # Months without movement keep the previous balance
+                emit(key, month, previous_month_start(period), balance)
+            balance = base + total
+            month = period
+            emit(key, month, month, balance)
+            month = next_month_start(month)
+        if key is not None:
+            emit(key, month, last_month, balance)
+        # Balances with no movement since from_month
+        for key, balance in opening.items():
+            emit(key, from_month, last_month, balance)
+        written += len(GLBalanceSnapshot.objects.bulk_create(batch))
+    ledger_refreshed.send(sender=GLBalanceSnapshot, from_month=from_month)
+    return written
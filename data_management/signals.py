@@ -0,0 +1,39 @@
+"""
+Bumps the report data versions (data_management.fragment_cache) whenever the data behind a cached
+report changes, so its cached tables are rebuilt on the next view.
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .fragment_cache import LEDGER, BUDGET, bump_data_version
+from .rollups import ledger_refreshed
+
+
+@receiver(ledger_refreshed)
+def ledger_changed(sender, **kwargs):
+    # Imports, rollbacks, revaluations and rollup rebuilds all end with ledger_refreshed
+    bump_data_version(LEDGER)
+
+
+@receiver(post_save, sender='setup.GLAccount')
+@receiver(post_delete, sender='setup.GLAccount')
+@receiver(post_save, sender='setup.IntercompanyAccountPair')
+@receiver(post_delete, sender='setup.IntercompanyAccountPair')
+@receiver(post_save, sender='setup.CostCenter')
+@receiver(post_delete, sender='setup.CostCenter')
+def account_changed(sender, raw=False, **kwargs):
+    # The statements group and sign their lines by the account's classification;
+    # the consolidation eliminates by the intercompany pairs; the budget vs actual
+    # drill-down assigns actuals to departments by cost center
+    if not raw:
+        bump_data_version(LEDGER)
+
+
+@receiver(post_save, sender='budget_input.BudgetAssumption')
+@receiver(post_delete, sender='budget_input.BudgetAssumption')
+@receiver(post_save, sender='budget_input.BudgetTransaction')
+@receiver(post_delete, sender='budget_input.BudgetTransaction')
+@receiver(post_save, sender='budget_input.PINDataSubmission')
+@receiver(post_delete, sender='budget_input.PINDataSubmission')
+def budget_changed(sender, raw=False, **kwargs):
+    if not raw:
+        bump_data_version(BUDGET)
@@ -0,0 +1,175 @@
+"""
+Shared building blocks for the financial statement engines: reporting period buckets aligned to
+the fiscal calendar, statement filters, and the monthly account movements the engines read
+(from the GLMonthlyBalance rollup whenever the filters allow it).
+"""
+import datetime
+from decimal import Decimal
+from django.db.models import Max, Q, Sum
+from django.db.models.functions import TruncMonth
+from setup.fiscal import get_fiscal_config
+from setup.models import GLTransaction
+from .models import GLMonthlyBalance
+from .rollups import month_start, next_month_start
+
+PERIOD_MONTHS = {'monthly': 1, 'quarterly': 3, 'half_yearly': 6, 'annual': 12}
+PERIOD_PREFIXES = {'quarterly': 'Q', 'half_yearly': 'H'}
+
+# IncomeStatementFilterForm field -> GLTransaction column
+FILTER_FIELDS = {
+    'entity': 'entity_code',
+    'cost_center': 'cost_center_code',
+    'journal_type': 'journal_type',
+    'project': 'project_code',
+    'currency': 'currency_code',
+}
+# Dimensions kept in the monthly rollup; any other filter falls back to the ledger itself
+ROLLUP_FILTERS = {'entity', 'cost_center'}
+
+
+def add_months(d, months):
+    index = d.year * 12 + d.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def fiscal_year_first_month(d, start_month=None):
+    """First day of the (monthly) fiscal year containing d. Fiscal years are named by their start year."""
+    start_month = start_month or get_fiscal_config()['START_MONTH']
+    year = d.year if d.month >= start_month else d.year - 1
+    return datetime.date(year, start_month, 1)
+
+
+def latest_ledger_month():
+    latest = GLMonthlyBalance.objects.aggregate(last=Max('period'))['last']
+    return latest or month_start(datetime.date.today())
+
+
+def reporting_periods(reporting_period='annual', start_date=None, end_date=None):
+    """
+    Chronological list of (label, first_month, last_month) buckets, aligned to FISCAL_CALENDAR
+    START_MONTH. Statements are built from monthly data, so dates are widened to whole months.
+
+    Without dates: annual compares the latest fiscal year with the one before; the other period
+    types split the latest fiscal year. With dates: the range is split into buckets (one bucket
+    for annual), clipped at both ends.
+    """
+    months = PERIOD_MONTHS.get(reporting_period, 12)
+    start_month = get_fiscal_config()['START_MONTH']
+
+    if start_date or end_date:
+        last = month_start(end_date or latest_ledger_month())
+        first = month_start(start_date) if start_date else fiscal_year_first_month(last, start_month)
+        if first > last:
+            first, last = last, first
+        if reporting_period == 'annual':
+            return [(f"{first:%b %Y} - {last:%b %Y}", first, last)]
+    else:
+        fy_first = fiscal_year_first_month(latest_ledger_month(), start_month)
+        if reporting_period == 'annual':
+            first = add_months(fy_first, -12)
+        else:
+            first = fy_first
+        last = add_months(fy_first, 11)
+
+    periods = []
+    bucket_first = first
+    while bucket_first <= last:
+        fy_first = fiscal_year_first_month(bucket_first, start_month)
+        offset = (bucket_first.year - fy_first.year) * 12 + bucket_first.month - fy_first.month
+        number = offset // months + 1
+        bucket_last = min(add_months(fy_first, number * months - 1), last)
+        if months == 1:
+            label = f"{bucket_first:%b %Y}"
+        elif months == 12:
+            label = f"FY{fy_first.year}"
+        else:
+            label = f"{PERIOD_PREFIXES[reporting_period]}{number} FY{fy_first.year}"
+        periods.append((label, bucket_first, bucket_last))
+        bucket_first = add_months(bucket_last, 1)
+    return periods
+
+
+def month_index(periods):
+    """{first day of month: bucket position} for every month covered by `periods`."""
+    index = {}
+    for position, (_, first, last) in enumerate(periods):
+        month = first
+        while month <= last:
+            index[month] = position
+            month = add_months(month, 1)
+    return index
+
+
+def active_filters(cleaned_data):
+    """Non-empty statement filters from IncomeStatementFilterForm.cleaned_data."""
+    return {key: cleaned_data[key] for key in FILTER_FIELDS if cleaned_data.get(key)}
+
+
+def note_account(codes, name, code):
+    """Records in `codes` the account behind statement line `name`; None once two accounts share the name."""
+    codes[name] = code if codes.get(name, code) == code else None
+
+
+def monthly_account_movements(first_month, last_month, filters=None, carry_forward=None):
+    """
+    One aggregate query returning a row per month x account:
+    {'month', 'account', 'name', 'statement', 'category', 'debit', 'credit'} in base currency,
+    for months in [first_month, last_month]. `carry_forward` is an extra Q on the account
+    (e.g. cash accounts) whose rows before first_month are returned too, so opening balances
+    come out of the same pass.
+    """
+    filters = filters or {}
+    account_fields = {
+        'account': 'gl_account_code',
+        'name': 'gl_account_code__gl_account_name',
+        'statement': 'gl_account_code__financial_statement',
+        'category': 'gl_account_code__cash_flow_category',
+    }
+
+    if set(filters) <= ROLLUP_FILTERS:
+        qs = GLMonthlyBalance.objects.all()
+        month_field, debit_field, credit_field = 'period', 'debit', 'credit'
+    else:
+        qs = GLTransaction.objects.net().annotate(month=TruncMonth('transaction_date'))
+        month_field, debit_field, credit_field = 'month', 'base_debit', 'base_credit'
+    qs = qs.filter(**{FILTER_FIELDS[key]: value for key, value in filters.items()})
+
+    in_range = Q(**{f"{month_field}__gte": first_month, f"{month_field}__lt": next_month_start(last_month)})
+    if carry_forward is not None:
+        in_range |= Q(carry_forward, **{f"{month_field}__lt": first_month})
+    qs = qs.filter(in_range)
+
+    rows = (
+        qs.values(month_field, *account_fields.values())
+        .annotate(debit_total=Sum(debit_field), credit_total=Sum(credit_field))
+        .order_by()
+    )
+    for row in rows.iterator():
+        month = row[month_field]
+        if isinstance(month, datetime.datetime):
+            month = month.date()
+        yield {
+            'month': month,
+            **{key: row[field] for key, field in account_fields.items()},
+            'debit': row['debit_total'] or Decimal('0'),
+            'credit': row['credit_total'] or Decimal('0'),
+        }
+
+
+def compact_amount(value):
+    """₦1.24B / ₦730M / ₦250K style amounts for the performance cards."""
+    value = Decimal(value or 0)
+    sign = '-' if value < 0 else ''
+    value = abs(value)
+    for divisor, suffix in ((Decimal('1e9'), 'B'), (Decimal('1e6'), 'M'), (Decimal('1e3'), 'K')):
+        if value >= divisor:
+            return f"{sign}₦{value / divisor:.2f}".rstrip('0').rstrip('.') + suffix
+    return f"{sign}₦{value:,.0f}"
+
+
+def change_card(current, previous):
+    """('+12.5%', 'up') comparing two period values; ('n/a', 'up') when there is no base."""
+    if not previous:
+        return 'n/a', 'up'
+    change = (Decimal(current) - Decimal(previous)) / abs(Decimal(previous)) * 100
+    return f"{change:+.1f}%", 'up' if change >= 0 else 'down'
@@ -0,0 +1,141 @@
+"""
+Background job handlers of the data_management app (see data_management.jobs).
+"""
+import contextlib
+import datetime
+import os
+import shutil
+import tempfile
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.http import QueryDict
+from .batches import STATUS_IMPORTING, rollback_batch
+from .exports import STATEMENTS, statement_from_query, export_filename, render_statement
+from .jobs import JobCancelled, job_handler, export_path, progress_callback, report_progress
+from .models import UploadHistory
+from .parallel_import import import_gl_files, import_fund_files
+from .rollups import refresh_monthly_balances
+
+# Historical upload types with a real importer: upload_type -> FundTransaction source_type (None for GL)
+UPLOAD_SOURCES = {
+    'gl_transactions': None,
+    'rsa_fund': 'RSA',
+    'managed_fund': 'MANAGED',
+}
+
+
+@contextlib.contextmanager
+def local_files(files):
+    """
+    [[storage path, name, ...]] -> [(local file path, name)] for the parse processes, copying
+    files to a temporary directory when the storage is not the local filesystem.
+    """
+    try:
+        paths = [(default_storage.path(path), name) for path, name, *_ in files]
+    except NotImplementedError:
+        paths = None
+    if paths is not None:
+        yield paths
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        local = []
+        for i, (path, name, *_) in enumerate(files):
+            target = os.path.join(tmp, f"{i}{os.path.splitext(name)[1]}")
+            with default_storage.open(path, 'rb') as src, open(target, 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            local.append((target, name))
+        yield local
+
+
+@job_handler('import_upload')
+def import_upload(job, files, upload_type, checksum=''):
+    """
+    Imports the stored files of one historical upload ([[storage path, name, sha256], ...])
+    together and logs them in UploadHistory, like the synchronous view did. An upload whose
+    checksum matches an earlier successful upload of the same type is skipped. The UploadHistory
+    row is created first: it is the import batch the new lines are stamped with.
+    """
+    user = job.created_by
+    file_names = ', '.join(name for _, name, *_ in files)
+    history = {'file_name': file_names[:255], 'uploaded_by': user, 'upload_type': upload_type, 'checksum': checksum}
+    try:
+        duplicate = checksum and (
+            UploadHistory.objects.filter(checksum=checksum, upload_type=upload_type, status__startswith='Success')
+            .order_by('-upload_date').first()
+        )
+        if duplicate:
+            upload = UploadHistory.objects.create(record_count=0, status=f'Skipped: identical to upload #{duplicate.pk}', **history)
+            report_progress(job, 0, 0, 'Identical to an earlier upload; nothing imported')
+            return {
+                'record_count': 0, 'updated_count': 0, 'created_funds': 0, 'upload_id': upload.pk,
+                'duplicate_of': duplicate.pk, 'duplicate_date': duplicate.upload_date.isoformat(),
+            }
+
+        upload = UploadHistory.objects.create(record_count=0, status=STATUS_IMPORTING, **history)
+        progress = progress_callback(job, f"Importing {file_names}")
+        report_progress(job, 0, message=f"Reading {file_names}")
+        updated_count = created_funds = 0
+        try:
+            with local_files(files) as paths:
+                if UPLOAD_SOURCES[upload_type] is None:
+                    record_count, updated_count = import_gl_files(paths, user=user, progress=progress, batch=upload)
+                else:
+                    record_count, created_funds = import_fund_files(
+                        paths, UPLOAD_SOURCES[upload_type], progress=progress, batch=upload,
+                    )
+        except JobCancelled:
+            upload.status = 'Cancelled'
+            upload.save(update_fields=['status'])
+            raise
+        except Exception as e:
+            upload.status = f'Failed: {e}'[:50]
+            upload.save(update_fields=['status'])
+            raise
+    finally:
+        for path, *_ in files:
+            default_storage.delete(path)
+
+    upload.record_count = record_count
+    upload.status = f'Success: Routed to {upload_type} table'
+    upload.save(update_fields=['record_count', 'status'])
+    report_progress(job, record_count, record_count, 'Done')
+    return {
+        'record_count': record_count, 'updated_count': updated_count, 'created_funds': created_funds,
+        'upload_id': upload.pk,
+    }
+
+
+@job_handler('rollback_upload')
+def rollback_upload(job, upload_id):
+    """Removes the lines imported by one upload (see data_management.batches)."""
+    upload = UploadHistory.objects.get(pk=upload_id)
+    report_progress(job, 0, upload.record_count, f"Rolling back {upload.file_name}")
+    gl_count, fund_count = rollback_batch(upload, progress=progress_callback(job, f"Rolling back {upload.file_name}"))
+    report_progress(job, gl_count + fund_count, gl_count + fund_count, 'Done')
+    return {'upload_id': upload_id, 'gl_count': gl_count, 'fund_count': fund_count}
+
+
+@job_handler('export_statement')
+def export_statement(job, statement, query='', format='xlsx'):
+    """Builds a statement export and stores it for the job download endpoint."""
+    engine, title = STATEMENTS[statement]
+    report_progress(job, 0, 2, f"Building the {title}")
+    _, reporting_period, built = statement_from_query(QueryDict(query), engine)
+    report_progress(job, 1, 2, 'Writing the file')
+    content, content_type, extension = render_statement(built, title, format)
+    filename = f"{export_filename(statement, reporting_period, built)}.{extension}"
+    path = default_storage.save(export_path(job, filename), ContentFile(content))
+    report_progress(job, 2, 2, 'Done')
+    return {'path': path, 'filename': filename, 'content_type': content_type}
+
+
+@job_handler('refresh_gl_rollups')
+def refresh_gl_rollups(job, first_date=None, last_date=None):
+    """Rebuilds the monthly GL rollup and balance snapshots (ISO dates; whole ledger when omitted)."""
+    report_progress(job, 0, message='Refreshing monthly balances')
+    rows = refresh_monthly_balances(
+        datetime.date.fromisoformat(first_date) if first_date else None,
+        datetime.date.fromisoformat(last_date) if last_date else None,
+    )
+    report_progress(job, rows, rows, 'Done')
+    return {'rows': rows}
@@ -1,3 +1,306 @@
-from django.test import TestCase
+import csv
+import datetime
+import os
+import tempfile
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from budget_input.models import BudgetAssumption
+from setup.models import DateDetail, GLAccount, GLTransaction, IntercompanyAccountPair
+from .consolidation import consolidate, consolidation_worksheet
+from .drill_through import FIELDS, decode_cursor, drill_through_lines, encode_cursor, iter_line_values, keyset_page
+from .fragment_cache import BUDGET, LEDGER, cached_fragment, fragment_cache_stats
+from .jobs import claim_next_job, enqueue, job_handler, report_progress, requeue_stale_jobs
+from .models import JOB_FAILED, JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, BackgroundJob, UploadHistory
+from .parallel_import import import_gl_files
+from .rollups import refresh_monthly_balances
 
-# Create your tests here.
+
+def make_account(code, financial_statement, normal_balance, category):
+    return GLAccount.objects.create(
+        gl_account_code=code, gl_account_name=f'Account {code}', category=category,
+        financial_statement=financial_statement, account_type=category, normal_balance=normal_balance,
+    )
+
+
+def post(account, date, entity, debit=0, credit=0):
+    return GLTransaction.objects.create(
+        gl_account_code=account, transaction_date=date, entity_code=entity,
+        debit=Decimal(debit), credit=Decimal(credit),
+    )
+
+
+class ConsolidationTests(TestCase):
+    MONTH = datetime.date(2024, 6, 1)
+
+    def setUp(self):
+        receivable = make_account('1300', 'Balance Sheet', 'Debit', 'Current Assets')
+        payable = make_account('2300', 'Balance Sheet', 'Credit', 'Current Liabilities')
+        revenue = make_account('4100', 'Income Statement', 'Credit', 'Revenue')
+        expense = make_account('6100', 'Income Statement', 'Debit', 'Expense')
+        IntercompanyAccountPair.objects.create(name='IC balances', debit_account=receivable, credit_account=payable)
+        IntercompanyAccountPair.objects.create(name='IC services', debit_account=expense, credit_account=revenue)
+        # Entity A bills B 1,000; B has only booked 800 of it
+        date = datetime.date(2024, 6, 10)
+        post(receivable, date, 'A', debit=1000)
+        post(revenue, date, 'A', credit=1000)
+        post(expense, date, 'B', debit=800)
+        post(payable, date, 'B', credit=800)
+        refresh_monthly_balances()
+
+    def test_common_amount_is_eliminated_and_the_rest_reported(self):
+        result = consolidate(self.MONTH, months=1, workers=0)
+        self.assertEqual(result['entities'], ['A', 'B'])
+        self.assertEqual(result['eliminations']['closing'], {'1300': [Decimal(-800)], '2300': [Decimal(800)]})
+        self.assertEqual(result['eliminations']['movements'], {'6100': [Decimal(-800)], '4100': [Decimal(800)]})
+        self.assertEqual(result['consolidated']['closing']['1300'], [Decimal(200)])
+        self.assertEqual(result['consolidated']['closing']['2300'], [Decimal(0)])
+        self.assertEqual(result['consolidated']['movements']['4100'], [Decimal(-200)])
+        self.assertEqual(
+            sorted((difference['pair'], difference['difference']) for difference in result['differences']),
+            [('IC balances', Decimal(200)), ('IC services', Decimal(-200))],
+        )
+
+    def test_worksheet_balances_after_eliminations(self):
+        worksheet = consolidation_worksheet(consolidate(self.MONTH, months=1, workers=0))
+        self.assertEqual(worksheet['column_labels'], ['A', 'B', 'Eliminations', 'Consolidated'])
+        totals = worksheet['totals']
+        # Columns: A, B, Eliminations, Consolidated
+        self.assertEqual(totals['net_profit'], [Decimal(1000), Decimal(-800), Decimal(0), Decimal(200)])
+        self.assertEqual(totals['assets'], [Decimal(1000), Decimal(0), Decimal(-800), Decimal(200)])
+        self.assertEqual((totals['eliminated_balances'], totals['eliminated_transactions']), (Decimal(800), Decimal(800)))
+        self.assertFalse([row for row in worksheet['balance_sheet'] if row['description'].startswith('Out of balance')])
+        self.assertEqual(len(worksheet['differences']), 2)
+
+    def test_inactive_pair_is_not_eliminated(self):
+        IntercompanyAccountPair.objects.update(is_active=False)
+        result = consolidate(self.MONTH, months=1, workers=0)
+        self.assertEqual(result['eliminations'], {'movements': {}, 'closing': {}})
+        self.assertEqual(result['differences'], [])
+
+
+class DrillThroughPagingTests(TestCase):
+    def setUp(self):
+        parent = make_account('1000', 'Balance Sheet', 'Debit', 'Current Assets')
+        child = make_account('1010', 'Balance Sheet', 'Debit', 'Current Assets')
+        child.parent_account = parent
+        child.save()
+        other = make_account('2000', 'Balance Sheet', 'Credit', 'Current Liabilities')
+        # Several lines per date, so the id breaks the ties
+        for day in range(1, 8):
+            for account in (parent, child, other):
+                post(account, datetime.date(2024, 3, day), 'A', debit=day)
+        self.lines = drill_through_lines('1000')
+        self.expected = list(self.lines.order_by('transaction_date', 'pk').values_list('pk', flat=True))
+
+    def test_account_includes_sub_accounts(self):
+        self.assertEqual(len(self.expected), 14)
+        self.assertEqual(set(self.lines.values_list('gl_account_code', flat=True)), {'1000', '1010'})
+
+    def test_pages_forward_and_back(self):
+        pages, cursor = [], None
+        while True:
+            page = keyset_page(self.lines, after=cursor, size=4)
+            pages.append([line.pk for line in page['lines']])
+            cursor = page['next']
+            if cursor is None:
+                break
+        self.assertEqual([len(page) for page in pages], [4, 4, 4, 2])
+        self.assertEqual(sum(pages, []), self.expected)
+
+        # Back from the last page, one page at a time
+        page = keyset_page(self.lines, after=encode_cursor(GLTransaction.objects.get(pk=self.expected[11])), size=4)
+        self.assertEqual([line.pk for line in page['lines']], pages[3])
+        for expected in reversed(pages[:3]):
+            page = keyset_page(self.lines, before=page['previous'], size=4)
+            self.assertEqual([line.pk for line in page['lines']], expected)
+        self.assertIsNone(page['previous'])
+
+    def test_export_batches_cover_every_line_once(self):
+        rows = list(iter_line_values(self.lines, batch_size=3))
+        self.assertEqual([row[FIELDS.index('id')] for row in rows], self.expected)
+
+    def test_malformed_cursor(self):
+        with self.assertRaises(ValueError):
+            decode_cursor('2024-03-01')
+
+
+
+@job_handler('test_add')
+def add_numbers(job, a, b):
+    report_progress(job, 1, 1, 'Added')
+    return {'sum': a + b}
+
+
+@job_handler('test_fail')
+def fail(job):
+    raise RuntimeError('Broken file')
+
+
+class BackgroundJobTests(TestCase):
+    @override_settings(BACKGROUND_JOBS={'RUN_INLINE': True})
+    def test_inline_job_runs_when_enqueued(self):
+        job = enqueue('test_add', {'a': 2, 'b': 3})
+        self.assertEqual((job.status, job.result, job.attempts), (JOB_SUCCEEDED, {'sum': 5}, 1))
+        self.assertEqual((job.progress_current, job.progress_message), (1, 'Added'))
+
+    @override_settings(BACKGROUND_JOBS={'RUN_INLINE': True})
+    def test_failed_handler_records_its_error(self):
+        with self.assertLogs('data_management.jobs', 'ERROR'):
+            job = enqueue('test_fail')
+        self.assertEqual((job.status, job.error), (JOB_FAILED, 'Broken file'))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_unknown_job_type_is_rejected(self):
+        with self.assertRaises(ValueError):
+            enqueue('no_such_job')
+
+    def test_stale_running_job_is_requeued_then_failed(self):
+        job = enqueue('test_add', {'a': 1, 'b': 1})
+        self.assertEqual(claim_next_job('box:1'), job.pk)
+        self.assertIsNone(claim_next_job('box:2'))
+        long_ago = timezone.now() - datetime.timedelta(hours=1)
+        BackgroundJob.objects.filter(pk=job.pk).update(heartbeat_at=long_ago)
+
+        self.assertEqual(requeue_stale_jobs(), (1, 0))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.worker), (JOB_QUEUED, ''))
+
+        # Second attempt dies as well: out of attempts
+        self.assertEqual(claim_next_job('box:2'), job.pk)
+        BackgroundJob.objects.filter(pk=job.pk).update(heartbeat_at=long_ago)
+        self.assertEqual(requeue_stale_jobs(), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (JOB_FAILED, 2))
+
+    def test_running_job_with_recent_heartbeat_is_left_alone(self):
+        job = enqueue('test_add', {'a': 1, 'b': 1})
+        claim_next_job('box:1')
+        self.assertEqual(requeue_stale_jobs(), (0, 0))
+        job.refresh_from_db()
+        self.assertEqual(job.status, JOB_RUNNING)
+
+
+GL_HEADER = ['transaction_date', 'gl_account_code', 'description', 'document_no', 'debit', 'credit']
+
+
+class GLReimportTests(TestCase):
+    def setUp(self):
+        make_account('1000', 'Balance Sheet', 'Debit', 'Current Assets')
+        make_account('4000', 'Income Statement', 'Credit', 'Revenue')
+        self.directory = tempfile.mkdtemp()
+
+    def write_upload(self, rows, name='gl.csv'):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(GL_HEADER)
+            writer.writerows(rows)
+        return path
+
+    def import_rows(self, rows):
+        return import_gl_files([(self.write_upload(rows), 'gl.csv')], workers=0)
+
+    def test_reimport_updates_lines_instead_of_adding_them(self):
+        rows = [
+            ['2024-05-02', '1000', 'Fee', 'INV-1', '250', ''],
+            ['2024-05-02', '4000', 'Fee', 'INV-1', '', '250'],
+        ]
+        self.assertEqual(self.import_rows(rows), (2, 0))
+        ids = set(GLTransaction.objects.values_list('pk', flat=True))
+
+        rows[0][2] = 'Management fee'
+        self.assertEqual(self.import_rows(rows), (2, 2))
+        self.assertEqual(set(GLTransaction.objects.values_list('pk', flat=True)), ids)
+        self.assertEqual(
+            GLTransaction.objects.get(gl_account_code='1000').description, 'Management fee',
+        )
+
+    def test_identical_lines_within_one_upload_are_kept_apart(self):
+        line = ['2024-05-03', '1000', 'Cash', 'RCPT-9', '100', '']
+        self.assertEqual(self.import_rows([line, line]), (2, 0))
+        self.assertEqual(GLTransaction.objects.values('line_hash').distinct().count(), 2)
+        # The same file again changes nothing; a third copy of the line is a new line
+        self.assertEqual(self.import_rows([line, line]), (2, 2))
+        self.assertEqual(self.import_rows([line, line, line]), (3, 2))
+        self.assertEqual(GLTransaction.objects.count(), 3)
+
+    @override_settings(BACKGROUND_JOBS={'RUN_INLINE': True}, MEDIA_ROOT=tempfile.mkdtemp())
+    def test_identical_upload_is_skipped(self):
+        def upload():
+            path = default_storage.save('job_uploads/gl.csv', ContentFile(
+                b'transaction_date,gl_account_code,debit,credit\n2024-05-04,1000,10,\n2024-05-04,4000,,10\n'
+            ))
+            return enqueue('import_upload', {
+                'files': [[path, 'gl.csv', 'digest']], 'upload_type': 'gl_transactions', 'checksum': 'digest',
+            })
+
+        first = upload()
+        self.assertEqual((first.status, first.result['record_count']), (JOB_SUCCEEDED, 2))
+        second = upload()
+        self.assertEqual(second.result['duplicate_of'], first.result['upload_id'])
+        self.assertEqual(GLTransaction.objects.count(), 2)
+        self.assertTrue(UploadHistory.objects.get(pk=second.result['upload_id']).status.startswith('Skipped'))
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'fragment-tests'}},
+    FRAGMENT_CACHE={'ENABLED': True, 'CACHE': 'default'},
+)
+class FragmentCacheTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.builds = []
+
+    def view(self, name, sources):
+        def build():
+            self.builds.append(name)
+            return {'built': len(self.builds)}
+        return cached_fragment(name, sources, build, params={'year': '2024'})
+
+    def test_repeat_view_is_a_hit(self):
+        first = self.view('report', (LEDGER,))
+        self.assertEqual(self.view('report', (LEDGER,)), first)
+        self.assertEqual(self.builds, ['report'])
+        self.assertEqual(cached_fragment('report', (LEDGER,), lambda: None, params={'year': '2025'}), None)
+
+    def test_ledger_change_invalidates(self):
+        account = make_account('1000', 'Balance Sheet', 'Debit', 'Current Assets')
+        self.view('report', (LEDGER,))
+        post(account, datetime.date(2024, 5, 1), 'A', debit=10)
+        refresh_monthly_balances()
+        self.view('report', (LEDGER,))
+        self.assertEqual(len(self.builds), 2)
+        # Reclassifying an account changes the statements as well
+        account.category = 'Non-current Assets'
+        account.save()
+        self.view('report', (LEDGER,))
+        self.assertEqual(len(self.builds), 3)
+
+    def test_budget_change_invalidates_budget_fragments_only(self):
+        self.view('forecast', (BUDGET,))
+        self.view('ledger_report', (LEDGER,))
+        DateDetail.objects.create(date=datetime.date(2024, 12, 31))
+        BudgetAssumption.objects.create(period_start_date_id=datetime.date(2024, 12, 31), version_name='FY2025')
+        self.view('forecast', (BUDGET,))
+        self.view('ledger_report', (LEDGER,))
+        self.assertEqual(self.builds, ['forecast', 'ledger_report', 'forecast'])
+
+    def test_statement_page_repeat_view_is_served_from_the_cache(self):
+        self.client.force_login(get_user_model().objects.create_user('analyst'))
+        make_account('1000', 'Balance Sheet', 'Debit', 'Current Assets')
+        url = reverse('data_management:balance_sheet')
+
+        def hits():
+            return fragment_cache_stats().get('balance_sheet', {}).get('hits', 0)
+
+        self.assertEqual(self.client.get(url).status_code, 200)
+        before = hits()
+        second = self.client.get(url)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(hits(), before + 1)
@@ -13,6 +13,15 @@ urlpatterns = [
     # ADDED New Cash Flow URLs
     path('cash_flow/', views.cash_flow_view, name='cash_flow'),
     path('export/cash_flow/', views.export_cash_flow_excel, name='export_cash_flow_excel'),
+    path('consolidation/', views.consolidation_view, name='consolidation'),
+    path('drill_through/', views.drill_through_view, name='drill_through'),
     path('managed_fund_report/', views.managed_fund_view, name='managed_fund_report'),
     path('rsa_fund_report/', views.rsa_fund_view, name='rsa_fund_report'),
+    # Background jobs (status polling, cancellation, export downloads)
+    path('jobs/<int:job_id>/', views.job_status_view, name='job_status'),
+    path('jobs/<int:job_id>/cancel/', views.job_cancel_view, name='job_cancel'),
+    path('jobs/<int:job_id>/download/', views.job_download_view, name='job_download'),
+    path('uploads/<int:upload_id>/rollback/', views.upload_rollback_view, name='upload_rollback'),
+    # Report fragment cache instrumentation
+    path('fragment_cache/stats/', views.fragment_cache_stats_view, name='fragment_cache_stats'),
 ]
\ No newline at end of file
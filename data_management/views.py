@@ -1,16 +1,40 @@
-from django.shortcuts import render, redirect
+from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponse 
+from django.contrib import messages
+from django.core.files.storage import default_storage
+from django.http import HttpResponse, FileResponse, Http404, JsonResponse
+from django.views.decorators.http import require_POST
 from .models import UploadHistory
 from setup.models import GLTransaction 
 from .forms import IncomeStatementFilterForm 
 import io 
+import os
 from openpyxl import Workbook 
 from django.utils.formats import number_format 
 from django.shortcuts import render
 # FIX: Import FundTransaction model
 from setup.models import GLTransaction, FundTransaction
-from .forms import IncomeStatementFilterForm, HistoricalDataUploadForm # ADDED HistoricalDataUploadForm
+from .forms import IncomeStatementFilterForm, HistoricalDataUploadForm, ConsolidationForm, DrillThroughForm # ADDED HistoricalDataUploadForm
+from .statements import active_filters, compact_amount, change_card, latest_ledger_month
+from .drill_through import (
+    AMOUNT_FIELDS as DRILL_AMOUNT_FIELDS, COLUMNS as DRILL_COLUMNS, FIELDS as DRILL_FIELDS, PAGE_SIZE, csv_response as drill_through_csv,
+    drill_through_lines, keyset_page, line_values,
+)
+from .consolidation import cached_consolidation, consolidation_worksheet, get_consolidation_config
+from .rollups import month_start
+from .exports import STATEMENTS, statement_from_query, export_filename, render_statement
+from .jobs import enqueue, store_upload, upload_checksum, cancel_job
+from .models import BackgroundJob, DataVersion, JOB_SUCCEEDED, JOB_FAILED
+from .tasks import UPLOAD_SOURCES
+from .batches import can_roll_back
+from .fragment_cache import LEDGER, cached_fragment, fragment_cache_stats
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.template.loader import render_to_string
+from django.urls import reverse
+from urllib.parse import urlencode
+from django.utils.safestring import mark_safe
+from setup.fiscal import get_fiscal_config
 
 
 
@@ -31,20 +55,52 @@ def historical_data_view(request):
     upload_history = UploadHistory.objects.filter(uploaded_by=request.user).order_by('-upload_date')[:10]
     recent_gl_transactions = GLTransaction.objects.all().order_by('-created_at')[:5]
     recent_fund_transactions = FundTransaction.objects.all().order_by('-created_at')[:5]
+    recent_jobs = BackgroundJob.objects.filter(created_by=request.user)[:10]
     
     if request.method == 'POST':
         upload_form = HistoricalDataUploadForm(request.POST, request.FILES)
         if upload_form.is_valid():
-            uploaded_file = upload_form.cleaned_data['excel_file']
+            uploaded_files = upload_form.cleaned_data['excel_file']
             upload_type = upload_form.cleaned_data['upload_type']
+            file_names = ', '.join(f.name for f in uploaded_files)
             
+            if upload_type in UPLOAD_SOURCES:
+                # Imported by a background job; with BACKGROUND_JOBS['RUN_INLINE'] it has already run
+                stored = [(*store_upload(f), f.name) for f in uploaded_files]  # (path, sha256, name)
+                job = enqueue(
+                    'import_upload',
+                    {
+                        'files': [[path, name, digest] for path, digest, name in stored],
+                        'upload_type': upload_type,
+                        'checksum': upload_checksum([digest for _, digest, _ in stored]),
+                    },
+                    user=request.user,
+                    label=file_names,
+                )
+                if job.status == JOB_SUCCEEDED and job.result.get('duplicate_of'):
+                    messages.warning(
+                        request,
+                        f"{file_names} is identical to an upload already imported on "
+                        f"{job.result['duplicate_date'][:10]}. Nothing was imported."
+                    )
+                elif job.status == JOB_SUCCEEDED:
+                    messages.success(request, f"{job.result['record_count']} records imported from {file_names}.")
+                    if job.result['updated_count']:
+                        messages.info(request, f"{job.result['updated_count']} of them were already in the ledger and were updated, not duplicated.")
+                    if job.result['created_funds']:
+                        messages.warning(request, f"{job.result['created_funds']} new fund(s) were created from this upload.")
+                elif job.status == JOB_FAILED:
+                    messages.error(request, f"Upload failed, nothing was imported. {job.error}")
+                else:
+                    messages.info(request, f"{file_names} queued for import as job #{job.pk}. Progress is shown under Background Jobs.")
+                return redirect('data_management:historical_data')
+
             # --- Simulation of Import Logic ---
-            # In a real app, this is where you'd call a parser function
-            # that routes data based on upload_type (e.g., to GLTransaction, FundTransaction tables)
+            # Remaining upload types are not wired to an importer yet
             
             # Simulate logging success
             UploadHistory.objects.create(
-                file_name=uploaded_file.name,
+                file_name=file_names[:255],
                 uploaded_by=request.user,
                 record_count=100, # Mock count
                 status=f'Success: Routed to {upload_type} table'
@@ -62,6 +118,7 @@ def historical_data_view(request):
         'recent_gl_transactions': recent_gl_transactions, 
         'recent_fund_transactions': recent_fund_transactions, 
         'upload_form': upload_form, # Pass the form to the template
+        'recent_jobs': recent_jobs,
     }
     return render(request, 'data_management/historical_data.html', context)
 
@@ -78,7 +135,8 @@ def download_excel_template(request, template_type):
                 'transaction_date (YYYY-MM-DD)', 'gl_account_code', 'description', 
                 'journal_type', 'document_no', 'reference_no', 'entity_code', 
                 'cost_center_code', 'project_code', 'currency_code', 
-                'exchange_rate', 'debit', 'credit'
+                'exchange_rate', 'debit', 'credit',
+                'reversal_flag (TRUE/FALSE)', 'reversal_ref_id'
             ]
         },
         'gl_accounts': {
@@ -87,7 +145,8 @@ def download_excel_template(request, template_type):
                 'gl_account_code', 'gl_account_name', 'category', 'sub_category',
                 'financial_statement (Income Statement/Balance Sheet/Cash Flow)', 
                 'account_type (Account/Header)', 'is_postable (TRUE/FALSE)', 
-                'parent_account_code', 'normal_balance (Credit/Debit)', 'active_flag (TRUE/FALSE)'
+                'parent_account_code', 'normal_balance (Credit/Debit)', 'active_flag (TRUE/FALSE)',
+                'cash_flow_category (CASH/OPERATING/NON_CASH/INVESTING/FINANCING)'
             ]
         },
         'date_table': {
@@ -268,120 +327,165 @@ def export_income_statement_excel(request):
     return response
 
 
+def _statement_from_request(request, engine):
+    """Filter form + statement engine output shared by a statement page and its exports."""
+    return statement_from_query(request.GET, engine)
+
+
+def _performance_card(totals, title, key, icon, color):
+    """Card comparing the latest column of a statement total with the column before it."""
+    current = totals[key][-1]
+    previous = totals[key][-2] if len(totals[key]) > 1 else None
+    change, trend = change_card(current, previous)
+    return {'title': title, 'value': compact_amount(current), 'change': change, 'trend': trend, 'icon': icon, 'color': color}
+
+
+def _drill_url(filter_form, drill_dates):
+    """Drill-through URL (without the account) for a statement's dates and dimension filters."""
+    start_date, end_date = drill_dates
+    query = active_filters(filter_form.cleaned_data) if filter_form.is_valid() else {}
+    if start_date:
+        query['start_date'] = start_date.isoformat()
+    if end_date:
+        query['end_date'] = end_date.isoformat()
+    return f"{reverse('data_management:drill_through')}?{urlencode(query)}"
+
+
+def _cached_statement(request, key, cards, description_width, mute_history):
+    """
+    Filter form + the statement fragment of a statement page for its GET parameters: reporting
+    period, period labels, performance cards (`cards(totals)`) and the rendered table. Served from
+    the fragment cache until the ledger changes (data_management.fragment_cache).
+    """
+    engine, _ = STATEMENTS[key]
+
+    def build():
+        filter_form, reporting_period, statement = _statement_from_request(request, engine)
+        return {
+            'reporting_period': reporting_period,
+            'period_labels': statement['period_labels'],
+            'performance_cards': cards(statement['totals']),
+            'table': render_to_string('data_management/statement_table.html', {
+                'period_labels': statement['period_labels'],
+                'financial_data': statement['rows'],
+                'description_width': description_width,
+                'mute_history': mute_history,
+                'drill_url': _drill_url(filter_form, statement['drill_dates']),
+            }),
+        }
+
+    statement = cached_fragment(
+        key, (LEDGER,), build, params=request.GET,
+        extra=(get_fiscal_config()['START_MONTH'], settings.BASE_CURRENCY),
+    )
+    return IncomeStatementFilterForm(request.GET), statement
+
+
+def _statement_export(request, key):
+    """
+    XLSX (default) or CSV (?format=csv) download of a statement with the page's filters.
+    ?background=1 queues the export as a background job instead (for long multi-period ranges).
+    """
+    engine, title = STATEMENTS[key]
+    export_format = request.GET.get('format') or 'xlsx'
+    if request.GET.get('background'):
+        query = request.GET.copy()
+        query.pop('background', None)
+        job = enqueue(
+            'export_statement',
+            {'statement': key, 'query': query.urlencode(), 'format': export_format},
+            user=request.user,
+            label=f"{title} export ({export_format.upper()})",
+        )
+        messages.info(request, f"{title} export queued as job #{job.pk}. Download it from Background Jobs when it has finished.")
+        return redirect('data_management:historical_data')
+
+    _, reporting_period, statement = statement_from_query(request.GET, engine)
+    content, content_type, extension = render_statement(statement, title, export_format)
+    response = HttpResponse(content, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename={export_filename(key, reporting_period, statement)}.{extension}'
+    return response
+
+
+def _balance_sheet_cards(totals):
+    current_ratio = [
+        assets / liabilities if liabilities else None
+        for assets, liabilities in zip(totals['current_assets'], totals['current_liabilities'])
+    ]
+    ratio_change = (
+        f"{current_ratio[-1] - current_ratio[-2]:+.1f}x"
+        if len(current_ratio) > 1 and current_ratio[-1] is not None and current_ratio[-2] is not None else 'n/a'
+    )
+    return [
+        _performance_card(totals, 'Total Assets', 'assets', 'fas fa-arrow-up', 'success'),
+        _performance_card(totals, 'Total Liabilities', 'liabilities', 'fas fa-arrow-down', 'danger'),
+        _performance_card(totals, 'Total Equity', 'equity', 'fas fa-chart-line', 'primary'),
+        {'title': 'Current Ratio', 'value': f"{current_ratio[-1]:.1f}x" if current_ratio[-1] is not None else 'n/a',
+         'change': ratio_change, 'trend': 'down' if ratio_change.startswith('-') else 'up',
+         'icon': 'fas fa-percentage', 'color': 'warning'},
+    ]
+
+
 @login_required
 def balance_sheet_view(request):
-    """Renders the Balance Sheet page with performance cards and financial data, respecting filters."""
+    """Renders the Balance Sheet from month-end balance snapshots, respecting filters."""
     
-    filter_form = IncomeStatementFilterForm(request.GET)
-    
-    # Balance Sheet uses an 'As At' period, often the end date
-    period_title = 'December 31, 2024'
-    previous_period_title = 'December 31, 2023'
+    filter_form, statement = _cached_statement(request, 'balance_sheet', _balance_sheet_cards, description_width=40, mute_history=True)
+    period_labels = statement['period_labels']
     applied_filters = {}
-    period_labels = ['Current Period', 'Previous Period']
     
-    # --- Simulate Filter Application (Only date changes report header) ---
     if filter_form.is_valid():
-        end_date = filter_form.cleaned_data.get('end_date')
-        if end_date:
-            period_title = end_date.strftime('%B %d, %Y')
-            previous_period_title = "Prior Year"
-        
         applied_filters = {
             filter_form.fields[k].label: v 
             for k, v in filter_form.cleaned_data.items() 
             if v not in (None, '', False)
         }
-
-    # Mock Performance Data
-    performance_cards = [
-        {'title': 'Total Assets', 'value': '₦2.5B', 'change': '+5.0%', 'trend': 'up', 'icon': 'fas fa-arrow-up', 'color': 'success'},
-        {'title': 'Total Liabilities', 'value': '₦1.1B', 'change': '-1.2%', 'trend': 'down', 'icon': 'fas fa-arrow-down', 'color': 'danger'},
-        {'title': 'Total Equity', 'value': '₦1.4B', 'change': '+10.5%', 'trend': 'up', 'icon': 'fas fa-chart-line', 'color': 'primary'},
-        {'title': 'Current Ratio', 'value': '2.1x', 'change': '-0.1x', 'trend': 'down', 'icon': 'fas fa-percentage', 'color': 'warning'},
-    ]
-    
-    # Mock Balance Sheet Data (Assets = Liabilities + Equity)
-    financial_data = [
-        {'description': 'ASSETS', 'current': 2500000000, 'previous': 2380000000, 'type': 'section_header', 'periods': {'Current Period': 2500000000, 'Previous Period': 2380000000}},
-        {'description': 'Non-Current Assets', 'current': 1500000000, 'previous': 1400000000, 'type': 'header', 'periods': {'Current Period': 1500000000, 'Previous Period': 1400000000}},
-        {'description': 'Property, Plant & Equipment', 'current': 1450000000, 'previous': 1350000000, 'type': 'account', 'periods': {'Current Period': 1450000000, 'Previous Period': 1350000000}},
-        {'description': 'Current Assets', 'current': 1000000000, 'previous': 980000000, 'type': 'header', 'periods': {'Current Period': 1000000000, 'Previous Period': 980000000}},
-        {'description': 'Cash & Bank Balances', 'current': 450000000, 'previous': 420000000, 'type': 'account', 'periods': {'Current Period': 450000000, 'Previous Period': 420000000}},
-        {'description': 'Trade Receivables', 'current': 550000000, 'previous': 560000000, 'type': 'account', 'periods': {'Current Period': 550000000, 'Previous Period': 560000000}},
-        {'description': 'TOTAL ASSETS', 'current': 2500000000, 'previous': 2380000000, 'type': 'major_total', 'periods': {'Current Period': 2500000000, 'Previous Period': 2380000000}},
-
-        {'description': 'LIABILITIES', 'current': 1100000000, 'previous': 1113000000, 'type': 'section_header', 'periods': {'Current Period': 1100000000, 'Previous Period': 1113000000}},
-        {'description': 'Current Liabilities', 'current': 550000000, 'previous': 560000000, 'type': 'header', 'periods': {'Current Period': 550000000, 'Previous Period': 560000000}},
-        {'description': 'Trade Payables', 'current': 300000000, 'previous': 310000000, 'type': 'account', 'periods': {'Current Period': 300000000, 'Previous Period': 310000000}},
-        {'description': 'Accrued Liabilities', 'current': 250000000, 'previous': 250000000, 'type': 'account', 'periods': {'Current Period': 250000000, 'Previous Period': 250000000}},
-        {'description': 'Non-Current Liabilities', 'current': 550000000, 'previous': 553000000, 'type': 'header', 'periods': {'Current Period': 550000000, 'Previous Period': 553000000}},
-        {'description': 'Long-Term Borrowings', 'current': 550000000, 'previous': 553000000, 'type': 'account', 'periods': {'Current Period': 550000000, 'Previous Period': 553000000}},
-        {'description': 'TOTAL LIABILITIES', 'current': 1100000000, 'previous': 1113000000, 'type': 'subtotal', 'periods': {'Current Period': 1100000000, 'Previous Period': 1113000000}},
-
-        {'description': 'EQUITY', 'current': 1400000000, 'previous': 1267000000, 'type': 'section_header', 'periods': {'Current Period': 1400000000, 'Previous Period': 1267000000}},
-        {'description': 'Share Capital', 'current': 800000000, 'previous': 800000000, 'type': 'account', 'periods': {'Current Period': 800000000, 'Previous Period': 800000000}},
-        {'description': 'Retained Earnings', 'current': 600000000, 'previous': 467000000, 'type': 'account', 'periods': {'Current Period': 600000000, 'Previous Period': 467000000}},
-        {'description': 'TOTAL EQUITY', 'current': 1400000000, 'previous': 1267000000, 'type': 'subtotal', 'periods': {'Current Period': 1400000000, 'Previous Period': 1267000000}},
-        
-        {'description': 'TOTAL LIABILITIES & EQUITY', 'current': 2500000000, 'previous': 2380000000, 'type': 'major_total', 'periods': {'Current Period': 2500000000, 'Previous Period': 2380000000}},
-    ]
     
     context = {
         'filter_form': filter_form,
         'applied_filters': applied_filters,
-        'performance_cards': performance_cards,
-        'financial_data': financial_data,
+        'performance_cards': statement['performance_cards'],
+        'statement_table': mark_safe(statement['table']),
         'period_labels': period_labels, # Pass dynamic labels for B.S.
-        'period': period_title,
+        'period': period_labels[-1],
+        'previous_period': period_labels[-2] if len(period_labels) > 1 else '',
         'report_type': 'Balance Sheet',
         'period_prefix': 'As At:',
+        'export_query': request.GET.urlencode(),
     }
     return render(request, 'data_management/balance_sheet.html', context)
 
 
 @login_required
 def export_balance_sheet_excel(request):
-    # ... (remains unchanged) ...
-    # ... (omitted for brevity) ...
+    """Exports the Balance Sheet with the same filters as the page (?format=csv, ?background=1)."""
+    return _statement_export(request, 'balance_sheet')
 
-    # Prepare in-memory file
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
 
-    # Create HTTP response
-    response = HttpResponse(
-        output.read(),
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = 'attachment; filename=Balance_Sheet_FY2024.xlsx'
-    
-    return response
+# --- NEW Cash Flow Views ---
 
+def _cash_flow_cards(totals):
+    # Latest period against the one before it
+    return [
+        _performance_card(totals, 'Net Operating Cash', 'operating', 'fas fa-briefcase', 'success'),
+        _performance_card(totals, 'Cash from Investing', 'investing', 'fas fa-chart-line', 'primary'),
+        _performance_card(totals, 'Net Change in Cash', 'net_change', 'fas fa-balance-scale', 'info'),
+        _performance_card(totals, 'Ending Cash Balance', 'closing_cash', 'fas fa-university', 'warning'),
+    ]
 
-# --- NEW Cash Flow Views ---
 
 @login_required
 def cash_flow_view(request):
-    """Renders the Cash Flow Statement page with performance cards and financial data, respecting filters."""
-    
-    filter_form = IncomeStatementFilterForm(request.GET)
+    """Renders the Cash Flow Statement (indirect method) from the monthly GL rollup, respecting filters."""
     
-    period_title = 'FY 2024'
+    filter_form, statement = _cached_statement(request, 'cash_flow', _cash_flow_cards, description_width=30, mute_history=False)
+    reporting_period = statement['reporting_period']
+    period_labels = statement['period_labels']
+    period_title = period_labels[-1] if reporting_period == 'annual' else f"{period_labels[0]} to {period_labels[-1]}"
     period_prefix = 'For the Period Ended:'
     applied_filters = {}
-    reporting_period = filter_form.data.get('reporting_period', 'annual') # Get the chosen period
     
-    # --- Simulate Filter Application ---
     if filter_form.is_valid():
-        start_date = filter_form.cleaned_data.get('start_date')
-        end_date = filter_form.cleaned_data.get('end_date')
-        reporting_period = filter_form.cleaned_data.get('reporting_period') or 'annual'
-        
-        if start_date and end_date and reporting_period == 'annual':
-            period_title = f"{start_date.strftime('%b %d, %Y')} to {end_date.strftime('%b %d, %Y')}"
-            
         applied_filters = {
             filter_form.fields[k].label: v 
             for k, v in filter_form.cleaned_data.items() 
@@ -391,129 +495,140 @@ def cash_flow_view(request):
         if reporting_period != 'annual':
              applied_filters['Period Type'] = dict(filter_form.fields['reporting_period'].choices).get(reporting_period)
 
-
-    # Mock Performance Data
-    performance_cards = [
-        {'title': 'Net Operating Cash', 'value': '₦730M', 'change': '+15%', 'trend': 'up', 'icon': 'fas fa-briefcase', 'color': 'success'},
-        {'title': 'Cash from Investing', 'value': '-₦120M', 'change': '+5%', 'trend': 'up', 'icon': 'fas fa-chart-line', 'color': 'primary'},
-        {'title': 'Net Change in Cash', 'value': '₦680M', 'change': '+20%', 'trend': 'up', 'icon': 'fas fa-balance-scale', 'color': 'info'},
-        {'title': 'Ending Cash Balance', 'value': '₦1.1B', 'change': '+18%', 'trend': 'up', 'icon': 'fas fa-university', 'color': 'warning'},
-    ]
-    
-    # Generate headers and adapt data for time series
-    period_labels = generate_mock_periods(reporting_period)
-    
-    # Mock Data adapted for multi-period display
-    data_template = [
-        {'description': 'CASH FLOW FROM OPERATING ACTIVITIES', 'data': [730000000, 635000000], 'type': 'section_header'},
-        {'description': 'Cash received from customers', 'data': [1400000000, 1250000000], 'type': 'account'},
-        {'description': 'Cash paid to suppliers and employees', 'data': [-670000000, -615000000], 'type': 'account'},
-        {'description': 'NET CASH FROM OPERATING ACTIVITIES', 'data': [730000000, 635000000], 'type': 'subtotal'},
-        
-        {'description': 'CASH FLOW FROM INVESTING ACTIVITIES', 'data': [-120000000, -114000000], 'type': 'section_header'},
-        {'description': 'Purchase of Property, Plant & Equipment', 'data': [-150000000, -140000000], 'type': 'account'},
-        {'description': 'NET CASH USED IN INVESTING ACTIVITIES', 'data': [-120000000, -114000000], 'type': 'subtotal'},
-        
-        {'description': 'NET INCREASE IN CASH AND CASH EQUIVALENTS', 'data': [680000000, 576000000], 'type': 'major_total'},
-        {'description': 'CASH AND CASH EQUIVALENTS AT END OF PERIOD', 'data': [1100000000, 956000000], 'type': 'major_total'},
-    ]
-    
-    financial_data = []
-
-    for item in data_template:
-        new_item = {'description': item['description'], 'type': item['type'], 'periods': {}}
-        
-        if reporting_period != 'annual':
-            # Simulate split for monthly/quarterly/half-yearly
-            num_periods = len(period_labels)
-            current_base = item['data'][0] / num_periods if num_periods > 0 else 0
-            
-            for i, label in enumerate(period_labels):
-                # Mock small variance across periods
-                new_item['periods'][label] = current_base + (i * 1000000) 
-        else:
-            # Standard annual structure
-            new_item['periods']['Current Period'] = item['data'][0]
-            new_item['periods']['Previous Period'] = item['data'][1]
-            
-        financial_data.append(new_item)
-
-
     context = {
         'filter_form': filter_form,
         'applied_filters': applied_filters,
-        'performance_cards': performance_cards,
-        'financial_data': financial_data,
+        'performance_cards': statement['performance_cards'],
+        'statement_table': mark_safe(statement['table']),
         'period_labels': period_labels, # Pass dynamic labels
         'period': period_title,
         'report_type': 'Cash Flow Statement',
         'period_prefix': period_prefix,
+        'export_query': request.GET.urlencode(),
     }
     return render(request, 'data_management/cash_flow.html', context)
 
 
 @login_required
 def export_cash_flow_excel(request):
-    """Exports the mock Cash Flow data to an Excel file."""
-    
-    # Retrieve reporting period filter (default to annual)
-    reporting_period = request.GET.get('reporting_period', 'annual')
-    period_labels = generate_mock_periods(reporting_period)
-    
-    # Mock Data (Direct Method Simulation)
-    financial_data_raw = [
-        # Same structure as data_template in cash_flow_view
-        {'description': 'CASH FLOW FROM OPERATING ACTIVITIES', 'data': [730000000, 635000000], 'type': 'section_header'},
-        {'description': 'Cash received from customers', 'data': [1400000000, 1250000000], 'type': 'account'},
-        {'description': 'Cash paid to suppliers and employees', 'data': [-670000000, -615000000], 'type': 'account'},
-        {'description': 'NET CASH FROM OPERATING ACTIVITIES', 'data': [730000000, 635000000], 'type': 'subtotal'},
-        
-        {'description': 'CASH FLOW FROM INVESTING ACTIVITIES', 'data': [-120000000, -114000000], 'type': 'section_header'},
-        {'description': 'Purchase of Property, Plant & Equipment', 'data': [-150000000, -140000000], 'type': 'account'},
-        {'description': 'NET CASH USED IN INVESTING ACTIVITIES', 'data': [-120000000, -114000000], 'type': 'subtotal'},
-        
-        {'description': 'NET INCREASE IN CASH AND CASH EQUIVALENTS', 'data': [680000000, 576000000], 'type': 'major_total'},
-        {'description': 'CASH AND CASH EQUIVALENTS AT END OF PERIOD', 'data': [1100000000, 956000000], 'type': 'major_total'},
-    ]
+    """Exports the Cash Flow Statement with the same filters as the page (?format=csv, ?background=1)."""
+    return _statement_export(request, 'cash_flow')
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Cash Flow Statement FY2024"
-    
-    # Dynamic Headers
-    headers = ['Description'] + period_labels
-    ws.append(headers)
 
-    # Populate Data Rows (using the same mock logic as the view)
-    for item in financial_data_raw:
-        row = [item['description']]
-        
-        if reporting_period != 'annual':
-            num_periods = len(period_labels)
-            current_base = item['data'][0] / num_periods if num_periods > 0 else 0
-            
-            for i, label in enumerate(period_labels):
-                row.append(current_base + (i * 1000000))
-        else:
-            row.append(item['data'][0])
-            row.append(item['data'][1])
-            
-        ws.append(row)
+@login_required
+def consolidation_view(request):
+    """
+    Consolidation worksheet for a close period: each entity's income statement (fiscal year to
+    date) and balance sheet, the intercompany eliminations and the consolidated figures.
+    """
+    form = ConsolidationForm(request.GET or None)
+    latest = latest_ledger_month()
+    close_month, months = latest, 12
+    if form.is_valid():
+        close_month = month_start(form.cleaned_data['period'] or latest)
+        months = form.cleaned_data['months'] or 12
+    elif form.is_bound:
+        messages.error(request, "Invalid close period; showing the latest ledger month.")
+    if close_month > latest:
+        messages.warning(request, f"The ledger has no data after {latest:%b %Y}; showing that month instead.")
+        close_month = latest
+    months = min(months, get_consolidation_config()['MAX_MONTHS'])
+
+    # Computed once per close period and window until the ledger or the intercompany pairs change
+    result = cached_consolidation(close_month, months)
+    worksheet = consolidation_worksheet(result, close_month, get_fiscal_config()['START_MONTH'])
+    totals = worksheet['totals']
+
+    def table(rows):
+        return mark_safe(render_to_string('data_management/statement_table.html', {
+            'period_labels': worksheet['column_labels'],
+            'financial_data': rows,
+            'description_width': 25,
+            'mute_history': False,
+        }))
 
+    performance_cards = [
+        {'title': 'Entities', 'value': len(result['entities']), 'note': f"{result['seconds']:.2f}s to consolidate", 'icon': 'fas fa-sitemap', 'color': 'secondary'},
+        {'title': 'Consolidated Net Profit (YTD)', 'value': compact_amount(totals['net_profit'][-1]), 'note': f"Revenue {compact_amount(totals['revenue'][-1])}", 'icon': 'fas fa-chart-line', 'color': 'primary'},
+        {'title': 'Consolidated Total Assets', 'value': compact_amount(totals['assets'][-1]), 'note': f"As at {close_month:%b %Y}", 'icon': 'fas fa-balance-scale', 'color': 'info'},
+        {'title': 'Intercompany Eliminated', 'value': compact_amount(totals['eliminated_balances']), 'note': f"Transactions YTD {compact_amount(totals['eliminated_transactions'])}", 'icon': 'fas fa-exchange-alt', 'color': 'warning'},
+    ]
+    context = {
+        'form': form,
+        'report_type': 'Consolidation',
+        'period': f"{close_month:%b %Y}",
+        'ytd_period': f"{worksheet['ytd_first_month']:%b %Y} - {close_month:%b %Y}",
+        'performance_cards': performance_cards,
+        'income_statement_table': table(worksheet['income_statement']),
+        'balance_sheet_table': table(worksheet['balance_sheet']),
+        'differences': worksheet['differences'],
+    }
+    return render(request, 'data_management/consolidation.html', context)
 
-    # Prepare in-memory file
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
 
-    # Create HTTP response
-    response = HttpResponse(
-        output.read(),
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = f'attachment; filename=Cash_Flow_Statement_{reporting_period.capitalize()}.xlsx'
-    
-    return response
+@login_required
+def drill_through_view(request):
+    """
+    The net GL lines behind a statement line: account subtree, dates and dimension filters, paged
+    with keyset cursors (?after= / ?before=). ?format=csv streams the whole selection and
+    ?format=json returns one page.
+    """
+    form = DrillThroughForm(request.GET or None)
+    selection = {}
+    if form.is_valid():
+        account = form.cleaned_data['account']
+        selection = {
+            'account': account.gl_account_code if account else None,
+            'date_from': form.cleaned_data['start_date'],
+            'date_to': form.cleaned_data['end_date'],
+            'filters': active_filters(form.cleaned_data),
+        }
+    elif form.is_bound:
+        messages.error(request, "Invalid drill-through selection; showing all lines.")
+    lines = drill_through_lines(**selection)
+
+    export_format = request.GET.get('format')
+    if export_format == 'csv':
+        return drill_through_csv(lines, f"GL_Lines_{selection.get('account') or 'All'}")
+
+    try:
+        size = int(request.GET.get('size') or PAGE_SIZE)
+        page = keyset_page(lines, after=request.GET.get('after'), before=request.GET.get('before'), size=size)
+    except ValueError:
+        if export_format == 'json':
+            return JsonResponse({'error': 'Invalid page cursor or size.'}, status=400)
+        messages.error(request, "Invalid page cursor; showing the first page.")
+        page = keyset_page(lines)
+
+    if export_format == 'json':
+        return JsonResponse({
+            'lines': [dict(zip(DRILL_FIELDS, line_values(line))) for line in page['lines']],
+            'next': page['next'],
+            'previous': page['previous'],
+        })
+
+    # Cursor links keep the selection and drop the current cursor
+    query = request.GET.copy()
+    for key in ('after', 'before', 'format'):
+        query.pop(key, None)
+    base_query = query.urlencode()
+    context = {
+        'form': form,
+        'report_type': 'GL Drill-Through',
+        # (value, is amount) per cell
+        'rows': [
+            [(value, field in DRILL_AMOUNT_FIELDS) for field, value in zip(DRILL_FIELDS, line_values(line))]
+            for line in page['lines']
+        ],
+        'columns': [(header, field in DRILL_AMOUNT_FIELDS) for field, header in DRILL_COLUMNS],
+        'next_query': f"{base_query}&after={page['next']}" if page['next'] else None,
+        'previous_query': f"{base_query}&before={page['previous']}" if page['previous'] else None,
+        'first_query': base_query,
+        'csv_query': f"{base_query}&format=csv",
+        'selection': selection,
+    }
+    return render(request, 'data_management/drill_through.html', context)
+
 
 # Mock data structure to simulate CSV content
 MOCK_MANAGED_FUND_DATA = {
@@ -565,21 +680,21 @@ def managed_fund_view(request):
         {'title': 'Avg Quarterly Return', 'value': '1.5%', 'change': '-0.1%', 'trend': 'down', 'icon': 'fas fa-percentage', 'color': 'warning'},
     ]
     
-    # Adapt mock data for table display
+    # Adapt mock data for table display (values aligned to period_labels)
     financial_data = []
     
     for fund_name, metrics in MOCK_MANAGED_FUND_DATA.items():
         # AUM Closing Balance
         financial_data.append({
             'description': f"AUM Closing Balance - {fund_name}",
-            'periods': {period: metrics['AUM Closing Balance'] + (i * 1000) for i, period in enumerate(period_labels)},
+            'values': [metrics['AUM Closing Balance'] + (i * 1000) for i in range(len(period_labels))],
             'type': 'account',
             'is_major': False
         })
         # Contribution
         financial_data.append({
             'description': f"Contribution - {fund_name}",
-            'periods': {period: metrics['Contribution'] + (i * 100) for i, period in enumerate(period_labels)},
+            'values': [metrics['Contribution'] + (i * 100) for i in range(len(period_labels))],
             'type': 'account',
             'is_major': False
         })
@@ -609,35 +724,35 @@ def rsa_fund_view(request):
         {'title': 'Avg Contrib. (New)', 'value': '₦550', 'change': '-10%', 'trend': 'down', 'icon': 'fas fa-arrow-down', 'color': 'danger'},
     ]
     
-    # Adapt mock data for table display
+    # Adapt mock data for table display (values aligned to period_labels)
     financial_data = []
     
     for fund_name, metrics in MOCK_RSA_FUND_DATA.items():
         # AUM
         financial_data.append({
             'description': f"AUM Closing Balance - {fund_name}",
-            'periods': {period: metrics['AUM Closing Balance'] + (i * 500000) for i, period in enumerate(period_labels)},
+            'values': [metrics['AUM Closing Balance'] + (i * 500000) for i in range(len(period_labels))],
             'type': 'header',
             'is_major': False
         })
         # Total PINs
         financial_data.append({
             'description': f"Total PINs - {fund_name}",
-            'periods': {period: metrics['Total PINs'] + (i * 100) for i, period in enumerate(period_labels)},
+            'values': [metrics['Total PINs'] + (i * 100) for i in range(len(period_labels))],
             'type': 'account',
             'is_major': False
         })
         # Active PINs
         financial_data.append({
             'description': f"Active PINs - {fund_name}",
-            'periods': {period: metrics['Active PINs'] + (i * 50) for i, period in enumerate(period_labels)},
+            'values': [metrics['Active PINs'] + (i * 50) for i in range(len(period_labels))],
             'type': 'account',
             'is_major': False
         })
         # Avg Contribution
         financial_data.append({
             'description': f"Avg Contribution (New) - {fund_name}",
-            'periods': {period: metrics['Avg Contribution (New)'] + (i * 5) for i, period in enumerate(period_labels)},
+            'values': [metrics['Avg Contribution (New)'] + (i * 5) for i in range(len(period_labels))],
             'type': 'account',
             'is_major': False
         })
@@ -650,4 +765,79 @@ def rsa_fund_view(request):
         'report_type': 'RSA Fund Historical Data',
         'period_prefix': 'Quarterly Breakdown:',
     }
-    return render(request, 'data_management/rsa_fund_report.html', context)
\ No newline at end of file
+    return render(request, 'data_management/rsa_fund_report.html', context)
+
+# --- Background jobs ---
+
+def _user_job(request, job_id):
+    """A job of the current user (any job for staff)."""
+    jobs = BackgroundJob.objects.all() if request.user.is_staff else BackgroundJob.objects.filter(created_by=request.user)
+    return get_object_or_404(jobs, pk=job_id)
+
+
+@login_required
+def job_status_view(request, job_id):
+    """Status-polling endpoint: the job's status and progress as JSON."""
+    return JsonResponse(_user_job(request, job_id).as_dict())
+
+
+@login_required
+@require_POST
+def job_cancel_view(request, job_id):
+    """Cancels a queued job, or asks a running one to stop at its next progress report."""
+    job = _user_job(request, job_id)
+    cancel_job(job)
+    job.refresh_from_db()
+    return JsonResponse(job.as_dict())
+
+
+@login_required
+def job_download_view(request, job_id):
+    """Downloads the file produced by a finished export job."""
+    job = _user_job(request, job_id)
+    if job.status != JOB_SUCCEEDED or not (job.result or {}).get('path'):
+        raise Http404("This job has no file to download.")
+    return FileResponse(
+        default_storage.open(job.result['path'], 'rb'),
+        as_attachment=True,
+        filename=job.result['filename'],
+        content_type=job.result.get('content_type'),
+    )
+
+
+@login_required
+@require_POST
+def upload_rollback_view(request, upload_id):
+    """Queues the removal of every line imported by one upload (the uploader's own, any for staff)."""
+    uploads = UploadHistory.objects.all() if request.user.is_staff else UploadHistory.objects.filter(uploaded_by=request.user)
+    upload = get_object_or_404(uploads, pk=upload_id)
+    if not can_roll_back(upload):
+        messages.error(request, f"{upload.file_name} cannot be rolled back (status: {upload.status}).")
+        return redirect('data_management:historical_data')
+
+    job = enqueue('rollback_upload', {'upload_id': upload.pk}, user=request.user, label=f"Roll back {upload.file_name}")
+    if job.status == JOB_SUCCEEDED:
+        messages.success(
+            request,
+            f"{upload.file_name} rolled back: {job.result['gl_count']} GL and {job.result['fund_count']} fund lines removed."
+        )
+    elif job.status == JOB_FAILED:
+        messages.error(request, f"Rollback failed, nothing was removed. {job.error}")
+    else:
+        messages.info(request, f"Rollback of {upload.file_name} queued as job #{job.pk}.")
+    return redirect('data_management:historical_data')
+
+
+@login_required
+def fragment_cache_stats_view(request):
+    """Staff only: this process's report fragment cache (hits, misses, build times) and the data versions, as JSON."""
+    if not request.user.is_staff:
+        raise PermissionDenied
+    return JsonResponse({
+        'pid': os.getpid(),
+        'fragments': fragment_cache_stats(),
+        'data_versions': [
+            {'source': version.source, 'version': version.version, 'updated_at': version.updated_at.isoformat()}
+            for version in DataVersion.objects.all()
+        ],
+    })
@@ -0,0 +1,30 @@
+"""
+Entry points for the process pools of run_workers and data_management.consolidation. The pools use
+the 'spawn' start method, so each worker is a fresh interpreter with its own database connection;
+this module must therefore be importable before Django is set up (no model imports at module level).
+"""
+
+
+def init_worker():
+    import django
+    django.setup()
+
+
+def run(job_id):
+    from django.db import close_old_connections
+    from .jobs import run_job
+    close_old_connections()
+    try:
+        return run_job(job_id)
+    finally:
+        close_old_connections()
+
+
+def consolidate_entity(entity, first_month, last_month):
+    from django.db import close_old_connections
+    from .consolidation import entity_balances
+    close_old_connections()
+    try:
+        return entity_balances(entity, first_month, last_month)
+    finally:
+        close_old_connections()
@@ -1,3 +1,72 @@
 from django.contrib import admin
+from .models import AUMForecastRun, AUMForecast, PINModelRun, PINActivityProjection, BudgetRiskScore, ModelArtifact
 
-# Register your models here.
+
+@admin.register(AUMForecastRun)
+class AUMForecastRunAdmin(admin.ModelAdmin):
+    list_display = ('id', 'created_at', 'status', 'fund_count', 'skipped_count', 'horizon_months', 'duration_seconds')
+    list_filter = ('status',)
+    readonly_fields = ('created_at', 'finished_at', 'duration_seconds')
+
+
+@admin.register(AUMForecast)
+class AUMForecastAdmin(admin.ModelAdmin):
+    # Written by the forecaster, never edited by hand
+    list_display = ('fund_name', 'fund_type', 'run', 'model', 'backtest_error', 'last_period', 'last_actual')
+    list_filter = ('fund_type', 'model')
+    search_fields = ('fund_name',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(PINModelRun)
+class PINModelRunAdmin(admin.ModelAdmin):
+    list_display = ('id', 'created_at', 'status', 'fund_count', 'skipped_count', 'horizon_periods', 'duration_seconds')
+    list_filter = ('status',)
+    readonly_fields = ('created_at', 'finished_at', 'duration_seconds')
+
+
+@admin.register(PINActivityProjection)
+class PINActivityProjectionAdmin(admin.ModelAdmin):
+    # Written by the PIN model, never edited by hand
+    list_display = ('rsa_fund', 'run', 'activation_rate', 'deactivation_rate', 'reactivation_rate', 'churn_rate', 'fit_error')
+    search_fields = ('rsa_fund__name',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(BudgetRiskScore)
+class BudgetRiskScoreAdmin(admin.ModelAdmin):
+    # Written by the risk scorer, never edited by hand
+    list_display = ('transaction', 'risk', 'top_factor', 'department_rejection_rate', 'department_variance', 'scored_at')
+    list_filter = ('top_factor',)
+    list_select_related = ('transaction__department', 'transaction__gl_account')
+    search_fields = ('transaction__description', 'transaction__department__name')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ModelArtifact)
+class ModelArtifactAdmin(admin.ModelAdmin):
+    # Versions are registered by training runs and switched with `manage.py model_artifacts --activate`
+    list_display = ('name', 'version', 'is_active', 'size_bytes', 'created_at', 'created_by')
+    list_filter = ('name', 'is_active')
+    readonly_fields = ('checksum', 'files', 'size_bytes', 'metadata', 'created_at', 'created_by')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class PredictiveAnalyticsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'predictive_analytics'
-    verbose_name = 'Predictive Analytics'
\ No newline at end of file
+    verbose_name = 'Predictive Analytics'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,234 @@
+"""
+Versioned model artifacts for the predictive views.
+
+A fitted model is saved as a set of named numpy arrays: one .npy file each under
+MODEL_ARTIFACTS['ROOT']/<name>/v<version>/, with a ModelArtifact row holding the version, the
+SHA-256 of the files, the array names and the model's JSON metadata. Exactly one version per name
+is active; save_artifact() activates the new version and activate_artifact() switches back, so a
+model is swapped without restarting anything.
+
+load_artifact() keeps the active version of each name per process. Arrays are memory-mapped
+(np.load mmap_mode='r') on first access, so a request only pages in what it reads and every
+worker process shares the same page cache. The active version is re-checked in the database at
+most every CHECK_INTERVAL seconds; when it changed, the next call maps the new version. Cold
+starts (checksum check, mapping) are timed and logged, and cache_stats() reports them with the
+hit counts for the artifact stats endpoint.
+"""
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import ModelArtifact
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_ARTIFACTS = {
+    'ROOT': None,  # default: BASE_DIR/var/model_artifacts
+    'KEEP_VERSIONS': 5,
+    'VERIFY_ON_LOAD': True,
+    'CHECK_INTERVAL': 5,
+}
+
+_lock = threading.Lock()
+# name: {'artifact': LoadedArtifact or None, 'checked': time.monotonic() of the last version check}
+_cache = {}
+# name: counters and cold-start timings of this process
+_stats = {}
+
+
+def get_artifacts_config():
+    config = dict(DEFAULT_MODEL_ARTIFACTS)
+    config.update(getattr(settings, 'MODEL_ARTIFACTS', {}))
+    if not config['ROOT']:
+        config['ROOT'] = os.path.join(settings.BASE_DIR, 'var', 'model_artifacts')
+    return config
+
+
+def artifact_directory(name, version):
+    return os.path.join(get_artifacts_config()['ROOT'], name, f'v{version}')
+
+
+def _digest(directory, files):
+    sha256 = hashlib.sha256()
+    for key in sorted(files):
+        sha256.update(key.encode())
+        with open(os.path.join(directory, f'{key}.npy'), 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def verify_artifact(record):
+    """True when the files of the ModelArtifact `record` still match its checksum."""
+    try:
+        return _digest(artifact_directory(record.name, record.version), record.files) == record.checksum
+    except FileNotFoundError:
+        return False
+
+
+# --- Registering versions ---
+
+def save_artifact(name, arrays, metadata=None, user=None):
+    """
+    Stores `arrays` ({key: ndarray}) as the next version of `name`, makes it the active version
+    and prunes old inactive versions beyond KEEP_VERSIONS. Returns the ModelArtifact.
+    """
+    config = get_artifacts_config()
+    if not arrays or not all(key.isidentifier() for key in arrays):
+        raise ValueError("Artifact arrays need names that are valid identifiers.")
+    os.makedirs(os.path.join(config['ROOT'], name), exist_ok=True)
+    # Written next to the final directory, then renamed into place once the version is known
+    staging = tempfile.mkdtemp(prefix='.staging-', dir=os.path.join(config['ROOT'], name))
+    directory = None
+    try:
+        for key, array in arrays.items():
+            np.save(os.path.join(staging, f'{key}.npy'), np.asarray(array), allow_pickle=False)
+        files = sorted(arrays)
+        checksum = _digest(staging, files)
+        size = sum(os.path.getsize(os.path.join(staging, f'{key}.npy')) for key in files)
+
+        with transaction.atomic():
+            versions = list(ModelArtifact.objects.select_for_update().filter(name=name).values_list('version', flat=True))
+            version = max(versions, default=0) + 1
+            directory = artifact_directory(name, version)
+            os.replace(staging, directory)
+            ModelArtifact.objects.filter(name=name, is_active=True).update(is_active=False)
+            record = ModelArtifact.objects.create(
+                name=name, version=version, is_active=True, checksum=checksum, files=files,
+                size_bytes=size, metadata=metadata or {},
+                created_by=user if user is not None and user.is_authenticated else None,
+            )
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        if directory:
+            shutil.rmtree(directory, ignore_errors=True)
+        raise
+
+    _forget(name)
+    prune_artifacts(name, config['KEEP_VERSIONS'])
+    return record
+
+
+def activate_artifact(name, version):
+    """Makes `version` the active version of `name` (other processes follow within CHECK_INTERVAL)."""
+    with transaction.atomic():
+        record = ModelArtifact.objects.select_for_update().get(name=name, version=version)
+        ModelArtifact.objects.filter(name=name, is_active=True).exclude(pk=record.pk).update(is_active=False)
+        if not record.is_active:
+            record.is_active = True
+            record.save(update_fields=['is_active'])
+    _forget(name)
+    return record
+
+
+def prune_artifacts(name, keep):
+    """Deletes the inactive versions of `name` older than the newest `keep`, files included."""
+    stale = list(ModelArtifact.objects.filter(name=name, is_active=False).order_by('-version')[keep:])
+    for record in stale:
+        shutil.rmtree(artifact_directory(name, record.version), ignore_errors=True)
+    ModelArtifact.objects.filter(pk__in=[record.pk for record in stale]).delete()
+    return len(stale)
+
+
+# --- Per-process cache ---
+
+class LoadedArtifact:
+    """One version of an artifact in this process. artifact[key] memory-maps the array on first access."""
+
+    def __init__(self, record):
+        self.name = record.name
+        self.version = record.version
+        self.checksum = record.checksum
+        self.metadata = record.metadata
+        self.files = tuple(record.files)
+        self.directory = artifact_directory(record.name, record.version)
+        self._arrays = {}
+
+    def __getitem__(self, key):
+        array = self._arrays.get(key)
+        if array is None:
+            if key not in self.files:
+                raise KeyError(key)
+            started = time.perf_counter()
+            array = np.load(os.path.join(self.directory, f'{key}.npy'), mmap_mode='r', allow_pickle=False)
+            self._arrays[key] = array
+            with _lock:
+                stats = _stats.get(self.name)
+                if stats is not None and stats['version'] == self.version:
+                    stats['map_seconds'] += time.perf_counter() - started
+                    stats['mapped_bytes'] += array.nbytes
+        return array
+
+    def __contains__(self, key):
+        return key in self.files
+
+
+def _forget(name):
+    with _lock:
+        _cache.pop(name, None)
+
+
+def load_artifact(name):
+    """
+    The active version of `name` as a LoadedArtifact, or None when none is registered.
+    Raises ValueError when the files no longer match the registered checksum (VERIFY_ON_LOAD).
+    """
+    config = get_artifacts_config()
+    now = time.monotonic()
+    with _lock:
+        entry = _cache.get(name)
+        if entry is not None and now - entry['checked'] < config['CHECK_INTERVAL']:
+            _count_hit(name)
+            return entry['artifact']
+
+    record = ModelArtifact.objects.filter(name=name, is_active=True).first()
+    with _lock:
+        entry = _cache.get(name)
+        current = entry['artifact'] if entry is not None else None
+        if current is not None and record is not None and (current.version, current.checksum) == (record.version, record.checksum):
+            entry['checked'] = now
+            _count_hit(name)
+            return current
+    if record is None:
+        with _lock:
+            _cache[name] = {'artifact': None, 'checked': now}
+        return None
+
+    # Cold start: a version this process has not used yet
+    started = time.perf_counter()
+    if config['VERIFY_ON_LOAD'] and not verify_artifact(record):
+        raise ValueError(f"Model artifact {name} v{record.version} does not match its checksum; retrain or activate another version.")
+    verify_seconds = time.perf_counter() - started
+    artifact = LoadedArtifact(record)
+    with _lock:
+        previous = _stats.get(name, {})
+        _stats[name] = {
+            'version': record.version,
+            'loaded_at': timezone.now().isoformat(),
+            'loads': previous.get('loads', 0) + 1,
+            'hits': 0,
+            'verify_seconds': verify_seconds,
+            'map_seconds': 0.0,
+            'mapped_bytes': 0,
+        }
+        _cache[name] = {'artifact': artifact, 'checked': now}
+    logger.info("Loaded model artifact %s v%s (checksum check %.1f ms)", name, record.version, verify_seconds * 1000)
+    return artifact
+
+
+def _count_hit(name):
+    if name in _stats:
+        _stats[name]['hits'] += 1
+
+
+def cache_stats():
+    """This process's artifacts: version in use, loads (cold starts), cache hits and timings."""
+    with _lock:
+        return {name: dict(stats) for name, stats in _stats.items()}
@@ -0,0 +1,430 @@
+"""
+Rework-risk scoring of pending budget lines for the Performance & Budget Management page.
+
+Each BudgetTransaction awaiting approval gets the probability that it is rejected (sent back for
+rework), from a logistic regression over:
+
+    department / submitter / GL account rejection rate   share of their decided lines rejected,
+                                                         shrunk towards the overall rate
+    department variance                                  budget-weighted mean |actual - budget| / budget
+                                                         of the accounts and years the department budgeted
+    log amount, amount vs history                        size of the line, and against the department's
+                                                         average approved line on the same account
+    capex, no justification                              0/1 flags
+
+Every feature comes from a handful of GROUP BY queries (outcome counts, approved budget per
+department x account x year, GL actuals per account x year from GLMonthlyBalance); the lines are
+then joined to them with np.searchsorted, so scoring the whole queue is one vectorised pass.
+
+A training line must not see its own outcome. Leaving it out of its group's rate is not enough:
+within a group every rejected line would then get a lower rate than every approved one, and the
+model learns the label backwards. Training lines instead take their rejection rates and approved
+history from the lines submitted before them (an expanding window in submission order), which
+is also what a pending line sees when it is scored.
+
+The model is trained offline on every approved or rejected line (train_model, scheduled nightly
+with `manage.py train_budget_risk`) and registered as a version of the 'budget_risk' model
+artifact (predictive_analytics.artifacts); scoring only reads the active version. New or edited
+pending lines are scored one at a time by the 'score_budget_risk' job queued from
+predictive_analytics.signals.
+"""
+import time
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import ExtractYear
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from budget_input.models import BudgetTransaction
+from data_management.models import GLMonthlyBalance
+from .artifacts import load_artifact, save_artifact
+from .models import BudgetRiskScore
+
+DEFAULT_BUDGET_RISK = {
+    'PRIOR_LINES': 10,
+    'L2': 1.0,
+    'ITERATIONS': 25,
+    'MIN_TRAINING_LINES': 30,
+    'HIGH_RISK': 0.5,
+}
+
+# BudgetTransaction.status is free text: the submission forms write 'Pending Approval', the
+# approval workflow the APPROVAL_STATUS_CHOICES codes
+PENDING_STATUSES = ('Pending Approval', 'PENDING')
+APPROVED_STATUSES = ('Approved', 'APPROVED')
+REJECTED_STATUSES = ('Rejected', 'REJECTED')
+
+FEATURES = (
+    'department_rejection_rate',
+    'submitter_rejection_rate',
+    'account_rejection_rate',
+    'department_variance',
+    'log_amount',
+    'amount_vs_history',
+    'capex',
+    'no_justification',
+)
+
+FEATURE_LABELS = {
+    'department_rejection_rate': 'Department rejection history',
+    'submitter_rejection_rate': 'Submitter rejection history',
+    'account_rejection_rate': 'GL account rejection history',
+    'department_variance': 'Department budget variance',
+    'log_amount': 'Line amount',
+    'amount_vs_history': 'Amount above past approvals',
+    'capex': 'CAPEX line',
+    'no_justification': 'No justification',
+}
+
+# |actual - budget| / budget above this is treated as the same (bad) variance
+MAX_VARIANCE = 2.0
+
+LINE_FIELDS = (
+    'pk', 'department_id', 'submitted_by_id', 'gl_account_id', 'transaction_type',
+    'annual_amount', 'justification', 'status',
+)
+
+
+def get_budget_risk_config():
+    config = dict(DEFAULT_BUDGET_RISK)
+    config.update(getattr(settings, 'BUDGET_RISK', {}))
+    return config
+
+
+# --- Logistic regression (numpy) ---
+
+def _sigmoid(z):
+    return 1 / (1 + np.exp(-np.clip(z, -30, 30)))
+
+
+def fit_logistic(X, y, l2=1.0, iterations=25):
+    """
+    L2-regularised logistic regression by Newton's method. X is (lines, features) without an
+    intercept column; returns weights with the intercept first. The intercept is not penalised.
+    """
+    A = np.hstack([np.ones((X.shape[0], 1)), X])
+    w = np.zeros(A.shape[1])
+    penalty = np.full(A.shape[1], float(l2))
+    penalty[0] = 0.0
+    for _ in range(iterations):
+        p = _sigmoid(A @ w)
+        gradient = A.T @ (p - y) + penalty * w
+        hessian = (A * (p * (1 - p))[:, None]).T @ A + np.diag(penalty) + 1e-9 * np.eye(A.shape[1])
+        step = np.linalg.solve(hessian, gradient)
+        w -= step
+        if np.max(np.abs(step)) < 1e-8:
+            break
+    return w
+
+
+def auc(y, p):
+    """Area under the ROC curve (rank statistic); None when only one class is present."""
+    positives = int(y.sum())
+    negatives = y.size - positives
+    if not positives or not negatives:
+        return None
+    order = np.argsort(p, kind='mergesort')
+    ranks = np.empty(p.size)
+    ranks[order] = np.arange(1, p.size + 1)
+    # Ties share their average rank
+    _, inverse, counts = np.unique(p, return_inverse=True, return_counts=True)
+    ranks = (np.bincount(inverse, ranks) / counts)[inverse]
+    return float((ranks[y == 1].sum() - positives * (positives + 1) / 2) / (positives * negatives))
+
+
+# --- Set-based features ---
+
+def _lookup(keys, table_keys, table_values, default=np.nan):
+    """table_values[i] where table_keys[i] == keys (table_keys sorted), default where missing."""
+    if not len(table_keys):
+        return np.full(keys.shape, default, dtype=float)
+    position = np.clip(np.searchsorted(table_keys, keys), 0, len(table_keys) - 1)
+    return np.where(table_keys[position] == keys, table_values[position], default)
+
+
+def _pair_key(a, b):
+    return np.asarray(a, dtype=np.int64) * (1 << 32) + np.asarray(b, dtype=np.int64)
+
+
+def _outcome_table(field):
+    """(sorted keys, decided lines, rejected lines) per value of `field` over decided lines."""
+    rows = sorted(
+        BudgetTransaction.objects.filter(status__in=APPROVED_STATUSES + REJECTED_STATUSES)
+        .values_list(field)
+        .annotate(decided=Count('id'), rejected=Count('id', filter=Q(status__in=REJECTED_STATUSES)))
+        .order_by()
+    )
+    rows = [row for row in rows if row[0] is not None]
+    table = np.array(rows, dtype=np.int64).reshape(-1, 3)
+    return table[:, 0], table[:, 1].astype(float), table[:, 2].astype(float)
+
+
+def _department_variance():
+    """(sorted department ids, budget-weighted mean |actual - budget| / budget of their approved accounts)."""
+    approved = list(
+        BudgetTransaction.objects.filter(status__in=APPROVED_STATUSES)
+        .values_list('department_id', 'gl_account__gl_account_code', 'budget_year')
+        .annotate(budget=Sum('annual_amount'))
+        .order_by()
+    )
+    actuals = {}
+    for code, normal_balance, year, debit, credit in (
+        GLMonthlyBalance.objects.annotate(year=ExtractYear('period'))
+        .values_list('gl_account_code', 'gl_account_code__normal_balance', 'year')
+        .annotate(debit_total=Sum('debit'), credit_total=Sum('credit'))
+        .order_by()
+    ):
+        movement = (credit or 0) - (debit or 0) if normal_balance == 'Credit' else (debit or 0) - (credit or 0)
+        actuals[(code, year)] = float(movement)
+
+    budgets = {}
+    for _, code, year, budget in approved:
+        budgets[(code, year)] = budgets.get((code, year), 0.0) + float(budget or 0)
+
+    weighted, weights = {}, {}
+    for department_id, code, year, budget in approved:
+        total = budgets[(code, year)]
+        if (code, year) not in actuals or total <= 0:
+            continue  # no actuals yet for that year (or nothing budgeted) to compare against
+        variance = min(abs(actuals[(code, year)] - total) / total, MAX_VARIANCE)
+        weighted[department_id] = weighted.get(department_id, 0.0) + variance * float(budget)
+        weights[department_id] = weights.get(department_id, 0.0) + float(budget)
+
+    departments = np.array(sorted(d for d in weights if weights[d] > 0), dtype=np.int64)
+    return departments, np.array([weighted[d] / weights[d] for d in departments], dtype=float)
+
+
+def _approved_totals():
+    """(sorted department x account keys, approved annual amount total, approved line count)."""
+    rows = list(
+        BudgetTransaction.objects.filter(status__in=APPROVED_STATUSES)
+        .values_list('department_id', 'gl_account_id')
+        .annotate(total=Sum('annual_amount'), lines=Count('id'))
+        .order_by()
+    )
+    if not rows:
+        return np.array([], dtype=np.int64), np.array([]), np.array([])
+    keys = _pair_key([r[0] for r in rows], [r[1] for r in rows])
+    order = np.argsort(keys)
+    totals = np.array([float(r[2] or 0) for r in rows])
+    counts = np.array([float(r[3]) for r in rows])
+    return keys[order], totals[order], counts[order]
+
+
+def load_feature_tables(prior_lines):
+    """Every aggregate the features need, computed once per training or scoring pass."""
+    tables = {field: _outcome_table(field) for field in ('department_id', 'submitted_by_id', 'gl_account_id')}
+    decided = sum(tables['department_id'][1])
+    rejected = sum(tables['department_id'][2])
+    return {
+        'outcomes': tables,
+        'base_rate': (rejected + 1) / (decided + 2),
+        'prior_lines': prior_lines,
+        'variance': _department_variance(),
+        'approved_totals': _approved_totals(),
+    }
+
+
+def _line_arrays(rows):
+    columns = list(zip(*rows)) if rows else [()] * len(LINE_FIELDS)
+    lines = dict(zip(LINE_FIELDS, columns))
+    return {
+        'pk': np.array(lines['pk'], dtype=np.int64),
+        'department_id': np.array(lines['department_id'], dtype=np.int64),
+        'submitted_by_id': np.array(lines['submitted_by_id'], dtype=np.int64),
+        'gl_account_id': np.array(lines['gl_account_id'], dtype=np.int64),
+        'amount': np.array([float(a or 0) for a in lines['annual_amount']]),
+        'capex': np.array([t == 'CAPEX' for t in lines['transaction_type']], dtype=float),
+        'no_justification': np.array([not (j or '').strip() for j in lines['justification']], dtype=float),
+        'rejected': np.array([s in REJECTED_STATUSES for s in lines['status']], dtype=float),
+        'decided': np.array([s in APPROVED_STATUSES + REJECTED_STATUSES for s in lines['status']], dtype=float),
+    }
+
+
+def _earlier_totals(keys, *values):
+    """
+    For each line (in array order), the sum of every `values` array over the earlier lines with the
+    same key: an expanding window per key, without the line itself.
+    """
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]) if keys.size else np.array([], dtype=int)
+    group_start = np.repeat(starts, np.diff(np.r_[starts, keys.size]))
+    totals = []
+    for value in values:
+        ordered = value[order]
+        before = np.cumsum(ordered) - ordered
+        result = np.empty_like(before)
+        result[order] = before - before[group_start]
+        totals.append(result)
+    return totals
+
+
+def feature_matrix(lines, tables, sequential=False):
+    """
+    (lines, len(FEATURES)) matrix. Pending lines are scored against the full outcome tables. With
+    `sequential` (training: decided lines in submission order) the rejection rates and approved
+    average come only from the earlier lines, so a line's own outcome never reaches its features.
+    """
+    base_rate, prior = tables['base_rate'], tables['prior_lines']
+    columns = []
+    for field in ('department_id', 'submitted_by_id', 'gl_account_id'):
+        if sequential:
+            decided, rejected = _earlier_totals(lines[field], lines['decided'], lines['rejected'])
+        else:
+            keys, decided, rejected = tables['outcomes'][field]
+            decided = _lookup(lines[field], keys, decided, 0.0)
+            rejected = _lookup(lines[field], keys, rejected, 0.0)
+        columns.append((rejected + prior * base_rate) / (decided + prior))
+
+    departments, variance = tables['variance']
+    known = _lookup(lines['department_id'], departments, variance)
+    fallback = float(np.median(variance)) if variance.size else 0.0
+    columns.append(np.where(np.isnan(known), fallback, known))
+
+    amount = np.maximum(lines['amount'], 0)
+    columns.append(np.log1p(amount))
+    pair = _pair_key(lines['department_id'], lines['gl_account_id'])
+    if sequential:
+        approved = lines['decided'] * (1 - lines['rejected'])
+        total, count = _earlier_totals(pair, approved * amount, approved)
+    else:
+        keys, totals, counts = tables['approved_totals']
+        total = _lookup(pair, keys, totals, 0.0)
+        count = _lookup(pair, keys, counts, 0.0)
+    average = np.where(count > 0, total / np.maximum(count, 1), 0.0)
+    columns.append(np.where(average > 0, np.log1p(amount) - np.log1p(np.maximum(average, 0)), 0.0))
+
+    columns.append(lines['capex'])
+    columns.append(lines['no_justification'])
+    return np.column_stack(columns) if lines['pk'].size else np.zeros((0, len(FEATURES)))
+
+
+# --- Model artifact ---
+
+ARTIFACT_NAME = 'budget_risk'
+
+
+def train_model(user=None, progress=None):
+    """
+    Fits the model on every approved or rejected line and registers it as the next version of the
+    'budget_risk' artifact (predictive_analytics.artifacts). Returns the model dict (see load_model).
+    """
+    config = get_budget_risk_config()
+    started = time.monotonic()
+    tables = load_feature_tables(config['PRIOR_LINES'])
+    lines = _line_arrays(list(
+        BudgetTransaction.objects.filter(status__in=APPROVED_STATUSES + REJECTED_STATUSES)
+        .order_by('submission_date', 'pk').values_list(*LINE_FIELDS)
+    ))
+    y = lines['rejected']
+    if y.size < config['MIN_TRAINING_LINES'] or y.sum() == 0 or y.sum() == y.size:
+        raise ValueError(
+            f"Not enough decided budget lines to train the rework-risk model: {y.size} decided, "
+            f"{int(y.sum())} rejected (at least {config['MIN_TRAINING_LINES']} with both outcomes needed)."
+        )
+    if progress:
+        progress(0, f'Fitting on {y.size} decided lines')
+
+    X = feature_matrix(lines, tables, sequential=True)
+    mean = X.mean(axis=0)
+    scale = X.std(axis=0)
+    scale[scale == 0] = 1.0
+    weights = fit_logistic((X - mean) / scale, y, config['L2'], config['ITERATIONS'])
+    fitted_auc = auc(y, _sigmoid(weights[0] + ((X - mean) / scale) @ weights[1:]))
+
+    save_artifact(
+        ARTIFACT_NAME,
+        {'weights': weights, 'mean': mean, 'scale': scale},
+        metadata={
+            'features': list(FEATURES),
+            'trained_at': timezone.now().isoformat(),
+            'training_lines': int(y.size),
+            'rejected_lines': int(y.sum()),
+            'auc': fitted_auc,
+            'duration_seconds': round(time.monotonic() - started, 3),
+        },
+        user=user,
+    )
+    return load_model()
+
+
+def load_model():
+    """
+    The active model as a dict (version, weights, mean, scale, trained_at, training_lines,
+    rejected_lines, auc), or None when nothing has been trained yet or the active version was
+    trained on other FEATURES.
+    """
+    artifact = load_artifact(ARTIFACT_NAME)
+    if artifact is None or tuple(artifact.metadata.get('features', ())) != FEATURES:
+        return None
+    metadata = artifact.metadata
+    return {
+        'version': artifact.version,
+        'weights': artifact['weights'],
+        'mean': artifact['mean'],
+        'scale': artifact['scale'],
+        'trained_at': parse_datetime(metadata['trained_at']),
+        'training_lines': metadata['training_lines'],
+        'rejected_lines': metadata['rejected_lines'],
+        'auc': metadata.get('auc'),
+    }
+
+
+# --- Scoring ---
+
+def score_lines(ids=None, progress=None):
+    """
+    Scores the pending lines (only `ids` when given, else the whole queue) in one pass and upserts
+    their BudgetRiskScore rows; scores of lines that are no longer pending are removed.
+    Returns the number of lines scored (0 when no model has been trained yet).
+    """
+    config = get_budget_risk_config()
+    stale = BudgetRiskScore.objects.exclude(transaction__status__in=PENDING_STATUSES)
+    if ids is not None:
+        stale = stale.filter(transaction_id__in=ids)
+    stale.delete()
+
+    model = load_model()
+    if model is None:
+        return 0
+    pending = BudgetTransaction.objects.filter(status__in=PENDING_STATUSES)
+    if ids is not None:
+        pending = pending.filter(pk__in=ids)
+    lines = _line_arrays(list(pending.order_by('pk').values_list(*LINE_FIELDS)))
+    if not lines['pk'].size:
+        return 0
+
+    X = (feature_matrix(lines, load_feature_tables(config['PRIOR_LINES'])) - model['mean']) / model['scale']
+    risk = _sigmoid(model['weights'][0] + X @ model['weights'][1:])
+    # The feature pushing each line's risk up the most
+    top_factor = np.argmax(X * model['weights'][1:], axis=1)
+
+    scored_at = timezone.now()
+    columns = {name: X[:, i] * model['scale'][i] + model['mean'][i] for i, name in enumerate(FEATURES)}
+    scores = [
+        BudgetRiskScore(
+            transaction_id=int(pk),
+            risk=round(float(risk[row]), 6),
+            department_rejection_rate=round(float(columns['department_rejection_rate'][row]), 6),
+            department_variance=round(float(columns['department_variance'][row]), 6),
+            amount_vs_history=round(float(columns['amount_vs_history'][row]), 6),
+            top_factor=FEATURES[top_factor[row]],
+            model_trained_at=model['trained_at'],
+            scored_at=scored_at,
+        )
+        for row, pk in enumerate(lines['pk'])
+    ]
+    BudgetRiskScore.objects.bulk_create(
+        scores,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['transaction'],
+        update_fields=[
+            'risk', 'department_rejection_rate', 'department_variance', 'amount_vs_history',
+            'top_factor', 'model_trained_at', 'scored_at',
+        ],
+    )
+    if progress:
+        progress(len(scores))
+    return len(scores)
@@ -0,0 +1,221 @@
+"""
+Batch AUM forecasting for the Financial Forecasting page.
+
+Every fund's aum_closing_balance history (RSAFundHistorical / ManagedFundHistorical) is loaded in
+one ordered query per fund type and grouped by reporting frequency (inferred from the spacing of
+the period end dates). Each group is cut into matrices of DEFAULT_AUM_FORECASTING['CHUNK_FUNDS']
+funds that predictive_analytics.smoothing fits in one vectorised pass: SES, damped trend and
+seasonal naive are backtested on the last periods, the best model per fund forecasts the horizon.
+Chunks are fitted in a process pool. Results are stored as one AUMForecastRun with one AUMForecast
+row per fund, so the page only reads the latest complete run.
+
+Scheduled nightly with `manage.py forecast_aum`, or queued from the page as a background job.
+"""
+import calendar
+import datetime
+import math
+import multiprocessing
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from setup.models import RSAFund, ManagedFund, RSAFundHistorical, ManagedFundHistorical
+from . import smoothing
+from .models import AUMForecastRun, AUMForecast, RUN_COMPLETE, RUN_FAILED
+
+DEFAULT_AUM_FORECASTING = {
+    'HORIZON_MONTHS': 12,
+    'MIN_HISTORY': 6,
+    'WORKERS': 2,
+    'CHUNK_FUNDS': 500,
+    'INTERVAL_Z': 1.96,
+    'KEEP_RUNS': 5,
+}
+
+# source_type: (history model, fund FK id field, fund model)
+HISTORY_SOURCES = {
+    'RSA': (RSAFundHistorical, 'rsa_fund_id', RSAFund),
+    'MANAGED': (ManagedFundHistorical, 'managed_fund_id', ManagedFund),
+}
+
+# frequency: (months per period, season length in periods)
+FREQUENCIES = {
+    'monthly': (1, 12),
+    'quarterly': (3, 4),
+    'annual': (12, 1),
+}
+
+
+def get_forecasting_config():
+    config = dict(DEFAULT_AUM_FORECASTING)
+    config.update(getattr(settings, 'AUM_FORECASTING', {}))
+    return config
+
+
+def infer_frequency(dates):
+    gaps = [(b - a).days for a, b in zip(dates, dates[1:])]
+    gap = statistics.median(gaps) if gaps else 31
+    if gap <= 45:
+        return 'monthly'
+    if gap <= 135:
+        return 'quarterly'
+    return 'annual'
+
+
+def add_months(d, months):
+    """`d` moved by `months`; month ends stay month ends."""
+    month_index = d.month - 1 + months
+    year, month = d.year + month_index // 12, month_index % 12 + 1
+    last_day = calendar.monthrange(year, month)[1]
+    if d.day == calendar.monthrange(d.year, d.month)[1]:
+        return datetime.date(year, month, last_day)
+    return datetime.date(year, month, min(d.day, last_day))
+
+
+def load_histories(min_history):
+    """
+    Returns ({frequency: [series, ...]}, skipped count) where a series is
+    {'fund_type', 'fund_id', 'fund_name', 'dates', 'values'}, oldest first.
+    """
+    groups = {frequency: [] for frequency in FREQUENCIES}
+    skipped = 0
+    for fund_type, (history_model, fund_field, fund_model) in HISTORY_SOURCES.items():
+        names = dict(fund_model.objects.values_list('pk', 'name'))
+        rows = (
+            history_model.objects.order_by(fund_field, 'period_end_date')
+            .values_list(fund_field, 'period_end_date', 'aum_closing_balance')
+            .iterator(chunk_size=5000)
+        )
+        current = None
+        for fund_id, period, balance in rows:
+            if current is None or current['fund_id'] != fund_id:
+                if current is not None:
+                    skipped += _add_series(groups, current, min_history)
+                current = {
+                    'fund_type': fund_type, 'fund_id': fund_id, 'fund_name': names.get(fund_id, str(fund_id)),
+                    'dates': [], 'values': [],
+                }
+            current['dates'].append(period)
+            current['values'].append(float(balance))
+        if current is not None:
+            skipped += _add_series(groups, current, min_history)
+    return groups, skipped
+
+
+def _add_series(groups, series, min_history):
+    if len(series['values']) < min_history:
+        return 1
+    groups[infer_frequency(series['dates'])].append(series)
+    return 0
+
+
+def _chunks(series_list, size):
+    # Similar lengths side by side keeps the NaN padding of each matrix small
+    ordered = sorted(series_list, key=lambda series: len(series['values']))
+    for start in range(0, len(ordered), size):
+        yield ordered[start:start + size]
+
+
+def _matrix(chunk):
+    """Right-aligned (funds, periods) matrix, NaN-padded on the left."""
+    width = max(len(series['values']) for series in chunk)
+    Y = np.full((len(chunk), width), np.nan)
+    for row, series in enumerate(chunk):
+        Y[row, width - len(series['values']):] = series['values']
+    return Y
+
+
+def _forecast_rows(run, chunk, result, frequency, horizon):
+    months_per_period = FREQUENCIES[frequency][0]
+    money = lambda value: Decimal(str(round(float(value), 2)))
+    for row, series in enumerate(chunk):
+        last_date = series['dates'][-1]
+        errors = {
+            model: round(float(error), 4)
+            for model, error in zip(smoothing.MODELS, result['errors'][row]) if not math.isnan(error)
+        }
+        model = smoothing.MODELS[result['model'][row]]
+        yield AUMForecast(
+            run=run,
+            fund_type=series['fund_type'],
+            fund_id=series['fund_id'],
+            fund_name=series['fund_name'],
+            frequency=frequency,
+            model=model,
+            backtest_error=errors.get(model),
+            model_errors=errors,
+            last_period=last_date,
+            last_actual=money(series['values'][-1]),
+            points=[
+                {
+                    'date': add_months(last_date, months_per_period * (step + 1)).isoformat(),
+                    'forecast': round(float(result['forecast'][row, step]), 2),
+                    'lower': round(float(result['lower'][row, step]), 2),
+                    'upper': round(float(result['upper'][row, step]), 2),
+                }
+                for step in range(horizon)
+            ],
+        )
+
+
+def run_aum_forecasts(user=None, workers=None, progress=None):
+    """
+    Forecasts every fund with enough history and stores the run. Returns the AUMForecastRun.
+    `progress(count, message=None)` is called after each chunk (see data_management.jobs).
+    """
+    config = get_forecasting_config()
+    workers = config['WORKERS'] if workers is None else workers
+    started = time.monotonic()
+    run = AUMForecastRun.objects.create(horizon_months=config['HORIZON_MONTHS'], created_by=user)
+    pool = None
+    try:
+        groups, skipped = load_histories(config['MIN_HISTORY'])
+        tasks = []
+        for frequency, series_list in groups.items():
+            months_per_period, season = FREQUENCIES[frequency]
+            horizon = max(1, math.ceil(config['HORIZON_MONTHS'] / months_per_period))
+            holdout = max(1, min(horizon, season))
+            for chunk in _chunks(series_list, config['CHUNK_FUNDS']):
+                tasks.append((chunk, frequency, horizon, (_matrix(chunk), horizon, season, holdout, config['INTERVAL_Z'])))
+
+        if workers > 0 and len(tasks) > 1:
+            # 'spawn': smoothing imports nothing from Django, the children need no setup
+            pool = ProcessPoolExecutor(max_workers=min(workers, len(tasks)), mp_context=multiprocessing.get_context('spawn'))
+            results = pool.map(smoothing.forecast_batch, *zip(*(args for *_, args in tasks)))
+        else:
+            results = (smoothing.forecast_batch(*args) for *_, args in tasks)
+
+        done = 0
+        with transaction.atomic():
+            for (chunk, frequency, horizon, _), result in zip(tasks, results):
+                AUMForecast.objects.bulk_create(_forecast_rows(run, chunk, result, frequency, horizon))
+                done += len(chunk)
+                if progress:
+                    progress(done)
+            run.status = RUN_COMPLETE
+            run.fund_count = done
+            run.skipped_count = skipped
+            run.finished_at = timezone.now()
+            run.duration_seconds = round(time.monotonic() - started, 3)
+            run.save()
+    except Exception as e:
+        AUMForecastRun.objects.filter(pk=run.pk).update(
+            status=RUN_FAILED, error=str(e) or e.__class__.__name__, finished_at=timezone.now(),
+        )
+        raise
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    # Older runs are only kept for comparison
+    stale = AUMForecastRun.objects.values_list('pk', flat=True)[config['KEEP_RUNS']:]
+    AUMForecastRun.objects.filter(pk__in=list(stale)).delete()
+    return run
+
+
+def latest_run():
+    return AUMForecastRun.objects.filter(status=RUN_COMPLETE).first()
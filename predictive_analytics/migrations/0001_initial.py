@@ -0,0 +1,124 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:15
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AUMForecastRun",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("RUNNING", "Running"),
+                            ("COMPLETE", "Complete"),
+                            ("FAILED", "Failed"),
+                        ],
+                        default="RUNNING",
+                        max_length=20,
+                    ),
+                ),
+                ("horizon_months", models.IntegerField()),
+                ("fund_count", models.IntegerField(default=0)),
+                ("skipped_count", models.IntegerField(default=0)),
+                ("duration_seconds", models.FloatField(blank=True, null=True)),
+                ("error", models.TextField(blank=True)),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="aum_forecast_runs",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "AUM Forecast Run",
+                "verbose_name_plural": "AUM Forecast Runs",
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.CreateModel(
+            name="AUMForecast",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "fund_type",
+                    models.CharField(
+                        choices=[("RSA", "RSA Fund"), ("MANAGED", "Managed Fund")],
+                        max_length=10,
+                    ),
+                ),
+                ("fund_id", models.IntegerField()),
+                ("fund_name", models.CharField(max_length=255)),
+                ("frequency", models.CharField(max_length=10)),
+                (
+                    "model",
+                    models.CharField(
+                        choices=[
+                            ("ses", "Exponential smoothing"),
+                            ("damped_trend", "Damped trend"),
+                            ("seasonal_naive", "Seasonal naive"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("backtest_error", models.FloatField(blank=True, null=True)),
+                ("model_errors", models.JSONField(default=dict)),
+                ("last_period", models.DateField()),
+                ("last_actual", models.DecimalField(decimal_places=2, max_digits=20)),
+                ("points", models.JSONField(default=list)),
+                (
+                    "run",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="forecasts",
+                        to="predictive_analytics.aumforecastrun",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "AUM Forecast",
+                "verbose_name_plural": "AUM Forecasts",
+                "ordering": ["fund_type", "fund_name"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="aumforecast",
+            constraint=models.UniqueConstraint(
+                fields=("run", "fund_type", "fund_id"), name="aumforecast_run_fund_uniq"
+            ),
+        ),
+    ]
@@ -0,0 +1,120 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:19
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("setup", "0014_import_batch"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("predictive_analytics", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PINModelRun",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("RUNNING", "Running"),
+                            ("COMPLETE", "Complete"),
+                            ("FAILED", "Failed"),
+                        ],
+                        default="RUNNING",
+                        max_length=20,
+                    ),
+                ),
+                ("horizon_periods", models.IntegerField()),
+                ("fund_count", models.IntegerField(default=0)),
+                ("skipped_count", models.IntegerField(default=0)),
+                ("pooled_rates", models.JSONField(default=dict)),
+                ("duration_seconds", models.FloatField(blank=True, null=True)),
+                ("error", models.TextField(blank=True)),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="pin_model_runs",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "PIN Model Run",
+                "verbose_name_plural": "PIN Model Runs",
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.CreateModel(
+            name="PINActivityProjection",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("frequency", models.CharField(max_length=10)),
+                ("periods_observed", models.IntegerField()),
+                ("activation_rate", models.FloatField()),
+                ("deactivation_rate", models.FloatField()),
+                ("reactivation_rate", models.FloatField()),
+                ("churn_rate", models.FloatField()),
+                ("enrolments_per_period", models.FloatField()),
+                ("fit_error", models.FloatField(blank=True, null=True)),
+                ("transition_matrix", models.JSONField(default=list)),
+                ("last_period", models.DateField()),
+                ("last_total", models.IntegerField()),
+                ("last_active", models.IntegerField()),
+                ("points", models.JSONField(default=list)),
+                (
+                    "rsa_fund",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="pin_projections",
+                        to="setup.rsafund",
+                    ),
+                ),
+                (
+                    "run",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="projections",
+                        to="predictive_analytics.pinmodelrun",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "PIN Activity Projection",
+                "verbose_name_plural": "PIN Activity Projections",
+                "ordering": ["rsa_fund__name"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="pinactivityprojection",
+            constraint=models.UniqueConstraint(
+                fields=("run", "rsa_fund"), name="pinprojection_run_fund_uniq"
+            ),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("budget_input", "0004_approvedbudgetversion_forecastgltransaction"),
+        ("predictive_analytics", "0002_pin_model"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BudgetRiskScore",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("risk", models.FloatField(db_index=True)),
+                ("department_rejection_rate", models.FloatField()),
+                ("department_variance", models.FloatField()),
+                ("amount_vs_history", models.FloatField()),
+                ("top_factor", models.CharField(max_length=50)),
+                ("model_trained_at", models.DateTimeField()),
+                ("scored_at", models.DateTimeField()),
+                (
+                    "transaction",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="risk_score",
+                        to="budget_input.budgettransaction",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Budget Risk Score",
+                "verbose_name_plural": "Budget Risk Scores",
+                "ordering": ["-risk"],
+            },
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:26
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("predictive_analytics", "0003_budget_risk"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ModelArtifact",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100)),
+                ("version", models.PositiveIntegerField()),
+                ("is_active", models.BooleanField(default=False)),
+                ("checksum", models.CharField(max_length=64)),
+                ("files", models.JSONField(default=list)),
+                ("size_bytes", models.BigIntegerField(default=0)),
+                ("metadata", models.JSONField(blank=True, default=dict)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="model_artifacts",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Model Artifact",
+                "verbose_name_plural": "Model Artifacts",
+                "ordering": ["name", "-version"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="modelartifact",
+            constraint=models.UniqueConstraint(
+                fields=("name", "version"), name="modelartifact_name_version_uniq"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="modelartifact",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("is_active", True)),
+                fields=("name",),
+                name="modelartifact_one_active",
+            ),
+        ),
+    ]
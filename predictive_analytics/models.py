@@ -1,3 +1,221 @@
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+RUN_RUNNING = 'RUNNING'
+RUN_COMPLETE = 'COMPLETE'
+RUN_FAILED = 'FAILED'
+RUN_STATUS_CHOICES = [
+    (RUN_RUNNING, 'Running'),
+    (RUN_COMPLETE, 'Complete'),
+    (RUN_FAILED, 'Failed'),
+]
+
+FUND_TYPE_CHOICES = [('RSA', 'RSA Fund'), ('MANAGED', 'Managed Fund')]
+
+FORECAST_MODEL_CHOICES = [
+    ('ses', 'Exponential smoothing'),
+    ('damped_trend', 'Damped trend'),
+    ('seasonal_naive', 'Seasonal naive'),
+]
+
+
+class AUMForecastRun(models.Model):
+    """One batch run of the AUM forecaster (predictive_analytics.forecasting.run_aum_forecasts)."""
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    status = models.CharField(max_length=20, choices=RUN_STATUS_CHOICES, default=RUN_RUNNING)
+    horizon_months = models.IntegerField()
+    fund_count = models.IntegerField(default=0)
+    # Funds with too little history to forecast
+    skipped_count = models.IntegerField(default=0)
+    duration_seconds = models.FloatField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='aum_forecast_runs'
+    )
+
+    class Meta:
+        verbose_name = "AUM Forecast Run"
+        verbose_name_plural = "AUM Forecast Runs"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"AUM forecast {self.created_at:%Y-%m-%d %H:%M} ({self.status})"
+
+
+class AUMForecast(models.Model):
+    """
+    The forecast of one fund's aum_closing_balance from one run, with the model that won the
+    backtest. `points` holds [{'date', 'forecast', 'lower', 'upper'}, ...] so the forecasting page
+    reads a fund's whole horizon in one row.
+    """
+    run = models.ForeignKey(AUMForecastRun, on_delete=models.CASCADE, related_name='forecasts')
+    fund_type = models.CharField(max_length=10, choices=FUND_TYPE_CHOICES)
+    fund_id = models.IntegerField()
+    fund_name = models.CharField(max_length=255)
+    frequency = models.CharField(max_length=10)  # 'monthly', 'quarterly' or 'annual'
+    model = models.CharField(max_length=20, choices=FORECAST_MODEL_CHOICES)
+    # Backtest sMAPE (%) of the chosen model; None when the history was too short to backtest
+    backtest_error = models.FloatField(null=True, blank=True)
+    # sMAPE of every model that could be backtested, by model name
+    model_errors = models.JSONField(default=dict)
+    last_period = models.DateField()
+    last_actual = models.DecimalField(max_digits=20, decimal_places=2)
+    points = models.JSONField(default=list)
+
+    class Meta:
+        verbose_name = "AUM Forecast"
+        verbose_name_plural = "AUM Forecasts"
+        ordering = ['fund_type', 'fund_name']
+        constraints = [
+            models.UniqueConstraint(fields=['run', 'fund_type', 'fund_id'], name='aumforecast_run_fund_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.fund_name} ({self.get_model_display()})"
+
+    @property
+    def horizon_end(self):
+        return self.points[-1] if self.points else None
+
+
+class PINModelRun(models.Model):
+    """One batch run of the PIN activity model (predictive_analytics.pin_model.run_pin_model)."""
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    status = models.CharField(max_length=20, choices=RUN_STATUS_CHOICES, default=RUN_RUNNING)
+    horizon_periods = models.IntegerField()
+    fund_count = models.IntegerField(default=0)
+    # Funds with too little history to fit
+    skipped_count = models.IntegerField(default=0)
+    # All-funds rates per frequency; each fund's rates are shrunk towards them
+    pooled_rates = models.JSONField(default=dict)
+    duration_seconds = models.FloatField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='pin_model_runs'
+    )
+
+    class Meta:
+        verbose_name = "PIN Model Run"
+        verbose_name_plural = "PIN Model Runs"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"PIN model {self.created_at:%Y-%m-%d %H:%M} ({self.status})"
+
+
+class PINActivityProjection(models.Model):
+    """
+    One RSA fund's fitted per-period PIN transition rates from one run and the projected PIN
+    states. `points` holds [{'date', 'total', 'active', 'never_funded', 'dormant'}, ...].
+    """
+    run = models.ForeignKey(PINModelRun, on_delete=models.CASCADE, related_name='projections')
+    rsa_fund = models.ForeignKey('setup.RSAFund', on_delete=models.CASCADE, related_name='pin_projections')
+    frequency = models.CharField(max_length=10)  # 'monthly', 'quarterly' or 'annual'
+    periods_observed = models.IntegerField()
+    # Per period: never funded -> active, active -> dormant, dormant -> active, any state -> exited
+    activation_rate = models.FloatField()
+    deactivation_rate = models.FloatField()
+    reactivation_rate = models.FloatField()
+    churn_rate = models.FloatField()
+    enrolments_per_period = models.FloatField()
+    # In-sample one-period-ahead error of active PINs (%)
+    fit_error = models.FloatField(null=True, blank=True)
+    # 4x4 row-stochastic matrix over (never_funded, active, dormant, exited)
+    transition_matrix = models.JSONField(default=list)
+    last_period = models.DateField()
+    last_total = models.IntegerField()
+    last_active = models.IntegerField()
+    points = models.JSONField(default=list)
+
+    class Meta:
+        verbose_name = "PIN Activity Projection"
+        verbose_name_plural = "PIN Activity Projections"
+        ordering = ['rsa_fund__name']
+        constraints = [
+            models.UniqueConstraint(fields=['run', 'rsa_fund'], name='pinprojection_run_fund_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.rsa_fund} PIN projection"
+
+    @property
+    def horizon_end(self):
+        return self.points[-1] if self.points else None
+
+    @property
+    def active_share(self):
+        return self.last_active / self.last_total * 100 if self.last_total else None
+
+
+class BudgetRiskScore(models.Model):
+    """
+    Rework risk of one pending budget line (predictive_analytics.budget_risk.score_lines), with the
+    main inputs kept for the page. Rows are upserted per line and removed once the line is decided.
+    """
+    transaction = models.OneToOneField(
+        'budget_input.BudgetTransaction',
+        on_delete=models.CASCADE,
+        related_name='risk_score'
+    )
+    # Probability (0-1) that the line is rejected / sent back for rework
+    risk = models.FloatField(db_index=True)
+    department_rejection_rate = models.FloatField()
+    # Budget-weighted mean |actual - budget| / budget of the department's past approved accounts
+    department_variance = models.FloatField()
+    # log(amount / the department's average approved amount on the same account); 0 without history
+    amount_vs_history = models.FloatField()
+    # The feature (budget_risk.FEATURES) adding the most to this line's risk
+    top_factor = models.CharField(max_length=50)
+    model_trained_at = models.DateTimeField()
+    scored_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Budget Risk Score"
+        verbose_name_plural = "Budget Risk Scores"
+        ordering = ['-risk']
+
+    def __str__(self):
+        return f"{self.transaction} risk {self.risk:.0%}"
+
+
+class ModelArtifact(models.Model):
+    """
+    One saved version of a fitted model (predictive_analytics.artifacts): its arrays are .npy files
+    under MODEL_ARTIFACTS['ROOT']/<name>/v<version>/. One version per name is active.
+    """
+    name = models.CharField(max_length=100)
+    version = models.PositiveIntegerField()
+    is_active = models.BooleanField(default=False)
+    # SHA-256 over the array files, checked before a process first maps them
+    checksum = models.CharField(max_length=64)
+    # Array names; each is stored as <name>.npy
+    files = models.JSONField(default=list)
+    size_bytes = models.BigIntegerField(default=0)
+    metadata = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='model_artifacts'
+    )
+
+    class Meta:
+        verbose_name = "Model Artifact"
+        verbose_name_plural = "Model Artifacts"
+        ordering = ['name', '-version']
+        constraints = [
+            models.UniqueConstraint(fields=['name', 'version'], name='modelartifact_name_version_uniq'),
+            models.UniqueConstraint(fields=['name'], condition=models.Q(is_active=True), name='modelartifact_one_active'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} v{self.version}{' (active)' if self.is_active else ''}"
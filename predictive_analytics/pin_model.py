@@ -0,0 +1,283 @@
+"""
+PIN activity model for the Customer & Operational Insight page.
+
+RSAFundHistorical only holds per-period head counts (total, active, never funded, enrolments), not
+individual PIN histories, so each fund is modelled as a Markov chain over the states
+never_funded -> active <-> dormant, plus an absorbing exited state (transfers out, deaths,
+retirements). dormant is total - active - never_funded. Between two periods:
+
+    exits        = total(t-1) + enrolments(t) - total(t)              churn  = exits / total(t-1)
+    never_funded(t) = never_funded(t-1) * (1 - churn) * (1 - activation) + enrolments(t)
+    dormant(t)   = dormant(t-1) * (1 - churn) * (1 - reactivation) + active(t-1) * (1 - churn) * deactivation
+
+activation and churn are ratio estimates; deactivation and reactivation come from a 2x2
+least-squares solve on the dormant equation. Every fund is solved at once with numpy on
+NaN-padded (funds, periods) matrices, one matrix per reporting frequency. Rates are shrunk towards
+the all-funds rates (PIN_MODEL['PRIOR_PERIODS'] periods' worth), so a short or flat history does
+not produce extreme rates. The fitted chain then projects each fund's PIN states forward with
+its recent average enrolments. Results are stored as a PINModelRun with one PINActivityProjection
+per fund; the page never fits anything.
+"""
+import math
+import time
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from setup.models import RSAFundHistorical
+from .forecasting import FREQUENCIES, add_months, infer_frequency
+from .models import PINModelRun, PINActivityProjection, RUN_COMPLETE, RUN_FAILED
+
+DEFAULT_PIN_MODEL = {
+    'HORIZON_MONTHS': 24,
+    'MIN_HISTORY': 4,
+    'PRIOR_PERIODS': 2,
+    'ENROLMENT_WINDOW': 4,
+    'KEEP_RUNS': 5,
+}
+
+STATES = ('never_funded', 'active', 'dormant', 'exited')
+
+
+def get_pin_model_config():
+    config = dict(DEFAULT_PIN_MODEL)
+    config.update(getattr(settings, 'PIN_MODEL', {}))
+    return config
+
+
+def load_pin_histories(min_history):
+    """Returns ({frequency: [series, ...]}, skipped count); a series holds the fund's columns oldest first."""
+    groups = {frequency: [] for frequency in FREQUENCIES}
+    skipped = 0
+    rows = (
+        RSAFundHistorical.objects.order_by('rsa_fund_id', 'period_end_date')
+        .values_list('rsa_fund_id', 'period_end_date', 'total_pins', 'active_pins', 'never_funded_pins', 'enrolments')
+        .iterator(chunk_size=5000)
+    )
+    current = None
+
+    def close(series):
+        if len(series['dates']) < min_history or not any(series['total']):
+            return 1
+        groups[infer_frequency(series['dates'])].append(series)
+        return 0
+
+    for fund_id, period, total, active, never_funded, enrolments in rows:
+        if current is None or current['fund_id'] != fund_id:
+            if current is not None:
+                skipped += close(current)
+            current = {'fund_id': fund_id, 'dates': [], 'total': [], 'active': [], 'never_funded': [], 'enrolments': []}
+        current['dates'].append(period)
+        current['total'].append(total)
+        current['active'].append(active)
+        current['never_funded'].append(never_funded)
+        current['enrolments'].append(enrolments)
+    if current is not None:
+        skipped += close(current)
+    return groups, skipped
+
+
+def _matrices(series_list):
+    """Right-aligned (funds, periods) matrices per column, NaN-padded on the left."""
+    width = max(len(series['dates']) for series in series_list)
+    columns = {}
+    for column in ('total', 'active', 'never_funded', 'enrolments'):
+        matrix = np.full((len(series_list), width), np.nan)
+        for row, series in enumerate(series_list):
+            matrix[row, width - len(series[column]):] = series[column]
+        columns[column] = matrix
+    columns['dormant'] = np.maximum(columns['total'] - columns['active'] - columns['never_funded'], 0)
+    return columns
+
+
+def _solve_flows(x1, x2, y):
+    """
+    Least-squares (deactivation, reactivation) of y = d * x1 - r * x2 per row; inputs are
+    (rows, periods) with zeros where invalid. Returns (rates (rows, 2), identified mask): when the
+    active and dormant counts moved in lockstep only the net flow is identified, not d and r.
+    """
+    m = np.empty((x1.shape[0], 2, 2))
+    m[:, 0, 0] = np.sum(x1 * x1, axis=1)
+    m[:, 1, 1] = np.sum(x2 * x2, axis=1)
+    m[:, 0, 1] = m[:, 1, 0] = -np.sum(x1 * x2, axis=1)
+    b = np.stack([np.sum(x1 * y, axis=1), -np.sum(x2 * y, axis=1)], axis=1)
+    eigenvalues = np.linalg.eigvalsh(m)
+    identified = eigenvalues[:, 0] > 1e-6 * np.maximum(eigenvalues[:, 1], 1e-12)
+    m[~identified] = np.eye(2)
+    rates = np.clip(np.linalg.solve(m, b[:, :, None])[:, :, 0], 0, 1)
+    return rates, identified
+
+
+def fit_transition_rates(columns, prior_periods):
+    """
+    Fits per-fund per-period rates from the matrices of _matrices().
+    Returns ({'activation', 'deactivation', 'reactivation', 'churn', 'fit_error'} arrays, pooled rates).
+    """
+    total, active, never_funded, dormant, enrolments = (
+        columns[c] for c in ('total', 'active', 'never_funded', 'dormant', 'enrolments')
+    )
+    prev = slice(None, -1)
+    cur = slice(1, None)
+    valid = ~np.isnan(total[:, prev]) & ~np.isnan(total[:, cur]) & (np.nan_to_num(total[:, prev]) > 0)
+    periods = np.maximum(valid.sum(axis=1), 1)
+    zero = lambda a: np.where(valid, np.nan_to_num(a), 0.0)
+
+    enrolled = zero(enrolments[:, cur])
+    exits = zero(np.maximum(total[:, prev] + enrolments[:, cur] - total[:, cur], 0))
+    exposure = zero(total[:, prev])
+    survival = np.where(valid, 1 - np.clip(exits / np.where(exposure > 0, exposure, 1), 0, 1), 0.0)
+
+    # Activation of never funded PINs: ratio estimate shrunk towards the pooled rate
+    exposed = zero(never_funded[:, prev]) * survival
+    activated = np.maximum(exposed + enrolled - zero(never_funded[:, cur]), 0)
+    pooled_activation = min(activated.sum() / exposed.sum(), 1.0) if exposed.sum() > 0 else 0.0
+    pooled_churn = exits.sum() / exposure.sum() if exposure.sum() > 0 else 0.0
+    prior_exposed = prior_periods * exposed.sum(axis=1) / periods
+    activation = np.clip(
+        (activated.sum(axis=1) + prior_exposed * pooled_activation) / np.maximum(exposed.sum(axis=1) + prior_exposed, 1e-9), 0, 1
+    )
+    prior_exposure = prior_periods * exposure.sum(axis=1) / periods
+    churn = np.clip(
+        (exits.sum(axis=1) + prior_exposure * pooled_churn) / np.maximum(exposure.sum(axis=1) + prior_exposure, 1e-9), 0, 1
+    )
+
+    # Flows between active and dormant, from the dormant equation; the prior is the median fund
+    x1 = zero(active[:, prev]) * survival
+    x2 = zero(dormant[:, prev]) * survival
+    y = np.where(valid, zero(dormant[:, cur]) - x2, 0.0)
+    own, identified = _solve_flows(x1, x2, y)
+    pooled = np.median(own[identified], axis=0) if identified.any() else np.zeros(2)
+    own[~identified] = pooled
+    own_weight = np.where(identified, periods, 0)[:, None]
+    flows = (own_weight * own + prior_periods * pooled) / np.maximum(own_weight + prior_periods, 1e-9)
+    deactivation, reactivation = flows[:, 0], flows[:, 1]
+
+    # One-period-ahead error of active PINs (%)
+    predicted = (
+        x1 * (1 - deactivation[:, None]) + exposed * activation[:, None] + x2 * reactivation[:, None]
+    )
+    actual = zero(active[:, cur])
+    scored = valid & (actual > 0)
+    ape = np.where(scored, np.abs(predicted - actual) / np.where(actual > 0, actual, 1), 0.0)
+    fit_error = np.where(scored.any(axis=1), 100 * ape.sum(axis=1) / np.maximum(scored.sum(axis=1), 1), np.nan)
+
+    rates = {
+        'activation': activation, 'deactivation': deactivation, 'reactivation': reactivation,
+        'churn': churn, 'fit_error': fit_error,
+    }
+    pooled_rates = {
+        'activation': float(pooled_activation), 'deactivation': float(pooled[0]),
+        'reactivation': float(pooled[1]), 'churn': float(pooled_churn),
+    }
+    return rates, pooled_rates
+
+
+def transition_matrices(rates):
+    """(funds, 4, 4) row-stochastic matrices over STATES."""
+    a, d, r, c = (rates[k] for k in ('activation', 'deactivation', 'reactivation', 'churn'))
+    s = 1 - c
+    p = np.zeros((a.size, 4, 4))
+    p[:, 0, 0], p[:, 0, 1] = s * (1 - a), s * a
+    p[:, 1, 1], p[:, 1, 2] = s * (1 - d), s * d
+    p[:, 2, 1], p[:, 2, 2] = s * r, s * (1 - r)
+    p[:, :3, 3] = c[:, None]
+    p[:, 3, 3] = 1
+    return p
+
+
+def project_states(start, matrices, enrolments, horizon):
+    """
+    Projects (funds, 3) never_funded / active / dormant counts `horizon` periods ahead; new
+    enrolments enter as never funded. Returns (funds, horizon, 3).
+    """
+    states = np.empty((start.shape[0], horizon, 3))
+    state = start
+    for step in range(horizon):
+        state = np.einsum('ni,nij->nj', state, matrices[:, :3, :3])
+        state[:, 0] += enrolments
+        states[:, step] = state
+    return states
+
+
+def run_pin_model(user=None, progress=None):
+    """Fits and projects every RSA fund with enough PIN history and stores the run. Returns the PINModelRun."""
+    config = get_pin_model_config()
+    started = time.monotonic()
+    run = PINModelRun.objects.create(horizon_periods=0, created_by=user)
+    try:
+        groups, skipped = load_pin_histories(config['MIN_HISTORY'])
+        projections = []
+        pooled_rates = {}
+        horizon_periods = 0
+        for frequency, series_list in groups.items():
+            if not series_list:
+                continue
+            months_per_period = FREQUENCIES[frequency][0]
+            horizon = max(1, math.ceil(config['HORIZON_MONTHS'] / months_per_period))
+            horizon_periods = max(horizon_periods, horizon)
+            columns = _matrices(series_list)
+            rates, pooled_rates[frequency] = fit_transition_rates(columns, config['PRIOR_PERIODS'])
+            matrices = transition_matrices(rates)
+            window = columns['enrolments'][:, -config['ENROLMENT_WINDOW']:]
+            with np.errstate(invalid='ignore'):
+                enrolments = np.nan_to_num(np.nanmean(window, axis=1))
+            start = np.stack([columns[c][:, -1] for c in ('never_funded', 'active', 'dormant')], axis=1)
+            states = project_states(start, matrices, enrolments, horizon)
+
+            for row, series in enumerate(series_list):
+                last_date = series['dates'][-1]
+                points = []
+                for step in range(horizon):
+                    never_funded, active, dormant = (int(round(v)) for v in states[row, step])
+                    points.append({
+                        'date': add_months(last_date, months_per_period * (step + 1)).isoformat(),
+                        'total': never_funded + active + dormant,
+                        'active': active,
+                        'never_funded': never_funded,
+                        'dormant': dormant,
+                    })
+                fit_error = rates['fit_error'][row]
+                projections.append(PINActivityProjection(
+                    run=run,
+                    rsa_fund_id=series['fund_id'],
+                    frequency=frequency,
+                    periods_observed=len(series['dates']),
+                    activation_rate=float(rates['activation'][row]),
+                    deactivation_rate=float(rates['deactivation'][row]),
+                    reactivation_rate=float(rates['reactivation'][row]),
+                    churn_rate=float(rates['churn'][row]),
+                    enrolments_per_period=float(enrolments[row]),
+                    fit_error=None if np.isnan(fit_error) else round(float(fit_error), 4),
+                    transition_matrix=np.round(matrices[row], 6).tolist(),
+                    last_period=last_date,
+                    last_total=series['total'][-1],
+                    last_active=series['active'][-1],
+                    points=points,
+                ))
+            if progress:
+                progress(len(projections))
+
+        with transaction.atomic():
+            PINActivityProjection.objects.bulk_create(projections, batch_size=1000)
+            run.status = RUN_COMPLETE
+            run.horizon_periods = horizon_periods
+            run.fund_count = len(projections)
+            run.skipped_count = skipped
+            run.pooled_rates = pooled_rates
+            run.finished_at = timezone.now()
+            run.duration_seconds = round(time.monotonic() - started, 3)
+            run.save()
+    except Exception as e:
+        PINModelRun.objects.filter(pk=run.pk).update(
+            status=RUN_FAILED, error=str(e) or e.__class__.__name__, finished_at=timezone.now(),
+        )
+        raise
+
+    # Older runs are only kept for comparison
+    stale = PINModelRun.objects.values_list('pk', flat=True)[config['KEEP_RUNS']:]
+    PINModelRun.objects.filter(pk__in=list(stale)).delete()
+    return run
+
+
+def latest_pin_run():
+    return PINModelRun.objects.filter(status=RUN_COMPLETE).first()
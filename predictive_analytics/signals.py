@@ -0,0 +1,23 @@
+"""
+Keeps the budget rework-risk scores (predictive_analytics.budget_risk) current between the nightly
+retraining runs: a saved pending line is queued for scoring, a decided line loses its score.
+"""
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from data_management.jobs import enqueue
+from .budget_risk import ARTIFACT_NAME, PENDING_STATUSES
+from .models import BudgetRiskScore, ModelArtifact
+
+
+@receiver(post_save, sender='budget_input.BudgetTransaction')
+def rescore_budget_line(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    if instance.status not in PENDING_STATUSES:
+        BudgetRiskScore.objects.filter(transaction_id=instance.pk).delete()
+    elif ModelArtifact.objects.filter(name=ARTIFACT_NAME, is_active=True).exists():
+        pk = instance.pk
+        transaction.on_commit(
+            lambda: enqueue('score_budget_risk', {'ids': [pk]}, label=f'Budget line #{pk} risk score')
+        )
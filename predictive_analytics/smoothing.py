@@ -0,0 +1,177 @@
+"""
+Vectorised exponential smoothing for many short series at once (numpy only, no Django imports,
+so the forecasting process pool can import it without setting Django up).
+
+A batch is a float matrix Y of shape (series, periods). Series are right-aligned: every row ends
+at the last column and shorter histories are padded with NaN on the left. Each model runs one
+Python loop over the periods, updating all series and all candidate parameters together.
+"""
+import numpy as np
+
+MODELS = ('ses', 'damped_trend', 'seasonal_naive')
+
+SES_ALPHAS = np.array([0.1, 0.2, 0.3, 0.5, 0.7, 0.9])
+# (alpha, beta, phi) candidates of the damped trend model
+DAMPED_PARAMS = np.array([
+    (alpha, beta, phi)
+    for alpha in (0.2, 0.5, 0.8)
+    for beta in (0.05, 0.2)
+    for phi in (0.8, 0.9, 0.98)
+])
+
+
+def observations(Y):
+    return np.sum(~np.isnan(Y), axis=1)
+
+
+def _best(sse, fitted):
+    """Per series: the index of the candidate with the smallest one-step squared error."""
+    sse = np.where(fitted > 0, sse, np.inf)
+    return np.argmin(sse, axis=1)
+
+
+def ses(Y, horizon):
+    """
+    Simple exponential smoothing with alpha picked per series from SES_ALPHAS.
+    Returns (forecasts (n, horizon), one-step residual std (n,), interval scale (n, horizon)).
+    """
+    n, periods = Y.shape
+    alphas = SES_ALPHAS[None, :]
+    level = np.zeros((n, alphas.size))
+    sse = np.zeros((n, alphas.size))
+    fitted = np.zeros((n, 1))
+    seen = np.zeros((n, 1), dtype=bool)
+    for t in range(periods):
+        y = Y[:, t:t + 1]
+        valid = ~np.isnan(y)
+        update = valid & seen
+        error = np.where(update, y - level, 0.0)
+        sse += error ** 2
+        fitted += update
+        level = np.where(update, level + alphas * error, level)
+        level = np.where(valid & ~seen, y, level)
+        seen |= valid
+
+    best = _best(sse, fitted)
+    rows = np.arange(n)
+    alpha = SES_ALPHAS[best]
+    sigma = np.sqrt(sse[rows, best] / np.maximum(fitted[:, 0], 1))
+    steps = np.arange(horizon)[None, :]
+    # Var of the h-step error: sigma^2 * (1 + (h - 1) * alpha^2)
+    scale = np.sqrt(1 + steps * alpha[:, None] ** 2)
+    return np.repeat(level[rows, best][:, None], horizon, axis=1), sigma, scale
+
+
+def damped_trend(Y, horizon):
+    """
+    Additive damped trend (Gardner-McKenzie) with (alpha, beta, phi) picked per series from
+    DAMPED_PARAMS. Level and trend start from the first two observations. Same return as ses().
+    """
+    n, periods = Y.shape
+    alpha, beta, phi = (DAMPED_PARAMS[:, i][None, :] for i in range(3))
+    k = DAMPED_PARAMS.shape[0]
+    level = np.zeros((n, k))
+    trend = np.zeros((n, k))
+    sse = np.zeros((n, k))
+    fitted = np.zeros((n, 1))
+    seen = np.zeros((n, 1), dtype=int)
+    for t in range(periods):
+        y = Y[:, t:t + 1]
+        valid = ~np.isnan(y)
+        update = valid & (seen >= 2)
+        forecast = level + phi * trend
+        error = np.where(update, y - forecast, 0.0)
+        sse += error ** 2
+        fitted += update
+        new_level = np.where(update, forecast + alpha * error, level)
+        trend = np.where(update, phi * trend + alpha * beta * error, trend)
+        # Second observation: initial trend; first observation: initial level
+        second = valid & (seen == 1)
+        trend = np.where(second, y - level, trend)
+        new_level = np.where(second | (valid & (seen == 0)), y, new_level)
+        level = new_level
+        seen += valid
+
+    best = _best(sse, fitted)
+    rows = np.arange(n)
+    phi_best = DAMPED_PARAMS[best, 2][:, None]
+    steps = np.arange(1, horizon + 1)[None, :]
+    damping = np.cumsum(phi_best ** steps, axis=1)
+    forecasts = level[rows, best][:, None] + damping * trend[rows, best][:, None]
+    sigma = np.sqrt(sse[rows, best] / np.maximum(fitted[:, 0], 1))
+    # Approximation: error variance growing linearly with the horizon
+    return forecasts, sigma, np.sqrt(steps).repeat(n, axis=0)
+
+
+def seasonal_naive(Y, horizon, season):
+    """Repeats the last `season` observations (the last value when season is 1). Same return as ses()."""
+    n, periods = Y.shape
+    season = max(1, min(season, periods))
+    last = Y[:, periods - season:]
+    steps = np.arange(horizon)
+    forecasts = last[:, steps % season]
+    differences = Y[:, season:] - Y[:, :-season] if periods > season else np.full((n, 1), np.nan)
+    counts = np.sum(~np.isnan(differences), axis=1)
+    sigma = np.sqrt(np.nansum(differences ** 2, axis=1) / np.maximum(counts, 1))
+    scale = np.sqrt(steps // season + 1)[None, :].repeat(n, axis=0)
+    return forecasts, sigma, scale
+
+
+def run_model(model, Y, horizon, season):
+    if model == 'ses':
+        return ses(Y, horizon)
+    if model == 'damped_trend':
+        return damped_trend(Y, horizon)
+    return seasonal_naive(Y, horizon, season)
+
+
+def min_observations(model, season):
+    return {'ses': 2, 'damped_trend': 4, 'seasonal_naive': season + 1}[model]
+
+
+def smape(actual, forecast):
+    """Symmetric mean absolute percentage error per series, in percent (NaN where nothing to compare)."""
+    denominator = np.abs(actual) + np.abs(forecast)
+    ratio = np.where(denominator > 0, 2 * np.abs(actual - forecast) / np.where(denominator > 0, denominator, 1), 0.0)
+    ratio = np.where(np.isnan(actual) | np.isnan(forecast), np.nan, ratio)
+    with np.errstate(invalid='ignore'):
+        return 100 * np.nanmean(ratio, axis=1)
+
+
+def forecast_batch(Y, horizon, season, holdout, z=1.96):
+    """
+    Backtests every model on Y without its last `holdout` periods, picks the model with the
+    lowest sMAPE per series and forecasts `horizon` periods from the full history with it.
+    Series too short for any backtest fall back to SES. Returns a dict of arrays:
+    model (n,) indexes into MODELS, errors (n, len(MODELS)), forecast / lower / upper (n, horizon).
+    """
+    n = Y.shape[0]
+    train, actual = Y[:, :-holdout], Y[:, -holdout:]
+    train_obs = observations(train)
+    errors = np.full((n, len(MODELS)), np.nan)
+    for i, model in enumerate(MODELS):
+        usable = train_obs >= min_observations(model, season)
+        if usable.any():
+            backtest, _, _ = run_model(model, train[usable], holdout, season)
+            errors[usable, i] = smape(actual[usable], backtest)
+
+    with np.errstate(invalid='ignore'):
+        chosen = np.argmin(np.where(np.isnan(errors), np.inf, errors), axis=1)
+    chosen = np.where(np.isnan(errors).all(axis=1), MODELS.index('ses'), chosen)
+
+    forecast = np.zeros((n, horizon))
+    width = np.zeros((n, horizon))
+    for i, model in enumerate(MODELS):
+        rows = chosen == i
+        if rows.any():
+            points, sigma, scale = run_model(model, Y[rows], horizon, season)
+            forecast[rows] = points
+            width[rows] = z * sigma[:, None] * scale
+    # Balances cannot go below zero
+    return {
+        'model': chosen,
+        'errors': errors,
+        'forecast': np.maximum(forecast, 0),
+        'lower': np.maximum(forecast - width, 0),
+        'upper': np.maximum(forecast + width, 0),
+    }
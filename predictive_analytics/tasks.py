@@ -0,0 +1,42 @@
+"""
+Background job handlers of the predictive_analytics app (see data_management.jobs).
+"""
+from data_management.jobs import job_handler, progress_callback, report_progress
+from .budget_risk import score_lines, train_model
+from .forecasting import run_aum_forecasts
+from .pin_model import run_pin_model
+
+
+@job_handler('forecast_aum')
+def forecast_aum(job):
+    """Runs the AUM forecaster for every fund (the nightly `manage.py forecast_aum`, on demand)."""
+    report_progress(job, 0, message='Loading fund histories')
+    run = run_aum_forecasts(user=job.created_by, progress=progress_callback(job, 'Forecasting funds'))
+    report_progress(job, run.fund_count, run.fund_count, 'Done')
+    return {'run_id': run.pk, 'fund_count': run.fund_count, 'skipped_count': run.skipped_count}
+
+
+@job_handler('pin_model')
+def pin_model(job):
+    """Fits the PIN activity model and projects every RSA fund (the nightly `manage.py model_pin_activity`)."""
+    report_progress(job, 0, message='Loading PIN histories')
+    run = run_pin_model(user=job.created_by, progress=progress_callback(job, 'Fitting PIN transition rates'))
+    report_progress(job, run.fund_count, run.fund_count, 'Done')
+    return {'run_id': run.pk, 'fund_count': run.fund_count, 'skipped_count': run.skipped_count}
+
+
+@job_handler('train_budget_risk')
+def train_budget_risk(job):
+    """Retrains the budget rework-risk model and rescores the pending queue (`manage.py train_budget_risk`)."""
+    report_progress(job, 0, message='Computing features')
+    model = train_model(user=job.created_by, progress=progress_callback(job))
+    scored = score_lines(progress=progress_callback(job, 'Scoring pending lines'))
+    report_progress(job, scored, scored, 'Done')
+    return {'version': model['version'], 'training_lines': model['training_lines'], 'scored': scored, 'auc': model['auc']}
+
+
+@job_handler('score_budget_risk')
+def score_budget_risk(job, ids=None):
+    """Scores the given pending budget lines (the whole queue when ids is None) with the saved model."""
+    scored = score_lines(ids=ids, progress=progress_callback(job, 'Scoring pending lines'))
+    return {'scored': scored}
@@ -1,3 +1,233 @@
-from django.test import TestCase
+import os
+import tempfile
+from unittest import mock
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from budget_input.models import BudgetTransaction
+from setup.models import Department, GLAccount, Location, State
+from . import artifacts
+from .artifacts import activate_artifact, artifact_directory, load_artifact, prune_artifacts, save_artifact
+from .budget_risk import (
+    FEATURES, _line_arrays, LINE_FIELDS, auc, feature_matrix, fit_logistic, load_feature_tables, train_model,
+)
+from .models import ModelArtifact
+from .pin_model import _matrices, fit_transition_rates, project_states, transition_matrices
+from .smoothing import MODELS, damped_trend, forecast_batch, seasonal_naive, ses
 
-# Create your tests here.
+
+class LogisticModelTests(TestCase):
+    def test_fit_recovers_weights(self):
+        rng = np.random.default_rng(3)
+        X = rng.normal(size=(4000, 2))
+        y = (rng.random(4000) < 1 / (1 + np.exp(-(0.5 + 2 * X[:, 0] - X[:, 1])))).astype(float)
+        weights = fit_logistic(X, y, l2=0.0)
+        np.testing.assert_allclose(weights, [0.5, 2.0, -1.0], atol=0.2)
+
+    def test_auc(self):
+        self.assertEqual(auc(np.array([0., 0., 1., 1.]), np.array([0.1, 0.2, 0.3, 0.4])), 1.0)
+        self.assertEqual(auc(np.array([0., 1.]), np.array([0.5, 0.5])), 0.5)
+        self.assertIsNone(auc(np.array([1., 1.]), np.array([0.1, 0.2])))
+
+
+class BudgetRiskFeatureTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('submitter')
+        self.department = Department.objects.create(name='Finance')
+        self.location = Location.objects.create(name='Head Office', state=State.objects.create(name='Lagos'))
+        self.accounts = [
+            GLAccount.objects.create(
+                gl_account_code=f'610{i}', gl_account_name=f'Expense {i}', category='Opex',
+                financial_statement='Income Statement', account_type='Expense', normal_balance='Debit',
+            )
+            for i in range(4)
+        ]
+
+    def add_lines(self, rejected, justified=None):
+        rng = np.random.default_rng(11)
+        BudgetTransaction.objects.bulk_create([
+            BudgetTransaction(
+                budget_year=2025, transaction_type='OPEX', department=self.department,
+                gl_account=self.accounts[i % len(self.accounts)], location=self.location, description=f'Line {i}',
+                annual_amount=float(rng.integers(1, 100)) * 1000, monthly_amount=0, submitted_by=self.user,
+                justification='Needed' if justified is None or justified[i] else '',
+                status='Rejected' if outcome else 'Approved',
+            )
+            for i, outcome in enumerate(rejected)
+        ])
+
+    def training_features(self):
+        lines = _line_arrays(list(
+            BudgetTransaction.objects.order_by('submission_date', 'pk').values_list(*LINE_FIELDS)
+        ))
+        return lines['rejected'], feature_matrix(lines, load_feature_tables(10), sequential=True)
+
+    def test_random_outcomes_carry_no_signal(self):
+        self.add_lines(np.random.default_rng(5).random(600) < 0.3)
+        y, X = self.training_features()
+        for name in ('department_rejection_rate', 'submitter_rejection_rate', 'account_rejection_rate'):
+            self.assertAlmostEqual(auc(y, X[:, FEATURES.index(name)]), 0.5, delta=0.1, msg=name)
+
+        with override_settings(MODEL_ARTIFACTS={'ROOT': tempfile.mkdtemp()}):
+            model = train_model()
+        self.assertAlmostEqual(model['auc'], 0.5, delta=0.1)
+
+    def test_rates_use_only_earlier_lines(self):
+        self.add_lines([True, False, False, True])
+        y, X = self.training_features()
+        rate = X[:, FEATURES.index('submitter_rejection_rate')]
+        # The first line has no history (overall rate); then up after a rejection, down after an approval
+        self.assertEqual(rate[0], 0.5)
+        self.assertGreater(rate[1], rate[0])
+        self.assertLess(rate[2], rate[1])
+
+    def test_learns_a_real_signal(self):
+        rng = np.random.default_rng(8)
+        justified = rng.random(400) < 0.5
+        self.add_lines(rng.random(400) < np.where(justified, 0.1, 0.6), justified)
+        with override_settings(MODEL_ARTIFACTS={'ROOT': tempfile.mkdtemp()}):
+            model = train_model()
+        self.assertGreater(model['auc'], 0.7)
+        self.assertGreater(model['weights'][1 + FEATURES.index('no_justification')], 0)
+
+
+def simulate_fund(rates, periods=10, start=(4000.0, 5000.0, 1000.0), enrolments=300.0):
+    """Expected PIN head counts of a fund following the Markov chain with `rates` exactly."""
+    a, d, r, c = (rates[k] for k in ('activation', 'deactivation', 'reactivation', 'churn'))
+    never_funded, active, dormant = start
+    series = {'dates': [], 'total': [], 'active': [], 'never_funded': [], 'enrolments': []}
+    for period in range(periods):
+        series['dates'].append(period)
+        series['total'].append(never_funded + active + dormant)
+        series['active'].append(active)
+        series['never_funded'].append(never_funded)
+        series['enrolments'].append(enrolments if period else 0.0)
+        never_funded, active, dormant = (
+            never_funded * (1 - c) * (1 - a) + enrolments,
+            (1 - c) * (active * (1 - d) + never_funded * a + dormant * r),
+            (1 - c) * (dormant * (1 - r) + active * d),
+        )
+    return series
+
+
+class PINModelTests(TestCase):
+    RATES = [
+        {'activation': 0.2, 'deactivation': 0.05, 'reactivation': 0.1, 'churn': 0.01},
+        {'activation': 0.35, 'deactivation': 0.12, 'reactivation': 0.03, 'churn': 0.02},
+    ]
+
+    def test_fit_recovers_transition_rates(self):
+        columns = _matrices([simulate_fund(rates, start=start) for rates, start in zip(
+            self.RATES, [(4000.0, 5000.0, 1000.0), (1000.0, 2000.0, 3000.0)],
+        )])
+        fitted, pooled = fit_transition_rates(columns, prior_periods=0)
+        for row, rates in enumerate(self.RATES):
+            for name, value in rates.items():
+                self.assertAlmostEqual(fitted[name][row], value, places=4, msg=name)
+        self.assertLess(np.nanmax(fitted['fit_error']), 0.01)
+
+    def test_projection_conserves_pins(self):
+        rates = {name: np.array([value]) for name, value in self.RATES[0].items()}
+        matrices = transition_matrices(rates)
+        np.testing.assert_allclose(matrices.sum(axis=2), 1.0)
+        start = np.array([[4000.0, 5000.0, 1000.0]])
+        states = project_states(start, matrices, np.array([300.0]), horizon=3)
+        # Each period: the survivors of the previous total plus the new enrolments
+        expected = 10000.0
+        for step in range(3):
+            expected = expected * (1 - 0.01) + 300.0
+            self.assertAlmostEqual(states[0, step].sum(), expected, places=6)
+
+
+def left_padded(*series):
+    """Right-aligned batch matrix of `series`, NaN-padded on the left."""
+    periods = max(len(values) for values in series)
+    Y = np.full((len(series), periods), np.nan)
+    for row, values in enumerate(series):
+        Y[row, periods - len(values):] = values
+    return Y
+
+
+class SmoothingTests(TestCase):
+    def test_ses_on_a_constant_series(self):
+        forecasts, sigma, scale = ses(left_padded([50.0] * 12, [50.0] * 3), horizon=4)
+        np.testing.assert_allclose(forecasts, 50.0)
+        np.testing.assert_allclose(sigma, 0.0)
+        self.assertEqual(scale.shape, (2, 4))
+
+    def test_damped_trend_on_a_linear_series(self):
+        forecasts, sigma, _ = damped_trend(left_padded(np.arange(10.0, 130.0, 10.0)), horizon=6)
+        # Damping lags a straight line a little; the least damped candidates fit it best
+        self.assertLess(sigma[0], 1.0)
+        self.assertGreater(forecasts[0, 0], 125.0)
+        # Keeps rising, by at most the historical slope and less each step
+        steps = np.diff(forecasts[0])
+        self.assertTrue(((steps > 0) & (steps <= 10.0)).all())
+        self.assertTrue((np.diff(steps) < 0).all())
+
+    def test_seasonal_naive_on_a_periodic_series(self):
+        pattern = [10.0, 20.0, 30.0, 40.0]
+        forecasts, sigma, _ = seasonal_naive(left_padded(pattern * 5), horizon=6, season=4)
+        np.testing.assert_allclose(forecasts[0], pattern + pattern[:2])
+        self.assertAlmostEqual(sigma[0], 0.0)
+
+    def test_mixed_length_batch(self):
+        periodic = [10.0, 20.0, 30.0, 40.0] * 6
+        constant = [75.0] * 6
+        short = [5.0, 6.0, 7.0]
+        result = forecast_batch(left_padded(periodic, constant, short), horizon=4, season=4, holdout=4)
+        self.assertEqual([MODELS[model] for model in result['model']], ['seasonal_naive', 'ses', 'ses'])
+        np.testing.assert_allclose(result['forecast'][0], [10.0, 20.0, 30.0, 40.0])
+        np.testing.assert_allclose(result['forecast'][1], 75.0)
+        # Too short to backtest: no errors, SES fallback
+        self.assertTrue(np.isnan(result['errors'][2]).all())
+        self.assertTrue((5.0 <= result['forecast'][2]).all() and (result['forecast'][2] <= 7.0).all())
+        self.assertTrue((result['lower'] <= result['forecast']).all() and (result['forecast'] <= result['upper']).all())
+
+        # The padding does not leak into a series' own forecast
+        alone = forecast_batch(left_padded(constant), horizon=4, season=4, holdout=4)
+        np.testing.assert_allclose(alone['forecast'][0], result['forecast'][1])
+
+
+class ModelArtifactTests(TestCase):
+    def setUp(self):
+        overrides = override_settings(MODEL_ARTIFACTS={'ROOT': tempfile.mkdtemp(), 'CHECK_INTERVAL': 60})
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        artifacts._cache.clear()
+        self.addCleanup(artifacts._cache.clear)
+
+    def save(self, value):
+        return save_artifact('model', {'weights': np.full(3, float(value))}, {'value': value})
+
+    def test_version_switch_is_picked_up_after_the_check_interval(self):
+        self.save(1)
+        self.save(2)
+        self.assertEqual(load_artifact('model').version, 2)
+        # Another process activates version 1: this one keeps its cached version until the next check
+        ModelArtifact.objects.update(is_active=False)
+        ModelArtifact.objects.filter(version=1).update(is_active=True)
+        self.assertEqual(load_artifact('model').version, 2)
+        with mock.patch.object(artifacts.time, 'monotonic', return_value=artifacts.time.monotonic() + 61):
+            loaded = load_artifact('model')
+        self.assertEqual((loaded.version, loaded.metadata), (1, {'value': 1}))
+        np.testing.assert_array_equal(loaded['weights'], [1.0, 1.0, 1.0])
+
+        # A switch in this process applies at once
+        activate_artifact('model', 2)
+        self.assertEqual(load_artifact('model').version, 2)
+
+    def test_tampered_files_are_rejected(self):
+        record = self.save(1)
+        np.save(os.path.join(artifact_directory('model', record.version), 'weights.npy'), np.zeros(3))
+        with self.assertRaises(ValueError):
+            load_artifact('model')
+
+    def test_pruning_keeps_the_active_version(self):
+        for value in range(1, 5):
+            self.save(value)
+        activate_artifact('model', 1)
+        self.assertEqual(prune_artifacts('model', 1), 2)
+        self.assertEqual(sorted(ModelArtifact.objects.values_list('version', 'is_active')), [(1, True), (4, False)])
+        self.assertFalse(os.path.exists(artifact_directory('model', 2)))
+        self.assertEqual(load_artifact('model').version, 1)
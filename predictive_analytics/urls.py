@@ -10,6 +10,12 @@ urlpatterns = [
     
     # Sub-modules
     path('financial_forecasting/', views.financial_forecasting_view, name='financial_forecasting'),
+    path('financial_forecasting/refresh/', views.refresh_forecasts_view, name='refresh_forecasts'),
     path('budget_management/', views.budget_management_view, name='budget_management'),
+    path('budget_management/refresh/', views.refresh_budget_risk_view, name='refresh_budget_risk'),
     path('customer_insight/', views.customer_insight_view, name='customer_insight'),
+    path('customer_insight/refresh/', views.refresh_pin_model_view, name='refresh_pin_model'),
+
+    # Model artifact cache instrumentation
+    path('artifacts/stats/', views.artifact_stats_view, name='artifact_stats'),
 ]
\ No newline at end of file
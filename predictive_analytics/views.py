@@ -1,6 +1,26 @@
 # predictive_analytics/views.py
-from django.shortcuts import render
+import os
+from django.core.exceptions import PermissionDenied
+from django.http import JsonResponse
+from django.shortcuts import render, redirect
+from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import require_POST
+from django.db.models import Avg, Count, Q, Sum
+from budget_input.models import BudgetTransaction
+from data_management.jobs import enqueue
+from data_management.models import JOB_SUCCEEDED, JOB_FAILED
+from setup.models import Department, RSAFundHistorical
+from .artifacts import cache_stats
+from .budget_risk import FEATURE_LABELS, PENDING_STATUSES, get_budget_risk_config, load_model
+from .forecasting import HISTORY_SOURCES, latest_run
+from .models import AUMForecast, BudgetRiskScore, ModelArtifact
+from .pin_model import latest_pin_run
+
+# Actual periods shown before the forecast / projection on the fund charts
+HISTORY_POINTS = 36
+# Highest-risk pending lines listed on the budget management page
+RISK_LINES_SHOWN = 200
 
 # Define URLs for the three sub-modules:
 # 1. Financial Forecasting
@@ -23,15 +43,199 @@ def analytics_index_view(request):
 
 @login_required
 def financial_forecasting_view(request):
-    # Placeholder for AUM/Revenue ML model output
-    return render(request, 'predictive_analytics/financial_forecasting.html')
+    """AUM forecasts per fund from the latest forecaster run (see predictive_analytics.forecasting)."""
+    run = latest_run()
+    fund_type = request.GET.get('fund_type', '')
+    forecasts = run.forecasts.all() if run else AUMForecast.objects.none()
+    if fund_type in HISTORY_SOURCES:
+        forecasts = forecasts.filter(fund_type=fund_type)
+    forecasts = list(forecasts)
+
+    selected = None
+    if forecasts:
+        selected_id = request.GET.get('fund')
+        selected = next((f for f in forecasts if str(f.pk) == selected_id), forecasts[0])
+
+    chart = None
+    if selected:
+        history_model, fund_field, _ = HISTORY_SOURCES[selected.fund_type]
+        history = list(
+            history_model.objects.filter(**{fund_field: selected.fund_id})
+            .order_by('-period_end_date')
+            .values_list('period_end_date', 'aum_closing_balance')[:HISTORY_POINTS]
+        )[::-1]
+        chart = {
+            'fund': selected.fund_name,
+            'labels': [d.isoformat() for d, _ in history] + [p['date'] for p in selected.points],
+            'actual': [float(v) for _, v in history] + [None] * len(selected.points),
+            # The forecast line starts at the last actual so the two lines join
+            'forecast': [None] * (len(history) - 1) + [float(selected.last_actual)] + [p['forecast'] for p in selected.points],
+            'lower': [None] * len(history) + [p['lower'] for p in selected.points],
+            'upper': [None] * len(history) + [p['upper'] for p in selected.points],
+        }
+
+    context = {
+        'run': run,
+        'forecasts': forecasts,
+        'selected': selected,
+        'chart': chart,
+        'fund_type': fund_type,
+        'total_actual': sum(f.last_actual for f in forecasts),
+        'total_forecast': sum(f.points[-1]['forecast'] for f in forecasts if f.points),
+    }
+    return render(request, 'predictive_analytics/financial_forecasting.html', context)
+
+
+@login_required
+@require_POST
+def refresh_forecasts_view(request):
+    """Queues a forecaster run (normally run nightly by `manage.py forecast_aum`)."""
+    job = enqueue('forecast_aum', user=request.user, label='AUM forecasts')
+    if job.status == JOB_SUCCEEDED:
+        messages.success(request, f"Forecasts refreshed for {job.result['fund_count']} funds.")
+    elif job.status == JOB_FAILED:
+        messages.error(request, f"Forecasting failed. {job.error}")
+    else:
+        messages.info(request, f"Forecast refresh queued as job #{job.pk}.")
+    return redirect('predictive_analytics:financial_forecasting')
 
 @login_required
 def budget_management_view(request):
-    # Placeholder for Variance/Rework Prediction ML model output
-    return render(request, 'predictive_analytics/budget_management.html')
+    """Pending budget lines ranked by rework risk (see predictive_analytics.budget_risk)."""
+    high_risk = get_budget_risk_config()['HIGH_RISK']
+    scores = BudgetRiskScore.objects.all()
+    department_id = request.GET.get('department', '')
+    if department_id.isdigit():
+        scores = scores.filter(transaction__department_id=department_id)
+    if request.GET.get('flagged'):
+        scores = scores.filter(risk__gte=high_risk)
+
+    summary = scores.aggregate(
+        lines=Count('pk'),
+        flagged=Count('pk', filter=Q(risk__gte=high_risk)),
+        flagged_amount=Sum('transaction__annual_amount', filter=Q(risk__gte=high_risk)),
+        average_risk=Avg('risk'),
+    )
+    by_department = list(
+        BudgetRiskScore.objects.values('transaction__department__name')
+        .annotate(lines=Count('pk'), flagged=Count('pk', filter=Q(risk__gte=high_risk)), average_risk=Avg('risk'))
+        .order_by('-average_risk')
+    )
+    top = list(
+        scores.select_related('transaction__department', 'transaction__gl_account', 'transaction__submitted_by')
+        .order_by('-risk')[:RISK_LINES_SHOWN]
+    )
+    for score in top:
+        score.factor_label = FEATURE_LABELS.get(score.top_factor, score.top_factor)
+
+    context = {
+        'model': load_model(),
+        'pending_count': BudgetTransaction.objects.filter(status__in=PENDING_STATUSES).count(),
+        'summary': summary,
+        'scores': top,
+        'shown': RISK_LINES_SHOWN,
+        'high_risk': high_risk,
+        'departments': Department.objects.filter(is_active=True),
+        'department_id': department_id,
+        'flagged': bool(request.GET.get('flagged')),
+        'chart': {
+            'labels': [row['transaction__department__name'] for row in by_department],
+            'average_risk': [round(row['average_risk'] * 100, 1) for row in by_department],
+            'flagged': [row['flagged'] for row in by_department],
+        },
+    }
+    return render(request, 'predictive_analytics/budget_management.html', context)
+
+
+@login_required
+@require_POST
+def refresh_budget_risk_view(request):
+    """Queues a retrain and full rescoring (normally run nightly by `manage.py train_budget_risk`)."""
+    job = enqueue('train_budget_risk', user=request.user, label='Budget rework-risk model')
+    if job.status == JOB_SUCCEEDED:
+        messages.success(request, f"Risk model retrained; {job.result['scored']} pending lines scored.")
+    elif job.status == JOB_FAILED:
+        messages.error(request, f"Risk model training failed. {job.error}")
+    else:
+        messages.info(request, f"Risk model retraining queued as job #{job.pk}.")
+    return redirect('predictive_analytics:budget_management')
 
 @login_required
 def customer_insight_view(request):
-    # Placeholder for PIN Churn/Migration ML model output
-    return render(request, 'predictive_analytics/customer_insight.html')
\ No newline at end of file
+    """PIN transition rates and projected PIN states per RSA fund from the latest PIN model run."""
+    run = latest_pin_run()
+    projections = list(run.projections.select_related('rsa_fund')) if run else []
+    for projection in projections:
+        projection.percentages = {
+            rate: getattr(projection, f'{rate}_rate') * 100
+            for rate in ('activation', 'deactivation', 'reactivation', 'churn')
+        }
+
+    selected = None
+    if projections:
+        selected_id = request.GET.get('fund')
+        selected = next((p for p in projections if str(p.pk) == selected_id), projections[0])
+
+    chart = None
+    if selected:
+        history = list(
+            RSAFundHistorical.objects.filter(rsa_fund_id=selected.rsa_fund_id)
+            .order_by('-period_end_date')
+            .values_list('period_end_date', 'total_pins', 'active_pins', 'never_funded_pins')[:HISTORY_POINTS]
+        )[::-1]
+        actual = len(history)
+        chart = {
+            'fund': selected.rsa_fund.name,
+            'labels': [d.isoformat() for d, *_ in history] + [p['date'] for p in selected.points],
+            'actual': actual,
+            'total': [t for _, t, _, _ in history] + [p['total'] for p in selected.points],
+            'active': [a for _, _, a, _ in history] + [p['active'] for p in selected.points],
+            'never_funded': [n for _, _, _, n in history] + [p['never_funded'] for p in selected.points],
+        }
+
+    context = {
+        'run': run,
+        'projections': projections,
+        'selected': selected,
+        'chart': chart,
+        'total_pins': sum(p.last_total for p in projections),
+        'active_pins': sum(p.last_active for p in projections),
+        'projected_total': sum(p.points[-1]['total'] for p in projections if p.points),
+        'projected_active': sum(p.points[-1]['active'] for p in projections if p.points),
+    }
+    return render(request, 'predictive_analytics/customer_insight.html', context)
+
+
+@login_required
+@require_POST
+def refresh_pin_model_view(request):
+    """Queues a PIN model run (normally run nightly by `manage.py model_pin_activity`)."""
+    job = enqueue('pin_model', user=request.user, label='PIN activity model')
+    if job.status == JOB_SUCCEEDED:
+        messages.success(request, f"PIN projections refreshed for {job.result['fund_count']} funds.")
+    elif job.status == JOB_FAILED:
+        messages.error(request, f"PIN modelling failed. {job.error}")
+    else:
+        messages.info(request, f"PIN model refresh queued as job #{job.pk}.")
+    return redirect('predictive_analytics:customer_insight')
+
+
+@login_required
+def artifact_stats_view(request):
+    """Staff only: the registered model versions and this process's artifact cache (cold starts, hits) as JSON."""
+    if not request.user.is_staff:
+        raise PermissionDenied
+    return JsonResponse({
+        'pid': os.getpid(),
+        'cache': cache_stats(),
+        'artifacts': [
+            {
+                'name': record.name,
+                'version': record.version,
+                'is_active': record.is_active,
+                'size_bytes': record.size_bytes,
+                'created_at': record.created_at.isoformat(),
+            }
+            for record in ModelArtifact.objects.all()
+        ],
+    })
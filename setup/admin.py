@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import RSAFund, State, Location, Region, ManagedFund, DateDetail
+from .models import RSAFund, State, Location, Region, ManagedFund, DateDetail, ExchangeRate, IntercompanyAccountPair, LocationRegionMap, CostCenter
 
 @admin.register(RSAFund)
 class RSAFundAdmin(admin.ModelAdmin):
@@ -24,6 +24,19 @@ class RegionAdmin(admin.ModelAdmin):
     filter_horizontal = ('states', 'locations')
     search_fields = ('name',)
 
+@admin.register(LocationRegionMap)
+class LocationRegionMapAdmin(admin.ModelAdmin):
+    # Derived from the Region M2M tables by setup.signals, never edited by hand
+    list_display = ('region', 'state', 'location', 'via_state')
+    list_filter = ('region', 'via_state')
+    search_fields = ('location__name', 'state__name', 'region__name')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
 @admin.register(ManagedFund)
 class ManagedFundAdmin(admin.ModelAdmin):
     list_display = ('name', 'created_at')
@@ -31,8 +44,28 @@ class ManagedFundAdmin(admin.ModelAdmin):
 
 @admin.register(DateDetail)
 class DateDetailAdmin(admin.ModelAdmin):
-    list_display = ('date', 'month', 'quarter', 'half_year', 'year')
-    list_filter = ('year', 'quarter', 'half_year')
+    list_display = ('date', 'month', 'quarter', 'half_year', 'year', 'fiscal_year', 'fiscal_quarter', 'fiscal_period')
+    list_filter = ('year', 'quarter', 'half_year', 'fiscal_year')
     search_fields = ('date',)
     ordering = ('date',)
-    readonly_fields = ('month', 'quarter', 'half_year', 'year')
\ No newline at end of file
+    readonly_fields = ('month', 'quarter', 'half_year', 'year', 'fiscal_year', 'fiscal_quarter', 'fiscal_period')
+
+@admin.register(ExchangeRate)
+class ExchangeRateAdmin(admin.ModelAdmin):
+    list_display = ('currency_code', 'rate_date', 'rate', 'updated_at')
+    list_filter = ('currency_code',)
+    search_fields = ('currency_code',)
+    ordering = ('currency_code', '-rate_date')
+
+@admin.register(IntercompanyAccountPair)
+class IntercompanyAccountPairAdmin(admin.ModelAdmin):
+    list_display = ('name', 'debit_account', 'credit_account', 'is_active', 'updated_at')
+    list_filter = ('is_active',)
+    search_fields = ('name', 'debit_account__gl_account_code', 'credit_account__gl_account_code')
+
+
+@admin.register(CostCenter)
+class CostCenterAdmin(admin.ModelAdmin):
+    list_display = ('code', 'name', 'department', 'updated_at')
+    list_filter = ('department',)
+    search_fields = ('code', 'name', 'department__name')
@@ -3,4 +3,7 @@ from django.apps import AppConfig
 class SetupConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'setup'
-    verbose_name = 'Budget Setup Records'
\ No newline at end of file
+    verbose_name = 'Budget Setup Records'
+
+    def ready(self):
+        from . import signals  # noqa: F401
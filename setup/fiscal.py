@@ -0,0 +1,103 @@
+import datetime
+from django.conf import settings
+
+# Supported fiscal period layouts.
+# 'monthly' follows calendar months from the configured start month.
+# '4-4-5' / '4-5-4' are week-based retail calendars (weeks per period within each quarter).
+PERIOD_PATTERNS = {
+    'monthly': None,
+    '4-4-5': (4, 4, 5),
+    '4-5-4': (4, 5, 4),
+}
+
+DEFAULT_FISCAL_CALENDAR = {
+    'START_MONTH': 1,
+    'PERIOD_PATTERN': 'monthly',
+}
+
+
+def get_fiscal_config(start_month=None, period_pattern=None):
+    """
+    Returns the active fiscal calendar configuration (settings.FISCAL_CALENDAR),
+    optionally overridden by explicit arguments (used by the recompute command).
+    """
+    config = dict(DEFAULT_FISCAL_CALENDAR)
+    config.update(getattr(settings, 'FISCAL_CALENDAR', {}))
+    if start_month is not None:
+        config['START_MONTH'] = start_month
+    if period_pattern is not None:
+        config['PERIOD_PATTERN'] = period_pattern
+
+    if config['PERIOD_PATTERN'] not in PERIOD_PATTERNS:
+        raise ValueError(f"Unknown fiscal period pattern '{config['PERIOD_PATTERN']}'. Use one of: {', '.join(PERIOD_PATTERNS)}.")
+    if not 1 <= int(config['START_MONTH']) <= 12:
+        raise ValueError("Fiscal START_MONTH must be between 1 and 12.")
+    config['START_MONTH'] = int(config['START_MONTH'])
+    return config
+
+
+def fiscal_year_start(fiscal_year, config):
+    """
+    First day of the given fiscal year. Fiscal years are named after the calendar year
+    in which they start (e.g. an April start gives FY2024 = Apr 2024 - Mar 2025).
+    Week-based patterns start on the Monday closest to the 1st of the start month.
+    """
+    nominal_start = datetime.date(fiscal_year, config['START_MONTH'], 1)
+    if PERIOD_PATTERNS[config['PERIOD_PATTERN']] is None:
+        return nominal_start
+
+    offset = nominal_start.weekday()  # Monday = 0
+    if offset <= 3:
+        return nominal_start - datetime.timedelta(days=offset)
+    return nominal_start + datetime.timedelta(days=7 - offset)
+
+
+def fiscal_periods(fiscal_year, config):
+    """
+    Returns the 12 periods of a fiscal year as (period, quarter, start_date, end_date) tuples.
+    For week-based patterns the 53rd week (when it occurs) is added to period 12.
+    """
+    weeks_pattern = PERIOD_PATTERNS[config['PERIOD_PATTERN']]
+    year_start = fiscal_year_start(fiscal_year, config)
+    next_year_start = fiscal_year_start(fiscal_year + 1, config)
+    periods = []
+
+    if weeks_pattern is None:
+        for index in range(12):
+            month_index = config['START_MONTH'] - 1 + index
+            start = datetime.date(fiscal_year + month_index // 12, month_index % 12 + 1, 1)
+            month_index += 1
+            end = datetime.date(fiscal_year + month_index // 12, month_index % 12 + 1, 1) - datetime.timedelta(days=1)
+            periods.append((index + 1, index // 3 + 1, start, end))
+        return periods
+
+    start = year_start
+    for index in range(12):
+        end = start + datetime.timedelta(weeks=weeks_pattern[index % 3]) - datetime.timedelta(days=1)
+        if index == 11:
+            # Absorb the 53rd week (if any) into the final period
+            end = next_year_start - datetime.timedelta(days=1)
+        periods.append((index + 1, index // 3 + 1, start, end))
+        start = end + datetime.timedelta(days=1)
+    return periods
+
+
+def fiscal_fields(d, config=None):
+    """Computes fiscal_year, fiscal_quarter and fiscal_period for a single date."""
+    config = config or get_fiscal_config()
+
+    fiscal_year = d.year
+    if d < fiscal_year_start(fiscal_year, config):
+        fiscal_year -= 1
+    elif d >= fiscal_year_start(fiscal_year + 1, config):
+        fiscal_year += 1
+
+    for period, quarter, start, end in fiscal_periods(fiscal_year, config):
+        if start <= d <= end:
+            return {
+                'fiscal_year': f"FY{fiscal_year}",
+                'fiscal_quarter': quarter,
+                'fiscal_period': period,
+            }
+    # Unreachable: fiscal_periods() covers the whole fiscal year
+    raise ValueError(f"Date {d} does not fall in fiscal year FY{fiscal_year}.")
@@ -95,7 +95,7 @@ class GLAccountForm(BaseSetupForm):
         fields = [
             'gl_account_code', 'gl_account_name', 'category', 'sub_category',
             'financial_statement', 'account_type', 'is_postable', 
-            'parent_account', 'normal_balance', 'active_flag'
+            'parent_account', 'normal_balance', 'cash_flow_category', 'active_flag'
         ]
         widgets = {
             'gl_account_code': forms.TextInput(attrs={'placeholder': 'e.g., GL100001'}),
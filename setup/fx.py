@@ -0,0 +1,168 @@
+"""
+Currency translation into the reporting (base) currency.
+
+Rates live in setup.ExchangeRate as "units of base currency per 1 unit of currency_code", one row
+per currency per date. A line is translated at the latest rate on or before its date, so weekend
+and holiday gaps in the rate file fall back to the previous business day.
+
+A line keeps its own exchange_rate. Closing-rate revaluation (post_revaluation) restates Balance
+Sheet foreign-currency balances with base-currency adjustment lines against the unrealised FX
+gain/loss account, each reversed the next day, so the ledger stays balanced and the next
+revaluation starts again from the historical translation.
+"""
+import bisect
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.utils import timezone
+
+CENT = Decimal('0.01')
+REVALUATION_SOURCE = 'FX Revaluation'
+
+DEFAULT_FX_REVALUATION = {
+    'GAIN_LOSS_ACCOUNT': '',
+}
+
+
+def base_currency():
+    return getattr(settings, 'BASE_CURRENCY', 'NGN')
+
+
+def get_revaluation_config():
+    config = dict(DEFAULT_FX_REVALUATION)
+    config.update(getattr(settings, 'FX_REVALUATION', {}))
+    return config
+
+
+def to_base(amount, rate):
+    """Base-currency amount, rounded to the 2 decimal places stored on GLTransaction."""
+    return (Decimal(amount) * Decimal(rate)).quantize(CENT)
+
+
+class RateBook:
+    """
+    In-memory copy of the rate table for the currencies of one import, for per-row lookups
+    without a query per line. Build it with RateBook.load(currencies).
+    """
+
+    def __init__(self, rates):
+        # {currency: ([rate_date, ...] ascending, [rate, ...])}
+        self.rates = rates
+
+    @classmethod
+    def load(cls, currencies=None):
+        from .models import ExchangeRate
+        qs = ExchangeRate.objects.order_by('currency_code', 'rate_date')
+        if currencies is not None:
+            qs = qs.filter(currency_code__in=currencies)
+        rates = defaultdict(lambda: ([], []))
+        for currency, rate_date, rate in qs.values_list('currency_code', 'rate_date', 'rate').iterator():
+            dates, values = rates[currency]
+            dates.append(rate_date)
+            values.append(rate)
+        return cls(dict(rates))
+
+    def rate_for(self, currency, on_date):
+        """Latest rate on or before on_date, 1 for the base currency, None when no rate is known."""
+        if currency == base_currency():
+            return Decimal('1')
+        dates, values = self.rates.get(currency, ((), ()))
+        i = bisect.bisect_right(dates, on_date)
+        return values[i - 1] if i else None
+
+
+def rate_subquery(date_ref, currency_ref='currency_code'):
+    """
+    Subquery for the latest ExchangeRate.rate on or before `date_ref`, for use in set-based
+    UPDATEs on GLTransaction. `date_ref` is an OuterRef or a date (closing-rate revaluation).
+    """
+    from .models import ExchangeRate
+    return Subquery(
+        ExchangeRate.objects.filter(currency_code=OuterRef(currency_ref), rate_date__lte=date_ref)
+        .order_by('-rate_date')
+        .values('rate')[:1]
+    )
+
+
+def revaluation_document(as_of):
+    """document_no shared by the adjustment and reversal lines of one revaluation date."""
+    return f'FXREV-{as_of:%Y%m%d}'
+
+
+def revaluation_adjustments(as_of, currencies=None):
+    """
+    Closing-rate differences of the Balance Sheet foreign-currency balances at `as_of`, per GL
+    account, currency, entity and cost center: (adjustments, currencies without a rate), where each
+    adjustment is (account, currency, entity, cost_center, rate, base amount to post; debit
+    positive). The carried base balance is the net ledger's historical translation; earlier
+    revaluations have reversed by then and later ones are dated after `as_of`.
+    """
+    from .models import GLTransaction
+    lines = GLTransaction.objects.net().exclude(currency_code=base_currency()).filter(
+        transaction_date__lte=as_of, gl_account_code__financial_statement='Balance Sheet',
+    )
+    if currencies:
+        lines = lines.filter(currency_code__in=currencies)
+    balances = (
+        lines.values_list('gl_account_code', 'currency_code', 'entity_code', 'cost_center_code')
+        .annotate(amount=Sum(F('debit') - F('credit')), carried=Sum(F('base_debit') - F('base_credit')))
+        .order_by('gl_account_code', 'currency_code', 'entity_code', 'cost_center_code')
+    )
+    book = RateBook.load(currencies)
+    adjustments, missing = [], set()
+    for account, currency, entity, cost_center, amount, carried in balances:
+        rate = book.rate_for(currency, as_of)
+        if rate is None:
+            missing.add(currency)
+            continue
+        difference = to_base(amount, rate) - carried
+        if difference:
+            adjustments.append((account, currency, entity, cost_center, rate, difference))
+    return adjustments, sorted(missing)
+
+
+def post_revaluation(as_of, gain_loss_account, currencies=None, user=None):
+    """
+    Posts the closing-rate revaluation at `as_of`: for every revaluation_adjustments() entry, the
+    adjustment on the balance's account and the opposite amount on `gain_loss_account`, dated
+    `as_of`, and both again reversed on the next day. A revaluation already posted for `as_of`
+    is replaced. Returns (adjustments posted, currencies without a rate).
+    """
+    from data_management.rollups import refresh_monthly_balances
+    from .models import DateDetail, GLTransaction
+    from .partitioning import ensure_partitions
+
+    reversal_date = as_of + datetime.timedelta(days=1)
+    document_no = revaluation_document(as_of)
+    dates = set(DateDetail.objects.filter(date__in=[as_of, reversal_date]).values_list('date', flat=True))
+    posted_date = timezone.now()
+
+    def line(account, date, amount, currency, entity, cost_center, description, reversal):
+        debit, credit = max(amount, Decimal(0)), max(-amount, Decimal(0))
+        return GLTransaction(
+            transaction_date=date, gl_account_code_id=account, date_detail_id=date if date in dates else None,
+            description=description, journal_type=REVALUATION_SOURCE, document_no=document_no,
+            reference_no=currency, entity_code=entity, cost_center_code=cost_center,
+            currency_code=base_currency(), exchange_rate=Decimal(1),
+            debit=debit, credit=credit, base_debit=debit, base_credit=credit,
+            posted_date=posted_date, user_posted_by=user, source_module=REVALUATION_SOURCE,
+            reversal_flag=reversal,
+        )
+
+    with transaction.atomic():
+        GLTransaction.objects.filter(source_module=REVALUATION_SOURCE, document_no=document_no).delete()
+        adjustments, missing = revaluation_adjustments(as_of, currencies)
+        lines = []
+        for account, currency, entity, cost_center, rate, amount in adjustments:
+            description = f'FX revaluation of {account} ({currency}) at {rate} on {as_of}'
+            for date, sign, reversal in ((as_of, 1, False), (reversal_date, -1, True)):
+                label = f'Reversal of {description}' if reversal else description
+                lines.append(line(account, date, amount * sign, currency, entity, cost_center, label, reversal))
+                lines.append(line(gain_loss_account, date, -amount * sign, currency, entity, cost_center, label, reversal))
+        ensure_partitions(as_of, reversal_date)
+        GLTransaction.objects.bulk_create(lines)
+        refresh_monthly_balances(as_of, reversal_date)
+    return len(adjustments), missing
@@ -0,0 +1,178 @@
+import re
+import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Sum, Count
+from setup.models import GLTransaction, FundTransaction, GLAccount, RSAFund
+
+# Indexes added by migrations 0009/0010. They are dropped inside a savepoint to capture the "before" plans.
+NEW_INDEXES = [
+    'gltrx_entity_date_idx',
+    'gltrx_costcenter_date_idx',
+    'gltrx_project_date_idx',
+    'gltrx_journal_date_idx',
+    'gltrx_net_acct_date_idx',
+    'gltrx_fx_currency_date_idx',
+    'gltrx_date_brin',
+    'fundtrx_rsa_date_idx',
+    'fundtrx_managed_date_idx',
+]
+
+BENCH_ACCOUNTS = 200
+BENCH_FUNDS = 10
+DATE_SPAN_DAYS = 4017  # 2015-01-01 .. 2025-12-31
+
+
+class Command(BaseCommand):
+    help = (
+        'Loads a synthetic GL (default 10M rows) inside a transaction, prints EXPLAIN ANALYZE plans '
+        'for the statement/fund queries with and without the 0009/0010 indexes, then rolls everything back. '
+        'PostgreSQL only. Run against a non-production database: the DROP INDEX step locks the tables.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10_000_000, help='Synthetic GL rows to generate.')
+        parser.add_argument('--fund-rows', type=int, default=None, help='Synthetic fund rows (default: rows / 10).')
+        parser.add_argument('--show-plans', action='store_true', help='Print the full plans, not just timings.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('benchmark_gl_indexes requires PostgreSQL (EXPLAIN ANALYZE, BRIN, transactional DDL).')
+
+        rows = options['rows']
+        fund_rows = options['fund_rows'] if options['fund_rows'] is not None else rows // 10
+
+        with transaction.atomic():
+            self.stdout.write(f"Generating {rows:,} GL rows and {fund_rows:,} fund rows...")
+            self._load_synthetic_data(rows, fund_rows)
+
+            queries = self._benchmark_queries()
+
+            after = {name: qs.explain(analyze=True, buffers=True) for name, qs in queries}
+
+            sid = transaction.savepoint()
+            with connection.cursor() as cursor:
+                for index_name in NEW_INDEXES:
+                    cursor.execute(f'DROP INDEX IF EXISTS {connection.ops.quote_name(index_name)}')
+            before = {name: qs.explain(analyze=True, buffers=True) for name, qs in queries}
+            transaction.savepoint_rollback(sid)
+
+            self._report(queries, before, after, options['show_plans'])
+
+            # Never keep the synthetic data
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('Benchmark complete. Synthetic data rolled back.'))
+
+    def _load_synthetic_data(self, rows, fund_rows):
+        GLAccount.objects.bulk_create([
+            GLAccount(
+                gl_account_code=f"BNCH{i:04d}",
+                gl_account_name=f"Benchmark Account {i}",
+                category='Benchmark',
+                financial_statement='Income Statement' if i % 2 else 'Balance Sheet',
+                account_type='Account',
+                normal_balance='Debit',
+            )
+            for i in range(BENCH_ACCOUNTS)
+        ])
+        funds = RSAFund.objects.bulk_create([RSAFund(name=f"Benchmark RSA Fund {i}") for i in range(BENCH_FUNDS)])
+        first_fund_id = min(f.pk for f in funds)
+
+        with connection.cursor() as cursor:
+            # Dates increase with the series so physical order tracks transaction_date (as real imports do)
+            cursor.execute("""
+                INSERT INTO setup_gltransaction (
+                    transaction_date, gl_account_code_id, entity_code, cost_center_code, project_code,
+                    journal_type, currency_code, exchange_rate, debit, credit, base_debit, base_credit,
+                    posted_flag, reversal_flag, net_status, created_at
+                )
+                SELECT
+                    DATE '2015-01-01' + (g::bigint * %s / %s)::int,
+                    'BNCH' || lpad((g %% %s)::text, 4, '0'),
+                    'ENT' || (g %% 20),
+                    'CC' || ((g * 7) %% 150),
+                    CASE WHEN g %% 5 = 0 THEN 'PRJ' || (g %% 500) END,
+                    (ARRAY['GJ', 'AP', 'AR', 'CB', 'FA'])[1 + g %% 5],
+                    CASE WHEN g %% 40 = 0 THEN 'USD' WHEN g %% 97 = 0 THEN 'GBP' ELSE 'NGN' END,
+                    1,
+                    CASE WHEN g %% 2 = 0 THEN (g %% 100000) / 100.0 ELSE 0 END,
+                    CASE WHEN g %% 2 = 1 THEN (g %% 100000) / 100.0 ELSE 0 END,
+                    CASE WHEN g %% 2 = 0 THEN (g %% 100000) / 100.0 ELSE 0 END,
+                    CASE WHEN g %% 2 = 1 THEN (g %% 100000) / 100.0 ELSE 0 END,
+                    g %% 50 <> 0,
+                    g %% 100 = 0,
+                    'OPEN',
+                    now()
+                FROM generate_series(1, %s) AS g
+            """, [DATE_SPAN_DAYS, rows, BENCH_ACCOUNTS, rows])
+
+            cursor.execute("""
+                INSERT INTO setup_fundtransaction (
+                    transaction_date, rsa_fund_id, entity_code, contributions, withdrawals,
+                    balance, source_type, created_at
+                )
+                SELECT
+                    DATE '2015-01-01' + (g::bigint * %s / %s)::int,
+                    %s + (g %% %s),
+                    'ENT' || (g %% 20),
+                    (g %% 50000) / 10.0,
+                    (g %% 7000) / 10.0,
+                    0,
+                    'RSA',
+                    now()
+                FROM generate_series(1, %s) AS g
+            """, [DATE_SPAN_DAYS, max(fund_rows, 1), first_fund_id, BENCH_FUNDS, fund_rows])
+
+            cursor.execute('ANALYZE setup_gltransaction')
+            cursor.execute('ANALYZE setup_fundtransaction')
+
+    def _benchmark_queries(self):
+        year_start, year_end = datetime.date(2024, 1, 1), datetime.date(2024, 12, 31)
+        q_start, q_end = datetime.date(2024, 10, 1), datetime.date(2024, 12, 31)
+        statement = GLTransaction.objects.filter(transaction_date__range=(year_start, year_end))
+        totals = {'total_debit': Sum('debit'), 'total_credit': Sum('credit')}
+
+        fund = RSAFund.objects.filter(name__startswith='Benchmark RSA Fund').order_by('pk').first()
+
+        return [
+            ('Income statement (net ledger, FY2024)',
+             statement.net().values('gl_account_code').annotate(**totals)),
+            ('Entity filter (ENT7, FY2024)',
+             statement.filter(entity_code='ENT7').values('gl_account_code').annotate(**totals)),
+            ('Cost center filter (CC42, FY2024)',
+             statement.filter(cost_center_code='CC42').values('gl_account_code').annotate(**totals)),
+            ('Project filter (PRJ15, FY2024)',
+             statement.filter(project_code='PRJ15').values('gl_account_code').annotate(**totals)),
+            ('Journal type filter (FA, Q4 2024)',
+             GLTransaction.objects.filter(journal_type='FA', transaction_date__range=(q_start, q_end))
+             .values('gl_account_code').annotate(**totals)),
+            ('Foreign currency lines (USD, FY2024)',
+             statement.filter(currency_code='USD').values('gl_account_code').annotate(**totals)),
+            ('Date range only (Q4 2024 line count)',
+             GLTransaction.objects.filter(transaction_date__range=(q_start, q_end)).values('posted_flag').annotate(lines=Count('id'))),
+            ('Fund lookup (one RSA fund, FY2024)',
+             FundTransaction.objects.filter(rsa_fund=fund, transaction_date__range=(year_start, year_end))
+             .values('rsa_fund').annotate(contributions=Sum('contributions'), withdrawals=Sum('withdrawals'))),
+        ]
+
+    def _report(self, queries, before, after, show_plans):
+        def execution_ms(plan):
+            match = re.search(r'Execution Time: ([\d.]+) ms', plan)
+            return float(match.group(1)) if match else None
+
+        self.stdout.write('')
+        self.stdout.write(f"{'Query':<50} {'Before (ms)':>12} {'After (ms)':>12} {'Speed-up':>9}")
+        self.stdout.write('-' * 86)
+        for name, _ in queries:
+            b, a = execution_ms(before[name]), execution_ms(after[name])
+            speedup = f"{b / a:.1f}x" if a and b else 'n/a'
+            self.stdout.write(f"{name:<50} {b or 0:>12.1f} {a or 0:>12.1f} {speedup:>9}")
+
+        if show_plans:
+            for name, _ in queries:
+                self.stdout.write(self.style.MIGRATE_HEADING(f"\n== {name} =="))
+                self.stdout.write(self.style.NOTICE('-- Before (without 0009/0010 indexes)'))
+                self.stdout.write(before[name])
+                self.stdout.write(self.style.NOTICE('-- After'))
+                self.stdout.write(after[name])
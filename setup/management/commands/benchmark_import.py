@@ -0,0 +1,105 @@
+import datetime
+import os
+import random
+import tempfile
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from openpyxl import Workbook
+from setup.models import GLAccount
+from data_management.importers import get_import_config
+from data_management.parallel_import import import_gl_files
+
+BENCH_ACCOUNTS = 50
+HEADERS = [
+    'transaction_date', 'gl_account_code', 'description', 'journal_type', 'document_no',
+    'entity_code', 'cost_center_code', 'currency_code', 'debit', 'credit',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures GL import throughput (rows/sec) against the number of parse processes: writes '
+        'synthetic GL workbooks (one sheet per month), imports them once per worker count inside a '
+        'transaction and rolls every run back. Run against a non-production database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--files', type=int, default=4, help='Workbooks to generate.')
+        parser.add_argument('--sheets', type=int, default=3, help='Monthly sheets per workbook.')
+        parser.add_argument('--rows', type=int, default=20_000, help='Rows per sheet.')
+        parser.add_argument(
+            '--workers', default=None,
+            help='Comma-separated parse process counts to compare (default: 0,1,2,... up to the CPU count, max 8).',
+        )
+
+    def handle(self, *args, **options):
+        if options['workers']:
+            try:
+                worker_counts = [int(w) for w in options['workers'].split(',')]
+            except ValueError:
+                raise CommandError('--workers must be comma-separated integers, e.g. 0,1,2,4.')
+        else:
+            worker_counts = [0, 1] + [n for n in (2, 4, 8) if n <= (os.cpu_count() or 1)]
+
+        total_rows = options['files'] * options['sheets'] * options['rows']
+        self.stdout.write(
+            f"Chunk size {get_import_config()['CHUNK_SIZE']}, queue {get_import_config()['QUEUE_CHUNKS']} chunks, "
+            f"{os.cpu_count()} CPUs."
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            self.stdout.write(f"Writing {options['files']} workbook(s) x {options['sheets']} sheet(s) x {options['rows']:,} rows...")
+            files = self._write_workbooks(tmp, options['files'], options['sheets'], options['rows'])
+            size = sum(os.path.getsize(path) for path, _ in files)
+            self.stdout.write(f"{total_rows:,} rows, {size / 1024 / 1024:.1f} MB.\n")
+
+            self.stdout.write(f"{'Workers':>8} {'Seconds':>10} {'Rows/sec':>12} {'Speed-up':>9}")
+            baseline = None
+            for workers in worker_counts:
+                elapsed = self._timed_import(files, workers)
+                rate = total_rows / elapsed
+                baseline = baseline or rate
+                label = 'in-proc' if workers == 0 else str(workers)
+                self.stdout.write(f"{label:>8} {elapsed:>10.2f} {rate:>12,.0f} {rate / baseline:>8.2f}x")
+
+        self.stdout.write(self.style.SUCCESS('Benchmark complete. Imported rows rolled back.'))
+
+    def _write_workbooks(self, directory, file_count, sheet_count, rows):
+        rng = random.Random(42)
+        files = []
+        for f in range(file_count):
+            wb = Workbook(write_only=True)
+            for s in range(sheet_count):
+                month = datetime.date(2024, s % 12 + 1, 1)
+                ws = wb.create_sheet(f"{month:%b %Y}")
+                ws.append(HEADERS)
+                for i in range(rows // 2):
+                    amount = round(rng.uniform(1, 1_000_000), 2)
+                    day = month.replace(day=rng.randint(1, 28))
+                    common = [f"Benchmark line {i}", 'GJ', f"BNCH-{f}-{s}-{i}", f"E{f}", f"CC{i % 20}", 'NGN']
+                    ws.append([day, f"BNCH{rng.randrange(BENCH_ACCOUNTS):04d}"] + common + [amount, 0])
+                    ws.append([day, f"BNCH{rng.randrange(BENCH_ACCOUNTS):04d}"] + common + [0, amount])
+            path = os.path.join(directory, f"entity_{f}.xlsx")
+            wb.save(path)
+            files.append((path, os.path.basename(path)))
+        return files
+
+    def _timed_import(self, files, workers):
+        with transaction.atomic():
+            GLAccount.objects.bulk_create([
+                GLAccount(
+                    gl_account_code=f"BNCH{i:04d}",
+                    gl_account_name=f"Benchmark Account {i}",
+                    category='Benchmark',
+                    financial_statement='Income Statement' if i % 2 else 'Balance Sheet',
+                    account_type='Account',
+                    normal_balance='Debit',
+                )
+                for i in range(BENCH_ACCOUNTS)
+            ], ignore_conflicts=True)
+            started = time.perf_counter()
+            import_gl_files(files, workers=workers)
+            elapsed = time.perf_counter() - started
+            # Never keep the synthetic data
+            transaction.set_rollback(True)
+        return elapsed
@@ -0,0 +1,86 @@
+import re
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.template import engines
+
+# The per-cell layout the period tables used before {% period_row %}: rows carry a {label: value}
+# dict and every cell goes through the template loop and the intcomma filter.
+PER_CELL_TEMPLATE = """{% load humanize %}<table><tbody>
+{% for item in financial_data %}
+    {% if item.type == 'section_header' %}
+        <tr class="section-header-row"><td colspan="{{ period_labels|length|add:1 }}">{{ item.description }}</td></tr>
+    {% elif item.type == 'header' %}
+        <tr class="header-row"><td colspan="{{ period_labels|length|add:1 }}">{{ item.description }}</td></tr>
+    {% elif item.type == 'subtotal' %}
+        <tr class="subtotal-row"><td>{{ item.description }}</td>
+        {% for label, value in item.periods.items %}<td class="amount-cell border-top border-dark border-1">{{ value|intcomma }}</td>{% endfor %}</tr>
+    {% elif item.type == 'major_total' %}
+        <tr class="major-total-row"><td>{{ item.description }}</td>
+        {% for label, value in item.periods.items %}<td class="amount-cell">{{ value|intcomma }}</td>{% endfor %}</tr>
+    {% else %}
+        <tr><td class="account-row">{{ item.description }}</td>
+        {% for label, value in item.periods.items %}<td class="amount-cell">{{ value|intcomma }}</td>{% endfor %}</tr>
+    {% endif %}
+{% endfor %}
+</tbody></table>"""
+
+ROW_TEMPLATE = """{% load report_tags %}<table><tbody>
+{% for item in financial_data %}{% period_row item period_labels %}{% endfor %}
+</tbody></table>"""
+
+ROW_TYPES = ['header', 'account', 'account', 'account', 'subtotal', 'account', 'account', 'major_total']
+
+
+class Command(BaseCommand):
+    help = (
+        'Times the period-table rendering of the statement, fund and analysis pages: the old per-cell '
+        'template loop over {label: value} dicts against {% period_row %} over value lists, on '
+        'synthetic rows. Checks that both produce the same cells.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--periods', type=int, default=120, help='Period columns.')
+        parser.add_argument('--rows', type=int, default=200, help='Table rows.')
+        parser.add_argument('--repeat', type=int, default=5, help='Renders per layout; the best time is reported.')
+
+    def handle(self, *args, **options):
+        if options['periods'] < 1 or options['rows'] < 1 or options['repeat'] < 1:
+            raise CommandError('--periods, --rows and --repeat must be at least 1.')
+        period_labels = [f"P{i + 1:03d}" for i in range(options['periods'])]
+        rows = []
+        for r in range(options['rows']):
+            values = [Decimal(1_000_000 + r * 7_919 + i * 104_729) / 100 for i in range(options['periods'])]
+            rows.append({
+                'description': f"Line {r + 1}",
+                'type': ROW_TYPES[r % len(ROW_TYPES)],
+                'periods': dict(zip(period_labels, values)),
+                'values': values,
+            })
+
+        engine = engines['django']
+        layouts = [
+            ('Per-cell loop', engine.from_string(PER_CELL_TEMPLATE)),
+            ('period_row', engine.from_string(ROW_TEMPLATE)),
+        ]
+        context = {'financial_data': rows, 'period_labels': period_labels}
+        cells = options['periods'] * options['rows']
+        self.stdout.write(f"{options['rows']} rows x {options['periods']} periods ({cells:,} cells), best of {options['repeat']}.\n")
+        self.stdout.write(f"{'Layout':<14} {'Seconds':>9} {'Cells/sec':>12} {'Speed-up':>9}")
+
+        outputs = []
+        baseline = None
+        for label, compiled in layouts:
+            best = None
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                html = compiled.render(context)
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            baseline = baseline or best
+            outputs.append(re.sub(r'>\s+<', '><', html).strip())
+            self.stdout.write(f"{label:<14} {best:>9.3f} {cells / best:>12,.0f} {baseline / best:>8.2f}x")
+
+        if outputs[0] != outputs[1]:
+            raise CommandError('The two layouts rendered different tables.')
+        self.stdout.write(self.style.SUCCESS('Benchmark complete. Both layouts render the same table.'))
@@ -0,0 +1,40 @@
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from budget_input.cloning import clone_budget_version
+from budget_input.models import ApprovedBudgetVersion, BudgetAssumption
+
+
+class Command(BaseCommand):
+    help = (
+        'Copies a budget version, with a copy of its base assumption and all of its forecast lines, '
+        'into a new pending version, inside the database (INSERT ... SELECT).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help='Name of the budget version to copy.')
+        parser.add_argument('version_name', help='Name of the new version (and of its assumption copy).')
+        parser.add_argument('--user', required=True, help='Username recorded as the submitter of the copy.')
+
+    def handle(self, *args, **options):
+        try:
+            source = ApprovedBudgetVersion.objects.get(version_name=options['source'])
+        except ApprovedBudgetVersion.DoesNotExist:
+            raise CommandError(f"No budget version named '{options['source']}'.")
+        try:
+            user = get_user_model().objects.get_by_natural_key(options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No user '{options['user']}'.")
+        version_name = options['version_name']
+        if (
+            ApprovedBudgetVersion.objects.filter(version_name=version_name).exists()
+            or BudgetAssumption.objects.filter(version_name=version_name).exists()
+        ):
+            raise CommandError(f"A budget version or assumption named '{version_name}' already exists.")
+
+        started = time.perf_counter()
+        clone, forecast_lines = clone_budget_version(source, version_name, user)
+        self.stdout.write(self.style.SUCCESS(
+            f"Version '{clone.version_name}' created: {forecast_lines:,} forecast line(s) "
+            f"in {time.perf_counter() - started:.2f}s."
+        ))
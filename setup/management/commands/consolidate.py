@@ -0,0 +1,56 @@
+import datetime
+from django.core.management.base import BaseCommand, CommandError
+from data_management.consolidation import (
+    cached_consolidation, consolidate, consolidation_worksheet, get_consolidation_config,
+)
+from data_management.statements import latest_ledger_month
+from setup.fiscal import get_fiscal_config
+
+
+class Command(BaseCommand):
+    help = (
+        'Consolidates every entity for a close period (the latest ledger month by default) with '
+        'intercompany eliminations, and stores the result in the report fragment cache so the '
+        'consolidation page opens at once. Run it after the month-end close.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--period', help='Close period as YYYY-MM (default: latest ledger month).')
+        parser.add_argument('--months', type=int, default=12, help='History window in months.')
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help='Entity processes (default: CONSOLIDATION settings); 0 computes in-process. Skips the cache.',
+        )
+
+    def handle(self, *args, **options):
+        if options['period']:
+            try:
+                close_month = datetime.datetime.strptime(options['period'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError('--period must be YYYY-MM.')
+        else:
+            close_month = latest_ledger_month()
+        months = options['months']
+        if not 1 <= months <= get_consolidation_config()['MAX_MONTHS']:
+            raise CommandError(f"--months must be between 1 and {get_consolidation_config()['MAX_MONTHS']}.")
+
+        if options['workers'] is None:
+            result = cached_consolidation(close_month, months)
+        else:
+            result = consolidate(close_month, months, workers=options['workers'])
+        worksheet = consolidation_worksheet(result, close_month, get_fiscal_config()['START_MONTH'])
+        totals = worksheet['totals']
+
+        self.stdout.write(
+            f"{len(result['entities'])} entities x {months} months to {close_month:%b %Y}: "
+            f"{result['seconds']:.2f}s with {result['workers'] or 'no'} worker process(es)."
+        )
+        self.stdout.write(
+            f"Consolidated net profit (YTD) {totals['net_profit'][-1]:,.2f}, total assets {totals['assets'][-1]:,.2f}; "
+            f"eliminated balances {totals['eliminated_balances']:,.2f}, transactions {totals['eliminated_transactions']:,.2f}."
+        )
+        for difference in worksheet['differences']:
+            self.stdout.write(self.style.WARNING(
+                f"Intercompany difference on {difference['pair']}: {difference['difference']:,.2f}"
+            ))
+        self.stdout.write(self.style.SUCCESS('Consolidation complete.'))
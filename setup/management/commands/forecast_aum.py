@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from predictive_analytics.forecasting import run_aum_forecasts
+
+
+class Command(BaseCommand):
+    help = (
+        'Forecasts every RSA and Managed fund\'s AUM closing balance for the Financial Forecasting page: '
+        'exponential smoothing, damped trend and seasonal naive are backtested per fund and the best one '
+        'is kept, with prediction intervals. Schedule nightly, after the historical uploads.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, help="Fitting processes (default: AUM_FORECASTING['WORKERS']; 0 = in-process).")
+
+    def handle(self, *args, **options):
+        run = run_aum_forecasts(workers=options['workers'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Forecast {run.fund_count} funds in {run.duration_seconds:.1f}s (run #{run.pk})."
+        ))
+        if run.skipped_count:
+            self.stdout.write(self.style.WARNING(f"{run.skipped_count} fund(s) skipped: not enough history."))
@@ -0,0 +1,56 @@
+import os
+from django.core.management.base import BaseCommand, CommandError
+from data_management.batches import STATUS_IMPORTING
+from data_management.models import UploadHistory
+from data_management.parallel_import import import_fund_files
+
+
+class Command(BaseCommand):
+    help = (
+        'Streams RSA Fund or Managed Fund historical files (.csv or .xlsx, template layout; every data '
+        'sheet of a workbook) into Fund Transactions in chunked bulk inserts, parsing files in parallel. '
+        'All files are imported or nothing is.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='Path(s) to the upload file(s).')
+        parser.add_argument('--type', required=True, choices=['rsa', 'managed'], help='Template the file follows.')
+        parser.add_argument(
+            '--create-missing-funds', action='store_true', default=None,
+            help="Create funds that do not exist yet (default: DATA_IMPORT['CREATE_MISSING_FUNDS']).",
+        )
+        parser.add_argument('--workers', type=int, help="Parse processes (default: DATA_IMPORT['PARSE_WORKERS']; 0 = in-process).")
+
+    def handle(self, *args, **options):
+        source_type = 'RSA' if options['type'] == 'rsa' else 'MANAGED'
+        files = [(path, os.path.basename(path)) for path in options['paths']]
+        # Logged like a web upload, so the import can be rolled back from the upload history
+        upload = UploadHistory.objects.create(
+            file_name=', '.join(name for _, name in files)[:255],
+            upload_type=f"{options['type']}_fund",
+            record_count=0,
+            status=STATUS_IMPORTING,
+        )
+        try:
+            count, created_funds = import_fund_files(
+                files, source_type,
+                create_missing_funds=options['create_missing_funds'], workers=options['workers'], batch=upload,
+            )
+        except OSError as e:
+            self.mark_failed(upload, e)
+            raise CommandError(f"Cannot read {e.filename}: {e.strerror}")
+        except ValueError as e:
+            self.mark_failed(upload, e)
+            raise CommandError(f"{e} Nothing was imported.")
+
+        upload.record_count = count
+        upload.status = f"Success: Routed to {upload.upload_type} table"
+        upload.save(update_fields=['record_count', 'status'])
+
+        self.stdout.write(self.style.SUCCESS(f"Imported {count} {source_type} fund transactions (upload #{upload.pk})."))
+        if created_funds:
+            self.stdout.write(self.style.WARNING(f"{created_funds} new fund(s) were created."))
+
+    def mark_failed(self, upload, error):
+        upload.status = f'Failed: {error}'[:50]
+        upload.save(update_fields=['status'])
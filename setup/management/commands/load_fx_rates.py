@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from data_management.importers import iter_upload_rows, parse_date, parse_decimal, get_import_config
+from setup.models import ExchangeRate
+from setup.fx import base_currency
+
+
+class Command(BaseCommand):
+    help = (
+        'Bulk loads FX rates (units of BASE_CURRENCY per 1 unit of currency) from a .csv or .xlsx file '
+        'with columns currency_code, rate_date (YYYY-MM-DD), rate. Existing (currency, date) rows are updated.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path to the rates file.')
+        parser.add_argument('--chunk-size', type=int, help="Rows per upsert (default: DATA_IMPORT['CHUNK_SIZE']).")
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size'] or get_import_config()['CHUNK_SIZE']
+        chunk = {}
+        loaded = 0
+
+        def flush():
+            # Keyed by (currency, date) so a chunk never upserts the same row twice
+            ExchangeRate.objects.bulk_create(
+                list(chunk.values()),
+                update_conflicts=True,
+                unique_fields=['currency_code', 'rate_date'],
+                update_fields=['rate', 'updated_at'],
+            )
+            chunk.clear()
+
+        try:
+            with open(options['path'], 'rb') as rates_file, transaction.atomic():
+                for line_no, row in iter_upload_rows(rates_file):
+                    currency = str(row.get('currency_code') or '').strip().upper()
+                    if not currency:
+                        raise ValueError(f"Row {line_no}: currency_code is required.")
+                    if currency == base_currency():
+                        continue
+                    rate_date = parse_date(row.get('rate_date'), 'rate_date', line_no)
+                    rate = parse_decimal(row.get('rate'), 'rate', line_no, None)
+                    if not rate or rate <= 0:
+                        raise ValueError(f"Row {line_no}: rate must be a positive number.")
+                    chunk[(currency, rate_date)] = ExchangeRate(currency_code=currency, rate_date=rate_date, rate=rate)
+                    loaded += 1
+                    if len(chunk) >= chunk_size:
+                        flush()
+                if chunk:
+                    flush()
+        except OSError as e:
+            raise CommandError(f"Cannot read {options['path']}: {e}")
+        except ValueError as e:
+            raise CommandError(f"{e} Nothing was loaded.")
+
+        self.stdout.write(self.style.SUCCESS(f"Loaded {loaded} exchange rates."))
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+from predictive_analytics.artifacts import activate_artifact, verify_artifact
+from predictive_analytics.models import ModelArtifact
+
+
+class Command(BaseCommand):
+    help = (
+        'Lists the saved versions of the predictive models, checks their files against their '
+        'checksums, or switches a model back to another version. Running processes pick the '
+        'switch up within MODEL_ARTIFACTS["CHECK_INTERVAL"] seconds.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', nargs='?', help='Only this model.')
+        parser.add_argument('--activate', type=int, metavar='VERSION', help='Make VERSION the active version of NAME.')
+        parser.add_argument('--verify', action='store_true', help='Recompute the checksum of every listed version.')
+
+    def handle(self, *args, **options):
+        name = options['name']
+        if options['activate'] is not None:
+            if not name:
+                raise CommandError('--activate needs the model name.')
+            try:
+                record = ModelArtifact.objects.get(name=name, version=options['activate'])
+            except ModelArtifact.DoesNotExist:
+                raise CommandError(f"{name} has no version {options['activate']}.")
+            if not verify_artifact(record):
+                raise CommandError(f"{record} does not match its checksum; not activated.")
+            activate_artifact(name, record.version)
+            self.stdout.write(self.style.SUCCESS(f"{name} v{record.version} is now active."))
+            return
+
+        records = ModelArtifact.objects.all()
+        if name:
+            records = records.filter(name=name)
+        failed = 0
+        for record in records:
+            line = (
+                f"{record.name:<20} v{record.version:<4} {'active' if record.is_active else '      '} "
+                f"{record.created_at:%Y-%m-%d %H:%M}  {record.size_bytes:>10} bytes  {record.checksum[:12]}"
+            )
+            if options['verify']:
+                ok = verify_artifact(record)
+                failed += not ok
+                line += '  ok' if ok else '  CHECKSUM MISMATCH'
+            self.stdout.write(line)
+        if failed:
+            raise CommandError(f"{failed} version(s) failed the checksum check.")
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from predictive_analytics.pin_model import run_pin_model
+
+
+class Command(BaseCommand):
+    help = (
+        'Fits per-fund PIN activation, deactivation, reactivation and churn rates from the RSA fund '
+        'history and projects PIN states forward for the Customer & Operational Insight page. '
+        'Schedule nightly, after the historical uploads.'
+    )
+
+    def handle(self, *args, **options):
+        run = run_pin_model()
+        self.stdout.write(self.style.SUCCESS(
+            f"Projected PIN activity for {run.fund_count} funds in {run.duration_seconds:.1f}s (run #{run.pk})."
+        ))
+        if run.skipped_count:
+            self.stdout.write(self.style.WARNING(f"{run.skipped_count} fund(s) skipped: not enough PIN history."))
@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand, CommandError
+from setup import partitioning
+
+
+class Command(BaseCommand):
+    help = (
+        'Manages optional range partitioning of GL transactions by transaction_date (PostgreSQL only). '
+        'Actions: status, convert (one-time), maintain (pre-create future partitions, run from cron), '
+        'detach (archive or drop old partitions without long locks). '
+        'On other databases the current single-table layout is kept and the command does nothing.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['status', 'convert', 'maintain', 'detach'])
+        parser.add_argument('--interval', choices=partitioning.INTERVALS, help='Override GL_PARTITIONING INTERVAL (convert only).')
+        parser.add_argument('--keep-legacy', action='store_true', help='Keep the original table as <table>_legacy after convert.')
+        parser.add_argument('--before-year', type=int, help='detach: detach every partition that ends on or before Jan 1 of this year.')
+        parser.add_argument('--drop', action='store_true', help='detach: drop the partitions instead of moving them to ARCHIVE_SCHEMA.')
+
+    def handle(self, *args, **options):
+        if not partitioning.is_supported():
+            self.stdout.write(self.style.WARNING(
+                'GL partitioning is only available on PostgreSQL. Keeping the current table layout.'
+            ))
+            return
+
+        try:
+            partitioning.get_partition_config()
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        action = options['action']
+        partitioned = partitioning.is_partitioned()
+
+        if action == 'status':
+            if not partitioned:
+                self.stdout.write('setup_gltransaction is a regular (non-partitioned) table.')
+                return
+            for name, bound in partitioning.list_partitions():
+                self.stdout.write(f"{name:<40} {bound}")
+            return
+
+        if action == 'convert':
+            if partitioned:
+                raise CommandError('setup_gltransaction is already partitioned.')
+            self.stdout.write('Converting setup_gltransaction to a partitioned table (runs in one transaction)...')
+            partitioning.convert_to_partitioned(options.get('interval'), keep_legacy=options['keep_legacy'])
+            self.stdout.write(self.style.SUCCESS(f"Converted. {len(partitioning.list_partitions())} partitions attached."))
+            return
+
+        if not partitioned:
+            raise CommandError("setup_gltransaction is not partitioned. Run 'partition_gl_transactions convert' first.")
+
+        if action == 'maintain':
+            created = partitioning.precreate_future_partitions()
+            self.stdout.write(self.style.SUCCESS(f"{created} future partition(s) created."))
+            return
+
+        # detach
+        if not options.get('before_year'):
+            raise CommandError('detach requires --before-year.')
+        cutoff = f"'{options['before_year']}-01-01'"
+        detached = 0
+        for name, bound in partitioning.list_partitions():
+            # bound looks like: FOR VALUES FROM ('2015-01-01') TO ('2016-01-01')
+            upper = bound.rsplit('TO (', 1)[-1].rstrip(')')
+            if upper <= cutoff:
+                partitioning.detach_partition(name, archive=not options['drop'], drop=options['drop'])
+                detached += 1
+                self.stdout.write(f"Detached {name}" + (' (dropped)' if options['drop'] else ' (archived)'))
+        self.stdout.write(self.style.SUCCESS(f"{detached} partition(s) detached."))
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max, Min
+from setup.models import DateDetail
+from setup.fiscal import get_fiscal_config, fiscal_periods, PERIOD_PATTERNS
+
+
+class Command(BaseCommand):
+    help = (
+        'Rewrites fiscal_year, fiscal_quarter and fiscal_period across the whole Date Table '
+        'using one range UPDATE per fiscal period (no per-row saves).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start-month', type=int, help='Override FISCAL_CALENDAR START_MONTH (1-12).')
+        parser.add_argument('--pattern', choices=list(PERIOD_PATTERNS), help='Override FISCAL_CALENDAR PERIOD_PATTERN.')
+
+    def handle(self, *args, **options):
+        try:
+            config = get_fiscal_config(options.get('start_month'), options.get('pattern'))
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        bounds = DateDetail.objects.aggregate(first=Min('date'), last=Max('date'))
+        if not bounds['first']:
+            self.stdout.write(self.style.WARNING('Date Table is empty. Nothing to recompute.'))
+            return
+
+        # A fiscal year can start in the previous calendar year (e.g. 4-4-5 starting late December)
+        first_year = bounds['first'].year - 1
+        last_year = bounds['last'].year
+
+        updated = 0
+        with transaction.atomic():
+            for fiscal_year in range(first_year, last_year + 1):
+                for period, quarter, start, end in fiscal_periods(fiscal_year, config):
+                    if end < bounds['first'] or start > bounds['last']:
+                        continue
+                    updated += DateDetail.objects.filter(date__gte=start, date__lte=end).update(
+                        fiscal_year=f"FY{fiscal_year}",
+                        fiscal_quarter=quarter,
+                        fiscal_period=period,
+                    )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Recomputed fiscal columns for {updated} dates "
+            f"(start month {config['START_MONTH']}, pattern {config['PERIOD_PATTERN']})."
+        ))
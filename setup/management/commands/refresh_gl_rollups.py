@@ -0,0 +1,20 @@
+import datetime
+from django.core.management.base import BaseCommand
+from data_management.rollups import refresh_monthly_balances
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuilds the monthly GL rollup (GL Monthly Balances) and rolls the month-end balance snapshots '
+        'forward; the financial statements read from both. '
+        'Imports and revaluations refresh the months they touch; run this after an initial deploy or '
+        'after changing GL lines outside the importers.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', type=datetime.date.fromisoformat, help='First month to rebuild (YYYY-MM-DD).')
+        parser.add_argument('--to', dest='date_to', type=datetime.date.fromisoformat, help='Last month to rebuild (YYYY-MM-DD).')
+
+    def handle(self, *args, **options):
+        rows = refresh_monthly_balances(options['date_from'], options['date_to'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} monthly balance rows and the balance snapshots that follow them."))
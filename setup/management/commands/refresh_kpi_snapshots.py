@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from analysis.kpis import refresh_aum_kpis, refresh_budget_kpis, refresh_ledger_kpis
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuilds the KPI snapshots behind the dashboard cards: ledger KPIs from the GL rollups, '
+        'closing AUM from the fund histories and budgeted net profit from approved forecasts. '
+        'Ledger and budget KPIs also refresh after every import and approval; schedule this '
+        'nightly for the fund histories.'
+    )
+
+    def handle(self, *args, **options):
+        ledger = refresh_ledger_kpis()
+        aum = refresh_aum_kpis()
+        budget = refresh_budget_kpis()
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {ledger} ledger, {aum} AUM and {budget} budget KPI snapshot(s)."
+        ))
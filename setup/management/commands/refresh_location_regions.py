@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from setup.regions import refresh_location_regions
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuilds the location-region map from the Region states / locations links. The map is kept '
+        'current by signals; run this after bulk loads or raw SQL that bypass them.'
+    )
+
+    def handle(self, *args, **options):
+        rows = refresh_location_regions()
+        self.stdout.write(self.style.SUCCESS(f'Location-region map rebuilt: {rows} row(s).'))
@@ -0,0 +1,79 @@
+import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Max, Min
+from setup.models import GLAccount, GLTransaction, ExchangeRate
+from setup.fx import base_currency, get_revaluation_config, post_revaluation, rate_subquery
+from data_management.rollups import refresh_monthly_balances
+
+
+class Command(BaseCommand):
+    help = (
+        'Default: re-translates foreign-currency GL lines whose rate came from the FX rate table at the '
+        'latest rate on or before their transaction_date, with two set-based UPDATEs (use after correcting '
+        'rates; rates supplied with a line are kept). '
+        'With --as-of: posts the closing-rate revaluation of Balance Sheet foreign-currency balances as '
+        'adjustment lines against the FX gain/loss account, reversed the next day; lines keep their rates.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--currency', action='append', help='Only this currency (repeatable).')
+        parser.add_argument('--from', dest='date_from', type=datetime.date.fromisoformat, help='First transaction_date (YYYY-MM-DD).')
+        parser.add_argument('--to', dest='date_to', type=datetime.date.fromisoformat, help='Last transaction_date (YYYY-MM-DD).')
+        parser.add_argument('--as-of', type=datetime.date.fromisoformat, help='Closing revaluation date (YYYY-MM-DD).')
+        parser.add_argument(
+            '--gain-loss-account',
+            help="Unrealised FX gain/loss account for --as-of (default: FX_REVALUATION['GAIN_LOSS_ACCOUNT']).",
+        )
+
+    def handle(self, *args, **options):
+        currencies = [c.upper() for c in options['currency']] if options['currency'] else None
+        if options['as_of']:
+            return self.revalue(options['as_of'], currencies, options)
+
+        lines = GLTransaction.objects.exclude(currency_code=base_currency()).filter(rate_from_table=True)
+        if currencies:
+            lines = lines.filter(currency_code__in=currencies)
+        if options['date_from']:
+            lines = lines.filter(transaction_date__gte=options['date_from'])
+        if options['date_to']:
+            lines = lines.filter(transaction_date__lte=options['date_to'])
+
+        # Lines without any usable rate keep their current translation
+        has_rate = Exists(ExchangeRate.objects.filter(
+            currency_code=OuterRef('currency_code'), rate_date__lte=OuterRef('transaction_date'),
+        ))
+        in_scope = lines.count()
+        lines = lines.filter(has_rate)
+
+        with transaction.atomic():
+            bounds = lines.aggregate(first=Min('transaction_date'), last=Max('transaction_date'))
+            revalued = lines.update(exchange_rate=rate_subquery(OuterRef('transaction_date')))
+            lines.update(
+                base_debit=F('debit') * F('exchange_rate'),
+                base_credit=F('credit') * F('exchange_rate'),
+            )
+            if revalued:
+                refresh_monthly_balances(bounds['first'], bounds['last'])
+
+        self.stdout.write(self.style.SUCCESS(f"Re-translated {revalued} GL lines at transaction-date rates."))
+        if in_scope > revalued:
+            self.stdout.write(self.style.WARNING(f"{in_scope - revalued} foreign-currency lines have no rate on or before their date and were left unchanged."))
+
+    def revalue(self, as_of, currencies, options):
+        if options['date_from'] or options['date_to']:
+            raise CommandError('--from/--to do not apply to --as-of: the revaluation covers every balance at that date.')
+        account = options['gain_loss_account'] or get_revaluation_config()['GAIN_LOSS_ACCOUNT']
+        if not account:
+            raise CommandError("Set FX_REVALUATION['GAIN_LOSS_ACCOUNT'] or pass --gain-loss-account.")
+        if not GLAccount.objects.filter(gl_account_code=account).exists():
+            raise CommandError(f"GL account '{account}' does not exist.")
+
+        adjustments, missing = post_revaluation(as_of, account, currencies)
+        self.stdout.write(self.style.SUCCESS(
+            f"Posted {adjustments} closing-rate revaluation adjustment(s) at {as_of} against {account}."
+        ))
+        if missing:
+            self.stdout.write(self.style.WARNING(
+                f"No rate on or before {as_of} for {', '.join(missing)}: those balances were not revalued."
+            ))
@@ -0,0 +1,94 @@
+import multiprocessing
+import os
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from django.core.management.base import BaseCommand
+from django.db import connection
+from data_management import worker
+from data_management.jobs import claim_next_job, get_jobs_config, heartbeat, record_failure, requeue_stale_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs queued background jobs (uploads, statement exports, recomputations) in a process pool. '
+        'Jobs are claimed from the database with SELECT ... FOR UPDATE SKIP LOCKED, so any number of '
+        'run_workers processes can share one queue. No message broker is needed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, help='Worker processes (default BACKGROUND_JOBS WORKERS).')
+        parser.add_argument('--poll-interval', type=float, help='Seconds between queue checks when idle.')
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty instead of waiting for new jobs.')
+
+    def new_pool(self, workers):
+        # 'spawn' so that no worker inherits (and shares) this process's database connection
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=worker.init_worker,
+        )
+
+    def handle(self, *args, **options):
+        config = get_jobs_config()
+        workers = max(1, options['workers'] or config['WORKERS'])
+        poll_interval = options['poll_interval'] or config['POLL_INTERVAL']
+        name = f"{socket.gethostname()}:{os.getpid()}"
+        if connection.vendor == 'sqlite' and workers > 1:
+            # SQLite allows one writer at a time: parallel imports would fail with 'database is locked'
+            self.stdout.write(self.style.WARNING('SQLite database: running jobs one at a time.'))
+            workers = 1
+
+        requeued, failed = requeue_stale_jobs()
+        if requeued:
+            self.stdout.write(self.style.WARNING(f"Re-queued {requeued} job(s) with no recent heartbeat."))
+        if failed:
+            self.stdout.write(self.style.WARNING(f"Marked {failed} job(s) with no recent heartbeat and no attempts left as failed."))
+        self.stdout.write(f"Worker {name} started with {workers} process(es).")
+
+        finished = 0
+        running = {}  # future -> job id
+        pool = self.new_pool(workers)
+        try:
+            while True:
+                while len(running) < workers:
+                    job_id = claim_next_job(name)
+                    if job_id is None:
+                        break
+                    running[pool.submit(worker.run, job_id)] = job_id
+                    self.stdout.write(f"Started job #{job_id}.")
+
+                if not running:
+                    if options['once']:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+
+                done, _ = wait(running, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                broken = False
+                for future in done:
+                    job_id = running.pop(future)
+                    finished += 1
+                    try:
+                        status = future.result()
+                    except Exception as e:
+                        # The process died (killed, out of memory) before the job could record its outcome
+                        record_failure(job_id, f"Worker process failed: {e}")
+                        status = 'FAILED'
+                        broken = broken or isinstance(e, BrokenProcessPool)
+                    self.stdout.write(f"Job #{job_id} {status.lower()}.")
+                if broken:
+                    # A dead process breaks the whole pool, taking the other running jobs with it
+                    for job_id in running.values():
+                        record_failure(job_id, 'Worker process pool failed.')
+                    running.clear()
+                    pool.shutdown(wait=False)
+                    pool = self.new_pool(workers)
+                    self.stdout.write(self.style.WARNING('A worker process died; the process pool was restarted.'))
+                heartbeat(running.values())
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING(f"Stopping: waiting for {len(running)} running job(s) to finish."))
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+        self.stdout.write(self.style.SUCCESS(f"Worker {name} stopped after {finished} job(s)."))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from predictive_analytics.budget_risk import load_model, score_lines, train_model
+
+
+class Command(BaseCommand):
+    help = (
+        'Retrains the budget rework-risk model on every approved or rejected budget line and '
+        'rescores all pending lines for the Performance & Budget Management page. '
+        'Schedule nightly; new submissions are scored as they arrive.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--score-only', action='store_true',
+            help='Rescore the pending lines with the saved model without retraining it.',
+        )
+
+    def handle(self, *args, **options):
+        if options['score_only']:
+            model = load_model()
+            if model is None:
+                raise CommandError('No trained budget risk model yet. Run without --score-only first.')
+        else:
+            try:
+                model = train_model()
+            except ValueError as e:
+                raise CommandError(str(e))
+            auc = f"{model['auc']:.3f}" if model['auc'] is not None else 'n/a'
+            self.stdout.write(self.style.SUCCESS(
+                f"Trained version {model['version']} on {model['training_lines']} decided lines "
+                f"({model['rejected_lines']} rejected, in-sample AUC {auc})."
+            ))
+        scored = score_lines()
+        self.stdout.write(self.style.SUCCESS(f"Scored {scored} pending budget line(s)."))
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-19 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("setup", "0007_remove_datedetail_quarter_year_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="datedetail",
+            name="fiscal_period",
+            field=models.PositiveSmallIntegerField(
+                blank=True, editable=False, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="datedetail",
+            name="fiscal_quarter",
+            field=models.PositiveSmallIntegerField(
+                blank=True, editable=False, null=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="datedetail",
+            index=models.Index(
+                fields=["fiscal_year", "fiscal_period"],
+                name="datedetail_fiscal_period_idx",
+            ),
+        ),
+    ]
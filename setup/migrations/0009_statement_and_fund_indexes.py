@@ -0,0 +1,112 @@
+# Generated by Django 4.2.30 on 2026-10-19 15:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# BRIN index on transaction_date (PostgreSQL only). GL lines arrive roughly in date
+# order, so a BRIN index gives date-range pruning at a fraction of a B-tree's size.
+def create_brin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS gltrx_date_brin ON setup_gltransaction "
+        "USING brin (transaction_date) WITH (pages_per_range = 32)"
+    )
+
+
+def drop_brin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS gltrx_date_brin")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("setup", "0008_datedetail_fiscal_quarter_fiscal_period"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="fundtransaction",
+            name="managed_fund",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                to="setup.managedfund",
+                verbose_name="Managed Fund",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="fundtransaction",
+            name="rsa_fund",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                to="setup.rsafund",
+                verbose_name="RSA Fund",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="fundtransaction",
+            index=models.Index(
+                fields=["rsa_fund", "transaction_date"], name="fundtrx_rsa_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="fundtransaction",
+            index=models.Index(
+                fields=["managed_fund", "transaction_date"],
+                name="fundtrx_managed_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="gltransaction",
+            index=models.Index(
+                fields=["entity_code", "transaction_date"], name="gltrx_entity_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="gltransaction",
+            index=models.Index(
+                fields=["cost_center_code", "transaction_date"],
+                name="gltrx_costcenter_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="gltransaction",
+            index=models.Index(
+                fields=["project_code", "transaction_date"],
+                name="gltrx_project_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="gltransaction",
+            index=models.Index(
+                fields=["journal_type", "transaction_date"],
+                name="gltrx_journal_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="gltransaction",
+            index=models.Index(
+                condition=models.Q(("posted_flag", True), ("reversal_flag", False)),
+                fields=["gl_account_code", "transaction_date"],
+                name="gltrx_posted_acct_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="gltransaction",
+            index=models.Index(
+                condition=models.Q(("currency_code", "NGN"), _negated=True),
+                fields=["currency_code", "transaction_date"],
+                name="gltrx_fx_currency_date_idx",
+            ),
+        ),
+        migrations.RunPython(create_brin_index, drop_brin_index),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 4.2.30 on 2026-10-19 15:44
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+from django.db.models.functions import TruncMonth
+
+
+# Net the reversal pairs already in the ledger: the two set-based UPDATEs of
+# setup.netting.apply_reversal_netting() as of this migration, inlined so later edits to it do not
+# change what this migration does. Only pairs within one calendar month are netted.
+def backfill_net_status(apps, schema_editor):
+    GLTransaction = apps.get_model("setup", "GLTransaction")
+    reversing = GLTransaction.objects.filter(
+        reversal_flag=True, reversal_ref_id__isnull=False, net_status="OPEN"
+    ).annotate(month=TruncMonth("transaction_date"))
+
+    GLTransaction.objects.filter(reversal_flag=False, net_status="OPEN").annotate(
+        month=TruncMonth("transaction_date")
+    ).filter(
+        Exists(reversing.filter(
+            month=OuterRef("month"),
+            reversal_ref_id=OuterRef("pk"),
+            gl_account_code=OuterRef("gl_account_code"),
+            debit=OuterRef("credit"),
+            credit=OuterRef("debit"),
+        ))
+    ).update(net_status="REVERSED")
+
+    reversing.filter(
+        Exists(GLTransaction.objects.annotate(month=TruncMonth("transaction_date")).filter(
+            month=OuterRef("month"),
+            pk=OuterRef("reversal_ref_id"),
+            net_status="REVERSED",
+            gl_account_code=OuterRef("gl_account_code"),
+            debit=OuterRef("credit"),
+            credit=OuterRef("debit"),
+        ))
+    ).update(net_status="REVERSING")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("setup", "0009_statement_and_fund_indexes"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="gltransaction",
+            name="gltrx_posted_acct_date_idx",
+        ),
+        migrations.AddField(
+            model_name="gltransaction",
+            name="net_status",
+            field=models.CharField(
+                choices=[
+                    ("OPEN", "Open"),
+                    ("REVERSED", "Reversed"),
+                    ("REVERSING", "Reversing"),
+                ],
+                default="OPEN",
+                max_length=10,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="gltransaction",
+            index=models.Index(
+                condition=models.Q(("net_status", "OPEN"), ("posted_flag", True)),
+                fields=["gl_account_code", "transaction_date"],
+                name="gltrx_net_acct_date_idx",
+            ),
+        ),
+        migrations.RunPython(backfill_net_status, migrations.RunPython.noop),
+    ]
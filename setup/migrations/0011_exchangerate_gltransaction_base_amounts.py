@@ -0,0 +1,72 @@
+# Generated by Django 4.2.30 on 2026-10-19 15:47
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+# Existing lines: translate at their stored exchange_rate in one UPDATE
+def backfill_base_amounts(apps, schema_editor):
+    GLTransaction = apps.get_model("setup", "GLTransaction")
+    GLTransaction.objects.update(
+        base_debit=F("debit") * F("exchange_rate"),
+        base_credit=F("credit") * F("exchange_rate"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("setup", "0010_gltransaction_net_status"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ExchangeRate",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "currency_code",
+                    models.CharField(max_length=10, verbose_name="Currency Code"),
+                ),
+                ("rate_date", models.DateField(verbose_name="Rate Date")),
+                (
+                    "rate",
+                    models.DecimalField(
+                        decimal_places=6, max_digits=18, verbose_name="Rate"
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Exchange Rate",
+                "verbose_name_plural": "Exchange Rates",
+                "ordering": ["currency_code", "-rate_date"],
+            },
+        ),
+        migrations.AddField(
+            model_name="gltransaction",
+            name="base_credit",
+            field=models.DecimalField(decimal_places=2, default=0.0, max_digits=18),
+        ),
+        migrations.AddField(
+            model_name="gltransaction",
+            name="base_debit",
+            field=models.DecimalField(decimal_places=2, default=0.0, max_digits=18),
+        ),
+        migrations.AddConstraint(
+            model_name="exchangerate",
+            constraint=models.UniqueConstraint(
+                fields=("currency_code", "rate_date"), name="fxrate_currency_date_uniq"
+            ),
+        ),
+        migrations.RunPython(backfill_base_amounts, migrations.RunPython.noop),
+    ]
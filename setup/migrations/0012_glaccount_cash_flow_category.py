@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-19 15:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("setup", "0011_exchangerate_gltransaction_base_amounts"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="glaccount",
+            name="cash_flow_category",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("CASH", "Cash & Cash Equivalents"),
+                    ("OPERATING", "Operating (Working Capital)"),
+                    ("NON_CASH", "Non-Cash Adjustment (e.g. Depreciation)"),
+                    ("INVESTING", "Investing Activities"),
+                    ("FINANCING", "Financing Activities"),
+                ],
+                max_length=20,
+                null=True,
+                verbose_name="Cash Flow Category",
+            ),
+        ),
+    ]
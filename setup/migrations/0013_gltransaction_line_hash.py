@@ -0,0 +1,79 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:07
+
+import hashlib
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+# data_management.importers.LINE_KEY_FIELDS / line_hash() as of this migration, frozen so later
+# edits to the importer do not change the hashes this migration writes.
+LINE_KEY_FIELDS = (
+    "transaction_date", "gl_account_code_id", "document_no", "reference_no", "journal_type",
+    "entity_code", "cost_center_code", "project_code", "currency_code", "debit", "credit", "reversal_flag",
+)
+
+
+def line_hash(values, occurrence=0):
+    parts = []
+    for field in LINE_KEY_FIELDS:
+        value = values.get(field)
+        if isinstance(value, Decimal):
+            value = f"{value:.2f}"
+        parts.append("" if value is None else str(value))
+    if occurrence:
+        parts.append(f"#{occurrence}")
+    return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+
+# Lines imported before line hashes existed, so re-importing their files updates them instead of
+# adding duplicates. Occurrences of identical lines are numbered per transaction_date in id order.
+def backfill_line_hashes(apps, schema_editor):
+    GLTransaction = apps.get_model("setup", "GLTransaction")
+    lines = (
+        GLTransaction.objects.filter(source_module="Upload")
+        .order_by("transaction_date", "id")
+        .only("id", *LINE_KEY_FIELDS)
+    )
+    batch = []
+    occurrences = {}
+    current_date = None
+    for line in lines.iterator(chunk_size=5000):
+        if line.transaction_date != current_date:
+            current_date = line.transaction_date
+            occurrences = {}
+        values = {field: getattr(line, field) for field in LINE_KEY_FIELDS}
+        key = line_hash(values)
+        occurrence = occurrences.get(key, 0)
+        occurrences[key] = occurrence + 1
+        line.line_hash = line_hash(values, occurrence) if occurrence else key
+        batch.append(line)
+        if len(batch) >= 5000:
+            GLTransaction.objects.bulk_update(batch, ["line_hash"])
+            batch = []
+    GLTransaction.objects.bulk_update(batch, ["line_hash"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("setup", "0012_glaccount_cash_flow_category"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="gltransaction",
+            name="line_hash",
+            field=models.CharField(
+                blank=True, editable=False, max_length=64, null=True
+            ),
+        ),
+        migrations.RunPython(backfill_line_hashes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="gltransaction",
+            constraint=models.UniqueConstraint(
+                fields=("transaction_date", "line_hash"),
+                name="gltrx_date_linehash_uniq",
+            ),
+        ),
+    ]
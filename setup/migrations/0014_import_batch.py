@@ -0,0 +1,41 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("data_management", "0005_uploadhistory_checksum"),
+        ("setup", "0013_gltransaction_line_hash"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="fundtransaction",
+            name="import_batch",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="fund_transactions",
+                to="data_management.uploadhistory",
+                verbose_name="Import Batch",
+            ),
+        ),
+        migrations.AddField(
+            model_name="gltransaction",
+            name="import_batch",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="gl_transactions",
+                to="data_management.uploadhistory",
+                verbose_name="Import Batch",
+            ),
+        ),
+    ]
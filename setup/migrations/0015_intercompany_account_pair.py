@@ -0,0 +1,63 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("setup", "0014_import_batch"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IntercompanyAccountPair",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100, verbose_name="Name")),
+                ("is_active", models.BooleanField(default=True, verbose_name="Active")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "credit_account",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="intercompany_credit_pairs",
+                        to="setup.glaccount",
+                        to_field="gl_account_code",
+                        verbose_name="Credit Side Account",
+                    ),
+                ),
+                (
+                    "debit_account",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="intercompany_debit_pairs",
+                        to="setup.glaccount",
+                        to_field="gl_account_code",
+                        verbose_name="Debit Side Account",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Intercompany Account Pair",
+                "verbose_name_plural": "Intercompany Account Pairs",
+                "ordering": ["name"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="intercompanyaccountpair",
+            constraint=models.UniqueConstraint(
+                fields=("debit_account", "credit_account"), name="icpair_accounts_uniq"
+            ),
+        ),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Builds the map for the regions already configured (setup.regions.location_region_rows)
+def build_location_region_map(apps, schema_editor):
+    Location = apps.get_model("setup", "Location")
+    Region = apps.get_model("setup", "Region")
+    LocationRegionMap = apps.get_model("setup", "LocationRegionMap")
+
+    rows = {}
+    for location_id, state_id, region_id in Location.objects.filter(
+        state__regions__isnull=False
+    ).values_list("pk", "state_id", "state__regions"):
+        rows[location_id, region_id] = (state_id, True)
+    for location_id, state_id, region_id in Region.locations.through.objects.values_list(
+        "location_id", "location__state_id", "region_id"
+    ):
+        rows.setdefault((location_id, region_id), (state_id, False))
+    LocationRegionMap.objects.bulk_create([
+        LocationRegionMap(location_id=location_id, region_id=region_id, state_id=state_id, via_state=via_state)
+        for (location_id, region_id), (state_id, via_state) in rows.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("setup", "0015_intercompany_account_pair"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LocationRegionMap",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("via_state", models.BooleanField(default=False)),
+                (
+                    "location",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="region_links",
+                        to="setup.location",
+                    ),
+                ),
+                (
+                    "region",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="location_links",
+                        to="setup.region",
+                    ),
+                ),
+                (
+                    "state",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="location_region_links",
+                        to="setup.state",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Location Region Map",
+                "verbose_name_plural": "Location Region Map",
+                "ordering": ["region", "state", "location"],
+                "indexes": [
+                    models.Index(
+                        fields=["region", "location"],
+                        name="locregion_region_location_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="locationregionmap",
+            constraint=models.UniqueConstraint(
+                fields=("location", "region"), name="locregion_location_region_uniq"
+            ),
+        ),
+        migrations.RunPython(build_location_region_map, migrations.RunPython.noop),
+    ]
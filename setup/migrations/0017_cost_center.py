@@ -0,0 +1,58 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("setup", "0016_location_region_map"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CostCenter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "code",
+                    models.CharField(
+                        max_length=50, unique=True, verbose_name="Cost Center Code"
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(
+                        blank=True, max_length=150, verbose_name="Cost Center Name"
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "department",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="cost_centers",
+                        to="setup.department",
+                        verbose_name="Department",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Cost Center",
+                "verbose_name_plural": "Cost Centers",
+                "ordering": ["code"],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-19 16:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("setup", "0017_cost_center"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="gltransaction",
+            name="gltrx_net_acct_date_idx",
+        ),
+        migrations.AddIndex(
+            model_name="gltransaction",
+            index=models.Index(
+                condition=models.Q(("net_status", "OPEN"), ("posted_flag", True)),
+                fields=["gl_account_code", "transaction_date", "id"],
+                name="gltrx_net_acct_date_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations
+from django.db.models import Exists, OuterRef
+from django.db.models.functions import TruncMonth
+
+
+# Reversal pairs were netted whatever month the reversal fell in, which hid the original from the
+# balances of the months before its reversal. Puts both sides of every netted pair that spans two
+# calendar months back to OPEN; same-month pairs stay netted. GLMonthlyBalance must be rebuilt
+# afterwards (manage.py refresh_gl_rollups).
+def reopen_cross_month_pairs(apps, schema_editor):
+    GLTransaction = apps.get_model("setup", "GLTransaction")
+    originals = GLTransaction.objects.annotate(month=TruncMonth("transaction_date"))
+    reversing = GLTransaction.objects.filter(net_status="REVERSING").annotate(
+        month=TruncMonth("transaction_date")
+    ).filter(
+        Exists(originals.filter(pk=OuterRef("reversal_ref_id")).exclude(month=OuterRef("month")))
+    )
+    GLTransaction.objects.filter(
+        pk__in=reversing.values("reversal_ref_id"), net_status="REVERSED"
+    ).update(net_status="OPEN")
+    reversing.update(net_status="OPEN")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("setup", "0018_gltransaction_net_account_keyset_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(reopen_cross_month_pairs, migrations.RunPython.noop),
+    ]
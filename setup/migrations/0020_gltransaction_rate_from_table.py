@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-19 17:10
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+# Foreign-currency lines whose rate equals the rate table's latest rate on or before their date
+# were translated from the table; any other rate was supplied with the line and is kept.
+def backfill_rate_from_table(apps, schema_editor):
+    GLTransaction = apps.get_model("setup", "GLTransaction")
+    ExchangeRate = apps.get_model("setup", "ExchangeRate")
+    table_rate = Subquery(
+        ExchangeRate.objects.filter(
+            currency_code=OuterRef("currency_code"), rate_date__lte=OuterRef("transaction_date")
+        ).order_by("-rate_date").values("rate")[:1]
+    )
+    GLTransaction.objects.exclude(
+        currency_code=getattr(settings, "BASE_CURRENCY", "NGN")
+    ).annotate(table_rate=table_rate).filter(exchange_rate=models.F("table_rate")).update(rate_from_table=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("setup", "0019_reopen_cross_month_reversals"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="gltransaction",
+            name="rate_from_table",
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(backfill_rate_from_table, migrations.RunPython.noop),
+    ]
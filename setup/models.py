@@ -1,7 +1,10 @@
 from django.db import models
 from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.utils import timezone
 import calendar # ADDED for month name calculation
+from .fiscal import fiscal_fields
+from .fx import to_base
 
 
 # Define choices based on the GL structure
@@ -16,6 +19,16 @@ BALANCE_CHOICES = [
     ('Debit', 'Debit'),
 ]
 
+# Indirect-method cash flow classification of Balance Sheet accounts (Income Statement accounts feed net income).
+# Blank Balance Sheet accounts are treated as OPERATING working capital.
+CASH_FLOW_CATEGORY_CHOICES = [
+    ('CASH', 'Cash & Cash Equivalents'),
+    ('OPERATING', 'Operating (Working Capital)'),
+    ('NON_CASH', 'Non-Cash Adjustment (e.g. Depreciation)'),
+    ('INVESTING', 'Investing Activities'),
+    ('FINANCING', 'Financing Activities'),
+]
+
 
 class RSAFund(models.Model):
     name = models.CharField(max_length=100, unique=True, verbose_name="PENCOM Fund Name")
@@ -70,6 +83,32 @@ class Region(models.Model):
     def __str__(self):
         return self.name
 
+class LocationRegionMap(models.Model):
+    """
+    Denormalized location -> state -> region index: one row per location and region containing it,
+    whether the region lists the location itself, its state, or both. Maintained from the Region
+    M2M tables by setup.signals (setup.regions.refresh_location_regions); region and state
+    roll-ups (setup.regions) join it on location instead of walking the M2M tables.
+    """
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name='region_links')
+    state = models.ForeignKey(State, on_delete=models.CASCADE, related_name='location_region_links')
+    region = models.ForeignKey(Region, on_delete=models.CASCADE, related_name='location_links')
+    via_state = models.BooleanField(default=False)  # the region lists the location's state
+
+    class Meta:
+        verbose_name = "Location Region Map"
+        verbose_name_plural = "Location Region Map"
+        ordering = ['region', 'state', 'location']
+        constraints = [
+            models.UniqueConstraint(fields=['location', 'region'], name='locregion_location_region_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['region', 'location'], name='locregion_region_location_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.location_id} -> {self.region_id}"
+
 class ManagedFund(models.Model):
     name = models.CharField(max_length=200, unique=True, verbose_name="Managed Fund Name")
     created_at = models.DateTimeField(auto_now_add=True)
@@ -107,6 +146,9 @@ class DateDetail(models.Model):
     quarter_name = models.CharField(max_length=10, null=True, blank=True, editable=False, verbose_name="QtrName") # 3. QX-YYYY (Qtr/Name -> QtrName)
     month_year = models.CharField(max_length=10, null=True, blank=True, editable=False) # 4. MX-YYYY
 
+    # Fiscal calendar columns (driven by settings.FISCAL_CALENDAR, see setup/fiscal.py)
+    fiscal_quarter = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+    fiscal_period = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
 
     def save(self, *args, **kwargs):
         # Calculate fields based on the date
@@ -134,8 +176,11 @@ class DateDetail(models.Model):
         self.year_quarter = f"{d.year} Q{self.quarter}"
         self.half_year = 1 if d.month <= 6 else 2
         
-        # Calculate Fiscal and Calendar Naming (assuming fiscal year = calendar year for simplicity)
-        self.fiscal_year = f"FY{d.year}" # 1. FYYYYY
+        # Calculate Fiscal and Calendar Naming (fiscal year follows the configured fiscal calendar)
+        fiscal = fiscal_fields(d)
+        self.fiscal_year = fiscal['fiscal_year'] # 1. FYYYYY
+        self.fiscal_quarter = fiscal['fiscal_quarter']
+        self.fiscal_period = fiscal['fiscal_period']
         self.calendar_year = f"CY{d.year}" # 2. CYYYYY
         self.quarter_name = f"Q{self.quarter}-{d.year}" # 3. QX-YYYY (QtrName)
         self.month_year = f"M{d.month}-{d.year}" # 4. MX-YYYY
@@ -146,6 +191,9 @@ class DateDetail(models.Model):
         verbose_name = "Date Detail"
         verbose_name_plural = "Date Table"
         ordering = ['date']
+        indexes = [
+            models.Index(fields=['fiscal_year', 'fiscal_period'], name='datedetail_fiscal_period_idx'),
+        ]
 
     def __str__(self):
         return f"{self.date.strftime('%Y-%m-%d')} ({self.quarter_name})"
@@ -156,6 +204,25 @@ class DateDetail(models.Model):
 from django.db import models
 from django.conf import settings
 from django.utils import timezone
+from django.db.models import Q
+
+# Net-ledger status: reversed/reversing pairs cancel out and are excluded from balances
+NET_STATUS_OPEN = 'OPEN'
+NET_STATUS_REVERSED = 'REVERSED'
+NET_STATUS_REVERSING = 'REVERSING'
+NET_STATUS_CHOICES = [
+    (NET_STATUS_OPEN, 'Open'),
+    (NET_STATUS_REVERSED, 'Reversed'),
+    (NET_STATUS_REVERSING, 'Reversing'),
+]
+
+
+class GLTransactionQuerySet(models.QuerySet):
+    def net(self):
+        """Posted lines that still count towards balances (netted reversal pairs excluded)."""
+        return self.filter(posted_flag=True, net_status=NET_STATUS_OPEN)
+
+
 # --- New GLTransaction Model ---
 class GLTransaction(models.Model):
     # transaction_id is automatically provided by Django's primary key (BigAutoField)
@@ -188,8 +255,14 @@ class GLTransaction(models.Model):
     project_code = models.CharField(max_length=50, blank=True, null=True)
     currency_code = models.CharField(max_length=10, default='NGN')
     exchange_rate = models.DecimalField(max_digits=18, decimal_places=6, default=1.000000)
+    # exchange_rate was looked up in the FX rate table (not supplied with the line), so
+    # revalue_gl_transactions may re-translate it after rates are corrected
+    rate_from_table = models.BooleanField(default=False, editable=False)
     debit = models.DecimalField(max_digits=18, decimal_places=2, default=0.00)
     credit = models.DecimalField(max_digits=18, decimal_places=2, default=0.00)
+    # debit/credit translated into settings.BASE_CURRENCY at exchange_rate (set by importers and re-translation)
+    base_debit = models.DecimalField(max_digits=18, decimal_places=2, default=0.00)
+    base_credit = models.DecimalField(max_digits=18, decimal_places=2, default=0.00)
     
     posted_flag = models.BooleanField(default=True)
     posted_date = models.DateTimeField(null=True, blank=True)
@@ -204,16 +277,64 @@ class GLTransaction(models.Model):
     source_module = models.CharField(max_length=50, blank=True, null=True)
     reversal_flag = models.BooleanField(default=False)
     reversal_ref_id = models.BigIntegerField(null=True, blank=True)
+    # Maintained by setup.netting.apply_reversal_netting() when lines are imported
+    net_status = models.CharField(max_length=10, choices=NET_STATUS_CHOICES, default=NET_STATUS_OPEN)
+    # Natural key of an imported line (data_management.importers.line_hash): re-importing the same
+    # line updates it instead of adding a duplicate. NULL for lines entered outside the importers.
+    line_hash = models.CharField(max_length=64, null=True, blank=True, editable=False)
+    # The upload that inserted the line; data_management.batches.rollback_batch() removes a whole upload
+    import_batch = models.ForeignKey(
+        'data_management.UploadHistory',
+        on_delete=models.PROTECT,
+        null=True, blank=True,
+        editable=False,
+        related_name='gl_transactions',
+        verbose_name="Import Batch"
+    )
     
     created_at = models.DateTimeField(auto_now_add=True) # Django uses auto_now_add instead of GETDATE()
 
+    objects = GLTransactionQuerySet.as_manager()
+
     class Meta:
         verbose_name = "GL Transaction"
         verbose_name_plural = "GL Transactions"
         # Optional: Add indexes for better performance on common lookups
+        # Dimension indexes lead with the filter column and end with the date so
+        # statement filters (IncomeStatementFilterForm) become index range scans.
+        # A BRIN index on transaction_date is added for PostgreSQL in migration 0009.
         indexes = [
             models.Index(fields=['transaction_date', 'gl_account_code']),
+            models.Index(fields=['entity_code', 'transaction_date'], name='gltrx_entity_date_idx'),
+            models.Index(fields=['cost_center_code', 'transaction_date'], name='gltrx_costcenter_date_idx'),
+            models.Index(fields=['project_code', 'transaction_date'], name='gltrx_project_date_idx'),
+            models.Index(fields=['journal_type', 'transaction_date'], name='gltrx_journal_date_idx'),
+            # Partial: only the net ledger (posted, not netted by a reversal) feeds the statements.
+            # Ends with id so GL drill-through pages (data_management.drill_through) are ordered range scans.
+            models.Index(
+                fields=['gl_account_code', 'transaction_date', 'id'],
+                condition=Q(posted_flag=True, net_status=NET_STATUS_OPEN),
+                name='gltrx_net_acct_date_idx',
+            ),
+            # Partial: base currency lines are the bulk of the ledger, so only foreign lines are indexed.
+            # The condition is fixed at NGN (the default BASE_CURRENCY) so migrations do not depend on
+            # settings; with another base currency queries stay correct but the index covers its lines too.
+            models.Index(
+                fields=['currency_code', 'transaction_date'],
+                condition=~Q(currency_code='NGN'),
+                name='gltrx_fx_currency_date_idx',
+            ),
         ]
+        constraints = [
+            # Includes the partition key, so it survives range partitioning (setup.partitioning)
+            models.UniqueConstraint(fields=['transaction_date', 'line_hash'], name='gltrx_date_linehash_uniq'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Single-row saves keep the base amounts in step; bulk importers set them directly
+        self.base_debit = to_base(self.debit, self.exchange_rate)
+        self.base_credit = to_base(self.credit, self.exchange_rate)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"TRX-{self.pk} ({self.gl_account_code.gl_account_code})"
@@ -224,16 +345,19 @@ class FundTransaction(models.Model):
     transaction_date = models.DateField(null=False)
     
     # Links to EITHER ManagedFund OR RSAFund (one must be set, the other null)
+    # db_index=False: covered by the (fund, transaction_date) composite indexes below
     managed_fund = models.ForeignKey(
         'ManagedFund',
         on_delete=models.PROTECT,
         null=True, blank=True,
+        db_index=False,
         verbose_name="Managed Fund"
     )
     rsa_fund = models.ForeignKey(
         'RSAFund',
         on_delete=models.PROTECT,
         null=True, blank=True,
+        db_index=False,
         verbose_name="RSA Fund"
     )
     
@@ -248,6 +372,14 @@ class FundTransaction(models.Model):
     
     # Source type to distinguish which import created the record
     source_type = models.CharField(max_length=20, choices=[('RSA', 'RSA Fund'), ('MANAGED', 'Managed Fund')])
+    import_batch = models.ForeignKey(
+        'data_management.UploadHistory',
+        on_delete=models.PROTECT,
+        null=True, blank=True,
+        editable=False,
+        related_name='fund_transactions',
+        verbose_name="Import Batch"
+    )
     
     created_at = models.DateTimeField(auto_now_add=True)
     
@@ -255,6 +387,10 @@ class FundTransaction(models.Model):
         verbose_name = "Fund Transaction"
         verbose_name_plural = "Fund Transactions"
         ordering = ['-transaction_date']
+        indexes = [
+            models.Index(fields=['rsa_fund', 'transaction_date'], name='fundtrx_rsa_date_idx'),
+            models.Index(fields=['managed_fund', 'transaction_date'], name='fundtrx_managed_date_idx'),
+        ]
 
     def __str__(self):
         if self.managed_fund:
@@ -323,7 +459,34 @@ class Department(models.Model):
 
     def __str__(self):
         return self.name
-        
+
+
+class CostCenter(models.Model):
+    """
+    A ledger cost center code (GLTransaction.cost_center_code) and the department it spends for,
+    so GL actuals can be set against the department's budget (analysis.drilldown).
+    """
+    code = models.CharField(max_length=50, unique=True, verbose_name="Cost Center Code")
+    name = models.CharField(max_length=150, blank=True, verbose_name="Cost Center Name")
+    department = models.ForeignKey(
+        Department,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='cost_centers',
+        verbose_name="Department"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Cost Center"
+        verbose_name_plural = "Cost Centers"
+        ordering = ['code']
+
+    def __str__(self):
+        return f"{self.code} - {self.name}" if self.name else self.code
+
+
 class GLAccount(models.Model):
     gl_account_code = models.CharField(max_length=15, unique=True, verbose_name="GL Account Code")
     gl_account_name = models.CharField(max_length=200, verbose_name="GL Account Name")
@@ -342,6 +505,9 @@ class GLAccount(models.Model):
         verbose_name="Parent Account"
     )
     normal_balance = models.CharField(max_length=10, choices=BALANCE_CHOICES, verbose_name="Normal Balance")
+    cash_flow_category = models.CharField(
+        max_length=20, choices=CASH_FLOW_CATEGORY_CHOICES, blank=True, null=True, verbose_name="Cash Flow Category"
+    )
     active_flag = models.BooleanField(default=True, verbose_name="Active")
     
     created_at = models.DateTimeField(auto_now_add=True)
@@ -353,4 +519,73 @@ class GLAccount(models.Model):
         ordering = ['gl_account_code']
 
     def __str__(self):
-        return f"{self.gl_account_code} - {self.gl_account_name}"
\ No newline at end of file
+        return f"{self.gl_account_code} - {self.gl_account_name}"
+
+
+class ExchangeRate(models.Model):
+    """Units of settings.BASE_CURRENCY per 1 unit of currency_code, effective from rate_date."""
+    currency_code = models.CharField(max_length=10, verbose_name="Currency Code")
+    rate_date = models.DateField(verbose_name="Rate Date")
+    rate = models.DecimalField(max_digits=18, decimal_places=6, verbose_name="Rate")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Exchange Rate"
+        verbose_name_plural = "Exchange Rates"
+        ordering = ['currency_code', '-rate_date']
+        constraints = [
+            # Also serves the "latest rate on or before a date" lookups
+            models.UniqueConstraint(fields=['currency_code', 'rate_date'], name='fxrate_currency_date_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.currency_code} {self.rate_date}: {self.rate}"
+
+
+class IntercompanyAccountPair(models.Model):
+    """
+    Intercompany accounts that eliminate against each other on consolidation
+    (data_management.consolidation): a receivable and its payable, or an intercompany expense and
+    the matching revenue. The debit side normally carries a debit balance, the credit side a
+    credit balance; the amount both sides hold in common is eliminated.
+    """
+    name = models.CharField(max_length=100, verbose_name="Name")
+    debit_account = models.ForeignKey(
+        GLAccount,
+        to_field='gl_account_code',
+        on_delete=models.CASCADE,
+        related_name='intercompany_debit_pairs',
+        verbose_name="Debit Side Account"
+    )
+    credit_account = models.ForeignKey(
+        GLAccount,
+        to_field='gl_account_code',
+        on_delete=models.CASCADE,
+        related_name='intercompany_credit_pairs',
+        verbose_name="Credit Side Account"
+    )
+    is_active = models.BooleanField(default=True, verbose_name="Active")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Intercompany Account Pair"
+        verbose_name_plural = "Intercompany Account Pairs"
+        ordering = ['name']
+        constraints = [
+            models.UniqueConstraint(fields=['debit_account', 'credit_account'], name='icpair_accounts_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.name}: {self.debit_account_id} / {self.credit_account_id}"
+
+    def clean(self):
+        # Both sides are matched on the same figures: movements (IS) or closing balances (BS)
+        if self.debit_account_id and self.credit_account_id:
+            if self.debit_account_id == self.credit_account_id:
+                raise ValidationError("The debit and credit side must be different accounts.")
+            if self.debit_account.financial_statement != self.credit_account.financial_statement:
+                raise ValidationError("Both accounts must be on the same financial statement.")
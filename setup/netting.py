@@ -0,0 +1,66 @@
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.functions import TruncMonth
+from .models import GLTransaction, NET_STATUS_OPEN, NET_STATUS_REVERSED, NET_STATUS_REVERSING
+
+
+def apply_reversal_netting(candidates=None, model=GLTransaction):
+    """
+    Marks reversal pairs with two set-based UPDATEs so statement queries can use
+    GLTransaction.objects.net() instead of self-joining on reversal_ref_id.
+
+    A pair matches when the reversing line (reversal_flag=True) points at the original through
+    reversal_ref_id, on the same GL account, with debit and credit swapped, in the same calendar
+    month. A reversal in a later month leaves both lines OPEN: the original must still count in
+    every balance and rollup month before the reversal date, and from then on the two cancel
+    out in the sums anyway. Partial reversals stay OPEN and keep counting. `candidates` limits
+    the reversing side (e.g. the lines of one import); None re-checks the whole ledger. `model` lets migrations pass the historical model.
+    Returns (reversed_count, reversing_count).
+    """
+    if candidates is None:
+        candidates = model.objects.all()
+    reversing = candidates.filter(
+        reversal_flag=True, reversal_ref_id__isnull=False, net_status=NET_STATUS_OPEN,
+    ).annotate(month=TruncMonth('transaction_date'))
+
+    with transaction.atomic():
+        reversed_count = model.objects.filter(reversal_flag=False, net_status=NET_STATUS_OPEN).annotate(
+            month=TruncMonth('transaction_date'),
+        ).filter(
+            Exists(reversing.filter(
+                month=OuterRef('month'),
+                reversal_ref_id=OuterRef('pk'),
+                gl_account_code=OuterRef('gl_account_code'),
+                debit=OuterRef('credit'),
+                credit=OuterRef('debit'),
+            ))
+        ).update(net_status=NET_STATUS_REVERSED)
+
+        reversing_count = reversing.filter(
+            Exists(model.objects.annotate(month=TruncMonth('transaction_date')).filter(
+                month=OuterRef('month'),
+                pk=OuterRef('reversal_ref_id'),
+                net_status=NET_STATUS_REVERSED,
+                gl_account_code=OuterRef('gl_account_code'),
+                debit=OuterRef('credit'),
+                credit=OuterRef('debit'),
+            ))
+        ).update(net_status=NET_STATUS_REVERSING)
+
+    return reversed_count, reversing_count
+
+
+def reversal_counterparts(lines):
+    """The other side of every netted reversal pair that has one side in `lines`."""
+    return GLTransaction.objects.filter(
+        Q(pk__in=lines.filter(net_status=NET_STATUS_REVERSING).values('reversal_ref_id'), net_status=NET_STATUS_REVERSED)
+        | Q(reversal_ref_id__in=lines.filter(net_status=NET_STATUS_REVERSED).values('pk'), net_status=NET_STATUS_REVERSING)
+    )
+
+
+def release_reversal_netting(lines):
+    """
+    Puts the counterparts of `lines` back to OPEN before `lines` are deleted, so removing one
+    side of a pair never leaves the other side hidden from the net ledger.
+    """
+    return reversal_counterparts(lines).update(net_status=NET_STATUS_OPEN)
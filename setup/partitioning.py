@@ -0,0 +1,228 @@
+"""
+Optional declarative range partitioning of setup_gltransaction by transaction_date (PostgreSQL only).
+
+The table is converted once with `manage.py partition_gl_transactions convert`. After that Django keeps
+using it as before: the planner prunes partitions for any query filtering on transaction_date. There is
+no DEFAULT partition, so `ALTER TABLE ... DETACH PARTITION ... CONCURRENTLY` stays available for
+archiving; importers call ensure_partitions() for the date range they are about to write.
+"""
+import datetime
+from django.conf import settings
+from django.db import connection, transaction
+
+DEFAULT_GL_PARTITIONING = {
+    'INTERVAL': 'yearly',
+    'PRECREATE': 2,
+    'ARCHIVE_SCHEMA': 'gl_archive',
+}
+
+INTERVALS = ('yearly', 'monthly')
+
+
+def get_partition_config():
+    config = dict(DEFAULT_GL_PARTITIONING)
+    config.update(getattr(settings, 'GL_PARTITIONING', {}))
+    if config['INTERVAL'] not in INTERVALS:
+        raise ValueError(f"GL_PARTITIONING INTERVAL must be one of: {', '.join(INTERVALS)}.")
+    return config
+
+
+def gl_table():
+    # Imported lazily: setup.models imports nothing from here, but keep the module importable from migrations
+    from setup.models import GLTransaction
+    return GLTransaction._meta.db_table
+
+
+def is_supported():
+    return connection.vendor == 'postgresql'
+
+
+def is_partitioned():
+    """True when setup_gltransaction is a partitioned table. Always False outside PostgreSQL."""
+    if not is_supported():
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = %s AND pg_table_is_visible(c.oid)",
+            [gl_table()],
+        )
+        return cursor.fetchone() is not None
+
+
+def period_start(d, interval):
+    return datetime.date(d.year, 1, 1) if interval == 'yearly' else datetime.date(d.year, d.month, 1)
+
+
+def next_period_start(start, interval):
+    if interval == 'yearly':
+        return datetime.date(start.year + 1, 1, 1)
+    return datetime.date(start.year + start.month // 12, start.month % 12 + 1, 1)
+
+
+def partition_name(start, interval):
+    suffix = f"y{start.year}" if interval == 'yearly' else f"m{start.year}{start.month:02d}"
+    return f"{gl_table()}_{suffix}"
+
+
+def list_partitions():
+    """Returns [(partition_name, bound_expression)] for the attached partitions, oldest first."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname, pg_get_expr(child.relpartbound, child.oid) "
+            "FROM pg_inherits i "
+            "JOIN pg_class parent ON parent.oid = i.inhparent "
+            "JOIN pg_class child ON child.oid = i.inhrelid "
+            "WHERE parent.relname = %s AND pg_table_is_visible(parent.oid) "
+            "ORDER BY child.relname",
+            [gl_table()],
+        )
+        return cursor.fetchall()
+
+
+def _create_partition(cursor, start, interval):
+    end = next_period_start(start, interval)
+    qn = connection.ops.quote_name
+    cursor.execute(
+        f"CREATE TABLE IF NOT EXISTS {qn(partition_name(start, interval))} "
+        f"PARTITION OF {qn(gl_table())} FOR VALUES FROM (%s) TO (%s)",
+        [start, end],
+    )
+
+
+def ensure_partitions(first_date, last_date, interval=None):
+    """
+    Creates any missing partitions covering [first_date, last_date]. No-op when the table is not
+    partitioned, so callers (importers, maintenance) can use it unconditionally.
+    """
+    if not is_partitioned():
+        return 0
+    interval = interval or get_partition_config()['INTERVAL']
+    existing = {name for name, _ in list_partitions()}
+    created = 0
+    with connection.cursor() as cursor:
+        start = period_start(first_date, interval)
+        while start <= last_date:
+            if partition_name(start, interval) not in existing:
+                _create_partition(cursor, start, interval)
+                created += 1
+            start = next_period_start(start, interval)
+    return created
+
+
+def partition_periods(first_date, last_date, interval=None):
+    """Yields (partition name, start, end) for the partition periods covering [first_date, last_date]."""
+    interval = interval or get_partition_config()['INTERVAL']
+    start = period_start(first_date, interval)
+    while start <= last_date:
+        end = next_period_start(start, interval)
+        yield partition_name(start, interval), start, end
+        start = end
+
+
+def truncate_partition(name):
+    """Empties one partition. Unlike a DELETE this reclaims the space at once and writes no per-row WAL."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"TRUNCATE TABLE {connection.ops.quote_name(name)}")
+
+
+def precreate_future_partitions(today=None):
+    """Keeps PRECREATE yearly/monthly partitions ready ahead of today."""
+    config = get_partition_config()
+    today = today or datetime.date.today()
+    last = period_start(today, config['INTERVAL'])
+    for _ in range(config['PRECREATE']):
+        last = next_period_start(last, config['INTERVAL'])
+    return ensure_partitions(today, last, config['INTERVAL'])
+
+
+def convert_to_partitioned(interval=None, keep_legacy=False):
+    """
+    One-time conversion of the heap table into a range-partitioned table, in a single transaction:
+    rename the old table, create the partitioned parent with the same columns, create partitions for
+    the existing date span, copy the rows, then recreate the primary key (id, transaction_date), the
+    foreign key / unique constraints and every index under their original names.
+    Unique constraints must include transaction_date, and no other table may reference
+    setup_gltransaction with a foreign key.
+    """
+    config = get_partition_config()
+    interval = interval or config['INTERVAL']
+    table = gl_table()
+    legacy = f"{table}_legacy"
+    qn = connection.ops.quote_name
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Foreign keys and unique constraints (their indexes are recreated with them)
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype IN ('f', 'u')",
+            [table],
+        )
+        constraint_defs = cursor.fetchall()
+        cursor.execute(
+            "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s AND indexname NOT IN "
+            "(SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass)",
+            [table, table],
+        )
+        index_defs = cursor.fetchall()
+
+        cursor.execute(f"ALTER TABLE {qn(table)} RENAME TO {qn(legacy)}")
+        cursor.execute(f"ALTER TABLE {qn(legacy)} RENAME CONSTRAINT {qn(table + '_pkey')} TO {qn(legacy + '_pkey')}")
+        for name, _ in constraint_defs:
+            cursor.execute(f"ALTER TABLE {qn(legacy)} RENAME CONSTRAINT {qn(name)} TO {qn(('legacy_' + name)[:63])}")
+        for name, _ in index_defs:
+            cursor.execute(f"ALTER INDEX {qn(name)} RENAME TO {qn(('legacy_' + name)[:63])}")
+
+        cursor.execute(
+            f"CREATE TABLE {qn(table)} (LIKE {qn(legacy)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE) "
+            f"PARTITION BY RANGE (transaction_date)"
+        )
+
+        cursor.execute(f"SELECT MIN(transaction_date), MAX(transaction_date), MAX(id) FROM {qn(legacy)}")
+        first_date, last_date, max_id = cursor.fetchone()
+        today = datetime.date.today()
+        first_date = first_date or today
+        last_date = max(last_date or today, today)
+        start = period_start(first_date, interval)
+        while start <= last_date:
+            _create_partition(cursor, start, interval)
+            start = next_period_start(start, interval)
+
+        cursor.execute(f"INSERT INTO {qn(table)} SELECT * FROM {qn(legacy)}")
+
+        # The identity column does not survive LIKE; replace it with an owned sequence continuing from MAX(id).
+        # (The legacy identity sequence, <table>_id_seq, is dropped together with the legacy table.)
+        sequence = f"{table}_part_id_seq"
+        cursor.execute(f"CREATE SEQUENCE IF NOT EXISTS {qn(sequence)} OWNED BY {qn(table)}.id")
+        cursor.execute("SELECT setval(%s, %s, %s)", [sequence, max_id or 1, max_id is not None])
+        cursor.execute(f"ALTER TABLE {qn(table)} ALTER COLUMN id SET DEFAULT nextval(%s::regclass)", [sequence])
+
+        # Unique constraints on a partitioned table must include the partition key
+        cursor.execute(f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(table + '_pkey')} PRIMARY KEY (id, transaction_date)")
+        for name, definition in constraint_defs:
+            cursor.execute(f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(name)} {definition}")
+        for _, definition in index_defs:
+            # pg_indexes still holds the original definitions (ON <table>), which now target the new parent
+            cursor.execute(definition)
+
+        if not keep_legacy:
+            cursor.execute(f"DROP TABLE {qn(legacy)}")
+
+    precreate_future_partitions()
+
+
+def detach_partition(name, archive=True, drop=False):
+    """
+    Detaches one partition with DETACH ... CONCURRENTLY (PostgreSQL 14+), which only takes a
+    SHARE UPDATE EXCLUSIVE lock on the parent, then moves it to ARCHIVE_SCHEMA or drops it.
+    Must run outside a transaction block.
+    """
+    config = get_partition_config()
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {qn(gl_table())} DETACH PARTITION {qn(name)} CONCURRENTLY")
+        if drop:
+            cursor.execute(f"DROP TABLE {qn(name)}")
+        elif archive:
+            cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {qn(config['ARCHIVE_SCHEMA'])}")
+            cursor.execute(f"ALTER TABLE {qn(name)} SET SCHEMA {qn(config['ARCHIVE_SCHEMA'])}")
@@ -0,0 +1,79 @@
+"""
+Region / state roll-ups over the LocationRegionMap index.
+
+A region covers the locations it lists and every location of the states it lists. Resolving that
+from the two Region M2M tables on every query means an OR across two join paths and a DISTINCT
+for locations covered both ways. LocationRegionMap holds the result instead, one row per location
+and region, refreshed by setup.signals whenever the M2M tables or a location's state change.
+
+Roll-ups take any queryset with a Location foreign key (budget lines today) and group it through
+that one map join. A location in two regions counts in both: region totals are exact per region
+but overlap across regions that share a location.
+"""
+from django.db import transaction
+from django.db.models import Sum
+from .models import Location, LocationRegionMap, Region
+
+
+def location_region_rows(regions=None, locations=None):
+    """{(location id, region id): (state id, via_state)} for the given region / location ids (all when None)."""
+    direct = Region.locations.through.objects.all()
+    by_state = Location.objects.filter(state__regions__isnull=False)
+    if regions is not None:
+        direct = direct.filter(region_id__in=regions)
+        by_state = by_state.filter(state__regions__in=regions)
+    if locations is not None:
+        direct = direct.filter(location_id__in=locations)
+        by_state = by_state.filter(pk__in=locations)
+
+    rows = {}
+    for location_id, state_id, region_id in by_state.values_list('pk', 'state_id', 'state__regions'):
+        rows[location_id, region_id] = (state_id, True)
+    for location_id, state_id, region_id in direct.values_list('location_id', 'location__state_id', 'region_id'):
+        # Listed directly and through its state: still one row
+        rows.setdefault((location_id, region_id), (state_id, False))
+    return rows
+
+
+def refresh_location_regions(regions=None, locations=None):
+    """
+    Rebuilds the LocationRegionMap rows of the given region / location ids (the whole map when
+    both are None). Returns the number of rows written.
+    """
+    rows = location_region_rows(regions, locations)
+    stale = LocationRegionMap.objects.all()
+    if regions is not None:
+        stale = stale.filter(region_id__in=regions)
+    if locations is not None:
+        stale = stale.filter(location_id__in=locations)
+    with transaction.atomic():
+        stale.delete()
+        LocationRegionMap.objects.bulk_create([
+            LocationRegionMap(location_id=location_id, region_id=region_id, state_id=state_id, via_state=via_state)
+            for (location_id, region_id), (state_id, via_state) in rows.items()
+        ])
+    return len(rows)
+
+
+def region_totals(queryset, amount='annual_amount', location_field='location'):
+    """{region id: Sum(amount)} of `queryset`; rows whose location is in no region are under None."""
+    return dict(
+        queryset.values_list(f'{location_field}__region_links__region')
+        .annotate(total=Sum(amount))
+        .order_by()
+    )
+
+
+def region_state_totals(queryset, amount='annual_amount', location_field='location'):
+    """{(region id, state id): Sum(amount)} of `queryset` (region None outside every region)."""
+    return {
+        (region_id, state_id): total
+        for region_id, state_id, total in queryset.values_list(
+            f'{location_field}__region_links__region', f'{location_field}__state',
+        ).annotate(total=Sum(amount)).order_by()
+    }
+
+
+def state_totals(queryset, amount='annual_amount', location_field='location'):
+    """{state id: Sum(amount)} of `queryset` (a location has one state, so no map is needed)."""
+    return dict(queryset.values_list(f'{location_field}__state').annotate(total=Sum(amount)).order_by())
@@ -0,0 +1,30 @@
+"""
+Keeps LocationRegionMap (setup.regions) in step with the Region M2M tables and location states.
+Deleting a region, state or location removes its map rows by cascade.
+"""
+from django.db.models.signals import m2m_changed, post_save
+from django.dispatch import receiver
+from .models import Location, Region
+from .regions import refresh_location_regions
+
+
+@receiver(m2m_changed, sender=Region.states.through)
+@receiver(m2m_changed, sender=Region.locations.through)
+def region_membership_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        refresh_location_regions(regions=[instance.pk])
+    elif pk_set:
+        # Changed from the state / location side: pk_set holds region ids
+        refresh_location_regions(regions=pk_set)
+    else:
+        # A reverse clear does not say which regions lost the state / location
+        refresh_location_regions()
+
+
+@receiver(post_save, sender=Location)
+def location_saved(sender, instance, raw=False, **kwargs):
+    # A location moved to another state joins / leaves the regions listing those states
+    if not raw:
+        refresh_location_regions(locations=[instance.pk])
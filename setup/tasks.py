@@ -0,0 +1,30 @@
+"""
+Background job handlers of the setup app (see data_management.jobs).
+"""
+import io
+from django.core.management import call_command
+from data_management.jobs import job_handler, report_progress
+
+# Maintenance commands that may be queued as jobs, e.g.
+# enqueue('management_command', {'name': 'revalue_gl_transactions', 'args': ['--as-of', '2024-12-31']})
+QUEUEABLE_COMMANDS = {
+    'forecast_aum',
+    'model_pin_activity',
+    'recompute_fiscal_calendar',
+    'refresh_gl_rollups',
+    'refresh_kpi_snapshots',
+    'revalue_gl_transactions',
+    'train_budget_risk',
+}
+
+
+@job_handler('management_command')
+def management_command(job, name, args=None):
+    """Runs one of QUEUEABLE_COMMANDS; the command's output is kept as the job result."""
+    if name not in QUEUEABLE_COMMANDS:
+        raise ValueError(f"'{name}' cannot be run as a background job.")
+    report_progress(job, 0, 1, f"Running {name}")
+    output = io.StringIO()
+    call_command(name, *(args or []), stdout=output, no_color=True)
+    report_progress(job, 1, 1, 'Done')
+    return {'output': output.getvalue()}
@@ -1,3 +1,173 @@
+import datetime
+import io
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import Sum
 from django.test import TestCase
+from budget_input.models import BudgetTransaction
+from data_management.balance_sheet import build_balance_sheet
+from data_management.rollups import refresh_monthly_balances
+from .fx import REVALUATION_SOURCE, post_revaluation
+from .models import (
+    Department, ExchangeRate, GLAccount, GLTransaction, Location, LocationRegionMap, NET_STATUS_OPEN,
+    NET_STATUS_REVERSED, NET_STATUS_REVERSING, Region, State,
+)
+from .netting import apply_reversal_netting, release_reversal_netting
+from .regions import location_region_rows, region_totals
 
-# Create your tests here.
+
+def make_account(code, financial_statement='Balance Sheet', normal_balance='Debit', category='Test', **fields):
+    return GLAccount.objects.create(
+        gl_account_code=code, gl_account_name=f'Account {code}', category=category,
+        financial_statement=financial_statement, account_type='Asset', normal_balance=normal_balance, **fields,
+    )
+
+
+def post(account, date, debit=0, credit=0, **fields):
+    return GLTransaction.objects.create(
+        gl_account_code=account, transaction_date=date, debit=Decimal(debit), credit=Decimal(credit), **fields,
+    )
+
+
+class ReversalNettingTests(TestCase):
+    def setUp(self):
+        self.receivable = make_account('1200')
+
+    def balance_at(self, date):
+        totals = GLTransaction.objects.net().filter(
+            gl_account_code=self.receivable, transaction_date__lte=date,
+        ).aggregate(debit=Sum('debit'), credit=Sum('credit'))
+        return (totals['debit'] or 0) - (totals['credit'] or 0)
+
+    def test_same_month_pair_is_netted(self):
+        original = post(self.receivable, datetime.date(2024, 2, 5), debit=500)
+        reversal = post(
+            self.receivable, datetime.date(2024, 2, 20), credit=500, reversal_flag=True, reversal_ref_id=original.pk,
+        )
+        self.assertEqual(apply_reversal_netting(), (1, 1))
+        original.refresh_from_db()
+        reversal.refresh_from_db()
+        self.assertEqual((original.net_status, reversal.net_status), (NET_STATUS_REVERSED, NET_STATUS_REVERSING))
+        self.assertEqual(self.balance_at(datetime.date(2024, 2, 10)), 0)
+
+    def test_reversal_in_later_month_keeps_original_in_earlier_balances(self):
+        original = post(self.receivable, datetime.date(2024, 2, 10), debit=500)
+        post(self.receivable, datetime.date(2024, 3, 15), credit=500, reversal_flag=True, reversal_ref_id=original.pk)
+        self.assertEqual(apply_reversal_netting(), (0, 0))
+        self.assertEqual(self.balance_at(datetime.date(2024, 2, 29)), Decimal(500))
+        self.assertEqual(self.balance_at(datetime.date(2024, 3, 31)), 0)
+
+    def test_partial_reversal_stays_open(self):
+        original = post(self.receivable, datetime.date(2024, 2, 5), debit=500)
+        post(self.receivable, datetime.date(2024, 2, 6), credit=200, reversal_flag=True, reversal_ref_id=original.pk)
+        self.assertEqual(apply_reversal_netting(), (0, 0))
+        self.assertEqual(self.balance_at(datetime.date(2024, 2, 29)), Decimal(300))
+
+    def test_release_reopens_counterpart(self):
+        original = post(self.receivable, datetime.date(2024, 2, 5), debit=500)
+        reversal = post(
+            self.receivable, datetime.date(2024, 2, 6), credit=500, reversal_flag=True, reversal_ref_id=original.pk,
+        )
+        apply_reversal_netting()
+        release_reversal_netting(GLTransaction.objects.filter(pk=reversal.pk))
+        original.refresh_from_db()
+        self.assertEqual(original.net_status, NET_STATUS_OPEN)
+
+
+class RevaluationTests(TestCase):
+    def setUp(self):
+        self.receivable = make_account('1200', category='Current Assets')
+        self.revenue = make_account('4000', financial_statement='Income Statement', normal_balance='Credit')
+        self.fx_gain_loss = make_account('7900', financial_statement='Income Statement', normal_balance='Credit')
+        ExchangeRate.objects.create(currency_code='USD', rate_date=datetime.date(2024, 12, 1), rate=Decimal(1500))
+        ExchangeRate.objects.create(currency_code='USD', rate_date=datetime.date(2024, 12, 31), rate=Decimal(1600))
+        self.sale = post(
+            self.receivable, datetime.date(2024, 12, 5), debit=100, currency_code='USD', exchange_rate=Decimal(1500),
+        )
+        post(self.revenue, datetime.date(2024, 12, 5), credit=100, currency_code='USD', exchange_rate=Decimal(1500))
+        refresh_monthly_balances()
+
+    def totals_at(self, as_at):
+        totals = build_balance_sheet('monthly', as_at.replace(day=1), as_at)['totals']
+        return totals['assets'][-1], totals['liabilities'][-1] + totals['equity'][-1]
+
+    def test_closing_rate_revaluation_keeps_the_balance_sheet_balanced(self):
+        self.assertEqual(post_revaluation(datetime.date(2024, 12, 31), '7900'), (1, []))
+        self.sale.refresh_from_db()
+        self.assertEqual(self.sale.exchange_rate, Decimal(1500))
+        self.assertEqual(self.totals_at(datetime.date(2024, 12, 31)), (Decimal(160000), Decimal(160000)))
+        # Reversed the next day: back to the historical translation
+        self.assertEqual(self.totals_at(datetime.date(2025, 1, 1)), (Decimal(150000), Decimal(150000)))
+        gain = GLTransaction.objects.filter(gl_account_code=self.fx_gain_loss, transaction_date=datetime.date(2024, 12, 31))
+        self.assertEqual(gain.aggregate(total=Sum('credit'))['total'], Decimal(10000))
+
+    def test_revaluation_is_replaced_when_run_again(self):
+        post_revaluation(datetime.date(2024, 12, 31), '7900')
+        post_revaluation(datetime.date(2024, 12, 31), '7900')
+        self.assertEqual(GLTransaction.objects.filter(source_module=REVALUATION_SOURCE).count(), 4)
+        self.assertEqual(self.totals_at(datetime.date(2024, 12, 31)), (Decimal(160000), Decimal(160000)))
+
+    def test_retranslation_keeps_supplied_rates(self):
+        from_table = post(
+            self.receivable, datetime.date(2024, 12, 6), debit=10, currency_code='USD',
+            exchange_rate=Decimal(1500), rate_from_table=True,
+        )
+        ExchangeRate.objects.filter(rate_date=datetime.date(2024, 12, 1)).update(rate=Decimal(1520))
+        call_command('revalue_gl_transactions', stdout=io.StringIO())
+        self.sale.refresh_from_db()
+        from_table.refresh_from_db()
+        self.assertEqual(self.sale.exchange_rate, Decimal(1500))
+        self.assertEqual((from_table.exchange_rate, from_table.base_debit), (Decimal(1520), Decimal(15200)))
+
+
+class LocationRegionMapTests(TestCase):
+    def setUp(self):
+        self.lagos = State.objects.create(name='Lagos')
+        self.ogun = State.objects.create(name='Ogun')
+        self.ikeja = Location.objects.create(name='Ikeja', state=self.lagos)
+        self.abeokuta = Location.objects.create(name='Abeokuta', state=self.ogun)
+        self.south_west = Region.objects.create(name='South West')
+        self.coastal = Region.objects.create(name='Coastal')
+
+    def assertMapInStep(self):
+        self.assertEqual(
+            {(row.location_id, row.region_id): (row.state_id, row.via_state) for row in LocationRegionMap.objects.all()},
+            location_region_rows(),
+        )
+
+    def test_map_follows_membership_and_location_changes(self):
+        self.south_west.states.add(self.lagos)  # forward
+        self.assertMapInStep()
+        self.ogun.regions.add(self.south_west, self.coastal)  # reverse
+        self.assertMapInStep()
+        self.coastal.locations.add(self.ikeja)
+        self.assertEqual(LocationRegionMap.objects.count(), 4)
+
+        self.ikeja.state = self.ogun
+        self.ikeja.save()
+        self.assertMapInStep()
+        self.assertTrue(LocationRegionMap.objects.get(location=self.ikeja, region=self.coastal).via_state)
+
+        self.ogun.regions.clear()  # reverse clear: no region ids given
+        self.assertMapInStep()
+        self.south_west.states.remove(self.lagos)
+        self.assertMapInStep()
+        self.assertEqual(list(LocationRegionMap.objects.values_list('location', 'region')), [(self.ikeja.pk, self.coastal.pk)])
+
+    def test_location_listed_directly_and_through_its_state_counts_once(self):
+        self.south_west.states.add(self.lagos)
+        self.south_west.locations.add(self.ikeja)
+        self.assertEqual(LocationRegionMap.objects.filter(region=self.south_west).count(), 1)
+
+        user = get_user_model().objects.create_user('planner')
+        account = make_account('6000', financial_statement='Income Statement')
+        department = Department.objects.create(name='Admin')
+        for location, amount in ((self.ikeja, 100), (self.abeokuta, 40)):
+            BudgetTransaction.objects.create(
+                budget_year=2025, transaction_type='OPEX', department=department, gl_account=account,
+                location=location, description='Rent', annual_amount=Decimal(amount), submitted_by=user,
+            )
+        self.assertEqual(
+            region_totals(BudgetTransaction.objects.all()), {self.south_west.pk: Decimal(100), None: Decimal(40)},
+        )
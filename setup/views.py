@@ -3,10 +3,13 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView
 from django.urls import reverse_lazy, reverse
+from django.db.models import Count, Max
 # FIX 1: Added Department to model imports
 from .models import RSAFund, State, Location, Region, ManagedFund, DateDetail, GLAccount, Department 
 # FIX 2: Added DepartmentForm to form imports
 from .forms import RSAFundForm, StateForm, LocationForm, RegionForm, ManagedFundForm, DateDetailForm, GLAccountForm, DepartmentForm
+from .regions import region_totals
+from budget_input.models import BudgetTransaction
 
 # --- Setup Index View ---
 @login_required
@@ -110,6 +113,22 @@ class RegionListView(BaseSetupView, ListView):
     template_name = 'setup/region_list.html'
     context_object_name = 'regions'
 
+    def get_queryset(self):
+        # Locations covered directly or through a state, each counted once (setup.LocationRegionMap)
+        return Region.objects.prefetch_related('states', 'locations').annotate(locations_covered=Count('location_links'))
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Approved budget of the latest budget year per region, in one grouped query over the map
+        approved = BudgetTransaction.objects.filter(status='APPROVED')
+        budget_year = approved.aggregate(year=Max('budget_year'))['year']
+        totals = region_totals(approved.filter(budget_year=budget_year)) if budget_year else {}
+        for region in context['regions']:
+            region.approved_budget = totals.get(region.pk)
+        context['budget_year'] = budget_year
+        context['unassigned_budget'] = totals.get(None)
+        return context
+
 class RegionCreateView(BaseSetupView, CreateView):
     model = Region
     form_class = RegionForm
@@ -167,3 +167,136 @@ LOGIN_URL = 'login'
 # Email backend configuration
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
+
+# Fiscal calendar used by the Date Table (setup.DateDetail) fiscal columns.
+# START_MONTH: 1-12 (e.g. 4 for an April-March fiscal year)
+# PERIOD_PATTERN: 'monthly', '4-4-5' or '4-5-4'
+# After changing, run: python manage.py recompute_fiscal_calendar
+FISCAL_CALENDAR = {
+    'START_MONTH': 1,
+    'PERIOD_PATTERN': 'monthly',
+}
+
+# Historical data uploads (data_management.importers and the import commands).
+# CHUNK_SIZE: rows per bulk_create batch.
+# CREATE_MISSING_FUNDS: create RSA/Managed funds named in an upload that do not exist yet
+# (otherwise the upload is rejected).
+# PARSE_WORKERS: processes parsing the files/sheets of an upload while the database writes
+# (0 parses in the importing process); QUEUE_CHUNKS: parsed chunks allowed to wait for the writer.
+# PARALLEL_MIN_BYTES: smaller uploads are parsed in-process. Measure with: python manage.py benchmark_import
+DATA_IMPORT = {
+    'CHUNK_SIZE': 5000,
+    'CREATE_MISSING_FUNDS': False,
+    'PARSE_WORKERS': 2,
+    'QUEUE_CHUNKS': 8,
+    'PARALLEL_MIN_BYTES': 2 * 1024 * 1024,
+}
+
+# Reporting currency. GL lines are translated into it at import (base_debit/base_credit)
+# using setup.ExchangeRate. Load rates with: python manage.py load_fx_rates rates.csv
+BASE_CURRENCY = 'NGN'
+
+# Closing-rate revaluation (python manage.py revalue_gl_transactions --as-of YYYY-MM-DD): Balance
+# Sheet foreign-currency balances are restated with adjustment lines against GAIN_LOSS_ACCOUNT
+# (an Income Statement unrealised FX gain/loss account), reversed the next day.
+FX_REVALUATION = {
+    'GAIN_LOSS_ACCOUNT': '',
+}
+
+# Optional PostgreSQL range partitioning of GL transactions by transaction_date.
+# Convert once with: python manage.py partition_gl_transactions convert
+# Then schedule:     python manage.py partition_gl_transactions maintain
+# INTERVAL: 'yearly' or 'monthly'; PRECREATE: future partitions kept ready ahead of today.
+# Ignored on SQLite (the regular single-table layout is used).
+GL_PARTITIONING = {
+    'INTERVAL': 'yearly',
+    'PRECREATE': 2,
+    'ARCHIVE_SCHEMA': 'gl_archive',
+}
+
+# Background jobs (data_management.jobs): uploads, statement exports and recomputations run
+# outside the request. Start the workers with: python manage.py run_workers
+# RUN_INLINE: run each job in the process that enqueues it (tests, or a box without workers).
+# WORKERS: worker processes per run_workers; POLL_INTERVAL: seconds between queue checks.
+# STALE_AFTER: seconds without a heartbeat before a running job is recovered when run_workers
+# starts: re-queued while it has been tried fewer than MAX_ATTEMPTS times, otherwise failed.
+BACKGROUND_JOBS = {
+    'RUN_INLINE': False,
+    'WORKERS': 2,
+    'POLL_INTERVAL': 2,
+    'STALE_AFTER': 900,
+    'MAX_ATTEMPTS': 2,
+}
+
+# AUM forecasting (predictive_analytics.forecasting) for the Financial Forecasting page.
+# Schedule nightly: python manage.py forecast_aum
+# HORIZON_MONTHS: forecast length; MIN_HISTORY: periods a fund needs before it is forecast.
+# WORKERS: fitting processes; CHUNK_FUNDS: funds fitted together in one vectorised batch.
+# INTERVAL_Z: prediction interval width in standard errors (1.96 = 95%); KEEP_RUNS: runs kept.
+AUM_FORECASTING = {
+    'HORIZON_MONTHS': 12,
+    'MIN_HISTORY': 6,
+    'WORKERS': 2,
+    'CHUNK_FUNDS': 500,
+    'INTERVAL_Z': 1.96,
+    'KEEP_RUNS': 5,
+}
+
+# PIN activity model (predictive_analytics.pin_model) for the Customer & Operational Insight page.
+# Schedule nightly: python manage.py model_pin_activity
+# HORIZON_MONTHS: projection length; MIN_HISTORY: periods a fund needs before it is modelled.
+# PRIOR_PERIODS: how many periods of a fund's own data the all-funds rates count as (shrinkage).
+# ENROLMENT_WINDOW: recent periods averaged for projected enrolments; KEEP_RUNS: runs kept.
+PIN_MODEL = {
+    'HORIZON_MONTHS': 24,
+    'MIN_HISTORY': 4,
+    'PRIOR_PERIODS': 2,
+    'ENROLMENT_WINDOW': 4,
+    'KEEP_RUNS': 5,
+}
+
+# Budget rework-risk model (predictive_analytics.budget_risk) for the Performance & Budget Management page.
+# Schedule nightly: python manage.py train_budget_risk (retrains, then rescores the pending queue).
+# Each training run is saved as a new version of the 'budget_risk' model artifact (MODEL_ARTIFACTS).
+# PRIOR_LINES: decided lines' worth of the overall rejection rate each department / submitter /
+# account rate is shrunk towards; L2, ITERATIONS: regularisation and Newton steps of the fit.
+# MIN_TRAINING_LINES: decided lines needed to train; HIGH_RISK: risk from which a line is flagged.
+BUDGET_RISK = {
+    'PRIOR_LINES': 10,
+    'L2': 1.0,
+    'ITERATIONS': 25,
+    'MIN_TRAINING_LINES': 30,
+    'HIGH_RISK': 0.5,
+}
+
+# Fitted model artifacts (predictive_analytics.artifacts): versioned, checksummed .npy files.
+# ROOT: where versions are stored (must be shared by the web and worker processes).
+# KEEP_VERSIONS: inactive versions kept per model for rollback (manage.py model_artifacts --activate).
+# VERIFY_ON_LOAD: check a version's SHA-256 before a process first maps it.
+# CHECK_INTERVAL: seconds a process serves its cached version before re-checking the active one.
+MODEL_ARTIFACTS = {
+    'ROOT': BASE_DIR / 'var' / 'model_artifacts',
+    'KEEP_VERSIONS': 5,
+    'VERIFY_ON_LOAD': True,
+    'CHECK_INTERVAL': 5,
+}
+
+# Report fragment cache (data_management.fragment_cache) for the balance sheet, cash flow and budget
+# forecast pages. Entries are keyed by the data versions of their sources, so they never
+# need clearing; use a shared CACHES backend (database, Redis) to share them across processes.
+# CACHE: alias in CACHES; TIMEOUT: seconds an unused entry is kept. Hit rates: /data/fragment_cache/stats/
+FRAGMENT_CACHE = {
+    'ENABLED': True,
+    'CACHE': 'default',
+    'TIMEOUT': 6 * 60 * 60,
+}
+
+# Multi-entity consolidation (data_management.consolidation, /data/consolidation/). Entities are
+# computed in WORKERS processes ('spawn'; 0 or 1 computes in-process) once there are at least
+# PARALLEL_MIN_ENTITIES of them. MAX_MONTHS: longest history window. Intercompany account pairs
+# are maintained in the admin. Precompute a close period with: python manage.py consolidate
+CONSOLIDATION = {
+    'WORKERS': 4,
+    'PARALLEL_MIN_ENTITIES': 4,
+    'MAX_MONTHS': 60,
+}